@@ -3,7 +3,7 @@ import logging
 import logging.config
 import os
 from ast import Call
-from datetime import datetime
+from datetime import datetime, time
 from pathlib import Path
 
 from omegaconf import OmegaConf
@@ -11,9 +11,18 @@ from telebot.types import CallbackQuery, Message
 
 from ..database.core import db_session
 from ..database.core import export_all_tables
-from .markup import create_admin_menu_markup, create_delete_all_matches_confirmation_markup
-from ..match.service import delete_all_matches
+from .markup import (
+    create_admin_menu_markup,
+    create_delete_all_matches_confirmation_markup,
+    create_new_season_confirmation_markup,
+)
+from ..match.service import delete_all_matches, read_match
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_equals
 from ..title.service import update_title_for_all_players
+from ..rating.checkpoints import replay_ratings_from, top_players_as_of
+from ..rating.seasons import close_season, get_active_season
 from ..rating.service import rebuild_all_ratings
 
 # Set up logging
@@ -22,8 +31,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-app_strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+app_strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 def register_handlers(bot):
@@ -52,7 +61,13 @@ def register_handlers(bot):
             message,
             text="Рейтинг игроков обновляется. Пожалуйста, подождите..."
         )
-        rebuild_all_ratings(db=db_session)
+        # `/update <match_id>` replays only the matches from that one on, starting at the nearest checkpoint
+        args = message.text.split()
+        match = read_match(int(args[1]), db_session) if len(args) > 1 and args[1].isdigit() else None
+        if match:
+            replay_ratings_from(db_session, match.timestamp, match.id, match.season_id)
+        else:
+            rebuild_all_ratings(db=db_session)
         bot.edit_message_text(
             chat_id=sent_message.chat.id,
             message_id=sent_message.message_id,
@@ -71,7 +86,34 @@ def register_handlers(bot):
         )
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "admin")
+    @bot.message_handler(commands=["rating_as_of"])
+    def rating_as_of_command(message: Message, data: dict):
+        """`/rating_as_of DD.MM.YYYY [count]` – the season's top players at the end of that day"""
+        user = data["user"]
+        if user.role_id not in {0, 1}:
+            bot.reply_to(message, app_strings[user.lang].no_rights)
+            return
+
+        strings = app_strings[user.lang].rating_as_of
+        args = message.text.split()
+        try:
+            day = datetime.strptime(args[1], "%d.%m.%Y").date()
+            limit = int(args[2]) if len(args) > 2 else config.rating_as_of.top
+        except (IndexError, ValueError):
+            bot.reply_to(message, strings.usage)
+            return
+
+        # Replayed from the nearest checkpoint, the stored ratings are not touched
+        top = top_players_as_of(db_session, datetime.combine(day, time.max), limit)
+        date = f"{day:%d.%m.%Y}"
+        lines = [strings.header.format(date=date)] if top else [strings.empty.format(date=date)]
+        lines += [
+            strings.line.format(place=place, username=username, rating=rating)
+            for place, (username, rating) in enumerate(top, 1)
+        ]
+        bot.reply_to(message, "\n".join(lines))
+
+    @bot.callback_query_handler(func=data_equals("admin"))
     def admin_menu_handler(call: CallbackQuery, data: dict):
         """Handler to show the admin menu."""
         user = data["user"]
@@ -88,17 +130,17 @@ def register_handlers(bot):
             reply_markup=create_admin_menu_markup(user.lang)
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "about")
+    @bot.callback_query_handler(func=data_equals("about"))
     def about_handler(call: Call, data: dict):
         user_id = call.from_user.id
 
-        config_str = OmegaConf.to_yaml(config)
+        config_str = OmegaConf.to_yaml(config.resolve())
 
         # Send config
         bot.send_message(user_id, f"```yaml\n{config_str}\n```", parse_mode="Markdown")
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "export_data")
+    @bot.callback_query_handler(func=data_equals("export_data"))
     def export_data_handler(call, data):
         user = data["user"]
         # Export data
@@ -116,7 +158,7 @@ def register_handlers(bot):
             bot.send_message(user.id, f"Error: ```{str(e)}```", parse_mode="Markdown")
             logger.error(f"Error exporting data: {e}")
 
-    @bot.callback_query_handler(func=lambda call: call.data == "delete_all_matches")
+    @bot.callback_query_handler(func=data_equals("delete_all_matches"))
     def delete_all_matches_handler(call: CallbackQuery, data: dict):
         """Handler to ask for confirmation to delete all matches."""
         user = data["user"]
@@ -131,7 +173,7 @@ def register_handlers(bot):
             reply_markup=create_delete_all_matches_confirmation_markup(user.lang)
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "delete_all_matches_confirm")
+    @bot.callback_query_handler(func=data_equals("delete_all_matches_confirm"))
     def delete_all_matches_confirm_handler(call: CallbackQuery, data: dict):
         """Handler to delete all matches after confirmation."""
         user = data["user"]
@@ -162,4 +204,47 @@ def register_handlers(bot):
             )
             bot.answer_callback_query(call.id, "Error!")
 
+    @bot.callback_query_handler(func=data_equals("new_season"))
+    def new_season_handler(call: CallbackQuery, data: dict):
+        """Handler to ask for confirmation to close the current season."""
+        user = data["user"]
+        if user.role_id not in {0, 1}:
+            bot.answer_callback_query(call.id, app_strings[user.lang].no_rights, show_alert=True)
+            return
+
+        bot.edit_message_text(
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            text=app_strings[user.lang].new_season.confirm,
+            reply_markup=create_new_season_confirmation_markup(user.lang)
+        )
+
+    @bot.callback_query_handler(func=data_equals("new_season_confirm"))
+    def new_season_confirm_handler(call: CallbackQuery, data: dict):
+        """Handler to archive the current season and start a new one after confirmation."""
+        user = data["user"]
+        if user.role_id not in {0, 1}:
+            bot.answer_callback_query(call.id, app_strings[user.lang].no_rights, show_alert=True)
+            return
+
+        try:
+            closed = get_active_season(db_session)
+            closed_name = closed.name
+            started = close_season(db_session)
 
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text=app_strings[user.lang].new_season.success.format(closed=closed_name, started=started.name),
+                reply_markup=create_admin_menu_markup(user.lang)
+            )
+            bot.answer_callback_query(call.id, "Done!")
+        except Exception as e:
+            logger.error(f"Error starting a new season: {e}")
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text=app_strings[user.lang].new_season.error,
+                reply_markup=create_admin_menu_markup(user.lang)
+            )
+            bot.answer_callback_query(call.id, "Error!")
@@ -2,13 +2,15 @@ import logging
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-app_strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+app_strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 logging.basicConfig(level=logging.INFO)
@@ -59,3 +61,19 @@ def create_delete_all_matches_confirmation_markup(lang: str) -> InlineKeyboardMa
     )
     markup.add(confirm_button, cancel_button)
     return markup
+
+
+def create_new_season_confirmation_markup(lang: str) -> InlineKeyboardMarkup:
+    """Create a confirmation markup for closing the current season."""
+    markup = InlineKeyboardMarkup(row_width=2)
+    strings = app_strings[lang].new_season
+    confirm_button = InlineKeyboardButton(
+        strings.confirm_button,
+        callback_data="new_season_confirm"
+    )
+    cancel_button = InlineKeyboardButton(
+        strings.cancel_button,
+        callback_data="admin"  # back to admin menu
+    )
+    markup.add(confirm_button, cancel_button)
+    return markup
@@ -30,6 +30,12 @@ def read_users(db_session: Session, ids: Optional[list[int]] = None) -> list[Use
     return result
 
 
+def read_users_by_username(db_session: Session, usernames: list[str]) -> dict[str, User]:
+    """Read users by username, keyed by username"""
+    users = db_session.query(User).filter(User.username.in_(usernames)).all()
+    return {user.username: user for user in users}
+
+
 def create_user(
     db_session: Session,
     id: int,
@@ -3,13 +3,15 @@ import logging
 from pathlib import Path
 from tracemalloc import start
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 from telebot.states import State, StatesGroup
 
 from ..common.service import cancel_timeout, start_timeout, user_messages
 from ..database.core import db_session
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_equals, data_startswith
 from .markup import create_clan_selection_menu_markup
 from .service import format_clan_stats, get_clan_stats, read_clans
 
@@ -19,8 +21,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Define States
 class ClanratingState(StatesGroup):
@@ -56,12 +58,12 @@ def register_handlers(bot: TeleBot):
         # user_messages[message.chat.id] = sent_message.message_id
         # start_timeout(bot, message.chat.id, sent_message.message_id)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "clanrating", state=ClanratingState.watching_clan_stats)
+    @bot.callback_query_handler(func=data_equals("clanrating"), state=ClanratingState.watching_clan_stats)
     def clanrating_callback(call: types.CallbackQuery, data: dict):
         """Handle the clan rating callback"""
         start_clanrating(call.message, data)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("clan_"), state=ClanratingState.waiting_for_clan_name)
+    @bot.callback_query_handler(func=data_startswith("clan_"), state=ClanratingState.waiting_for_clan_name)
     def process_clan_callback(call: types.CallbackQuery, data: dict):
         """Process the selected clan from callback"""
         user = data["user"]
@@ -98,7 +100,7 @@ def register_handlers(bot: TeleBot):
         bot.answer_callback_query(call.id)
 
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("exit"))
+    @bot.callback_query_handler(func=data_startswith("exit"))
     def exit_clanrating(call: types.CallbackQuery, data: dict):
         """Exit the clan rating process"""
         user = data["user"]
@@ -2,15 +2,16 @@ import logging
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from ..match.models import Clan
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +25,7 @@ def create_clan_selection_menu_markup(lang: str, clans: list[Clan]) -> InlineKey
 
     # Add buttons for each clan
     
-    print(clans, len(clans))
+    logger.debug("Clans for the markup: %s", len(clans))
     for clan in clans:
         markup.add(InlineKeyboardButton(clan.name, callback_data=f"clan_{clan.name}"))
 
@@ -4,6 +4,7 @@ from sqlalchemy import func
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import Session
 
+from ..database.replicas import on_primary, read_only
 from ..match.models import Clan, Hero, MatchParticipant, WinTypeEnum
 from ..top import service as top_services
 from ..title import service as title_services
@@ -76,7 +77,9 @@ def get_clan_stats(session: Session, clan_name: str):
             .filter(MatchParticipant.win_type == WinTypeEnum.stones).scalar() or 0
         print(f"Spirit stone wins: {stones_wins}")
 
-        best_player = top_services.get_top_players_by_clan(session, clan_id=clan.id, limit=1)[0]
+        # The stats are stored, so they are computed from the primary throughout
+        with on_primary():
+            best_player = top_services.get_top_players_by_clan(session, clan_id=clan.id, limit=1)[0]
 
         # get title associated with this clan
         clan_title = title_services.read_clan_title(session, clan_id=clan.id)
@@ -164,6 +167,7 @@ def format_clan_stats(clan_name, stats):
     return "\n".join(result)
 
 
+@read_only
 def read_clans(db_session: Session):
     """
     Read all clans from the database
@@ -0,0 +1,97 @@
+"""
+Background deletion of conversation messages.
+
+Handlers hand over the ids of the messages to remove and return at once; a
+background thread waits ``coalesce_seconds`` for more ids of the same chat and
+removes them with ``deleteMessages``, up to 100 ids per call. Telegram skips
+messages that are already gone, so deleting twice is harmless.
+
+    message_cleaner.delete(bot, chat_id, messages_to_delete + [message.message_id])
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
+
+from ..registry import lazy_config
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+
+# Limit of the deleteMessages method
+MAX_BATCH_SIZE = 100
+
+
+class MessageCleaner:
+    """Collects the messages to delete per chat and deletes them in batches from a background thread"""
+
+    def __init__(self, coalesce_seconds: Optional[float] = None, batch_size: Optional[int] = None):
+        self.coalesce_seconds = coalesce_seconds
+        self.batch_size = batch_size
+        # chat id -> (bot, message ids in the order they were handed over)
+        self._pending: dict[int, tuple[TeleBot, dict[int, None]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def delete(self, bot: TeleBot, chat_id: int, message_ids: Iterable[Optional[int]]):
+        """Queue ``message_ids`` of ``chat_id`` for deletion; ``None`` ids are ignored"""
+        ids = [message_id for message_id in message_ids if message_id is not None]
+        if not ids:
+            return
+        with self._lock:
+            pending = self._pending.setdefault(chat_id, (bot, {}))[1]
+            pending.update(dict.fromkeys(ids))
+        self._start()
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(ids) for _, ids in self._pending.values())
+
+    def flush(self) -> int:
+        """Delete everything queued so far in the calling thread; returns the number of deleteMessages calls"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        batch_size = min(self.batch_size or config.cleanup.batch_size, MAX_BATCH_SIZE)
+        calls = 0
+        for chat_id, (bot, ids) in pending.items():
+            ids = sorted(ids)
+            for start in range(0, len(ids), batch_size):
+                self._delete_batch(bot, chat_id, ids[start:start + batch_size])
+                calls += 1
+        return calls
+
+    def _delete_batch(self, bot: TeleBot, chat_id: int, message_ids: list[int]):
+        try:
+            bot.delete_messages(chat_id, message_ids)
+        except ApiTelegramException as e:
+            # E.g. no rights in the chat, or none of the messages can be deleted any more
+            logger.info("Could not delete %s messages in chat %s: %s", len(message_ids), chat_id, e.description)
+        except Exception as e:
+            logger.warning("Failed to delete %s messages in chat %s: %s", len(message_ids), chat_id, e)
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="message-cleaner", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # Let the rest of a conversation's cleanup arrive, so it goes out in one call
+            time.sleep(self.coalesce_seconds if self.coalesce_seconds is not None else config.cleanup.coalesce_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+
+message_cleaner = MessageCleaner()
@@ -1,17 +1,18 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 
 from ..common.service import cancel_timeout
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
 
 logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 def register_handlers(bot: TeleBot):
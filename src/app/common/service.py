@@ -1,13 +1,13 @@
 import threading
 from pathlib import Path
 
-from omegaconf import OmegaConf
-
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Timeout duration in seconds
 TIMEOUT_DURATION = 120
@@ -1,12 +1,14 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.states import State, StatesGroup
 
 from ..database.core import db_session
 from ..match.models import Player
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_startswith
 from .service import (
     CLAN_CATEGORIES,
     create_custom_title,
@@ -20,8 +22,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 class CustomTitleState(StatesGroup):
@@ -59,7 +61,7 @@ def register_handlers(bot: TeleBot):
         bot.reply_to(message, "Выберите действие:", reply_markup=markup)
         data["state"].set(CustomTitleState.action_selection)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("customtitle_action:"), 
+    @bot.callback_query_handler(func=data_startswith("customtitle_action:"), 
                               state=CustomTitleState.action_selection)
     def custom_title_action_selected(call: types.CallbackQuery, data: dict):
         """Handle custom title action selection"""
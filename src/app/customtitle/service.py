@@ -2,6 +2,7 @@ import logging
 from sqlalchemy.orm import Session
 
 from ..match.models import Player
+from ..rating.profile import invalidate_profiles
 from .models import CustomTitle
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,7 @@ def create_custom_title(session: Session, player_id: int, title: str) -> CustomT
     custom_title = CustomTitle(player_id=player_id, title=title)
     session.add(custom_title)
     session.commit()
+    invalidate_profiles(player_id)
     return custom_title
 
 
@@ -59,6 +61,7 @@ def delete_custom_title(session: Session, player_id: int, title: str) -> bool:
     
     session.delete(custom_title)
     session.commit()
+    invalidate_profiles(player_id)
     return True
 
 
@@ -1,7 +1,7 @@
 import csv
 import logging
-import logging.config
 import os
+from importlib import import_module
 
 from dotenv import find_dotenv, load_dotenv
 from sqlalchemy import create_engine, inspect
@@ -9,10 +9,8 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 
 from ..auth.models import Base
+from .migrations import upgrade_schema
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-logging.getLogger('sqlalchemy.engine.Engine').setLevel(logging.WARN)
 logger = logging.getLogger(__name__)
 
 
@@ -25,15 +23,24 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-print(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
+# An explicit DATABASE_URL (e.g. for benchmarks) takes precedence over the DB_* variables
+if os.getenv("DATABASE_URL"):
+    DATABASE_URL = os.getenv("DATABASE_URL")
 # Check if any of the required environment variables are not set
-if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_PORT]):
+elif not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_PORT]):
     logger.warning("One or more postgresql database environment variables are not set. Using SQLite instead.")
     DATABASE_URL = "sqlite:///local_database.db"
 else:
     # Construct the database URL for PostgreSQL
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
 
+# Comma separated URLs of read replicas of DATABASE_URL, for the read-only queries (see replicas.py)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Set to 1 to let the schema upgrade drop unique constraints that the models no longer declare;
+# the ones replaced by a wider declared constraint (e.g. per season) are always migrated
+DB_DROP_STALE_CONSTRAINTS = os.getenv("DB_DROP_STALE_CONSTRAINTS", "") == "1"
+
 def get_engine():
     """Get a new engine for the database."""
     return create_engine(
@@ -43,13 +50,61 @@ def get_engine():
     )
 
 
+# Feature packages whose models belong to the schema (items is not wired into the bot)
+MODEL_MODULES = [
+    "auth",
+    "match",
+    "rating",
+    "title",
+    "customtitle",
+    "herorating",
+    "clanrating",
+    "public_message",
+    "middleware",
+    "jobs",
+    "i18n",
+    "database",
+    "versus",
+    "matchup",
+]
+
+
+def import_models():
+    """Import the models of every feature package so they are registered on Base.metadata."""
+    app_package = __package__.rsplit(".", 1)[0]
+    for name in MODEL_MODULES:
+        import_module(f"{app_package}.{name}.models")
+
+
 def create_tables():
-    """Create tables in the database."""
+    """Create tables in the database and bring existing ones up to date."""
+    import_models()
     engine = get_engine()
     Base.metadata.create_all(engine)
+    upgrade_schema(
+        engine, Base.metadata, drop_stale_constraints=DB_DROP_STALE_CONSTRAINTS, backfills=_column_backfills()
+    )
     logger.info("Tables created")
 
 
+def _column_backfills():
+    """Fillers of the columns that the upgrade adds to existing tables, run in its transaction"""
+    from ..matchhistory.service import backfill_participant_timestamps
+    from ..rating.history import backfill_history_seasons
+
+    def in_session(backfill):
+        # The session joins the upgrade's transaction, its commit does not end it
+        def run(connection):
+            with sessionmaker(bind=connection)() as session:
+                backfill(session)
+        return run
+
+    return {
+        ("rating_history", "season_id"): in_session(backfill_history_seasons),
+        ("match_participants", "timestamp"): in_session(backfill_participant_timestamps),
+    }
+
+
 def drop_tables():
     """Drop tables in the database."""
     engine = get_engine()
@@ -86,7 +141,7 @@ def export_all_tables(db_session, export_dir: str) -> list[str]:
     db_session.close()
     return table_names
 
-# Create engine and session factory
+# Create engine and session factory (no connection is opened until the first query)
 engine = create_engine(DATABASE_URL, echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
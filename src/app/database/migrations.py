@@ -0,0 +1,166 @@
+"""
+Minimal schema upgrades for existing databases.
+
+``create_all`` only creates missing tables. This module brings existing tables in
+line with the models: it adds missing columns (with their server defaults, so
+existing rows get a value) and creates missing indexes and unique constraints.
+Columns whose values have to be derived from other tables are filled by the
+caller's ``backfills`` in the transaction that adds them.
+
+A unique constraint that the models replaced by a wider one, e.g. ``(player_id)``
+by ``(season_id, player_id)``, is dropped: the wider constraint is created in its
+place, on SQLite (which cannot drop a constraint) by rebuilding the table. Other
+unique constraints that the models no longer declare are only reported, unless
+the caller opts in to dropping them with ``drop_stale_constraints``.
+"""
+import logging
+from typing import Callable, Mapping, Optional
+
+from sqlalchemy import MetaData, UniqueConstraint, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+
+logger = logging.getLogger(__name__)
+
+
+def _column_ddl(engine: Engine, column) -> str:
+    ddl = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+    if column.server_default is not None:
+        default = column.server_default.arg
+        ddl += f" DEFAULT {getattr(default, 'text', default)}"
+    if not column.nullable and column.server_default is not None:
+        ddl += " NOT NULL"
+    return ddl
+
+
+def _declared_unique(table) -> set[tuple[str, ...]]:
+    return {
+        tuple(column.name for column in constraint.columns)
+        for constraint in table.constraints if isinstance(constraint, UniqueConstraint)
+    } | {(column.name,) for column in table.columns if column.unique}
+
+
+def _superseded(columns: tuple[str, ...], declared: set[tuple[str, ...]]) -> bool:
+    """Whether a declared constraint extends the existing one on ``columns`` by more columns"""
+    return any(set(columns) < set(wider) for wider in declared)
+
+
+def superseded_unique_constraints(connection: Connection, tables) -> list[str]:
+    """The existing unique constraints of ``tables`` that the upgrade still has to replace by wider ones"""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    superseded = []
+    for table in tables:
+        if table.name not in existing_tables:
+            continue
+        declared = _declared_unique(table)
+        for constraint in inspector.get_unique_constraints(table.name):
+            if _superseded(tuple(constraint["column_names"]), declared):
+                superseded.append(f"{table.name}{tuple(constraint['column_names'])}")
+    return superseded
+
+
+def _rebuild_table(connection: Connection, table, columns: set[str]):
+    """Recreate a SQLite table from its model, keeping the rows of the existing ``columns``"""
+    staging = f"{table.name}__rebuild"
+    create = str(CreateTable(table).compile(dialect=connection.dialect))
+    create = create.replace(f"CREATE TABLE {table.name} (", f"CREATE TABLE {staging} (", 1)
+    copied = ", ".join(column.name for column in table.columns if column.name in columns)
+    connection.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+    connection.execute(text(create))
+    connection.execute(text(f"INSERT INTO {staging} ({copied}) SELECT {copied} FROM {table.name}"))
+    connection.execute(text(f"DROP TABLE {table.name}"))
+    connection.execute(text(f"ALTER TABLE {staging} RENAME TO {table.name}"))
+    for index in table.indexes:
+        connection.execute(CreateIndex(index))
+
+
+def upgrade_schema(
+    engine: Engine,
+    metadata: MetaData,
+    drop_stale_constraints: bool = False,
+    backfills: Optional[Mapping[tuple[str, str], Callable[[Connection], None]]] = None,
+) -> set[tuple[str, str]]:
+    """
+    Apply the missing columns, indexes and unique constraints of ``metadata`` to existing tables.
+
+    Args:
+        drop_stale_constraints: Drop the unique constraints that the models no longer declare (and
+            that no declared one replaces) instead of only logging them (not supported on SQLite)
+        backfills: (table, column) -> function filling that column of the existing rows, called
+            with the upgrade's connection when the column is added. An error rolls the upgrade
+            back (on databases with transactional DDL), so the next start adds and fills it again
+
+    Returns:
+        (table, column) of every added column
+    """
+    added = set()
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    sqlite = engine.dialect.name == "sqlite"
+
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    logger.info(f"Adding column {table.name}.{column.name}")
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(engine, column)}"))
+                    added.add((table.name, column.name))
+                    columns.add(column.name)
+
+            declared_unique = _declared_unique(table)
+            existing_unique = inspector.get_unique_constraints(table.name)
+            superseded = [
+                constraint for constraint in existing_unique
+                if _superseded(tuple(constraint["column_names"]), declared_unique)
+            ]
+            if superseded and sqlite:
+                logger.info(f"Rebuilding table {table.name} to replace its unique constraints")
+                _rebuild_table(connection, table, columns)
+                continue
+            for constraint in superseded:
+                logger.info(f"Dropping unique constraint {constraint['name']} on {table.name}, replaced by a wider one")
+                connection.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {constraint['name']}"))
+
+            for constraint in existing_unique:
+                if tuple(constraint["column_names"]) in declared_unique or constraint in superseded:
+                    continue
+                # SQLite cannot drop a table constraint without recreating the table
+                if not drop_stale_constraints or sqlite or not constraint.get("name"):
+                    logger.warning(
+                        f"Unique constraint {constraint.get('name') or ''} on "
+                        f"{table.name}{tuple(constraint['column_names'])} is no longer declared "
+                        f"and has to be dropped manually"
+                    )
+                    continue
+                logger.info(f"Dropping unique constraint {constraint['name']} on {table.name}")
+                connection.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {constraint['name']}"))
+
+            index_names = {index["name"] for index in inspector.get_indexes(table.name)}
+            unique_names = {constraint.get("name") for constraint in inspector.get_unique_constraints(table.name)}
+            for index in table.indexes:
+                if index.name not in index_names:
+                    logger.info(f"Creating index {index.name}")
+                    connection.execute(CreateIndex(index))
+            for constraint in table.constraints:
+                if not isinstance(constraint, UniqueConstraint) or not constraint.name:
+                    continue
+                if constraint.name in unique_names or constraint.name in index_names:
+                    continue
+                logger.info(f"Creating unique constraint {constraint.name}")
+                if sqlite:
+                    # SQLite enforces a unique index the same way as a table constraint
+                    columns = ", ".join(column.name for column in constraint.columns)
+                    connection.execute(text(f"CREATE UNIQUE INDEX {constraint.name} ON {table.name} ({columns})"))
+                else:
+                    connection.execute(AddConstraint(constraint))
+
+        for column, backfill in (backfills or {}).items():
+            if column in added:
+                logger.info(f"Backfilling column {'.'.join(column)}")
+                backfill(connection)
+    return added
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, DateTime, Integer
+
+from ..models import Base
+
+
+class ReplicationHeartbeat(Base):
+    """ Single row rewritten on the primary; its value on a replica is how far the replica has replayed """
+    __tablename__ = "replication_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    written_at = Column(DateTime, nullable=False)
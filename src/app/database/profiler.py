@@ -0,0 +1,150 @@
+"""
+Query profiler for development and tests.
+
+Records the SQL statements run by the current thread, grouped by normalized
+statement and the application line that issued them. A statement repeated from
+the same line is the N+1 pattern (a query per row of an earlier result); slow
+statements are listed with their duration.
+
+    with QueryProfiler() as profiler:
+        update_title_for_all_players(session)
+    print(profiler.report())
+"""
+import functools
+import logging
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..routing import registered_handlers
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parents[1]
+_IGNORED_FILES = {str(Path(__file__).resolve())}
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """The statement with literals and IN lists replaced by placeholders"""
+    statement = _STRINGS.sub("?", statement)
+    statement = _NUMBERS.sub("?", statement)
+    statement = _IN_LISTS.sub("IN (?)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+def call_site() -> str:
+    """``file:line in function`` of the innermost application frame outside the database layer"""
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename not in _IGNORED_FILES and "sqlalchemy" not in filename:
+            if filename.startswith(str(APP_DIR)):
+                return f"{Path(filename).relative_to(APP_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            if fallback is None and not filename.startswith(sys.prefix):
+                fallback = f"{Path(filename).name}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "<unknown>"
+
+
+@dataclass
+class StatementStats:
+    statement: str
+    call_site: str
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+
+class QueryProfiler:
+    """Collects the statements executed by the current thread while active"""
+
+    def __init__(self, slow_query_ms: float = 100, n_plus_one_threshold: int = 5):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.statements: dict[tuple[str, str], StatementStats] = {}
+        self.query_count = 0
+        self._thread = None
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() != self._thread:
+            return
+        elapsed = time.perf_counter() - conn.info["profiler_started"].pop()
+        key = (normalize_statement(statement), call_site())
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = self.statements[key] = StatementStats(*key)
+        stats.count += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        self.query_count += 1
+
+    def start(self):
+        self._thread = threading.get_ident()
+        event.listen(Engine, "before_cursor_execute", self._before)
+        event.listen(Engine, "after_cursor_execute", self._after)
+        return self
+
+    def stop(self):
+        event.remove(Engine, "before_cursor_execute", self._before)
+        event.remove(Engine, "after_cursor_execute", self._after)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def n_plus_one(self) -> list[StatementStats]:
+        """Statements repeated from one call site at least ``n_plus_one_threshold`` times"""
+        repeated = [stats for stats in self.statements.values() if stats.count >= self.n_plus_one_threshold]
+        return sorted(repeated, key=lambda stats: -stats.count)
+
+    def slow_queries(self) -> list[StatementStats]:
+        """Statements that took longer than ``slow_query_ms`` at least once"""
+        slow = [stats for stats in self.statements.values() if stats.max_time * 1000 >= self.slow_query_ms]
+        return sorted(slow, key=lambda stats: -stats.max_time)
+
+    def report(self) -> str:
+        total = sum(stats.total_time for stats in self.statements.values())
+        lines = [f"{self.query_count} queries in {total * 1000:.1f} ms, {len(self.statements)} distinct"]
+        for stats in self.n_plus_one():
+            lines.append(f"  N+1: {stats.count}x at {stats.call_site}: {stats.statement[:200]}")
+        for stats in self.slow_queries():
+            lines.append(f"  slow: {stats.max_time * 1000:.1f} ms at {stats.call_site}: {stats.statement[:200]}")
+        return "\n".join(lines)
+
+
+def profile_handlers(bot, slow_query_ms: float, n_plus_one_threshold: int):
+    """Log the N+1 patterns and slow queries of every handler call of ``bot``"""
+    def profiled(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = QueryProfiler(slow_query_ms, n_plus_one_threshold).start()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.stop()
+                if profiler.n_plus_one() or profiler.slow_queries():
+                    logger.warning(f"Queries of handler {function.__module__}.{function.__name__}: "
+                                   f"{profiler.report()}")
+        return wrapper
+
+    for kind in ("message_handlers", "callback_query_handlers", "inline_handlers"):
+        for handler in registered_handlers(bot, kind):
+            handler["function"] = profiled(handler["function"])
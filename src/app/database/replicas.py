@@ -0,0 +1,229 @@
+"""
+Read replicas for the read-only query paths.
+
+Service functions decorated with ``@read_only`` run on a session of a replica
+instead of the session they are called with, as long as a replica is fresh
+enough: the primary rewrites a heartbeat row every ``heartbeat_seconds`` and
+the heartbeat a replica returns is the point it has replayed to. A replica
+lagging more than ``max_lag_seconds``, or failing, is skipped; without a usable
+replica the call stays on the primary.
+
+A user whose write (e.g. a confirmed match) a replica has not replayed yet is
+read from the primary until it has, so the bot never shows them their rating
+from before their own match.
+
+    configure_replicas(["postgresql://replica-1/bot"], max_lag_seconds=5)
+    start_heartbeat(session_factory, interval=1)
+
+    @read_only
+    def get_top_players(db: Session, ...): ...
+"""
+import functools
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Sequence, Union
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from ..metrics.collector import metrics
+from .models import ReplicationHeartbeat
+
+logger = logging.getLogger(__name__)
+
+# Telegram user of the update being handled, set by the user middlewares
+_current_user: ContextVar[Optional[int]] = ContextVar("replica_user", default=None)
+# Set inside ``on_primary()`` blocks
+_primary_only: ContextVar[bool] = ContextVar("replica_primary_only", default=False)
+
+
+class Replica:
+    """A replica engine with its sessions and the last heartbeat read from it"""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        # Results are used after the read transaction ends, so they are not expired by it
+        self.sessions = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+        self.position: Optional[datetime] = None
+        self.checked_at: Optional[float] = None
+
+
+class ReplicaRouter:
+    """Picks a replica fresh enough for the current user, or none to stay on the primary"""
+
+    def __init__(self, engines: Sequence[Engine], max_lag_seconds: float = 5, lag_check_seconds: float = 1,
+                 clock: Callable[[], datetime] = datetime.utcnow, monotonic: Callable[[], float] = time.monotonic):
+        self.replicas = [Replica(f"replica{index}", engine) for index, engine in enumerate(engines, start=1)]
+        self.max_lag = timedelta(seconds=max_lag_seconds)
+        self.lag_check_seconds = lag_check_seconds
+        self.clock = clock
+        self.monotonic = monotonic
+        # user id -> time of their last write on the primary
+        self._writes: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def record_write(self, user_id: Optional[int], at: Optional[datetime] = None):
+        """Read ``user_id`` from the primary until the replicas have replayed a write committed ``at``"""
+        if user_id is None:
+            return
+        now = self.clock()
+        with self._lock:
+            self._writes[user_id] = at or now
+            # A replica within the lag limit has replayed writes older than it, so those need no tracking
+            for stale in [user for user, written in self._writes.items() if written < now - self.max_lag]:
+                del self._writes[stale]
+
+    def choose(self, user_id: Optional[int] = None) -> Optional[Replica]:
+        """A replica that is within the lag limit and has replayed the last write of ``user_id``"""
+        now = self.clock()
+        with self._lock:
+            written = self._writes.get(user_id) if user_id is not None else None
+        oldest = now - self.max_lag
+        if written is not None and written > oldest:
+            oldest = written
+
+        fresh = [replica for replica in self.replicas if (self._position(replica) or datetime.min) >= oldest]
+        if not fresh:
+            return None
+        return fresh[next(self._turn) % len(fresh)]
+
+    def lag(self, replica: Replica) -> Optional[timedelta]:
+        """Time since the heartbeat the replica has replayed; None when unknown"""
+        position = self._position(replica)
+        return self.clock() - position if position is not None else None
+
+    def _position(self, replica: Replica) -> Optional[datetime]:
+        """The replayed heartbeat, read at most every ``lag_check_seconds``"""
+        now = self.monotonic()
+        if replica.checked_at is not None and now - replica.checked_at < self.lag_check_seconds:
+            return replica.position
+
+        replica.checked_at = now
+        session = replica.sessions()
+        try:
+            heartbeat = session.get(ReplicationHeartbeat, 1, populate_existing=True)
+            replica.position = heartbeat.written_at if heartbeat is not None else None
+            session.commit()
+        except Exception as e:
+            # Skipped until the next check
+            logger.warning("Replica %s is unavailable: %s", replica.name, e)
+            session.rollback()
+            replica.position = None
+
+        if replica.position is not None:
+            metrics.histogram(
+                "bot_db_replica_lag_seconds", "Time since the heartbeat a replica has replayed", ("replica",)
+            ).observe((self.clock() - replica.position).total_seconds(), replica.name)
+        return replica.position
+
+    def write_heartbeat(self, session: Session):
+        """Rewrite the heartbeat row on the primary"""
+        heartbeat = session.get(ReplicationHeartbeat, 1)
+        if heartbeat is None:
+            heartbeat = ReplicationHeartbeat(id=1)
+            session.add(heartbeat)
+        heartbeat.written_at = self.clock()
+        session.commit()
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.sessions.remove()
+            replica.engine.dispose()
+
+
+_router: Optional[ReplicaRouter] = None
+
+
+def configure_replicas(replicas: Sequence[Union[str, Engine]], **settings) -> Optional[ReplicaRouter]:
+    """Route the ``@read_only`` functions to ``replicas`` (URLs or engines); none turns routing off"""
+    global _router
+    if _router is not None:
+        _router.dispose()
+    engines = [create_engine(replica) if isinstance(replica, str) else replica for replica in replicas]
+    _router = ReplicaRouter(engines, **settings) if engines else None
+    return _router
+
+
+def replica_router() -> Optional[ReplicaRouter]:
+    return _router
+
+
+def set_current_user(user_id: Optional[int]):
+    """Remember the user of the update being handled, for read-your-writes"""
+    _current_user.set(user_id)
+
+
+def record_write(user_id: Optional[int]):
+    """Keep reading ``user_id`` from the primary until the replicas have caught up with this moment"""
+    if _router is not None:
+        _router.record_write(user_id)
+
+
+@contextmanager
+def on_primary():
+    """Keep the ``@read_only`` calls of the block on the session they are given, e.g. inside a write"""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+def read_only(function: Callable) -> Callable:
+    """
+    Run ``function``, whose first argument is the session, on a replica when one is fresh enough.
+    Its results must not be added to the primary session.
+    """
+    @functools.wraps(function)
+    def wrapper(db: Session, *args, **kwargs):
+        router = _router
+        # Pending changes mean the caller is in the middle of a write and reads its own state
+        if router is None or _primary_only.get() or db.new or db.dirty or db.deleted:
+            return function(db, *args, **kwargs)
+        replica = router.choose(_current_user.get())
+        if replica is None:
+            metrics.counter(
+                "bot_db_replica_fallbacks_total", "Read-only calls kept on the primary", ("function",)
+            ).inc(function.__name__)
+            return function(db, *args, **kwargs)
+
+        session = replica.sessions()
+        try:
+            result = function(session, *args, **kwargs)
+            # End the read transaction, so the next call sees what has been replayed since
+            session.commit()
+            return result
+        except Exception:
+            session.rollback()
+            raise
+
+    return wrapper
+
+
+def start_heartbeat(session_factory: Callable[[], Session], interval: float) -> threading.Event:
+    """Rewrite the heartbeat every ``interval`` seconds from a background thread; set the returned event to stop"""
+    stopped = threading.Event()
+
+    def run():
+        session = session_factory()
+        while True:
+            try:
+                if _router is not None:
+                    _router.write_heartbeat(session)
+            except Exception as e:
+                logger.warning("Failed to write the replication heartbeat: %s", e)
+                session.rollback()
+            if stopped.wait(interval):
+                break
+        session.close()
+
+    threading.Thread(target=run, name="replication-heartbeat", daemon=True).start()
+    return stopped
@@ -5,7 +5,8 @@ from typing import Optional
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive, GoogleDriveFile
 
-from .utils import create_keyfile_dict
+from ..google_sheets.utils import create_keyfile_dict
+from .transfer import TransferManager, TransferResult, TTLCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,9 +14,23 @@ logger = logging.getLogger(__name__)
 class GoogleDriveService:
     """Google Drive service class."""
 
-    def __init__(self, client_json_file_path: Optional[str] = None):
+    def __init__(self, client_json_file_path: Optional[str] = None, cache_ttl: float = 300):
         self.gauth = self.login_with_service_account(client_json_file_path)
         self.drive = GoogleDrive(self.gauth)
+        self.ids = TTLCache(cache_ttl)
+        self._transfers: Optional[TransferManager] = None
+
+    @property
+    def transfers(self) -> TransferManager:
+        """Transfer manager sharing this service's credentials and id cache"""
+        if self._transfers is None:
+            self._transfers = TransferManager(self.access_token, cache_ttl=self.ids.ttl)
+            self._transfers.ids = self.ids
+        return self._transfers
+
+    def access_token(self) -> str:
+        """Return a valid OAuth access token, refreshing it when expired"""
+        return self.gauth.credentials.get_access_token().access_token
 
     def login_with_service_account(self, client_json_file_path: Optional[str] = None) -> GoogleAuth:
         """
@@ -49,6 +64,7 @@ class GoogleDriveService:
             if parent_folder_id:
                 folder["parents"] = [{"id": parent_folder_id}]
             folder.Upload()
+            self.ids.set(("folder", folder_name), folder["id"])
             return folder
         except Exception as e:
             logging.error(f"Failed to create folder '{folder_name}': {e}")
@@ -58,6 +74,9 @@ class GoogleDriveService:
         """
         Find the folder ID by its name.
         """
+        cached = self.ids.get(("folder", folder_name))
+        if cached is not None:
+            return cached
         try:
             folder_list = self.drive.ListFile(
                 {
@@ -66,6 +85,7 @@ class GoogleDriveService:
             ).GetList()
 
             if folder_list:
+                self.ids.set(("folder", folder_name), folder_list[0]["id"])
                 return folder_list[0]["id"]
             else:
                 return None
@@ -77,10 +97,14 @@ class GoogleDriveService:
         """
         Find the file ID by its name.
         """
+        cached = self.ids.get(("title", file_name))
+        if cached is not None:
+            return cached
         try:
             file_list = self.drive.ListFile({"q": f"title = '{file_name}' and trashed = false"}).GetList()
 
             if file_list:
+                self.ids.set(("title", file_name), file_list[0])
                 return file_list[0]
             else:
                 return None
@@ -132,3 +156,16 @@ class GoogleDriveService:
         except Exception as e:
             logging.error(f"Failed to upload file '{file_path}': {e}")
             raise
+
+    def download_folder(self, folder_id: str, download_path: str) -> list[TransferResult]:
+        """
+        Download every file of a folder concurrently.
+        """
+        files = self.list_files_in_folder(folder_id)
+        return self.transfers.download_many([(file["id"], file["title"]) for file in files], download_path)
+
+    def upload_files(self, file_paths: list[str], folder_id: str, public: bool = True) -> list[TransferResult]:
+        """
+        Upload several files concurrently with resumable chunked uploads.
+        """
+        return self.transfers.upload_many(file_paths, folder_id, public=public)
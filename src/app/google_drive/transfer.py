@@ -0,0 +1,317 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DRIVE_API_URL = "https://www.googleapis.com"
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+# Drive requires every chunk except the last one to be a multiple of 256 KiB
+CHUNK_ALIGNMENT = 256 * 1024
+RESUME_INCOMPLETE = 308
+
+
+def _quote(value: str) -> str:
+    """A string literal of a Drive search query, with its backslashes and quotes escaped"""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+class TransferError(Exception):
+    """Raised when a Drive transfer cannot be completed"""
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._items: dict[Any, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < self._clock():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key: Any, value: Any):
+        with self._lock:
+            self._items[key] = (self._clock() + self.ttl, value)
+
+    def invalidate(self, key: Any = None):
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+
+@dataclass
+class TransferResult:
+    """Outcome of a single download or upload"""
+
+    name: str
+    file_id: Optional[str] = None
+    path: Optional[str] = None
+    size: int = 0
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TransferManager:
+    """Concurrent downloads and resumable chunked uploads over the Drive v3 REST API"""
+
+    def __init__(
+        self,
+        token_provider: Callable[[], str],
+        base_url: str = DRIVE_API_URL,
+        max_workers: int = 4,
+        chunk_size: int = 8 * CHUNK_ALIGNMENT,
+        cache_ttl: float = 300,
+        max_retries: int = 3,
+        timeout: float = 60,
+    ):
+        if chunk_size % CHUNK_ALIGNMENT:
+            raise ValueError(f"chunk_size must be a multiple of {CHUNK_ALIGNMENT} bytes")
+        self.token_provider = token_provider
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.ids = TTLCache(cache_ttl)
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """One HTTP session per worker thread, so connections are reused"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _headers(self, **extra: str) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token_provider()}", **extra}
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying connection errors and 5xx responses with backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                if response.status_code < 500 or attempt == self.max_retries:
+                    return response
+            except requests.ConnectionError:
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(min(2 ** attempt * 0.5, 8))
+        raise TransferError(f"{method} {url} failed after {self.max_retries} retries")
+
+    # Lookups
+
+    def _find(self, query: str) -> Optional[dict[str, Any]]:
+        response = self._request(
+            "GET",
+            f"{self.base_url}/drive/v3/files",
+            headers=self._headers(),
+            params={"q": query, "fields": "files(id,name,mimeType,size)", "pageSize": 1},
+        )
+        response.raise_for_status()
+        files = response.json().get("files", [])
+        return files[0] if files else None
+
+    def get_folder_id(self, folder_name: str) -> Optional[str]:
+        """Find a folder id by its name, using the id cache"""
+        key = ("folder", folder_name)
+        folder_id = self.ids.get(key)
+        if folder_id is None:
+            folder = self._find(f"name = {_quote(folder_name)} and mimeType = '{FOLDER_MIME_TYPE}' and trashed = false")
+            if folder is None:
+                return None
+            folder_id = folder["id"]
+            self.ids.set(key, folder_id)
+        return folder_id
+
+    def get_file_id(self, file_name: str, folder_id: Optional[str] = None) -> Optional[str]:
+        """Find a file id by its title, using the id cache"""
+        key = ("file", folder_id, file_name)
+        file_id = self.ids.get(key)
+        if file_id is None:
+            query = f"name = {_quote(file_name)} and trashed = false"
+            if folder_id:
+                query += f" and {_quote(folder_id)} in parents"
+            file = self._find(query)
+            if file is None:
+                return None
+            file_id = file["id"]
+            self.ids.set(key, file_id)
+        return file_id
+
+    # Downloads
+
+    def download(self, file_id: str, destination: str) -> TransferResult:
+        """Stream a file's content to ``destination``"""
+        name = os.path.basename(destination)
+        try:
+            os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+            response = self._request(
+                "GET",
+                f"{self.base_url}/drive/v3/files/{file_id}",
+                headers=self._headers(),
+                params={"alt": "media"},
+                stream=True,
+            )
+            response.raise_for_status()
+            size = 0
+            with open(destination, "wb") as file:
+                for chunk in response.iter_content(chunk_size=CHUNK_ALIGNMENT):
+                    file.write(chunk)
+                    size += len(chunk)
+            logger.info(f"Downloaded '{name}' ({size} bytes)")
+            return TransferResult(name=name, file_id=file_id, path=destination, size=size)
+        except Exception as e:
+            logger.error(f"Failed to download file '{name}': {e}")
+            return TransferResult(name=name, file_id=file_id, path=destination, error=e)
+
+    def download_many(self, files: Iterable[tuple[str, str]], download_path: str) -> list[TransferResult]:
+        """Download ``(file_id, file_name)`` pairs into ``download_path`` concurrently"""
+        jobs = [(file_id, os.path.join(download_path, file_name)) for file_id, file_name in files]
+        return self._run_parallel(self.download, jobs)
+
+    # Uploads
+
+    def upload(
+        self, file_path: str, folder_id: Optional[str] = None, file_name: Optional[str] = None, public: bool = False
+    ) -> TransferResult:
+        """Upload a file with the resumable protocol, sending it in ``chunk_size`` pieces"""
+        file_name = file_name or os.path.basename(file_path)
+        try:
+            total = os.path.getsize(file_path)
+            session_url = self._start_upload_session(file_name, folder_id, total)
+            file_id = self._send_chunks(session_url, file_path, total)
+            if public:
+                self.share_public(file_id)
+            self.ids.set(("file", folder_id, file_name), file_id)
+            logger.info(f"Uploaded '{file_name}' ({total} bytes)")
+            return TransferResult(name=file_name, file_id=file_id, path=file_path, size=total)
+        except Exception as e:
+            logger.error(f"Failed to upload file '{file_path}': {e}")
+            return TransferResult(name=file_name, path=file_path, error=e)
+
+    def upload_many(
+        self, file_paths: Iterable[str], folder_id: Optional[str] = None, public: bool = False
+    ) -> list[TransferResult]:
+        """Upload several files concurrently"""
+        jobs = [(file_path, folder_id, None, public) for file_path in file_paths]
+        return self._run_parallel(self.upload, jobs)
+
+    def share_public(self, file_id: str):
+        """Give anyone with the link read access"""
+        response = self._request(
+            "POST",
+            f"{self.base_url}/drive/v3/files/{file_id}/permissions",
+            headers=self._headers(**{"Content-Type": "application/json"}),
+            data=json.dumps({"type": "anyone", "role": "reader"}),
+        )
+        response.raise_for_status()
+
+    def _start_upload_session(self, file_name: str, folder_id: Optional[str], total: int) -> str:
+        metadata: dict[str, Any] = {"name": file_name}
+        if folder_id:
+            metadata["parents"] = [folder_id]
+        response = self._request(
+            "POST",
+            f"{self.base_url}/upload/drive/v3/files",
+            headers=self._headers(
+                **{"Content-Type": "application/json; charset=UTF-8", "X-Upload-Content-Length": str(total)}
+            ),
+            params={"uploadType": "resumable"},
+            data=json.dumps(metadata),
+        )
+        response.raise_for_status()
+        session_url = response.headers.get("Location")
+        if not session_url:
+            raise TransferError("Drive did not return an upload session URL")
+        return session_url
+
+    def _send_chunks(self, session_url: str, file_path: str, total: int) -> str:
+        offset = 0
+        failures = 0
+        with open(file_path, "rb") as file:
+            while True:
+                file.seek(offset)
+                chunk = file.read(self.chunk_size)
+                end = offset + len(chunk) - 1
+                content_range = f"bytes {offset}-{end}/{total}" if chunk else f"bytes */{total}"
+                try:
+                    response = self.session.put(
+                        session_url,
+                        headers=self._headers(**{"Content-Range": content_range}),
+                        data=chunk,
+                        timeout=self.timeout,
+                    )
+                except requests.ConnectionError:
+                    response = None
+
+                if response is not None and response.status_code in (200, 201):
+                    return response.json()["id"]
+                if response is not None and response.status_code == RESUME_INCOMPLETE:
+                    offset = self._committed_offset(response)
+                    failures = 0
+                    continue
+                if response is not None and response.status_code < 500:
+                    raise TransferError(f"Upload rejected with status {response.status_code}: {response.text}")
+
+                failures += 1
+                if failures > self.max_retries:
+                    raise TransferError(f"Upload of '{file_path}' interrupted at byte {offset}")
+                time.sleep(min(2 ** failures * 0.5, 8))
+                offset = self._query_offset(session_url, total)
+
+    def _query_offset(self, session_url: str, total: int) -> int:
+        """Ask the server how many bytes it already has, to resume after a failed chunk"""
+        response = self.session.put(
+            session_url, headers=self._headers(**{"Content-Range": f"bytes */{total}"}), timeout=self.timeout
+        )
+        if response.status_code == RESUME_INCOMPLETE:
+            return self._committed_offset(response)
+        if response.status_code in (200, 201):
+            return total
+        raise TransferError(f"Upload session is no longer valid (status {response.status_code})")
+
+    @staticmethod
+    def _committed_offset(response: requests.Response) -> int:
+        received = response.headers.get("Range")
+        if not received:
+            return 0
+        return int(received.rsplit("-", 1)[1]) + 1
+
+    def _run_parallel(self, function: Callable[..., TransferResult], jobs: list[tuple]) -> list[TransferResult]:
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            futures = {executor.submit(function, *job): index for index, job in enumerate(jobs)}
+            results: list[Optional[TransferResult]] = [None] * len(jobs)
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        failed = [result.name for result in results if not result.ok]
+        if failed:
+            logger.warning(f"{len(failed)} of {len(jobs)} transfers failed: {', '.join(failed)}")
+        return results
@@ -1,13 +1,14 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.states import State, StatesGroup
 from telebot.states.sync.context import StateContext
 
 from ..menu.markup import create_menu_markup
-from .client import GoogleSheetsClient
+from ..i18n.catalog import catalog
+from ..registry import lazy_config, registry
+from ..routing import data_equals
 from .markup import create_cancel_button
 from .utils import is_valid_date, is_valid_phone_number
 
@@ -16,10 +17,20 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
+
+
+def create_google_sheets_client():
+    """Authorize against Google and create the sheets client"""
+    from .client import GoogleSheetsClient
+
+    return GoogleSheetsClient(share_emails=config.app.share_emails)
+
+
+# Authorization happens on the first sheets call, not at import
+google_sheets = registry.register("google_sheets.client", create_google_sheets_client)
 
-google_sheets = GoogleSheetsClient(share_emails=config.app.share_emails)
 
 # Define States
 class GoogleSheetsState(StatesGroup):
@@ -36,7 +47,7 @@ def register_handlers(bot: TeleBot):
     """Register resource handlers"""
     logger.info("Registering resource handlers")
 
-    @bot.callback_query_handler(func=lambda call: call.data == "cancel_google_sheets")
+    @bot.callback_query_handler(func=data_equals("cancel_google_sheets"))
     def cancel(call: types.CallbackQuery, data: dict):
         user = data["user"]
         state = StateContext(call, bot)
@@ -52,7 +63,7 @@ def register_handlers(bot: TeleBot):
             reply_markup=create_menu_markup(user.lang)
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "google_sheets")
+    @bot.callback_query_handler(func=data_equals("google_sheets"))
     def start(call: types.CallbackQuery, data: dict):
         user = data["user"]
         state = StateContext(call, bot)
@@ -2,13 +2,15 @@ import logging
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-app_strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+app_strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 logging.basicConfig(level=logging.INFO)
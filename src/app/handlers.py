@@ -3,24 +3,27 @@ import logging
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.types import CallbackQuery
 
+from .i18n.catalog import catalog
+from .registry import lazy_config
+from .routing import data_equals
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 # React to any text if not command
 def register_handlers(bot):
     """Register common handlers"""
 
-    @bot.callback_query_handler(func=lambda call: call.data == "cancel")
+    @bot.callback_query_handler(func=data_equals("cancel"))
     def cancel_callback(call: CallbackQuery, data: dict):
         """Cancel current operation"""
         user = data["user"]
@@ -1,19 +1,20 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.states import State, StatesGroup
 
 from ..database.core import db_session
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
 from .service import format_hero_stats, get_hero_stats, read_hero
 
 logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Define States
 class HeroratingState(StatesGroup):
@@ -1,15 +1,16 @@
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
 
+from ..database.replicas import read_only
 from ..match.models import Hero, Match, MatchParticipant, WinTypeEnum
 from .models import HeroStats
 from difflib import get_close_matches
 
 
+@read_only
 def read_hero(db: Session, hero_name: str) -> Hero:
     # Try exact case-insensitive match first
-    
-    print(hero_name)
     hero = db.query(Hero).filter(Hero.name.ilike(hero_name)).first()
     if hero:
         return hero
@@ -53,15 +54,12 @@ def calculate_hero_stats(db_session: Session, hero_id: int):
     # Get hero
     hero = db_session.query(Hero).filter(Hero.id == hero_id).one()
     
-    # Get all participations of this hero
-    participations = db_session.query(MatchParticipant).filter(MatchParticipant.hero_id == hero_id).all()
-    
-    # Calculate stats
-    total_matches = len(participations)
-    total_wins = sum(1 for p in participations if p.is_winner)
-    
-    # Clalculate score as a sum of all participants' scores for the hero
-    score = sum(p.score for p in participations)
+    # Totals of all participations of this hero, computed by the database
+    total_matches, total_wins, score = db_session.query(
+        func.count(MatchParticipant.id),
+        func.coalesce(func.sum(case((MatchParticipant.is_winner, 1), else_=0)), 0),
+        func.coalesce(func.sum(MatchParticipant.score), 0),
+    ).filter(MatchParticipant.hero_id == hero_id).one()
     
     # Calculate wins by type
     win_types = {
@@ -71,10 +69,15 @@ def calculate_hero_stats(db_session: Session, hero_id: int):
         WinTypeEnum.stones: 0
     }
     
-    for p in participations:
-        if p.is_winner:
-            match = db_session.query(Match).filter(Match.id == p.match_id).one()
-            win_types[match.win_type] += 1
+    wins_by_type = db_session.query(Match.win_type, func.count(MatchParticipant.id)).select_from(
+        MatchParticipant
+    ).join(Match, Match.id == MatchParticipant.match_id).filter(
+        MatchParticipant.hero_id == hero_id,
+        MatchParticipant.is_winner.is_(True)
+    ).group_by(Match.win_type)
+    for win_type, wins in wins_by_type:
+        if win_type in win_types:
+            win_types[win_type] += wins
     
     # Create or update stats object
     stats = db_session.query(HeroStats).filter(HeroStats.hero_id == hero_id).first()
@@ -0,0 +1,202 @@
+"""
+Localisation catalog.
+
+The ``strings`` section of every module's config.yaml is compiled once into
+frozen per-language tables of plain ``str``, so rendering a message is an
+attribute lookup on an ordinary object instead of an OmegaConf node access.
+Admin-edited strings are applied on top and swap in a freshly compiled table,
+without touching the YAML files.
+
+    strings = catalog.strings(CURRENT_DIR / "config.yaml")
+    strings[user.lang].duplicate_screenshot_warning.format(match_ids="12, 15")
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from omegaconf import OmegaConf
+
+from ..registry import load_config
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+class Messages:
+    """Frozen strings of one language or nested section, read as ``messages.key`` or ``messages["key"]``"""
+
+    def __init__(self, values: dict[str, Any]):
+        object.__setattr__(self, "__dict__", {key: _freeze(value) for key, value in values.items()})
+
+    def __getitem__(self, key: str) -> Any:
+        return self.__dict__[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__dict__
+
+    def __iter__(self):
+        return iter(self.__dict__)
+
+    def __len__(self) -> int:
+        return len(self.__dict__)
+
+    def __setattr__(self, key: str, value: Any):
+        raise TypeError("Messages are read-only; edit them with StringCatalog.override")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.__dict__.get(key, default)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {key: _thaw(value) for key, value in self.__dict__.items()}
+
+    def __repr__(self) -> str:
+        return f"<Messages {', '.join(self.__dict__)}>"
+
+
+def _freeze(value: Any) -> Any:
+    """Sections become Messages and lists tuples, e.g. the ``menu.options`` of the markups"""
+    if isinstance(value, dict):
+        return Messages(value)
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Messages):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def module_name(path: Union[str, Path]) -> str:
+    """Name of the feature package owning ``path``, e.g. ``start`` for ``app/start/config.yaml``"""
+    parent = Path(path).resolve().parent
+    return "app" if parent == APP_DIR else parent.name
+
+
+def _set_path(values: dict, key: str, text: str):
+    *sections, leaf = key.split(".")
+    for section in sections:
+        values = values.setdefault(section, {})
+    values[leaf] = text
+
+
+class ModuleStrings:
+    """The compiled strings of one module by language: ``strings[lang]`` or ``strings.en``"""
+
+    __slots__ = ("_catalog", "_module", "_tables")
+
+    def __init__(self, catalog: "StringCatalog", module: str, tables: dict[str, Messages]):
+        object.__setattr__(self, "_catalog", catalog)
+        object.__setattr__(self, "_module", module)
+        object.__setattr__(self, "_tables", tables)
+
+    def __getitem__(self, lang: str) -> Messages:
+        try:
+            return self._tables[lang]
+        except KeyError:
+            if self._catalog.is_compiled(self._module):
+                raise
+            self._catalog.compile(self._module)
+            return self._tables[lang]
+
+    def __getattr__(self, lang: str) -> Messages:
+        try:
+            return self[lang]
+        except KeyError:
+            raise AttributeError(lang) from None
+
+    def __contains__(self, lang: str) -> bool:
+        try:
+            self[lang]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        if not self._catalog.is_compiled(self._module):
+            self._catalog.compile(self._module)
+        return iter(self._tables)
+
+    def __repr__(self) -> str:
+        return f"<ModuleStrings {self._module}: {', '.join(self._tables) or 'not compiled'}>"
+
+
+class StringCatalog:
+    """The strings of every module, compiled from the YAML files plus the overrides"""
+
+    def __init__(self):
+        self._paths: dict[str, str] = {}
+        # Per module: language -> compiled table; the dict is shared with the module's ModuleStrings
+        self._tables: dict[str, dict[str, Messages]] = {}
+        self._compiled: set[str] = set()
+        # Per module: (lang, dotted key) -> text
+        self._overrides: dict[str, dict[tuple[str, str], str]] = {}
+        self._lock = threading.RLock()
+
+    def strings(self, path: Union[str, Path]) -> ModuleStrings:
+        """Register the ``strings`` section of the config file at ``path``; compiled on first access"""
+        module = module_name(path)
+        with self._lock:
+            self._paths[module] = str(path)
+            tables = self._tables.setdefault(module, {})
+        return ModuleStrings(self, module, tables)
+
+    def modules(self) -> list[str]:
+        return sorted(self._paths)
+
+    def is_compiled(self, module: str) -> bool:
+        return module in self._compiled
+
+    def compile(self, module: str):
+        """Build the frozen tables of ``module`` from its YAML file and overrides"""
+        with self._lock:
+            node = load_config(self._paths[module]).get("strings")
+            languages = OmegaConf.to_container(node, resolve=True) if node is not None else {}
+            for (lang, key), text in self._overrides.get(module, {}).items():
+                _set_path(languages.setdefault(lang, {}), key, text)
+
+            tables = self._tables[module]
+            for lang, values in languages.items():
+                # Replacing a whole table is atomic for readers holding the old one
+                tables[lang] = Messages(values)
+            self._compiled.add(module)
+
+    def compile_all(self) -> float:
+        """Compile every registered module; returns the time taken in seconds"""
+        started = time.perf_counter()
+        for module in self.modules():
+            self.compile(module)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Compiled the strings of {len(self._paths)} modules in {elapsed * 1000:.1f} ms")
+        return elapsed
+
+    def override(self, module: str, lang: str, key: str, text: Optional[str]):
+        """Replace one string (``None`` restores the YAML value), recompiling its module if already compiled"""
+        with self._lock:
+            overrides = self._overrides.setdefault(module, {})
+            if text is None:
+                overrides.pop((lang, key), None)
+            else:
+                overrides[(lang, key)] = text
+            if module in self._compiled:
+                self.compile(module)
+
+    def load_overrides(self, overrides: list[tuple[str, str, str, str]]):
+        """Replace all overrides with ``(module, lang, key, text)`` rows, recompiling the affected modules"""
+        with self._lock:
+            affected = set(self._overrides)
+            self._overrides = {}
+            for module, lang, key, text in overrides:
+                self._overrides.setdefault(module, {})[(lang, key)] = text
+                affected.add(module)
+            for module in affected & self._compiled:
+                self.compile(module)
+
+
+catalog = StringCatalog()
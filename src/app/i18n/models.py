@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, UniqueConstraint
+
+from ..models import Base
+
+
+class StringOverride(Base):
+    """A string edited by an admin, taking precedence over the module's config.yaml"""
+    __tablename__ = 'string_overrides'
+    __table_args__ = (UniqueConstraint('module', 'lang', 'key', name='uq_string_override'),)
+    id = Column(Integer, primary_key=True)
+    module = Column(String, nullable=False)  # feature package, e.g. 'start'
+    lang = Column(String, nullable=False)
+    key = Column(String, nullable=False)  # dotted path inside the language, e.g. 'menu.title'
+    text = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from .catalog import catalog
+from .models import StringOverride
+
+
+def load_string_overrides(db_session: Session) -> int:
+    """Apply the admin-edited strings stored in the database to the catalog"""
+    rows = db_session.query(
+        StringOverride.module, StringOverride.lang, StringOverride.key, StringOverride.text
+    ).all()
+    catalog.load_overrides([tuple(row) for row in rows])
+    return len(rows)
+
+
+def set_string(db_session: Session, module: str, lang: str, key: str, text: Optional[str]):
+    """
+    Store an admin edit of a string and make it live immediately.
+    ``None`` removes the edit so the value from config.yaml applies again.
+    """
+    override = db_session.query(StringOverride).filter_by(module=module, lang=lang, key=key).first()
+    if text is None:
+        if override:
+            db_session.delete(override)
+    elif override:
+        override.text = text
+    else:
+        db_session.add(StringOverride(module=module, lang=lang, key=key, text=text))
+    db_session.commit()
+    catalog.override(module, lang, key, text)
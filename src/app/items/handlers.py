@@ -1,12 +1,14 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.states import State, StatesGroup
 
 from ..database.core import db_session
 from ..menu.markup import create_menu_markup
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_equals, data_startswith
 from .markup import create_cancel_button, create_item_menu_markup, create_items_list_markup, create_items_menu_markup
 from .service import (
     create_item,
@@ -21,8 +23,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Define States
 class ItemState(StatesGroup):
@@ -40,7 +42,7 @@ def register_handlers(bot: TeleBot):
     """Register item handlers"""
     logger.info("Registering item handlers")
 
-    @bot.callback_query_handler(func=lambda call: call.data == "item")
+    @bot.callback_query_handler(func=data_equals("item"))
     def item_menu(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(ItemState.menu)
@@ -54,7 +56,7 @@ def register_handlers(bot: TeleBot):
             reply_markup=markup
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "create_item")
+    @bot.callback_query_handler(func=data_equals("create_item"))
     def start_create_item(call: types.CallbackQuery, data: dict):
         user = data["user"]
         categories = read_item_categories(db_session)
@@ -70,7 +72,7 @@ def register_handlers(bot: TeleBot):
         )
         data["state"].set(ItemState.name)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("delete_item_"))
+    @bot.callback_query_handler(func=data_startswith("delete_item_"))
     def hanlder_delete_item(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(ItemState.delete_item)
@@ -84,7 +86,7 @@ def register_handlers(bot: TeleBot):
         )
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "my_items")
+    @bot.callback_query_handler(func=data_equals("my_items"))
     def show_my_items(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(ItemState.my_items)
@@ -114,7 +116,7 @@ def register_handlers(bot: TeleBot):
             reply_markup=markup
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("view_item_"))
+    @bot.callback_query_handler(func=data_startswith("view_item_"))
     def view_item(call: types.CallbackQuery, data: dict):
         user = data["user"]
         item_id = int(call.data.split("_")[2])
@@ -145,7 +147,7 @@ def register_handlers(bot: TeleBot):
             parse_mode="Markdown"
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("category_"))
+    @bot.callback_query_handler(func=data_startswith("category_"))
     def process_category(call: types.CallbackQuery, data: dict):
         user = data["user"]
         category_id = int(call.data.split("_")[1])
@@ -2,15 +2,16 @@ import logging
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
 from .models import Item
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,33 @@
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from sqlalchemy import Enum as SQLEnum
+
+from ..models import Base, TimeStampMixin
+
+
+class JobStatusEnum(str, Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class Job(Base, TimeStampMixin):
+    """ Durable background job """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    # Repeated requests with the same key (e.g. a double-clicked button) map to one job
+    idempotency_key = Column(String, unique=True, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(SQLEnum(JobStatusEnum), nullable=False, default=JobStatusEnum.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
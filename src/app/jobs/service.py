@@ -0,0 +1,116 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import Job, JobStatusEnum
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_job(db: Session, kind: str, payload: dict[str, Any], idempotency_key: str,
+                run_after: Optional[datetime] = None) -> tuple[Job, bool]:
+    """
+    Add a job to the queue, due at once or at ``run_after`` (UTC).
+    Returns the job and whether it was created; an existing job with the same key is returned as is.
+    """
+    existing = read_job(db, idempotency_key=idempotency_key)
+    if existing:
+        return existing, False
+
+    job = Job(kind=kind, idempotency_key=idempotency_key, payload=json.dumps(payload, ensure_ascii=False),
+              run_after=run_after or datetime.utcnow())
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another thread inserted the same key between the read and the insert
+        db.rollback()
+        return read_job(db, idempotency_key=idempotency_key), False
+    return job, True
+
+
+def read_job(db: Session, job_id: Optional[int] = None, idempotency_key: Optional[str] = None) -> Optional[Job]:
+    if job_id:
+        return db.query(Job).filter(Job.id == job_id).first()
+    if idempotency_key:
+        return db.query(Job).filter(Job.idempotency_key == idempotency_key).first()
+
+
+def claim_next_job(db: Session, kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+    """Mark the oldest due job (of ``kinds``, of any kind when None) as running and return it, or None"""
+    now = datetime.utcnow()
+    candidates = db.query(Job.id).filter(Job.status == JobStatusEnum.pending, Job.run_after <= now)
+    if kinds is not None:
+        candidates = candidates.filter(Job.kind.in_(list(kinds)))
+    candidates = (
+        candidates
+        .order_by(Job.run_after, Job.id)
+        .limit(5)
+        .all()
+    )
+    for (job_id,) in candidates:
+        # Conditional update, so concurrent workers never run the same job twice
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatusEnum.pending)
+            .values(status=JobStatusEnum.running, started_at=now, attempts=Job.attempts + 1, updated_at=now)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return read_job(db, job_id=job_id)
+    return None
+
+
+def complete_job(db: Session, job: Job):
+    job.status = JobStatusEnum.done
+    job.finished_at = datetime.utcnow()
+    job.last_error = None
+    db.commit()
+
+
+def reschedule_job(db: Session, job: Job, run_after: datetime):
+    """Queue a job that finished a slice of its work again; attempts count per slice"""
+    job.status = JobStatusEnum.pending
+    job.run_after = run_after
+    job.attempts = 0
+    job.last_error = None
+    db.commit()
+
+
+def fail_job(db: Session, job: Job, error: str, max_attempts: int, retry_delay: float):
+    """Schedule a retry with linear backoff, or give up after ``max_attempts``"""
+    job.last_error = error
+    if job.attempts >= max_attempts:
+        job.status = JobStatusEnum.failed
+        job.finished_at = datetime.utcnow()
+    else:
+        job.status = JobStatusEnum.pending
+        job.run_after = datetime.utcnow() + timedelta(seconds=retry_delay * job.attempts)
+    db.commit()
+
+
+def requeue_stale_jobs(db: Session, kinds: Optional[Iterable[str]] = None) -> int:
+    """Return jobs (of ``kinds``, of any kind when None) left running by a previous process to the queue"""
+    stale = db.query(Job).filter(Job.status == JobStatusEnum.running)
+    if kinds is not None:
+        stale = stale.filter(Job.kind.in_(list(kinds)))
+    count = stale.update({Job.status: JobStatusEnum.pending}, synchronize_session=False)
+    db.commit()
+    if count:
+        logger.warning(f"Requeued {count} jobs interrupted by a restart")
+    return count
+
+
+def get_payload(job: Job) -> dict[str, Any]:
+    return json.loads(job.payload or "{}")
+
+
+def save_payload(db: Session, job: Job, payload: dict[str, Any]):
+    """Store job progress, so a retried job can skip the steps it already finished"""
+    job.payload = json.dumps(payload, ensure_ascii=False)
+    db.commit()
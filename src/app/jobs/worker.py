@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database.core import get_session
+from ..metrics.instrumentation import observe_job
+from ..registry import lazy_config
+from .models import Job, JobStatusEnum
+from .service import claim_next_job, complete_job, fail_job, get_payload, requeue_stale_jobs, reschedule_job
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+
+# A handler that returns a datetime is run again at that time (UTC), e.g. to process a long job in slices
+JobHandler = Callable[[Session, Job, dict[str, Any]], Optional[datetime]]
+FailureHandler = Callable[[Session, Job, dict[str, Any], Exception], None]
+
+
+class JobLatency:
+    """Recent queue-wait and run times per job kind"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, queued: float, running: float):
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=self.window)).append((queued, running))
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Count and p50/p95 of total latency (enqueue to finish) in milliseconds per kind"""
+        result = {}
+        with self._lock:
+            for kind, samples in self._samples.items():
+                totals = sorted(queued + running for queued, running in samples)
+                result[kind] = {
+                    "count": len(totals),
+                    "p50_ms": totals[len(totals) // 2] * 1000,
+                    "p95_ms": totals[min(len(totals) - 1, int(len(totals) * 0.95))] * 1000,
+                }
+        return result
+
+
+class JobWorker:
+    """Background thread running the queued jobs of the kinds registered with it"""
+
+    def __init__(self, session_factory: Callable[[], Session] = get_session, name: str = "job-worker"):
+        self.session_factory = session_factory
+        self.name = name
+        self.handlers: dict[str, JobHandler] = {}
+        self.failure_handlers: dict[str, FailureHandler] = {}
+        self.latency = JobLatency(config.worker.latency_window)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, kind: str, handler: JobHandler, on_failure: Optional[FailureHandler] = None):
+        """Register the function that runs jobs of ``kind`` and, optionally, one called when it finally fails"""
+        self.handlers[kind] = handler
+        if on_failure:
+            self.failure_handlers[kind] = on_failure
+
+    def notify(self):
+        """Wake the worker up right away instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Job worker {self.name} started for: {', '.join(self.handlers) or 'no handlers'}")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        db = self.session_factory()
+        try:
+            requeue_stale_jobs(db, self.handlers)
+            while not self._stopped.is_set():
+                if not self.run_pending(db):
+                    self._wakeup.wait(config.worker.poll_interval)
+                    self._wakeup.clear()
+        finally:
+            db.close()
+
+    def run_pending(self, db: Session) -> int:
+        """Run every due job; returns how many were processed"""
+        processed = 0
+        while not self._stopped.is_set():
+            try:
+                job = claim_next_job(db, self.handlers)
+            except Exception as e:
+                logger.error(f"Failed to claim a job: {e}")
+                db.rollback()
+                break
+            if job is None:
+                break
+            self.run_job(db, job)
+            processed += 1
+        return processed
+
+    def run_job(self, db: Session, job: Job):
+        handler = self.handlers.get(job.kind)
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind '{job.kind}'")
+            continue_at = handler(db, job, get_payload(job))
+            if isinstance(continue_at, datetime):
+                reschedule_job(db, job, continue_at)
+            else:
+                complete_job(db, job)
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {e}", exc_info=True)
+            observe_job(job.kind, time.perf_counter() - started, succeeded=False)
+            db.rollback()
+            fail_job(db, job, str(e), config.worker.max_attempts, config.worker.retry_delay_seconds)
+            if job.status == JobStatusEnum.failed and job.kind in self.failure_handlers:
+                try:
+                    self.failure_handlers[job.kind](db, job, get_payload(job), e)
+                except Exception as failure_error:
+                    logger.error(f"Failure handler of job {job.id} raised: {failure_error}")
+            return
+
+        running = time.perf_counter() - started
+        observe_job(job.kind, running, succeeded=True)
+        queued = max((job.started_at - job.created_at).total_seconds(), 0) if job.created_at else 0.0
+        self.latency.record(job.kind, queued, running)
+        logger.info(
+            f"Job {job.id} ({job.kind}) done in {running * 1000:.0f} ms "
+            f"after {queued * 1000:.0f} ms in queue"
+        )
+
+
+job_worker = JobWorker()
+# Broadcasts send for a long time; on their own thread they never hold up a match confirmation
+broadcast_worker = JobWorker(name="broadcast-worker")
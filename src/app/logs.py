@@ -0,0 +1,139 @@
+"""
+Non-blocking logging pipeline.
+
+Records are put on a bounded queue by the calling thread and formatted and
+written by a background ``QueueListener``, so a handler only pays for creating
+the record. Messages use lazy %-style arguments, which are rendered by the
+writer; the records are JSON objects (one per line) carrying the ``extra``
+fields, or plain text lines. High-volume categories can be sampled by logger
+name. Arguments are read by the writer thread, so pass plain values rather
+than ORM objects.
+
+    logger.info("Rating of player %s: %s", player_id, rating, extra={"match_id": match.id})
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Mapping, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes of every LogRecord; anything else on a record came from ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record with the time, level, logger, message and ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the DEBUG and INFO records of the configured categories.
+    ``rates`` maps a logger name (and its children) to the fraction kept; warnings are always kept.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._cache: dict[str, Optional[float]] = {}
+
+    def _rate(self, name: str) -> Optional[float]:
+        if name not in self._cache:
+            parts = name.split(".")
+            prefixes = (".".join(parts[:index]) for index in range(len(parts), 0, -1))
+            self._cache[name] = next((self.rates[prefix] for prefix in prefixes if prefix in self.rates), None)
+        return self._cache[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Puts the record as it is on the queue: the message is rendered by the writer thread,
+    and a full queue drops the record instead of blocking the caller
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def setup_logging(level: str = "INFO", json_format: bool = False, queue_size: int = 10_000,
+                  sampling: Optional[Mapping[str, float]] = None, levels: Optional[Mapping[str, str]] = None,
+                  stream=None) -> QueueListener:
+    """
+    Route all records through a queue to a background writer on ``stream`` (stderr by default).
+    Replaces the handlers of the root logger; calling it again restarts the pipeline.
+    """
+    global _listener
+    with _lock:
+        stop_logging()
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+        handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        if sampling:
+            handler.addFilter(SamplingFilter(sampling))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+        for name, logger_level in (levels or {}).items():
+            logging.getLogger(name).setLevel(logger_level)
+
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def stop_logging():
+    """Write the queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,59 +1,68 @@
 import logging
 import os, certifi
 os.environ['SSL_CERT_FILE'] = certifi.where()
+from importlib import import_module
 from pathlib import Path
-from time import sleep
+from time import perf_counter, sleep
+
+from .registry import StartupProfile, load_config
+
+startup = StartupProfile()
 
 import requests
 import telebot
 from dotenv import find_dotenv, load_dotenv
-from omegaconf import OmegaConf
 from telebot import apihelper
 from telebot.states.sync.middleware import StateMiddleware
 
 apihelper.ENABLE_MIDDLEWARE = True
 
-from .admin.handlers import register_handlers as admin_handlers
-from .auth.data import init_roles_table, init_superuser
-from .clanrating.handlers import register_handlers as clanrating_handlers
-from .common.handlers import register_handlers as common_handlers
-from .customtitle.handlers import register_handlers as customtitle_handlers
 from .database.core import (
+    DATABASE_REPLICA_URLS,
+    SessionLocal,
     create_tables,
     db_session,
 )
-from .herorating.handlers import register_handlers as herorating_handlers
-from .match.data import init_test_data
-from .match.handlers import register_handlers as match_handlers  # noqa: E402
-from .menu.handlers import register_handlers as menu_handlers  # noqa: E402
+from .database.replicas import configure_replicas, start_heartbeat
+from .i18n.catalog import catalog
+from .i18n.service import load_string_overrides
+from .jobs.worker import broadcast_worker, job_worker
+from .logs import setup_logging
+from .metrics import collector as metrics_collector
+from .metrics.instrumentation import instrument_bot, instrument_database, instrument_telegram_api
+from .metrics.server import start_metrics_server, start_stats_dump
 from .middleware.antiflood import AntifloodMiddleware
+from .middleware.metrics import MetricsMiddleware
 from .middleware.user import UserCallbackMiddleware, UserMessageMiddleware
-from .public_message.handlers import register_handlers as public_message_handlers
-from .rating.handlers import register_handlers as rating_handlers  # noqa: E402
-from .start.handlers import register_handlers as start_handlers
-from .title.data import init_titles
-from .title.handlers import register_handlers as title_handlers
-from .top.handlers import register_handlers as top_handlers
-from .users.handlers import register_handlers as users_handlers
+from .routing import install_routing
+from .transport import ApiTransport, RetryPolicy, install_transport
 
-logger = logging.getLogger(__name__)
+startup.mark("imports", startup.started)
 
-# Configure logging with explicit formatter
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    force=True  # Force reconfiguration of root logger
-)
-
-# Ensure all existing loggers use the same format
-for name in logging.root.manager.loggerDict:
-    existing_logger = logging.getLogger(name)
-    if existing_logger.handlers:
-        for handler in existing_logger.handlers:
-            handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+logger = logging.getLogger(__name__)
 
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
+config = load_config(str(CURRENT_DIR / "config.yaml"))
+
+# Feature modules are imported while handlers are registered, in this order
+HANDLER_MODULES = [
+    "admin",
+    "customtitle",
+    "menu",
+    "herorating",
+    "common",
+    "public_message",
+    "clanrating",
+    "users",
+    "match",
+    "matchhistory",
+    "title",
+    "rating",
+    "start",
+    "top",
+    "versus",
+    "matchup",
+]
 
 # Load and get environment variables
 load_dotenv(find_dotenv(usecwd=True))
@@ -63,6 +72,15 @@ SUPERUSER_USER_ID = os.getenv("SUPERUSER_USER_ID")
 
 def start_bot():
     """Start the Telegram bot with configuration, middlewares, and handlers."""
+    # Records are written by a background thread; see logs.py
+    setup_logging(
+        level=config.logging.level,
+        json_format=config.logging.json,
+        queue_size=config.logging.queue_size,
+        sampling=config.logging.sampling,
+        levels=config.logging.levels,
+    )
+
     BOT_TOKEN = os.getenv("BOT_TOKEN")
 
     if not BOT_TOKEN:
@@ -72,13 +90,41 @@ def start_bot():
     logger.info(f"Initializing {config.name} v{config.version}")
 
     try:
-        bot = telebot.TeleBot(BOT_TOKEN, use_class_middlewares=True)
-        _setup_middlewares(bot)
-        _register_handlers(bot)
-        bot.add_custom_filter(telebot.custom_filters.StateFilter(bot))
+        bot = build_bot(BOT_TOKEN)
+
+        # Existing databases get the new columns and indexes before anything reads them
+        with startup.phase("schema"):
+            create_tables()
+
+        with startup.phase("strings"):
+            _compile_strings()
 
-        bot_info = bot.get_me()
+        with startup.phase("leaderboards"):
+            _build_leaderboards()
+
+        with startup.phase("player_pairs"):
+            _build_player_pairs()
+
+        with startup.phase("matchups"):
+            _load_matchups()
+
+        with startup.phase("get_me"):
+            bot_info = bot.get_me()
         logger.info(f"Bot {bot_info.username} (ID: {bot_info.id}) initialized successfully")
+        logger.info(startup.report())
+
+        # Post-match processing and broadcasts run in the background, each on its own thread
+        job_worker.start()
+        broadcast_worker.start()
+
+        if config.replicas.enabled and DATABASE_REPLICA_URLS:
+            _setup_replicas()
+
+        metrics_config = metrics_collector.config
+        if metrics_config.server.enabled:
+            start_metrics_server()
+        if metrics_config.dump.interval_seconds:
+            start_stats_dump(metrics_config.dump.interval_seconds)
 
         bot.polling(none_stop=True, timeout=360, long_polling_timeout=480, interval=2)
 
@@ -86,8 +132,115 @@ def start_bot():
         logger.critical(f"Failed to start bot: {str(e)}")
         raise
 
+def build_bot(token: str) -> telebot.TeleBot:
+    """Create the bot with middlewares, handlers and filters, without any network calls."""
+    with startup.phase("bot"):
+        bot = telebot.TeleBot(token, use_class_middlewares=True)
+    with startup.phase("middlewares"):
+        _setup_middlewares(bot)
+    with startup.phase("handlers"):
+        _register_handlers(bot)
+    with startup.phase("filters"):
+        bot.add_custom_filter(telebot.custom_filters.StateFilter(bot))
+    if config.telegram_api.enabled:
+        # Before the metrics, which time the requests themselves only without another sender
+        with startup.phase("transport"):
+            _setup_transport(bot)
+    with startup.phase("metrics"):
+        instrument_bot(bot)
+        instrument_database()
+        instrument_telegram_api()
+    if config.query_profiler.enabled:
+        from .database.profiler import profile_handlers
+        profile_handlers(bot, config.query_profiler.slow_query_ms, config.query_profiler.n_plus_one_threshold)
+    if config.routing.enabled:
+        # Last, so that the routes hold the timed and profiled handler functions
+        with startup.phase("routing"):
+            install_routing(bot, strict=config.routing.strict)
+    return bot
+
+
+def _setup_transport(bot):
+    """Send the Bot API requests through one connection pool shared by the threads of the bot"""
+    settings = config.telegram_api
+    workers = len(bot.worker_pool.workers) if bot.threaded else 1
+    # The polling thread, the job and broadcast workers and the message cleaner send requests too;
+    # with a blocking pool a missing connection would make one of them wait for another's request
+    pool_size = settings.pool_size or workers + 4
+    retry = RetryPolicy(
+        attempts=settings.retry.attempts,
+        backoff_seconds=settings.retry.backoff_seconds,
+        max_retry_after_seconds=settings.retry.max_retry_after_seconds,
+        idempotent_methods=frozenset(settings.retry.idempotent_methods),
+    )
+    install_transport(ApiTransport(pool_size, settings.timeouts, retry, settings.http2))
+    logger.info(f"Bot API transport: {pool_size} pooled connections, HTTP/2 {'on' if settings.http2 else 'off'}")
+
+
+def _setup_replicas():
+    """Send the read-only queries to the replicas and keep the heartbeat that measures their lag"""
+    settings = config.replicas
+    configure_replicas(
+        DATABASE_REPLICA_URLS,
+        max_lag_seconds=settings.max_lag_seconds,
+        lag_check_seconds=settings.lag_check_seconds,
+    )
+    start_heartbeat(SessionLocal, settings.heartbeat_seconds)
+    logger.info(f"Read-only queries go to {len(DATABASE_REPLICA_URLS)} replicas "
+                f"lagging at most {settings.max_lag_seconds}s")
+
+
+def _build_leaderboards():
+    """Build the ranked boards of the top lists when the database predates them"""
+    from .rating.leaderboards import ensure_leaderboards
+    from .rating.seasons import get_active_season
+
+    try:
+        ensure_leaderboards(db_session, get_active_season(db_session).id)
+    except Exception as e:
+        db_session.rollback()
+        logger.warning(f"Leaderboards could not be built: {e}")
+
+
+def _build_player_pairs():
+    """Build the head-to-head pairs when the database predates them"""
+    from .versus.service import ensure_player_pairs
+
+    try:
+        ensure_player_pairs(db_session)
+    except Exception as e:
+        db_session.rollback()
+        logger.warning(f"Head-to-head pairs could not be built: {e}")
+
+
+def _load_matchups():
+    """Load the stored hero matchup arrays, building them when the database predates them"""
+    from .matchup.service import ensure_matchups, get_matchups
+
+    try:
+        ensure_matchups(db_session)
+        get_matchups(db_session)
+    except Exception as e:
+        db_session.rollback()
+        logger.warning(f"Hero matchups could not be loaded: {e}")
+
+
+def _compile_strings():
+    """Compile the strings of all modules with the admin edits applied, before the first update"""
+    try:
+        count = load_string_overrides(db_session)
+        logger.info(f"Loaded {count} edited strings")
+    except Exception as e:
+        db_session.rollback()
+        logger.warning(f"Edited strings are not available: {e}")
+    catalog.compile_all()
+
+
 def _setup_middlewares(bot):
     """Configure bot middlewares."""
+    # First, so that the time of the other middlewares is included
+    bot.setup_middleware(MetricsMiddleware(bot))
+
     if config.antiflood.enabled:
         logger.info(f"Enabling antiflood (window: {config.antiflood.time_window_seconds}s)")
         bot.setup_middleware(AntifloodMiddleware(bot, config.antiflood.time_window_seconds))
@@ -98,23 +251,11 @@ def _setup_middlewares(bot):
 
 def _register_handlers(bot):
     """Register all bot handlers."""
-    handlers = [
-        admin_handlers,
-        customtitle_handlers,
-        menu_handlers,
-        herorating_handlers,
-        common_handlers,
-        public_message_handlers,
-        clanrating_handlers,
-        users_handlers,
-        match_handlers,
-        title_handlers,
-        rating_handlers,
-        start_handlers,
-        top_handlers
-    ]
-    for handler in handlers:
-        handler(bot)
+    for module_name in HANDLER_MODULES:
+        started = perf_counter()
+        module = import_module(f".{module_name}.handlers", __package__)
+        module.register_handlers(bot)
+        logger.debug(f"Handlers of '{module_name}' registered in {(perf_counter() - started) * 1000:.1f} ms")
 
 def _start_polling_loop(bot):
     """Start the main bot polling loop with error handling."""
@@ -142,8 +283,14 @@ def _start_polling_loop(bot):
 
 def init_db():
     """Initialize the database for applications."""
+    from .auth.data import init_roles_table, init_superuser
+    from .match.data import init_test_data
+    from .rating.seasons import get_active_season
+    from .title.data import init_titles
+
     # Create tables
     create_tables()
+    get_active_season(db_session)
 
     init_roles_table(db_session)
 
@@ -1,7 +1,14 @@
+import csv
+import io
 import random
 from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 from .models import Clan, Hero, Player, Match, MatchParticipant, WinTypeEnum
+from ..rating.engine import get_engine
+from ..rating.seasons import get_active_season
 from ..rating.service import update_ratings_after_match
 
 
@@ -110,7 +117,8 @@ def init_matches(db_session: Session, match_count=50):
                 hero_id=hero.id,
                 is_winner=is_winner,
                 win_type=win_type if is_winner else None,
-                score=4 if is_winner else -1
+                score=4 if is_winner else -1,
+                timestamp=match_date,
             )
             db_session.add(participant)
             db_session.flush()  # Get participant.id
@@ -143,6 +151,100 @@ def init_test_data(db_session: Session):
     
     print("Test data initialization complete!")
 
+def _bulk_write(db_session: Session, model, columns: dict, chunk_size: int):
+    """Write column arrays of equal length: COPY on PostgreSQL, executemany inserts elsewhere"""
+    names = list(columns)
+    total = len(columns[names[0]])
+    postgres = db_session.get_bind().dialect.name == "postgresql"
+    for start in range(0, total, chunk_size):
+        rows = zip(*(columns[name][start:start + chunk_size].tolist() for name in names))
+        if postgres:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                ["" if value is None else value for value in row] for row in rows
+            )
+            buffer.seek(0)
+            cursor = db_session.connection().connection.cursor()
+            cursor.copy_expert(f"COPY {model.__tablename__} ({', '.join(names)}) FROM STDIN WITH CSV", buffer)
+        else:
+            db_session.execute(insert(model.__table__), [dict(zip(names, row)) for row in rows])
+
+
+def generate_bulk_data(db_session: Session, players: int = 10_000, matches: int = 10_000,
+                       seed: int = 0, days: int = 365, chunk_size: int = 50_000):
+    """
+    Add a synthetic history of ``players`` players and ``matches`` four-player matches.
+
+    The rows are generated with NumPy and written in chunks (COPY on PostgreSQL),
+    so millions of matches take minutes instead of hours of ``add()`` calls.
+    Clans and heroes must already exist. Ratings are not computed: run
+    ``rebuild_all_ratings`` afterwards.
+
+    Returns:
+        Dict with the number of players, matches and participants added
+    """
+    if players < 4:
+        raise ValueError("Need at least 4 players to create matches")
+    hero_ids = np.array([hero_id for hero_id, in db_session.query(Hero.id).order_by(Hero.id)], dtype=np.int64)
+    if len(hero_ids) < 4:
+        raise ValueError("Need at least 4 heroes to create matches")
+
+    rng = np.random.default_rng(seed)
+    season_id = get_active_season(db_session).id
+    first_player = (db_session.query(func.max(Player.id)).scalar() or 0) + 1
+    first_match = (db_session.query(func.max(Match.id)).scalar() or 0) + 1
+    first_participant = (db_session.query(func.max(MatchParticipant.id)).scalar() or 0) + 1
+
+    player_ids = np.arange(first_player, first_player + players, dtype=np.int64)
+    _bulk_write(db_session, Player, {
+        "id": player_ids,
+        "user_id": player_ids + 10 ** 12,
+        "username": np.char.add("bench", player_ids.astype(str)).astype(object),
+    }, chunk_size)
+
+    # Matches are spread evenly over the last ``days`` days
+    match_ids = np.arange(first_match, first_match + matches, dtype=np.int64)
+    start = datetime.utcnow() - timedelta(days=days)
+    seconds = np.linspace(0, days * 86400, num=matches, endpoint=False).astype(np.int64)
+    win_types = np.array([win_type.value for win_type in WinTypeEnum], dtype=object)
+    match_win_types = win_types[rng.integers(0, len(win_types), size=matches)]
+    timestamps = np.array([start + timedelta(seconds=int(offset)) for offset in seconds], dtype=object)
+    _bulk_write(db_session, Match, {
+        "id": match_ids,
+        "season_id": np.full(matches, season_id, dtype=np.int64),
+        "timestamp": timestamps,
+        "screenshot": np.char.add("bench_", match_ids.astype(str)).astype(object),
+        "win_type": match_win_types,
+    }, chunk_size)
+
+    # Four distinct players and heroes per match: a random start plus a random stride
+    # that is small enough for the four seats never to wrap onto each other
+    seats = np.arange(4)
+    player_stride = rng.integers(1, max((players - 1) // 3, 1) + 1, size=(matches, 1))
+    lineups = (rng.integers(0, players, size=(matches, 1)) + seats * player_stride) % players
+    hero_stride = rng.integers(1, max((len(hero_ids) - 1) // 3, 1) + 1, size=(matches, 1))
+    heroes = (rng.integers(0, len(hero_ids), size=(matches, 1)) + seats * hero_stride) % len(hero_ids)
+    winners = seats == rng.integers(0, 4, size=(matches, 1))
+
+    engine = get_engine()
+    scores = np.where(winners, engine.score(True), engine.score(False))
+    participant_win_types = np.where(winners, match_win_types[:, None], None)
+    participants = matches * 4
+    _bulk_write(db_session, MatchParticipant, {
+        "id": np.arange(first_participant, first_participant + participants, dtype=np.int64),
+        "match_id": np.repeat(match_ids, 4),
+        "player_id": player_ids[lineups].ravel(),
+        "hero_id": hero_ids[heroes].ravel(),
+        "is_winner": winners.ravel(),
+        "win_type": participant_win_types.ravel(),
+        "score": scores.ravel(),
+        "timestamp": np.repeat(timestamps, 4),
+    }, chunk_size)
+
+    db_session.commit()
+    return {"players": players, "matches": matches, "participants": participants}
+
+
 # Function to clear all data (useful for testing)
 def clear_all_data(db_session: Session):
     """Remove all data from all tables"""
@@ -0,0 +1,149 @@
+import io
+import logging
+import threading
+from typing import Iterable, Optional
+
+from PIL import Image
+from sqlalchemy.orm import Session
+
+from .models import MatchScreenshot
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def dhash(image_bytes: bytes, hash_size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of an image.
+    The image is shrunk to (hash_size + 1) x hash_size greyscale pixels and every bit
+    tells whether a pixel is brighter than its right neighbour, so re-encoding, scaling
+    and small UI differences change only a few bits.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def from_hex(value: str) -> int:
+    return int(value, 16)
+
+
+class HashIndex:
+    """
+    Multi-index hashing over 64-bit hashes.
+    Hashes are split into ``max_distance + 1`` bands. Two hashes within ``max_distance``
+    bits must agree exactly on at least one band, so only the items sharing a band
+    value are compared, instead of every stored hash.
+    """
+
+    def __init__(self, max_distance: int, bits: int = HASH_SIZE * HASH_SIZE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        widths = [bits // bands + (1 if band < bits % bands else 0) for band in range(bands)]
+        self._bands: list[tuple[int, int]] = []
+        shift = 0
+        for width in widths:
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+        self._buckets: list[dict[int, set[int]]] = [{} for _ in self._bands]
+        self._values: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, item: int, value: int):
+        self.remove(item)
+        self._values[item] = value
+        for buckets, (shift, mask) in zip(self._buckets, self._bands):
+            buckets.setdefault((value >> shift) & mask, set()).add(item)
+
+    def remove(self, item: int):
+        value = self._values.pop(item, None)
+        if value is None:
+            return
+        for buckets, (shift, mask) in zip(self._buckets, self._bands):
+            bucket = buckets.get((value >> shift) & mask)
+            if bucket is not None:
+                bucket.discard(item)
+                if not bucket:
+                    del buckets[(value >> shift) & mask]
+
+    def search(self, value: int, max_distance: Optional[int] = None) -> list[tuple[int, int]]:
+        """Return ``(distance, item)`` pairs within ``max_distance`` of ``value``, closest first"""
+        limit = self.max_distance if max_distance is None else max_distance
+        if limit > self.max_distance:
+            candidates = self._values.keys()
+        else:
+            candidates = set()
+            for buckets, (shift, mask) in zip(self._buckets, self._bands):
+                candidates.update(buckets.get((value >> shift) & mask, ()))
+
+        found = []
+        for item in candidates:
+            distance = hamming_distance(value, self._values[item])
+            if distance <= limit:
+                found.append((distance, item))
+        found.sort()
+        return found
+
+
+class ScreenshotIndex:
+    """In-memory index of the screenshot hashes of recorded matches"""
+
+    def __init__(self, max_distance: int = 6):
+        self.max_distance = max_distance
+        self._index = HashIndex(max_distance)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def load(self, rows: Iterable[tuple[int, str]]):
+        """Fill the index from ``(match_id, hex_hash)`` rows"""
+        with self._lock:
+            for match_id, phash in rows:
+                self._index.add(match_id, from_hex(phash))
+
+    def add(self, match_id: int, value: int):
+        with self._lock:
+            self._index.add(match_id, value)
+
+    def remove(self, match_id: int):
+        with self._lock:
+            self._index.remove(match_id)
+
+    def find_duplicates(self, value: int, max_distance: Optional[int] = None) -> list[int]:
+        """Match ids whose screenshots are near-duplicates of ``value``, closest first"""
+        with self._lock:
+            return [match_id for _, match_id in self._index.search(value, max_distance)]
+
+
+def load_screenshot_index(db: Session, max_distance: int = 6) -> ScreenshotIndex:
+    """Build the index from the stored hashes with a single query"""
+    index = ScreenshotIndex(max_distance)
+    index.load(db.query(MatchScreenshot.match_id, MatchScreenshot.phash).all())
+    logger.info(f"Loaded {len(index)} screenshot hashes")
+    return index
+
+
+def save_screenshot_hash(db: Session, match_id: int, value: int, file_unique_id: Optional[str] = None) -> MatchScreenshot:
+    """Persist the hash of a match screenshot"""
+    screenshot = MatchScreenshot(match_id=match_id, phash=to_hex(value), file_unique_id=file_unique_id)
+    db.add(screenshot)
+    db.commit()
+    return screenshot
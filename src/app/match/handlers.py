@@ -2,31 +2,60 @@ import logging
 import re
 import time
 from pathlib import Path
+from typing import Optional
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.apihelper import ApiTelegramException
 from telebot.states import State, StatesGroup
 from sqlalchemy import func
+from sqlalchemy.orm import Session
 
-from ..auth.service import read_user
+from ..auth.service import read_users_by_username
+from ..common.cleanup import message_cleaner
 from ..database.core import db_session
+from ..database.replicas import record_write
+from ..jobs.models import Job
+from ..jobs.service import enqueue_job, save_payload
+from ..jobs.worker import job_worker
 from ..rating import service as rating_service
+from ..rating.checkpoints import maybe_create_checkpoint
+from ..i18n.catalog import catalog
+from ..registry import lazy_config, registry
+from ..routing import data_equals, data_startswith
 from ..title import service as title_service
+from .fingerprint import dhash, from_hex, load_screenshot_index, save_screenshot_hash, to_hex
 from .models import Hero, Player
 from .schemas import MatchCreate, ParticipantCreate
-from .service import create_match, read_hero, read_player, remove_match
+from .service import add_match, read_hero, read_match, read_player
 from .markup import create_win_type_markup
 
 logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
-# Load the database session
- 
+
+
+def create_screenshot_index():
+    """Load the hashes of recorded match screenshots"""
+    return load_screenshot_index(db_session, config.fingerprint.max_distance)
+
+
+screenshot_index = registry.register("match.screenshot_index", create_screenshot_index)
+
+
+def compute_screenshot_hash(bot: TeleBot, photos: list[types.PhotoSize]) -> Optional[int]:
+    """Download one size of the photo and return its perceptual hash"""
+    # The hash only needs 9x8 pixels, so the smallest size that keeps enough detail is used
+    photo = next((p for p in photos if min(p.width, p.height) >= config.fingerprint.min_photo_size), photos[-1])
+    try:
+        file_info = bot.get_file(photo.file_id)
+        return dhash(bot.download_file(file_info.file_path))
+    except Exception as e:
+        logger.warning(f"Failed to fingerprint screenshot {photo.file_unique_id}: {e}")
+        return None
 
 # Define States
 class MatchState(StatesGroup):
@@ -43,6 +72,9 @@ class MatchState(StatesGroup):
 # Dictionary to store timeout timers for match reports
 match_timeout_timers = {}
 
+# Background job that records a confirmed match
+CONFIRM_MATCH_JOB = "match.confirm"
+
 
 def register_handlers(bot: TeleBot):
     """Register match handlers"""
@@ -59,12 +91,17 @@ def register_handlers(bot: TeleBot):
             return
 
         match_id = message.text.split()[1] if len(message.text.split()) > 1 else None
-        if not match_id:
+        if not match_id or not match_id.isdigit():
             bot.reply_to(message, "Please provide a match ID.")
             return
         else:
-            response = remove_match(db_session, match_id)
+            # Subtract the match's rating deltas instead of rebuilding all ratings
+            affected_clans = rating_service.revert_match_ratings(db_session, int(match_id))
+            response = affected_clans is not None
             if response:
+                title_service.refresh_titles(db_session, title_service.categories_for_clans(affected_clans))
+                if registry.is_loaded("match.screenshot_index"):
+                    screenshot_index.remove(int(match_id))
                 bot.reply_to(message, f"Match {match_id} removed successfully.")
             else:
                 bot.reply_to(message, f"Match {match_id} not found.")
@@ -122,18 +159,8 @@ def register_handlers(bot: TeleBot):
         # Reset the state
         data["state"].delete()
         
-        # Delete all intermediate messages
-        for msg_id in messages_to_delete:
-            try:
-                bot.delete_message(message.chat.id, msg_id)
-            except ApiTelegramException:
-                logger.warning(f"Failed to delete message {msg_id}")
-        
-        # Also delete the cancel command
-        try:
-            bot.delete_message(message.chat.id, message.message_id)
-        except ApiTelegramException:
-            pass
+        # Delete all intermediate messages and the cancel command, in the background
+        message_cleaner.delete(bot, message.chat.id, messages_to_delete + [message.message_id])
 
     @bot.message_handler(content_types=['photo'], state=MatchState.upload_screenshot)
     def process_screenshot(message: types.Message, data: dict):
@@ -145,6 +172,15 @@ def register_handlers(bot: TeleBot):
         # Save file_id to state
         data["state"].add_data(screenshot=photo.file_id)
 
+        # Look for matches recorded with the same screenshot
+        screenshot_hash = compute_screenshot_hash(bot, message.photo)
+        if screenshot_hash is not None:
+            data["state"].add_data(
+                screenshot_hash=to_hex(screenshot_hash),
+                screenshot_unique_id=photo.file_unique_id,
+                duplicate_matches=screenshot_index.find_duplicates(screenshot_hash)
+            )
+
         # Ask for players
         sent_message = bot.reply_to(
             message,
@@ -189,15 +225,16 @@ def register_handlers(bot: TeleBot):
             existing_players = db_session.query(Player.username).filter(func.lower(Player.username).in_([u.lower() for u in usernames])).all()
             existing_usernames = {name.lower() for (name,) in existing_players}
 
+            missing = [username for username in usernames if username.lower() not in existing_usernames]
+            users = read_users_by_username(db_session, missing) if missing else {}
             new_players = []
-            for username in usernames:
-                if username.lower() not in existing_usernames:
-                    retrieved_user = read_user(db_session, username=username)
-                    if retrieved_user:
-                        player = Player(user_id=retrieved_user.id, username=username)
-                    else:
-                        player = Player(username=username)
-                    new_players.append(player)
+            for username in missing:
+                retrieved_user = users.get(username)
+                if retrieved_user:
+                    player = Player(user_id=retrieved_user.id, username=username)
+                else:
+                    player = Player(username=username)
+                new_players.append(player)
             
             if new_players:
                 db_session.add_all(new_players)
@@ -283,13 +320,13 @@ def register_handlers(bot: TeleBot):
         # start_timeout(bot, message.chat.id, sent_message.message_id)
 
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("wintype:"), state=MatchState.enter_win_type)
+    @bot.callback_query_handler(func=data_startswith("wintype:"), state=MatchState.enter_win_type)
     def process_win_type(call: types.CallbackQuery, data: dict):
         """Process win type selection"""
         user = data["user"]
         win_type = call.data.split(':')[1]
         data["state"].add_data(win_type=win_type)
-        print("Win type selected:", win_type)
+        logger.debug("Win type selected: %s", win_type)
         
         # Setup for hero selection
         with data["state"].data() as state_data:
@@ -399,6 +436,7 @@ def register_handlers(bot: TeleBot):
                 winner = state_data.get("winner_username", "")
                 win_type = state_data.get("win_type", "")
                 screenshot = state_data.get("screenshot", "")
+                duplicate_matches = state_data.get("duplicate_matches", [])
             
             # Translate win type
             win_type_display = {
@@ -411,13 +449,20 @@ def register_handlers(bot: TeleBot):
             summary = f"Победа через {win_type_display}\n\n"
             
             # Add player info
+            hero_names = dict(
+                db_session.query(Hero.id, Hero.name).filter(Hero.id.in_(set(hero_selection.values()))).all()
+            )
             for username in players:
-                hero_id = hero_selection.get(username)
-                hero_name = db_session.query(Hero.name).filter(Hero.id == hero_id).scalar()
+                hero_name = hero_names.get(hero_selection.get(username))
 
                 winner_mark = " 🏆" if username == winner else ""
                 summary += f"@{username} - {hero_name}{winner_mark}\n"
 
+            if duplicate_matches:
+                summary += "\n" + strings[user.lang].duplicate_screenshot_warning.format(
+                    match_ids=", ".join(str(match_id) for match_id in duplicate_matches)
+                ) + "\n"
+
             # Send match preview with confirmation buttons
             markup = types.InlineKeyboardMarkup()
             markup.row(
@@ -447,120 +492,141 @@ def register_handlers(bot: TeleBot):
             data["state"].set(MatchState.confirm_match)
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "match:confirm", state=MatchState.confirm_match)
-    def confirm_match(call: types.CallbackQuery, data: dict):
-        """Save match to database"""
-        user = data["user"]
-
-        with data["state"].data() as match_data:
-            players = match_data.get("players", [])
-            hero_selection = match_data.get("hero_selection", {})
-            winner = match_data.get("winner_username", "")
-            win_type = match_data.get("win_type", "")
-            screenshot = match_data.get("screenshot", "")
-            messages_to_delete = match_data.get("messages_to_delete", [])
-            original_message_id = match_data.get("original_message_id")
-            final_report_message_id = match_data.get("final_report_message_id")
-            match_id = match_data.get("match_id", "1")
-
-        try:
-            # Prepare data for match creation
-            participants = []
-            for username in players:
-                hero_id = hero_selection.get(username)
-                participants.append(ParticipantCreate(username=username, hero_id=hero_id))
+    def process_confirmed_match(db: Session, job: Job, payload: dict):
+        """Record a confirmed match, apply ratings and titles, then update the report message"""
+        chat_id = payload["chat_id"]
+        players = payload["players"]
+        hero_selection = payload["hero_selection"]
+        winner = payload["winner_username"]
+        win_type = payload["win_type"]
 
-            # Create match
-            print("win type:", win_type)
+        # A retried job skips the steps that were already committed
+        if not payload.get("match_id"):
+            participants = [
+                ParticipantCreate(username=username, hero_id=hero_selection.get(username)) for username in players
+            ]
             match_create = MatchCreate(
-                screenshot=screenshot,
+                screenshot=payload["screenshot"],
                 win_type=win_type,
                 participants=participants,
                 winner_username=winner
             )
-            match = create_match(db_session, match_create)
-
-            # Update ratings
-            rating_service.update_ratings_after_match(db_session, match)
-
-            # Update titles
-            title_service.update_title_for_all_players(db_session)
-
-            # Clean up the timer
-            if call.message.chat.id in match_timeout_timers:
-                match_timeout_timers[call.message.chat.id].cancel()
-                del match_timeout_timers[call.message.chat.id]
-
-            # Delete all intermediate messages
-            for msg_id in messages_to_delete:
+            # The match and the job's match_id are committed together, so a retry never records it again
+            match = add_match(db, match_create)
+            payload["match_id"] = match.id
+            save_payload(db, job, payload)
+
+            # Remember the screenshot so it can't be submitted again unnoticed
+            screenshot_hash = payload.get("screenshot_hash")
+            if screenshot_hash:
                 try:
-                    bot.delete_message(call.message.chat.id, msg_id)
-                except ApiTelegramException:
-                    logger.warning(f"Failed to delete message {msg_id}")
-
-            # Also delete original /match command
-            try:
-                bot.delete_message(call.message.chat.id, original_message_id)
-            except ApiTelegramException:
-                pass
-
-            # Update the final report message (remove the confirmation buttons)
-            win_type_display = {
-                "prestige": "Престиж",
-                "murder": "Убийство Короля",
-                "decay": "Гниль",
-                "stones": "Камни Духа"
-            }.get(win_type, win_type.capitalize())
-
-            final_report = f"Победа через {win_type_display}\n\n"
+                    save_screenshot_hash(db, match.id, from_hex(screenshot_hash), payload.get("screenshot_unique_id"))
+                    screenshot_index.add(match.id, from_hex(screenshot_hash))
+                except Exception as e:
+                    logger.warning(f"Failed to save screenshot hash for match {match.id}: {e}")
+                    db.rollback()
+
+        match_id = payload["match_id"]
+        if not payload.get("ratings_applied"):
+            match = read_match(match_id, db)
+            rating_service.update_ratings_after_match(db, match)
+            title_service.update_title_for_all_players(db)
+            payload["ratings_applied"] = True
+            save_payload(db, job, payload)
+            maybe_create_checkpoint(db)
+        # The one who confirmed checks their rating next; read it from the primary until the replicas catch up
+        record_write(payload.get("user_id"))
+
+        # Delete all intermediate messages and the original /match command, in the background
+        message_cleaner.delete(bot, chat_id, payload["messages_to_delete"] + [payload["original_message_id"]])
+
+        # Update the final report message (remove the confirmation buttons)
+        win_type_display = {
+            "prestige": "Престиж",
+            "murder": "Убийство Короля",
+            "decay": "Гниль",
+            "stones": "Камни Духа"
+        }.get(win_type, win_type.capitalize())
+
+        hero_names = dict(
+            db.query(Hero.id, Hero.name).filter(Hero.id.in_(list(hero_selection.values()))).all()
+        )
+        final_report = f"Матч №{match_id}\n\nПобеда через {win_type_display}\n\n"
+        for username in players:
+            winner_mark = " 🏆" if username == winner else ""
+            final_report += f"@{username} - {hero_names.get(hero_selection.get(username))}{winner_mark}\n"
 
-            for username in players:
-                hero_id = hero_selection.get(username)
-                hero_name = db_session.query(Hero.name).filter(Hero.id == hero_id).scalar()
+        try:
+            bot.edit_message_caption(
+                caption=final_report,
+                chat_id=chat_id,
+                message_id=payload["final_report_message_id"]
+            )
+        except ApiTelegramException:
+            bot.edit_message_text(
+                text=final_report,
+                chat_id=chat_id,
+                message_id=payload["final_report_message_id"]
+            )
 
-                winner_mark = " 🏆" if username == winner else ""
-                final_report += f"@{username} - {hero_name}{winner_mark}\n"
+    def report_failed_match(db: Session, job: Job, payload: dict, error: Exception):
+        """Tell the chat that the match could not be recorded"""
+        bot.send_message(
+            payload["chat_id"],
+            strings[payload["lang"]].match_save_error,
+            reply_to_message_id=payload["final_report_message_id"]
+        )
 
-            # Update the message without buttons
-            try:
-                match_id = match.id
-                final_report = f"Матч №{match_id}\n\n" + final_report
-                bot.edit_message_caption(
-                    caption=final_report,
-                    chat_id=call.message.chat.id,
-                    message_id=final_report_message_id
-                )
-                # Send notification
-                bot.answer_callback_query(
-                    call.id,
-                    text=strings[user.lang].match_recorded_success
-                )
-            except ApiTelegramException:
-                bot.edit_message_text(
-                    text=final_report,
-                    chat_id=call.message.chat.id,
-                    message_id=final_report_message_id
-                )
+    job_worker.register(CONFIRM_MATCH_JOB, process_confirmed_match, on_failure=report_failed_match)
 
-            # Reset state
-            data["state"].delete()
+    @bot.callback_query_handler(func=data_equals("match:confirm"), state=MatchState.confirm_match)
+    def confirm_match(call: types.CallbackQuery, data: dict):
+        """Queue the match for recording and acknowledge the button at once"""
+        user = data["user"]
 
+        with data["state"].data() as match_data:
+            payload = {
+                "chat_id": call.message.chat.id,
+                "user_id": user.id,
+                "lang": user.lang,
+                "players": match_data.get("players", []),
+                "hero_selection": match_data.get("hero_selection", {}),
+                "winner_username": match_data.get("winner_username", ""),
+                "win_type": match_data.get("win_type", ""),
+                "screenshot": match_data.get("screenshot", ""),
+                "screenshot_hash": match_data.get("screenshot_hash"),
+                "screenshot_unique_id": match_data.get("screenshot_unique_id"),
+                "messages_to_delete": match_data.get("messages_to_delete", []),
+                "original_message_id": match_data.get("original_message_id"),
+                "final_report_message_id": match_data.get("final_report_message_id"),
+            }
+
+        # The report message identifies the match, so repeated clicks resolve to the same job
+        idempotency_key = f"{CONFIRM_MATCH_JOB}:{payload['chat_id']}:{payload['final_report_message_id']}"
+        try:
+            _, created = enqueue_job(db_session, CONFIRM_MATCH_JOB, payload, idempotency_key)
         except Exception as e:
-            logger.error(f"Error saving match: {e}")
+            logger.error(f"Error queueing match: {e}")
             db_session.rollback()
-            bot.answer_callback_query(
-                call.id,
-                text="Ошибка при сохранении матча. Пожалуйста, попробуйте снова."
-            )
+            bot.answer_callback_query(call.id, text=strings[user.lang].match_save_error)
+            return
+
+        bot.answer_callback_query(
+            call.id,
+            text=strings[user.lang].match_queued if created else strings[user.lang].match_already_queued
+        )
+        if created:
+            job_worker.notify()
 
-            # Clean up the timer
-            if call.message.chat.id in match_timeout_timers:
-                match_timeout_timers[call.message.chat.id].cancel()
-                del match_timeout_timers[call.message.chat.id]
+        # Clean up the timer
+        if call.message.chat.id in match_timeout_timers:
+            match_timeout_timers[call.message.chat.id].cancel()
+            del match_timeout_timers[call.message.chat.id]
 
-            data["state"].delete()
+        # Reset state
+        data["state"].delete()
 
-    @bot.callback_query_handler(func=lambda call: call.data == "match:cancel", state=MatchState.confirm_match)
+    @bot.callback_query_handler(func=data_equals("match:cancel"), state=MatchState.confirm_match)
     def cancel_match_confirmation(call: types.CallbackQuery, data: dict):
         """Cancel match creation at the confirmation stage"""
         user = data["user"]
@@ -582,18 +648,8 @@ def register_handlers(bot: TeleBot):
             match_timeout_timers[call.message.chat.id].cancel()
             del match_timeout_timers[call.message.chat.id]
 
-        # Delete all intermediate messages
-        for msg_id in messages_to_delete:
-            try:
-                bot.delete_message(call.message.chat.id, msg_id)
-            except ApiTelegramException:
-                logger.warning(f"Failed to delete message {msg_id}")
-
-        # Delete the final report message
-        try:
-            bot.delete_message(call.message.chat.id, final_report_message_id)
-        except ApiTelegramException:
-            pass
+        # Delete all intermediate messages and the final report message, in the background
+        message_cleaner.delete(bot, call.message.chat.id, messages_to_delete + [final_report_message_id])
 
         # Reset state
         data["state"].delete()
@@ -628,15 +684,5 @@ def register_handlers(bot: TeleBot):
         # Reset the state
         data["state"].delete()
 
-        # Delete all intermediate messages
-        for msg_id in messages_to_delete:
-            try:
-                bot.delete_message(message.chat.id, msg_id)
-            except ApiTelegramException:
-                logger.warning(f"Failed to delete message {msg_id}")
-
-        # Also delete the cancel command
-        try:
-            bot.delete_message(message.chat.id, message.message_id)
-        except ApiTelegramException:
-            pass
+        # Delete all intermediate messages and the cancel command, in the background
+        message_cleaner.delete(bot, message.chat.id, messages_to_delete + [message.message_id])
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship
 
@@ -60,11 +60,19 @@ class Hero(Base):
 class Match(Base):
     __tablename__ = 'matches'
     id = Column(Integer, primary_key=True)
+    # Сезон, в рейтинг которого засчитан матч (до появления сезонов все матчи относятся к первому)
+    season_id = Column(Integer, ForeignKey('seasons.id'), nullable=False, server_default="1")
     timestamp = Column(DateTime, default=datetime.utcnow)
     screenshot = Column(String)  # путь к файлу или URL скриншота
     win_type = Column(SQLEnum(WinTypeEnum), nullable=False)
     # Каждый матч состоит из 4 участников
     participants = relationship("MatchParticipant", back_populates="match", cascade="all, delete-orphan")
+    # Перцептивный хеш скриншота для поиска дубликатов
+    screenshot_hash = relationship(
+        "MatchScreenshot", back_populates="match", cascade="all, delete-orphan", uselist=False
+    )
+
+    __table_args__ = (Index('ix_matches_season_timestamp', 'season_id', 'timestamp', 'id'),)
 
 
 class MatchParticipant(Base):
@@ -76,7 +84,24 @@ class MatchParticipant(Base):
     is_winner = Column(Boolean, default=False)
     win_type = Column(SQLEnum(WinTypeEnum), nullable=True)
     score = Column(Integer, default=0)
+    # Копия времени матча: история матчей игрока и героя читается по индексам ниже, без сортировки
+    timestamp = Column(DateTime, nullable=True)
 
     match = relationship("Match", back_populates="participants")
     player = relationship("Player", back_populates="matches")
     hero = relationship("Hero", back_populates="participants")
+
+    __table_args__ = (
+        Index('ix_match_participants_player_time', 'player_id', 'timestamp', 'match_id'),
+        Index('ix_match_participants_hero_time', 'hero_id', 'timestamp', 'match_id'),
+    )
+
+
+class MatchScreenshot(Base):
+    __tablename__ = 'match_screenshots'
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey('matches.id'), unique=True, nullable=False)
+    phash = Column(String(16), nullable=False, index=True)  # dHash в hex
+    file_unique_id = Column(String, nullable=True, index=True)
+
+    match = relationship("Match", back_populates="screenshot_hash")
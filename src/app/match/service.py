@@ -1,9 +1,16 @@
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from difflib import get_close_matches
 
-from .models import Player, Hero, Match, MatchParticipant
+from ..rating.engine import get_engine
+from ..rating.history import rebuild_daily_history
+from ..rating.models import MatchRatingDelta, RatingHistory
+from ..rating.seasons import get_active_season
+from ..matchup.service import rebuild_matchups
+from ..versus.service import rebuild_player_pairs
+from .models import Player, Hero, Match, MatchParticipant, MatchScreenshot
 from .schemas import MatchCreate
 
 
@@ -37,13 +44,14 @@ def read_player(
         return db.query(Player).filter(Player.username.ilike(username)).first()
 
 
-def create_match(db: Session, match_data: MatchCreate):
+def add_match(db: Session, match_data: MatchCreate) -> Match:
     """
-    Создает запись матча и участников.
+    Добавляет матч и участников в транзакцию вызывающего, без коммита.
     match_data содержит: скриншот, тип победы, список участников и username победителя.
     """
     # Создаем матч
     match = Match(
+        season_id=get_active_season(db).id,
         screenshot=match_data.screenshot,
         win_type=match_data.win_type,
         timestamp=datetime.utcnow()
@@ -51,26 +59,46 @@ def create_match(db: Session, match_data: MatchCreate):
     db.add(match)
     db.flush()
 
+    # Игроки и герои всех участников, одним запросом каждые
+    usernames = [participant.username.lower() for participant in match_data.participants]
+    players = {
+        player.username.lower(): player
+        for player in db.query(Player).filter(func.lower(Player.username).in_(usernames))
+    }
+    heroes = {
+        hero.id: hero
+        for hero in db.query(Hero).filter(Hero.id.in_([participant.hero_id for participant in match_data.participants]))
+    }
+
     # Создаем записи участников матча
     for participant in match_data.participants:
-        # Ищем игрока по username, если нет – создаем
-        player = get_player_by_username(db, participant.username)
+        player = players.get(participant.username.lower())
         if not player:
             raise ValueError(f"Player {participant.username} not found during match creation.")
 
-        # Получаем героя – предполагается, что он уже существует в БД
-        hero = db.query(Hero).filter(Hero.id == participant.hero_id).first()
+        # Герой – предполагается, что он уже существует в БД
+        hero = heroes[participant.hero_id]
         match_participant = MatchParticipant(
             match_id=match.id,
             player_id=player.id,
             hero_id=hero.id,
             is_winner=(participant.username.lower() == match_data.winner_username.lower()),
             win_type=match_data.win_type if (participant.username.lower() == match_data.winner_username.lower()) else None,
-            # add score 4 if winner and -1 otherwise
-            score=4 if (participant.username.lower() == match_data.winner_username.lower()) else -1
+            # the score of the configured rating engine (4 for the winner and -1 otherwise by default)
+            score=get_engine().score(participant.username.lower() == match_data.winner_username.lower()),
+            timestamp=match.timestamp,
         )
         db.add(match_participant)
 
+    db.flush()
+    return match
+
+
+def create_match(db: Session, match_data: MatchCreate) -> Match:
+    """
+    Создает запись матча и участников.
+    """
+    match = add_match(db, match_data)
     db.commit()
     return match
 
@@ -98,8 +126,6 @@ def get_match_report(db: Session, match_id: int):
 
 def read_hero(db: Session, hero_name: str) -> Hero:
     # Try exact case-insensitive match first
-
-    print(hero_name)
     hero = db.query(Hero).filter(Hero.name.ilike(hero_name)).first()
     if hero:
         return hero
@@ -155,12 +181,23 @@ def remove_match(db: Session, match_id: int):
 
 def delete_all_matches(db: Session):
     """
-    Deletes all matches and their participants from the database.
+    Deletes the active season's matches and their participants from the database.
+    The matches of archived seasons are kept.
     """
+    season_id = get_active_season(db).id
+    season_matches = select(Match.id).where(Match.season_id == season_id)
     try:
-        db.query(MatchParticipant).delete()
-        db.query(Match).delete()
+        first_day = db.query(func.min(Match.timestamp)).filter(Match.season_id == season_id).scalar()
+        # Rows referencing matches go first, bulk deletes skip the ORM cascades
+        for model in (MatchRatingDelta, RatingHistory, MatchScreenshot, MatchParticipant):
+            db.query(model).filter(model.match_id.in_(season_matches)).delete(synchronize_session=False)
+        db.query(Match).filter(Match.season_id == season_id).delete(synchronize_session=False)
+        if first_day is not None:
+            rebuild_daily_history(db, season_id, first_day.date())
         db.commit()
     except Exception as e:
         db.rollback()
         raise e
+    # Head-to-head pairs and hero matchups count the matches of every season
+    rebuild_player_pairs(db)
+    rebuild_matchups(db)
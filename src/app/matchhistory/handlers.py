@@ -0,0 +1,111 @@
+import logging
+from pathlib import Path
+
+from telebot import TeleBot, types
+
+from ..database.core import db_session
+from ..herorating.service import read_hero
+from ..i18n.catalog import catalog
+from ..match.models import Hero, Player
+from ..match.service import get_player_by_username
+from ..rating.seasons import get_active_season
+from ..rating.service import read_player
+from ..registry import lazy_config
+from ..routing import data_startswith
+from .markup import create_history_markup
+from .service import HERO, PLAYER, SEASON, Cursor, HistoryPage, read_history_page
+
+logger = logging.getLogger(__name__)
+
+# Load configuration
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
+
+
+def render_page(lang: str, scope: str, key: int, page: HistoryPage) -> str:
+    """Text of a history page: a header and one line per match"""
+    if scope == PLAYER:
+        player = db_session.get(Player, key)
+        lines = [strings[lang].player_header.format(username=player.username if player else key)]
+    elif scope == HERO:
+        hero = db_session.get(Hero, key)
+        lines = [strings[lang].hero_header.format(hero_name=hero.name if hero else key)]
+    else:
+        lines = [strings[lang].season_header]
+
+    if not page.entries:
+        lines.append(strings[lang].empty)
+    for entry in page.entries:
+        if scope == SEASON:
+            if entry.username:
+                result = strings[lang].winner.format(username=entry.username, hero=entry.hero, win_type=entry.win_type)
+            else:
+                result = entry.win_type
+        elif entry.is_winner:
+            result = strings[lang].win.format(win_type=entry.win_type)
+        else:
+            result = strings[lang].loss
+        subject = entry.hero if scope == PLAYER else f"@{entry.username}" if scope == HERO else None
+        prefix = f"#{entry.match_id} {entry.timestamp:%d.%m.%Y %H:%M}"
+        lines.append(f"{prefix} – {subject}: {result}" if subject else f"{prefix} – {result}")
+    return "\n".join(lines)
+
+
+def register_handlers(bot: TeleBot):
+    """Register match history handlers"""
+    logger.info("Registering match history handlers")
+
+    @bot.message_handler(commands=["history"])
+    def history_command(message: types.Message, data: dict):
+        """
+        /history – the caller's matches in a private chat, the season's matches in a group;
+        /history @username – a player's matches; /history <hero> – a hero's matches
+        """
+        user = data["user"]
+        parts = message.text.split(maxsplit=1)
+        query = parts[1].strip() if len(parts) > 1 else ""
+
+        if query.startswith("@"):
+            player = get_player_by_username(db_session, query[1:])
+            scope, key = PLAYER, player.id if player else None
+        elif query:
+            hero = read_hero(db_session, hero_name=query)
+            player = None if hero else get_player_by_username(db_session, query)
+            scope, key = (HERO, hero.id) if hero else (PLAYER, player.id if player else None)
+        elif message.chat.type == "private":
+            player = read_player(db_session, user_id=user.id) or read_player(db_session, username=user.username)
+            if player is None:
+                bot.reply_to(message, strings[user.lang].myhistory_not_found)
+                return
+            scope, key = PLAYER, player.id
+        else:
+            scope, key = SEASON, get_active_season(db_session).id
+
+        if key is None:
+            bot.reply_to(message, strings[user.lang].not_found.format(query=query))
+            return
+
+        page = read_history_page(db_session, scope, key, limit=config.page_size)
+        bot.reply_to(
+            message,
+            text=render_page(user.lang, scope, key, page),
+            reply_markup=create_history_markup(user.lang, scope, key, page),
+        )
+
+    @bot.callback_query_handler(func=data_startswith("history:"))
+    def show_history_page(call: types.CallbackQuery, data: dict):
+        user = data["user"]
+        _, scope, key, direction, cursor = call.data.split(":")
+        key = int(key)
+
+        page = read_history_page(
+            db_session, scope, key, Cursor.decode(cursor), direction, limit=config.page_size
+        )
+        bot.edit_message_text(
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            text=render_page(user.lang, scope, key, page),
+            reply_markup=create_history_markup(user.lang, scope, key, page),
+        )
+        bot.answer_callback_query(call.id)
@@ -0,0 +1,33 @@
+from pathlib import Path
+from typing import Optional
+
+from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from ..i18n.catalog import catalog
+from .service import NEWER, OLDER, HistoryPage
+
+CURRENT_DIR = Path(__file__).parent
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
+
+
+def history_callback_data(scope: str, key: int, direction: str, cursor) -> str:
+    """``history:<scope>:<key>:<direction>:<cursor>``, well under the 64 bytes of callback data"""
+    return f"history:{scope}:{key}:{direction}:{cursor.encode()}"
+
+
+def create_history_markup(lang: str, scope: str, key: int, page: HistoryPage) -> Optional[InlineKeyboardMarkup]:
+    """Buttons to the newer and older pages, None on a page that has neither"""
+    buttons = []
+    if page.newer is not None:
+        buttons.append(InlineKeyboardButton(
+            strings[lang].newer, callback_data=history_callback_data(scope, key, NEWER, page.newer)
+        ))
+    if page.older is not None:
+        buttons.append(InlineKeyboardButton(
+            strings[lang].older, callback_data=history_callback_data(scope, key, OLDER, page.older)
+        ))
+    if not buttons:
+        return None
+    markup = InlineKeyboardMarkup()
+    markup.row(*buttons)
+    return markup
@@ -0,0 +1,184 @@
+"""
+Match history.
+
+Pages of a player's, a hero's or the season's matches, newest first. Pages are
+addressed by keyset cursors, the (timestamp, match id) position of their first
+or last match, instead of an offset: a page reads ``limit + 1`` rows of an index
+range starting at the cursor, so page 100 costs the same as page 1. Player and
+hero pages read ``match_participants`` by their (player/hero, timestamp, match)
+indexes, season pages read ``matches`` by (season, timestamp, id).
+
+    page = read_history_page(db_session, PLAYER, player.id)
+    older = read_history_page(db_session, PLAYER, player.id, page.older)
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.orm import Session
+
+from ..database.replicas import read_only
+from ..match.models import Hero, Match, MatchParticipant, Player
+from ..rating.checkpoints import after_position, before_position
+
+logger = logging.getLogger(__name__)
+
+PLAYER = "p"
+HERO = "h"
+SEASON = "s"
+
+OLDER = "o"
+NEWER = "n"
+
+EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """The (timestamp, match id) position of a match in the history"""
+
+    timestamp: datetime
+    match_id: int
+
+    def encode(self) -> str:
+        """Compact form for callback data (which is limited to 64 bytes)"""
+        micros = (self.timestamp - EPOCH) // timedelta(microseconds=1)
+        return f"{_base36(micros)}.{_base36(self.match_id)}"
+
+    @classmethod
+    def decode(cls, value: str) -> "Cursor":
+        micros, match_id = value.split(".")
+        return cls(EPOCH + timedelta(microseconds=int(micros, 36)), int(match_id, 36))
+
+
+def _base36(number: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    encoded = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        encoded = digits[remainder] + encoded
+        if number == 0:
+            return encoded
+
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    match_id: int
+    timestamp: datetime
+    win_type: str
+    # The player's hero (player pages) or the winner's hero (season pages)
+    hero: Optional[str] = None
+    # The player of the hero (hero pages) or the winner (season pages)
+    username: Optional[str] = None
+    # Whether the player (player pages) or the hero (hero pages) won; None on season pages
+    is_winner: Optional[bool] = None
+
+
+@dataclass
+class HistoryPage:
+    entries: list[HistoryEntry] = field(default_factory=list)
+    # Cursors of the neighbouring pages, None at the ends of the history
+    newer: Optional[Cursor] = None
+    older: Optional[Cursor] = None
+
+
+def _scope_query(scope: str, key: int):
+    """SELECT of the history rows of ``scope`` with its (timestamp, match id) columns"""
+    # Participants without a timestamp (none once the schema upgrade has backfilled them) are left out
+    has_timestamp = MatchParticipant.timestamp.isnot(None)
+    if scope == PLAYER:
+        statement = select(
+            MatchParticipant.match_id, MatchParticipant.timestamp, Match.win_type,
+            Hero.name.label("hero"), MatchParticipant.is_winner,
+        ).join(Match, Match.id == MatchParticipant.match_id).join(Hero, Hero.id == MatchParticipant.hero_id)
+        statement = statement.where(MatchParticipant.player_id == key, has_timestamp)
+        return statement, MatchParticipant.timestamp, MatchParticipant.match_id
+    if scope == HERO:
+        statement = select(
+            MatchParticipant.match_id, MatchParticipant.timestamp, Match.win_type,
+            Player.username, MatchParticipant.is_winner,
+        ).join(Match, Match.id == MatchParticipant.match_id).join(Player, Player.id == MatchParticipant.player_id)
+        statement = statement.where(MatchParticipant.hero_id == key, has_timestamp)
+        return statement, MatchParticipant.timestamp, MatchParticipant.match_id
+    if scope == SEASON:
+        # One winner per match even when several are recorded: a join would repeat the match
+        winner = and_(MatchParticipant.match_id == Match.id, MatchParticipant.is_winner.is_(True))
+        winner_hero = select(Hero.name).join(MatchParticipant, MatchParticipant.hero_id == Hero.id).where(winner)
+        winner_name = select(Player.username).join(
+            MatchParticipant, MatchParticipant.player_id == Player.id
+        ).where(winner)
+        statement = select(
+            Match.id.label("match_id"), Match.timestamp, Match.win_type,
+            winner_hero.order_by(MatchParticipant.id).limit(1).scalar_subquery().label("hero"),
+            winner_name.order_by(MatchParticipant.id).limit(1).scalar_subquery().label("username"),
+        )
+        return statement.where(Match.season_id == key), Match.timestamp, Match.id
+    raise ValueError(f"Unknown history scope: {scope}")
+
+
+@read_only
+def read_history_page(
+    db: Session, scope: str, key: int, cursor: Optional[Cursor] = None, direction: str = OLDER, limit: int = 10,
+) -> HistoryPage:
+    """
+    A page of the history of a player (``PLAYER``, by player id), a hero (``HERO``, by hero id)
+    or a season (``SEASON``, by season id).
+
+    Args:
+        cursor: Position of the first (``NEWER``) or last (``OLDER``) match of the current page;
+            the newest page when None
+        direction: Read the matches before (``OLDER``) or after (``NEWER``) the cursor
+    """
+    statement, timestamp_column, id_column = _scope_query(scope, key)
+    if direction == NEWER and cursor is not None:
+        statement = statement.where(after_position(timestamp_column, id_column, cursor.timestamp, cursor.match_id))
+        statement = statement.order_by(timestamp_column, id_column)
+    else:
+        if cursor is not None:
+            statement = statement.where(before_position(timestamp_column, id_column, cursor.timestamp, cursor.match_id))
+        statement = statement.order_by(timestamp_column.desc(), id_column.desc())
+    rows = db.execute(statement.limit(limit + 1)).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == NEWER and cursor is not None:
+        rows.reverse()
+    entries = [
+        HistoryEntry(
+            match_id=row.match_id,
+            timestamp=row.timestamp,
+            win_type=row.win_type.value if row.win_type else None,
+            hero=getattr(row, "hero", None),
+            username=getattr(row, "username", None),
+            is_winner=getattr(row, "is_winner", None),
+        )
+        for row in rows
+    ]
+    page = HistoryPage(entries)
+    if entries:
+        # Coming from a cursor, the matches on its other side are still there
+        has_newer = more if direction == NEWER and cursor is not None else cursor is not None
+        has_older = more if direction == OLDER or cursor is None else True
+        if has_newer:
+            page.newer = Cursor(entries[0].timestamp, entries[0].match_id)
+        if has_older:
+            page.older = Cursor(entries[-1].timestamp, entries[-1].match_id)
+    return page
+
+
+def backfill_participant_timestamps(db: Session) -> int:
+    """
+    Copy the match timestamps to participants recorded before they had one; returns the number of rows.
+    Runs in the schema upgrade that adds the column.
+    """
+    match_timestamp = select(Match.timestamp).where(Match.id == MatchParticipant.match_id).scalar_subquery()
+    result = db.execute(
+        update(MatchParticipant).where(MatchParticipant.timestamp.is_(None)).values(timestamp=match_timestamp)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount:
+        logger.info(f"Match timestamps copied to {result.rowcount} participants")
+    return result.rowcount
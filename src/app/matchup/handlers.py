@@ -0,0 +1,58 @@
+import logging
+from pathlib import Path
+
+from telebot import TeleBot, types
+
+from ..database.core import db_session
+from ..herorating.service import read_hero
+from ..i18n.catalog import catalog
+from ..match.models import Hero
+from ..registry import lazy_config
+from .service import get_matchups
+
+logger = logging.getLogger(__name__)
+
+# Load configuration
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
+
+
+def register_handlers(bot: TeleBot):
+    """Register hero matchup handlers"""
+    logger.info("Registering hero matchup handlers")
+
+    @bot.message_handler(commands=["matchup"])
+    def matchup_command(message: types.Message, data: dict):
+        """/matchup <hero> – the hero's win rate against every other hero"""
+        user = data["user"]
+        parts = message.text.split(maxsplit=1)
+        if len(parts) < 2 or not parts[1].strip():
+            bot.reply_to(message, strings[user.lang].usage)
+            return
+
+        hero = read_hero(db_session, hero_name=parts[1].strip())
+        if hero is None:
+            bot.reply_to(message, strings[user.lang].hero_not_found.format(name=parts[1].strip()))
+            return
+
+        matchups = get_matchups(db_session)
+        games = matchups.games(hero.id)
+        if not games:
+            bot.reply_to(message, strings[user.lang].no_matches.format(hero_name=hero.name))
+            return
+
+        names = dict(db_session.query(Hero.id, Hero.name))
+        lines = [strings[user.lang].header.format(
+            hero_name=hero.name, games=games, win_rate=f"{matchups.hero_wins(hero.id) / games * 100:.1f}%"
+        ).rstrip("\n")]
+        opponents = [matchup for matchup in matchups.opponents(hero.id) if matchup.games >= config.min_games]
+        for matchup in opponents:
+            lines.append(strings[user.lang].line.format(
+                hero_name=names.get(matchup.hero_id, matchup.hero_id),
+                win_rate=f"{matchup.win_rate * 100:.1f}%",
+                games=matchup.games,
+            ))
+        if not opponents:
+            lines.append(strings[user.lang].too_few_games.format(min_games=config.min_games))
+        bot.reply_to(message, "\n".join(lines))
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary
+
+from ..models import Base
+
+
+class HeroMatchups(Base):
+    """The hero-vs-hero count arrays of all matches, in a single row"""
+    __tablename__ = 'hero_matchups'
+    id = Column(Integer, primary_key=True)
+    # Side of the square arrays: the largest hero id + 1
+    size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed little-endian int32 appearances and wins
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,229 @@
+"""
+Hero matchups.
+
+Two square count arrays indexed by hero id describe every recorded match:
+``appearances[i, j]`` is the number of matches in which heroes i and j were both
+played and ``wins[i, j]`` the number of those that hero i won, so hero i's win
+rate against hero j is ``wins[i, j] / appearances[i, j]``. The diagonal holds
+each hero's own matches and wins.
+
+The arrays are stored zlib-compressed in the single ``hero_matchups`` row.
+Applying or reverting a match adds its k×k block to them in the transaction
+that changes the ratings; the copy in memory that serves ``/matchup`` is
+dropped after the commit and read back from the row on the next request.
+``rebuild_matchups`` recomputes them from the full history with NumPy.
+"""
+import logging
+import threading
+import zlib
+from dataclasses import dataclass
+from itertools import product
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..match.models import MatchParticipant
+from .models import HeroMatchups
+
+logger = logging.getLogger(__name__)
+
+DTYPE = np.dtype("<i4")
+
+
+@dataclass(frozen=True)
+class Matchup:
+    """How a hero fared against one opponent"""
+
+    hero_id: int
+    games: int
+    wins: int
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games > 0 else 0
+
+
+class Matchups:
+    """The appearance and win arrays; read-only once shared through the cache"""
+
+    def __init__(self, appearances: np.ndarray, wins: np.ndarray):
+        self.appearances = appearances
+        self.wins = wins
+
+    @classmethod
+    def empty(cls, size: int = 0) -> "Matchups":
+        return cls(np.zeros((size, size), dtype=DTYPE), np.zeros((size, size), dtype=DTYPE))
+
+    @property
+    def size(self) -> int:
+        return len(self.appearances)
+
+    def grown(self, size: int) -> "Matchups":
+        """A copy with room for hero ids below ``size``"""
+        size = max(size, self.size)
+        padding = ((0, size - self.size), (0, size - self.size))
+        return Matchups(np.pad(self.appearances, padding), np.pad(self.wins, padding))
+
+    def encode(self) -> bytes:
+        return zlib.compress(np.stack([self.appearances, self.wins]).astype(DTYPE).tobytes(), 6)
+
+    @classmethod
+    def decode(cls, size: int, data: bytes) -> "Matchups":
+        arrays = np.frombuffer(zlib.decompress(data), dtype=DTYPE).reshape(2, size, size).copy()
+        return cls(arrays[0], arrays[1])
+
+    def games(self, hero_id: int) -> int:
+        return int(self.appearances[hero_id, hero_id]) if hero_id < self.size else 0
+
+    def hero_wins(self, hero_id: int) -> int:
+        return int(self.wins[hero_id, hero_id]) if hero_id < self.size else 0
+
+    def opponents(self, hero_id: int) -> list[Matchup]:
+        """The heroes met by ``hero_id``, best win rate first"""
+        if hero_id >= self.size:
+            return []
+        games, wins = self.appearances[hero_id], self.wins[hero_id]
+        met = np.flatnonzero(games)
+        matchups = [Matchup(int(other), int(games[other]), int(wins[other])) for other in met if other != hero_id]
+        return sorted(matchups, key=lambda matchup: (-matchup.win_rate, -matchup.games, matchup.hero_id))
+
+
+def _add_match(matchups: Matchups, seats: list[tuple[int, bool]], sign: int) -> Matchups:
+    """A copy of ``matchups`` with one match's k×k block added (``sign`` 1) or subtracted (-1)"""
+    heroes = np.array([hero_id for hero_id, _ in seats], dtype=np.int64)
+    winners = heroes[np.array([bool(is_winner) for _, is_winner in seats], dtype=bool)]
+    result = matchups.grown(int(heroes.max()) + 1)
+    np.add.at(result.appearances, (heroes[:, None], heroes[None, :]), sign)
+    np.add.at(result.wins, (winners[:, None], heroes[None, :]), sign)
+    return result
+
+
+def _apply_match(db: Session, seats: Iterable[tuple[int, bool]], sign: int):
+    seats = [(hero_id, is_winner) for hero_id, is_winner in seats if hero_id is not None]
+    if not seats:
+        return
+    # The row lock orders concurrent matches (PostgreSQL), the read-modify-write would lose one of them
+    row = db.query(HeroMatchups).with_for_update().first()
+    if row is None:
+        if sign < 0:
+            return
+        row = HeroMatchups(id=1)
+        db.add(row)
+        current = Matchups.empty()
+    else:
+        current = Matchups.decode(row.size, row.data)
+    updated = _add_match(current, seats, sign)
+    row.size = updated.size
+    row.data = updated.encode()
+
+
+def record_match_matchups(db: Session, seats: Iterable[tuple[int, bool]]):
+    """
+    Count a match in the matchup arrays, in the caller's transaction. Call
+    ``invalidate_matchups`` after the commit.
+
+    Args:
+        seats: (hero_id, is_winner) per participant
+    """
+    _apply_match(db, seats, 1)
+
+
+def revert_match_matchups(db: Session, seats: Iterable[tuple[int, bool]]):
+    """Subtract a match from the matchup arrays, in the caller's transaction"""
+    _apply_match(db, seats, -1)
+
+
+def compute_matchups(match_ids: np.ndarray, hero_ids: np.ndarray, winners: np.ndarray) -> Matchups:
+    """
+    The arrays of a whole history given as seat arrays sorted by match.
+
+    The matches are grouped by their number of seats k; for each group every one of
+    the k×k seat combinations is one ``np.add.at`` over all of its matches.
+    """
+    size = int(hero_ids.max()) + 1 if len(hero_ids) else 0
+    matchups = Matchups.empty(size)
+    if not len(match_ids):
+        return matchups
+    _, starts, sizes = np.unique(match_ids, return_index=True, return_counts=True)
+    for seat_count in np.unique(sizes):
+        # Seats of the matches with ``seat_count`` participants, one row per match
+        seats = starts[sizes == seat_count][:, None] + np.arange(seat_count)
+        heroes, won = hero_ids[seats], winners[seats]
+        for first, second in product(range(seat_count), repeat=2):
+            np.add.at(matchups.appearances, (heroes[:, first], heroes[:, second]), 1)
+            np.add.at(matchups.wins, (heroes[:, first], heroes[:, second]), won[:, first])
+    return matchups
+
+
+def rebuild_matchups(db: Session) -> Matchups:
+    """Recompute the matchup arrays from every recorded match and store them"""
+    rows = np.array([
+        (match_id, hero_id, bool(is_winner))
+        for match_id, hero_id, is_winner in db.query(
+            MatchParticipant.match_id, MatchParticipant.hero_id, MatchParticipant.is_winner
+        ).filter(MatchParticipant.hero_id.isnot(None)).order_by(MatchParticipant.match_id)
+    ], dtype=np.int64).reshape(-1, 3)
+    matchups = compute_matchups(rows[:, 0], rows[:, 1], rows[:, 2])
+
+    row = db.query(HeroMatchups).with_for_update().first() or HeroMatchups(id=1)
+    row.size = matchups.size
+    row.data = matchups.encode()
+    db.add(row)
+    db.commit()
+    invalidate_matchups()
+    logger.info(f"Hero matchups rebuilt from {len(np.unique(rows[:, 0]))} matches")
+    return matchups
+
+
+def ensure_matchups(db: Session) -> bool:
+    """Build the stored arrays when there are matches but no arrays yet (e.g. after an upgrade)"""
+    if db.query(HeroMatchups.id).first() is not None:
+        return False
+    if db.query(MatchParticipant.id).first() is None:
+        return False
+    rebuild_matchups(db)
+    return True
+
+
+def read_matchups(db: Session) -> Matchups:
+    """The stored arrays; empty when no match has been recorded yet"""
+    row = db.query(HeroMatchups).first()
+    return Matchups.decode(row.size, row.data) if row else Matchups.empty()
+
+
+class MatchupCache:
+    """The arrays in memory, read from the database again after every invalidation"""
+
+    def __init__(self):
+        self._matchups: Optional[Matchups] = None
+        # Bumped by every invalidation, so arrays read before it are not kept after it
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> Matchups:
+        with self._lock:
+            if self._matchups is not None:
+                return self._matchups
+            generation = self._generation
+        matchups = read_matchups(db)
+        with self._lock:
+            if generation == self._generation:
+                self._matchups = matchups
+        return matchups
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._matchups = None
+
+
+matchup_cache = MatchupCache()
+
+
+def get_matchups(db: Session) -> Matchups:
+    return matchup_cache.get(db)
+
+
+def invalidate_matchups():
+    matchup_cache.invalidate()
@@ -1,11 +1,13 @@
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.states import State
 from telebot.states.sync.context import StateContext
 from telebot.types import Message
 
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_equals
 from .markup import create_admin_menu_markup, create_menu_markup
 
 logging.basicConfig(level=logging.INFO)
@@ -13,8 +15,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 class AppStates:
     menu = State()
@@ -34,7 +36,7 @@ def register_handlers(bot):
 
         bot.send_message(message.chat.id, strings[user.lang].main_menu.title, reply_markup=create_menu_markup(user.lang))
 
-    @bot.callback_query_handler(func=lambda call: call.data == "menu")
+    @bot.callback_query_handler(func=data_equals("menu"))
     def menu_menu_command(call, data: dict):
         user = data["user"]
 
@@ -1,13 +1,15 @@
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+
 # Load configurations
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 def create_menu_markup(lang: str) -> InlineKeyboardMarkup:
     """Create the menu markup."""
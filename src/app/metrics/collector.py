@@ -0,0 +1,147 @@
+"""
+In-process metrics: counters and histograms with labels, rendered in the
+Prometheus text format.
+"""
+import bisect
+import threading
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+from ..registry import lazy_config
+
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+
+
+def _labels(names: Sequence[str], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = sorted(buckets)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: dict[tuple, tuple[list[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(labels) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[labels] = (counts, total + value)
+
+    def count(self, *labels) -> int:
+        counts, _ = self._values.get(labels, ([0], 0.0))
+        return sum(counts)
+
+    def sum(self, *labels) -> float:
+        return self._values.get(labels, ([0], 0.0))[1]
+
+    def quantile(self, fraction: float, *labels) -> Optional[float]:
+        """Upper bound of the bucket holding the given quantile (None when empty or beyond the last bucket)"""
+        counts, _ = self._values.get(labels, ([0], 0.0))
+        total = sum(counts)
+        if not total:
+            return None
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            if running >= fraction * total:
+                return bound
+        return None
+
+    def label_sets(self) -> list[tuple]:
+        with self._lock:
+            return sorted(self._values)
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(counts), total) for key, (counts, total) in self._values.items())
+        for key, counts, total in items:
+            running = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                running += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of the process, by name"""
+
+    def __init__(self):
+        self._metrics: dict[str, Union[Counter, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets or config.latency_buckets)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def names(self) -> list[str]:
+        return sorted(self._metrics)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,120 @@
+"""
+Hooks feeding the metrics: handler and middleware timing, SQLAlchemy query
+events and timed Telegram API requests.
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from telebot import apihelper
+
+from ..routing import registered_handlers
+from .collector import config, metrics
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def handler_name(function) -> str:
+    """``<feature>.<function>`` for a handler defined in ``app.<feature>.handlers``"""
+    module = function.__module__.split(".")
+    return f"{module[-2] if len(module) > 1 else module[0]}.{function.__name__}"
+
+
+def query_count() -> int:
+    """Queries executed so far by the current thread"""
+    return getattr(_local, "queries", 0)
+
+
+@contextmanager
+def timed(histogram: str, help_text: str, label_name: str, label: str):
+    """Observe the duration of the block; failures are also counted"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.counter(f"{histogram}_errors_total", f"Failures of {help_text.lower()}", (label_name,)).inc(label)
+        raise
+    finally:
+        metrics.histogram(f"{histogram}_seconds", help_text, (label_name,)).observe(
+            time.perf_counter() - started, label
+        )
+
+
+def _timed_function(histogram: str, help_text: str, label_name: str, label: str, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with timed(histogram, help_text, label_name, label):
+            return function(*args, **kwargs)
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_bot(bot):
+    """Time every registered handler and class middleware of ``bot``"""
+    for kind in ("message_handlers", "callback_query_handlers", "inline_handlers"):
+        for handler in registered_handlers(bot, kind):
+            if getattr(handler["function"], "timed", False):
+                continue
+            handler["function"] = _timed_function(
+                "bot_handler", "Handler run time", "handler", handler_name(handler["function"]), handler["function"]
+            )
+    for middleware in bot.middlewares or []:
+        if not getattr(middleware.pre_process, "timed", False):
+            middleware.pre_process = _timed_function(
+                "bot_middleware", "Middleware pre-processing time", "middleware", type(middleware).__name__,
+                middleware.pre_process
+            )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    _local.queries = query_count() + 1
+    metrics.counter("bot_db_queries_total", "Executed SQL statements").inc()
+    metrics.histogram("bot_db_query_seconds", "SQL statement execution time").observe(time.perf_counter() - started)
+
+
+def instrument_database():
+    """Count and time the SQL statements of every engine"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _timed_request_sender(method, url, **kwargs):
+    """``apihelper.CUSTOM_REQUEST_SENDER`` timing the request with the default session"""
+    with timed("bot_telegram_api", "Telegram Bot API request time", "method", url.rsplit("/", 1)[-1]):
+        return apihelper._get_req_session().request(method, url, **kwargs)
+
+
+def instrument_telegram_api():
+    """Time the Bot API requests, unless another request sender is installed"""
+    if apihelper.CUSTOM_REQUEST_SENDER is None:
+        apihelper.CUSTOM_REQUEST_SENDER = _timed_request_sender
+
+
+def observe_update(update_type: str, seconds: float, queries: int):
+    metrics.histogram("bot_update_seconds", "Update processing time", ("type",)).observe(seconds, update_type)
+    metrics.histogram(
+        "bot_update_queries", "SQL statements per update", ("type",), buckets=config.query_buckets
+    ).observe(queries, update_type)
+
+
+def observe_job(kind: str, seconds: float, succeeded: bool):
+    metrics.histogram("bot_job_seconds", "Background job run time", ("kind",)).observe(seconds, kind)
+    if not succeeded:
+        metrics.counter("bot_job_errors_total", "Failed background job runs", ("kind",)).inc(kind)
+
+
+def section(name: str):
+    """Time a named step inside a handler or middleware, e.g. ``with section("upsert_user"):``"""
+    return timed("bot_section", "Time spent in named code sections", "section", name)
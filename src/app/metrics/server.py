@@ -0,0 +1,67 @@
+"""
+Exposure of the metrics: a Prometheus text endpoint and a periodic log summary.
+"""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from .collector import Histogram, config, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_metrics_server(host: Optional[str] = None, port: Optional[int] = None) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread"""
+    server = ThreadingHTTPServer((host or config.server.host, config.server.port if port is None else port),
+                                 MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics served on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    return server
+
+
+def summary() -> str:
+    """One line per histogram series: count, mean and approximate p50/p99"""
+    lines = []
+    for name in metrics.names():
+        metric = metrics.get(name)
+        if not isinstance(metric, Histogram):
+            continue
+        for labels in metric.label_sets():
+            count = metric.count(*labels)
+            mean = metric.sum(*labels) / count if count else 0.0
+            p50, p99 = metric.quantile(0.5, *labels), metric.quantile(0.99, *labels)
+            lines.append(
+                f"{name}{list(labels) if labels else ''}: count={count} mean={mean:.4f} "
+                f"p50<={p50 if p50 is not None else 'inf'} p99<={p99 if p99 is not None else 'inf'}"
+            )
+    return "\n".join(lines)
+
+
+def start_stats_dump(interval: float) -> threading.Event:
+    """Log ``summary()`` every ``interval`` seconds; set the returned event to stop"""
+    stopped = threading.Event()
+
+    def run():
+        while not stopped.wait(interval):
+            logger.info("Metrics summary:\n" + summary())
+
+    threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+    return stopped
@@ -0,0 +1,25 @@
+import time
+
+from telebot import TeleBot
+from telebot.handler_backends import BaseMiddleware
+from telebot.util import update_types
+
+from ..metrics.instrumentation import observe_update, query_count
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Middleware measuring the processing time and SQL statements of every update"""
+
+    def __init__(self, bot: TeleBot) -> None:
+        self.bot = bot
+        self.update_types = update_types
+
+    def pre_process(self, update, data):
+        data["metrics_started"] = time.perf_counter()
+        data["metrics_queries"] = query_count()
+
+    def post_process(self, update, data, exception):
+        observe_update(
+            type(update).__name__, time.perf_counter() - data["metrics_started"],
+            query_count() - data["metrics_queries"]
+        )
@@ -7,6 +7,8 @@ from telebot.types import CallbackQuery, Message
 
 from ..auth.service import upsert_user
 from ..database.core import db_session
+from ..database.replicas import set_current_user
+from ..metrics.instrumentation import section
 from .service import create_event
 
 logger = logging.getLogger(__name__)
@@ -23,13 +25,17 @@ class UserMessageMiddleware(BaseMiddleware):
         """Pre-process the message"""
 
          
-        user = upsert_user(
-            db_session,
-            id=message.from_user.id,
-            username=message.from_user.username,
-            first_name=message.from_user.first_name,
-            last_name=message.from_user.last_name,
-        )
+        with section("upsert_user"):
+            user = upsert_user(
+                db_session,
+                id=message.from_user.id,
+                username=message.from_user.username,
+                first_name=message.from_user.first_name,
+                last_name=message.from_user.last_name,
+            )
+
+        # Reads of this update see the user's own writes
+        set_current_user(user.id)
 
         # Check if user is blocked
         if user.is_blocked:
@@ -37,17 +43,18 @@ class UserMessageMiddleware(BaseMiddleware):
             self.bot.answer_callback_query(message.id, "You have been blocked from using this bot.")
             return
 
-        event = create_event(
-            db_session, user_id=user.id, chat_id=message.chat.id,
-            content=message.text, content_type=message.content_type,
-            event_type="message", state=data["state"].get()
-        )
+        with section("create_event"):
+            event = create_event(
+                db_session, user_id=user.id, chat_id=message.chat.id,
+                content=message.text, content_type=message.content_type,
+                event_type="message", state=data["state"].get()
+            )
 
-        # Log event to the console
-        print(f"message.is_topic_message: {message.is_topic_message} message.message_thread_id not in ... {message.message_thread_id}"), 
         if message.is_topic_message and message.message_thread_id not in {13183, 13186}:
             return CancelUpdate()
-        logger.info(event.dict())
+        # The event is stored already; the log line is sampled (see the logging section of config.yaml)
+        logger.info("%s from user %s in chat %s", event.event_type, event.user_id, event.chat_id,
+                    extra={"content_type": event.content_type, "state": event.state})
 
         # Set the user data to the data dictionary
         data["user"] = user
@@ -66,13 +73,17 @@ class UserCallbackMiddleware(BaseMiddleware):
     def pre_process(self, callback_query: CallbackQuery, data: dict):
         """Pre-process the callback query"""
          
-        user = upsert_user(
-            db_session,
-            id=callback_query.from_user.id,
-            username=callback_query.from_user.username,
-            first_name=callback_query.from_user.first_name,
-            last_name=callback_query.from_user.last_name,
-        )
+        with section("upsert_user"):
+            user = upsert_user(
+                db_session,
+                id=callback_query.from_user.id,
+                username=callback_query.from_user.username,
+                first_name=callback_query.from_user.first_name,
+                last_name=callback_query.from_user.last_name,
+            )
+
+        # Reads of this update see the user's own writes
+        set_current_user(user.id)
 
         # Check if user is blocked
         if user.is_blocked:
@@ -80,14 +91,15 @@ class UserCallbackMiddleware(BaseMiddleware):
             self.bot.answer_callback_query(callback_query.id, "You have been blocked from using this bot.")
             return
 
-        event = create_event(
-            db_session, user_id=user.id, chat_id=callback_query.message.chat.id,
-            content=callback_query.data, content_type="callback_data", event_type="callback",
-            state=data["state"].get()
-        )
+        with section("create_event"):
+            event = create_event(
+                db_session, user_id=user.id, chat_id=callback_query.message.chat.id,
+                content=callback_query.data, content_type="callback_data", event_type="callback",
+                state=data["state"].get()
+            )
 
-        # Log event to the console
-        logger.info(event.dict())
+        logger.info("%s from user %s in chat %s", event.event_type, event.user_id, event.chat_id,
+                    extra={"content_type": event.content_type, "state": event.state})
 
         # Set the user data to the data dictionary
         data["user"] = user
@@ -1,41 +1,47 @@
 import logging
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 import pytz
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
-from omegaconf import OmegaConf
+from sqlalchemy.orm import Session
 from telebot import TeleBot
 from telebot.types import CallbackQuery, Message
 
 from ..admin.markup import create_admin_menu_markup
 from ..auth.models import User
-from ..auth.service import read_users
 from ..database.core import db_session
+from ..i18n.catalog import catalog
+from ..jobs.models import Job
+from ..jobs.worker import broadcast_worker
+from ..registry import lazy_config
+from ..routing import data_equals, data_startswith
 from .markup import create_cancel_button, create_keyboard_markup
-from .service import cancel_scheduled_message, list_scheduled_messages, send_scheduled_message
+from .service import (
+    BROADCAST_JOB,
+    cancel_broadcast,
+    cancel_scheduled_message,
+    create_broadcast,
+    list_scheduled_messages,
+    run_broadcast,
+)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
-# Define timezone
-timezone = pytz.timezone(config.app.timezone)
 
-# Initialize and start scheduler
-scheduler = BackgroundScheduler(timezone=timezone)
-scheduler.start()
+@lru_cache(maxsize=1)
+def get_timezone():
+    """Timezone used to schedule public messages"""
+    return pytz.timezone(config.app.timezone)
+
 
 # Dictionary to store user data during message scheduling
 user_data: dict[str, Any] = {}
 
-# Data structure to store scheduled messages
-scheduled_messages: dict[str, dict] = {}
-
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -44,7 +50,13 @@ def register_handlers(bot: TeleBot):
     """Register public message handlers"""
     logger.info("Registering `public message` handlers")
 
-    @bot.callback_query_handler(func=lambda call: call.data == "cancel_public_message")
+    def send_broadcast(db: Session, job: Job, payload: dict):
+        """Send a slice of the broadcast; the job comes back until every user got it"""
+        return run_broadcast(bot, db, payload["broadcast_id"])
+
+    broadcast_worker.register(BROADCAST_JOB, send_broadcast)
+
+    @bot.callback_query_handler(func=data_equals("cancel_public_message"))
     def cancel(call: CallbackQuery, data: dict):
         user = data["user"]
         data["state"].delete()
@@ -59,7 +71,7 @@ def register_handlers(bot: TeleBot):
             reply_markup=create_admin_menu_markup(user.lang)
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "public_message")
+    @bot.callback_query_handler(func=data_equals("public_message"))
     def query_handler(call: CallbackQuery, data: dict):
         user = data["user"]
 
@@ -71,7 +83,7 @@ def register_handlers(bot: TeleBot):
             reply_markup=create_keyboard_markup(user.lang)
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "schedule_public_message")
+    @bot.callback_query_handler(func=data_equals("schedule_public_message"))
     def create_public_message_handler(call: CallbackQuery, data: dict):
         user = data["user"]
 
@@ -79,7 +91,7 @@ def register_handlers(bot: TeleBot):
         sent_message = bot.edit_message_text(
             strings[user.lang].enter_datetime_prompt.format(
                 timezone=config.app.timezone,
-                datetime_example=datetime.now(timezone).strftime("%Y-%m-%d %H:%M")
+                datetime_example=datetime.now(get_timezone()).strftime("%Y-%m-%d %H:%M")
             ),
             call.message.chat.id,
             call.message.message_id,
@@ -89,28 +101,40 @@ def register_handlers(bot: TeleBot):
 
         bot.register_next_step_handler(sent_message, get_datetime_input, bot, user)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "list_scheduled_messages")
+    @bot.callback_query_handler(func=data_equals("list_scheduled_messages"))
     def list_scheduled_messages_handler(call: CallbackQuery, data: dict):
         user = data["user"]
-        list_scheduled_messages(bot, user, scheduled_messages)
+        list_scheduled_messages(bot, db_session, user, get_timezone())
 
-    @bot.callback_query_handler(func=lambda call: call.data == "cancel_scheduled_message")
+    @bot.callback_query_handler(func=data_equals("cancel_scheduled_message"))
     def cancel_scheduled_message_handler(call: CallbackQuery, data: dict):
         user = data["user"]
-        cancel_scheduled_message(bot, user, scheduled_messages)
+        cancel_scheduled_message(bot, db_session, user, get_timezone())
+
+    @bot.callback_query_handler(func=data_startswith("cancel_broadcast:"))
+    def handle_cancel_callback(call: CallbackQuery, data: dict):
+        """Cancel the selected broadcast"""
+        user = data["user"]
+        broadcast_id = int(call.data.split(":", 1)[1])
+        if cancel_broadcast(db_session, broadcast_id):
+            bot.send_message(
+                call.message.chat.id, strings[user.lang].cancel_message_confirmation.format(message_id=broadcast_id)
+            )
+        else:
+            bot.send_message(call.message.chat.id, strings[user.lang].message_not_found)
 
     def get_datetime_input(message: Message, bot: TeleBot, user: User):
         try:
             user_datetime = datetime.strptime(message.text, "%Y-%m-%d %H:%M")
-            user_datetime_localized = timezone.localize(user_datetime)
+            user_datetime_localized = get_timezone().localize(user_datetime)
 
-            if user_datetime_localized < datetime.now(timezone):
+            if user_datetime_localized < datetime.now(get_timezone()):
                 sent_message = bot.reply_to(message, strings[user.lang].past_datetime_error)
                 sent_message = bot.reply_to(
                     message,
                     strings[user.lang].enter_datetime_prompt.format(
                         timezone=config.app.timezone,
-                        datetime_example=datetime.now(timezone).strftime("%Y-%m-%d %H:%M")
+                        datetime_example=datetime.now(get_timezone()).strftime("%Y-%m-%d %H:%M")
                     ),
                     reply_markup=create_cancel_button(user.lang),
                     parse_mode="Markdown"
@@ -120,10 +144,7 @@ def register_handlers(bot: TeleBot):
 
             user_data[user.id] = {"datetime": user_datetime_localized}
             sent_message = bot.send_message(user.id, strings[user.lang].record_message_prompt)
-            bot.register_next_step_handler(
-                sent_message, get_message_content,
-                bot, user, user_data, scheduler
-            )
+            bot.register_next_step_handler(sent_message, get_message_content, bot, user, user_data)
 
         except ValueError:
             sent_message = bot.send_message(user.id, strings[user.lang].invalid_datetime_format)
@@ -135,68 +156,27 @@ def register_handlers(bot: TeleBot):
             bot.register_next_step_handler(sent_message, get_datetime_input, bot, user)
 
 
-def get_message_content(message: Message, bot: TeleBot, user: User, user_data: dict[int, dict], scheduler: Any):
-    """Get the message content and schedule the message"""
+def get_message_content(message: Message, bot: TeleBot, user: User, user_data: dict[int, dict]):
+    """Get the message content and schedule the broadcast"""
     try:
         media_type = "text" if message.text else "photo"
         content = message.text or message.caption or ""
         photo = message.photo[-1].file_id if message.photo else None
 
         scheduled_datetime = user_data[user.id]["datetime"]
+        send_at = scheduled_datetime.astimezone(pytz.utc).replace(tzinfo=None)
 
-        message_id = str(random.randint(100, 999))
-        scheduled_messages[message_id] = {
-            "id": message_id,
-            "datetime": scheduled_datetime,
-            "content": content,
-            "media_type": media_type,
-            "photo": photo,
-            "jobs": [],
-        }
-        print(f"Created message: {message_id}")
-         
-        target_users = read_users(db_session)
-        for target_user in target_users:
-            # add random delay to avoid spamming
-            scheduled_datetime += timedelta(seconds=random.randint(5, 30))
-
-            job = scheduler.add_job(
-                send_scheduled_message,
-                trigger=DateTrigger(run_date=scheduled_datetime),
-                args=[bot, target_user.id, media_type, content, photo],
-                misfire_grace_time=10
-            )
-
-            scheduled_messages[message_id]["jobs"].append(job)
+        # One durable job sends the broadcast to every user at the configured rate
+        broadcast = create_broadcast(db_session, user.id, media_type, content, photo, send_at)
+        n_users = db_session.query(User.id).count()
         bot.send_message(
             user.id,
             strings[user.lang].message_scheduled_confirmation.format(
-                message_id=message_id,
-                n_users=len(target_users),
+                message_id=broadcast.id,
+                n_users=n_users,
                 send_datetime=scheduled_datetime.strftime("%Y-%m-%d %H:%M"),
                 timezone=config.app.timezone,
             ),
         )
     finally:
         user_data.pop(user.id, None)
-
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("cancel_"))
-    def handle_cancel_callback(call: CallbackQuery, data: dict):
-        """Handle cancel callback"""
-        user = data["user"]
-        callback_data = call.data
-
-        message_id = callback_data.replace("cancel_", "")
-        if message_id in scheduled_messages:
-            message_data = scheduled_messages[message_id]
-            for job_id in message_data["jobs"]:
-                try:
-                    scheduler.remove_job(job_id)
-                except Exception as e:
-                    logger.error(f"Error removing job {job_id}: {e}")
-            del scheduled_messages[message_id]
-            bot.send_message(
-                call.message.chat.id, strings[user.lang].cancel_message_confirmation.format(message_id=message_id)
-            )
-        else:
-            bot.send_message(call.message.chat.id, strings[user.lang].message_not_found)
@@ -0,0 +1,37 @@
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text
+from sqlalchemy import Enum as SQLEnum
+
+from ..models import Base, TimeStampMixin
+
+
+class BroadcastStatusEnum(str, Enum):
+    scheduled = "scheduled"
+    sending = "sending"
+    done = "done"
+    cancelled = "cancelled"
+
+
+class Broadcast(Base, TimeStampMixin):
+    """ A public message sent to every user by one durable job """
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True)
+    created_by = Column(BigInteger, nullable=False)
+    media_type = Column(String, nullable=False)  # 'text' or 'photo'
+    content = Column(Text, nullable=False, default="")
+    photo = Column(String, nullable=True)  # Telegram file id
+    send_at = Column(DateTime, nullable=False)  # UTC
+    status = Column(SQLEnum(BroadcastStatusEnum), nullable=False, default=BroadcastStatusEnum.scheduled)
+    # Checkpoint: recipients are processed in user id order, up to and including this one
+    last_user_id = Column(BigInteger, nullable=False, default=0)
+    total = Column(Integer, nullable=True)  # recipients counted when sending starts
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)  # users who blocked the bot
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_broadcasts_status", "status"),)
@@ -1,40 +1,33 @@
 import logging
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
-from omegaconf import OmegaConf
+import pytz
+from sqlalchemy import func
+from sqlalchemy.orm import Session
 from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from ..auth.models import User
+from ..i18n.catalog import catalog
+from ..jobs.service import enqueue_job
+from ..registry import lazy_config
+from .models import Broadcast, BroadcastStatusEnum
 
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
-# Logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# def send_scheduled_message(
-#     bot: TeleBot,
-#     user_id: int,
-#     media_type: str,
-#     message_text: Optional[str] = None,
-#     message_photo: Optional[str] = None
-# ):
-#     """Send a scheduled message to a user"""
-#     try:
-#         logger.info(f"Sending scheduled message to {user_id}")
-#         if media_type == "text":
-#             bot.send_message(chat_id=user_id, text=message_text)
-#         elif media_type == "photo":
-#             bot.send_photo(chat_id=user_id, caption=message_text or "", photo=message_photo, disable_notification=False)
-
-#     except Exception as e:
-#         logger.error(f"Error sending scheduled message to {user_id}: {e}")
+BROADCAST_JOB = "public_message.broadcast"
+
+ACTIVE_STATUSES = (BroadcastStatusEnum.scheduled, BroadcastStatusEnum.sending)
 
 
 def send_scheduled_message(
@@ -44,36 +37,180 @@ def send_scheduled_message(
     ):
     """Send a scheduled message to a user"""
     if media_type == "text":
-        print(f"Sending scheduled message: {message_text}")
         bot.send_message(user_id, message_text)
     if media_type == "photo":
         bot.send_photo(chat_id=user_id, caption=message_text or "", photo=message_photo, disable_notification=False)
 
 
-def list_scheduled_messages(bot: TeleBot, user: User, scheduled_messages: dict[str, dict]):
-    """List all scheduled messages"""
-    if not scheduled_messages:
+def create_broadcast(db: Session, created_by: int, media_type: str, content: str, photo: Optional[str],
+                     send_at: datetime) -> Broadcast:
+    """Store a broadcast and queue its job for ``send_at`` (UTC)"""
+    broadcast = Broadcast(created_by=created_by, media_type=media_type, content=content, photo=photo, send_at=send_at)
+    db.add(broadcast)
+    db.commit()
+    enqueue_job(db, BROADCAST_JOB, {"broadcast_id": broadcast.id}, f"{BROADCAST_JOB}:{broadcast.id}", run_after=send_at)
+    return broadcast
+
+
+def cancel_broadcast(db: Session, broadcast_id: int) -> bool:
+    """Stop a broadcast that has not finished; a running job stops at its next checkpoint"""
+    cancelled = (
+        db.query(Broadcast)
+        .filter(Broadcast.id == broadcast_id, Broadcast.status.in_(ACTIVE_STATUSES))
+        .update({Broadcast.status: BroadcastStatusEnum.cancelled, Broadcast.finished_at: datetime.utcnow()},
+                synchronize_session=False)
+    )
+    db.commit()
+    return bool(cancelled)
+
+
+def read_active_broadcasts(db: Session) -> list[Broadcast]:
+    return db.query(Broadcast).filter(Broadcast.status.in_(ACTIVE_STATUSES)).order_by(Broadcast.send_at).all()
+
+
+def read_recipients(db: Session, after_user_id: int, limit: int) -> list[int]:
+    """The next ``limit`` user ids after ``after_user_id`` (keyset pagination)"""
+    rows = db.query(User.id).filter(User.id > after_user_id).order_by(User.id).limit(limit).all()
+    return [user_id for (user_id,) in rows]
+
+
+class RateLimiter:
+    """Spaces calls evenly at ``per_second`` (0 disables the limit)"""
+
+    def __init__(self, per_second: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.interval = 1 / per_second if per_second else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = self.clock()
+        if self._next > now:
+            self.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+def _deliver(bot: TeleBot, broadcast: Broadcast, user_id: int, limiter: RateLimiter) -> str:
+    """Send the broadcast to one user; returns 'sent', 'blocked' or 'failed'"""
+    for attempt in range(2):
+        limiter.wait()
+        try:
+            send_scheduled_message(bot, user_id, broadcast.media_type, broadcast.content, broadcast.photo)
+            return "sent"
+        except ApiTelegramException as e:
+            if e.error_code == 403:
+                return "blocked"
+            retry_after = (e.result_json or {}).get("parameters", {}).get("retry_after")
+            if e.error_code == 429 and retry_after and attempt == 0:
+                logger.warning("Broadcast %s is rate limited for %s s", broadcast.id, retry_after)
+                limiter.sleep(retry_after)
+                continue
+            logger.warning("Broadcast %s to user %s failed: %s", broadcast.id, user_id, e.description)
+            return "failed"
+        except Exception as e:
+            logger.warning("Broadcast %s to user %s failed: %s", broadcast.id, user_id, e)
+            return "failed"
+    return "failed"
+
+
+def run_broadcast(bot: TeleBot, db: Session, broadcast_id: int, limiter: Optional[RateLimiter] = None,
+                  slice_seconds: Optional[float] = None) -> Optional[datetime]:
+    """
+    Send the broadcast from its checkpoint on, for at most ``slice_seconds``.
+    Returns when to continue, or None once it is finished or cancelled.
+    """
+    settings = config.broadcast
+    limiter = limiter or RateLimiter(settings.messages_per_second)
+    slice_seconds = settings.slice_seconds if slice_seconds is None else slice_seconds
+
+    broadcast = db.query(Broadcast).filter(Broadcast.id == broadcast_id).first()
+    if broadcast is None or broadcast.status not in ACTIVE_STATUSES:
+        return None
+    if broadcast.status == BroadcastStatusEnum.scheduled:
+        broadcast.status = BroadcastStatusEnum.sending
+        broadcast.started_at = datetime.utcnow()
+        broadcast.total = db.query(func.count(User.id)).scalar()
+        db.commit()
+
+    started = time.monotonic()
+    since_checkpoint = 0
+    while True:
+        recipients = read_recipients(db, broadcast.last_user_id, settings.page_size)
+        if not recipients:
+            break
+        for user_id in recipients:
+            outcome = _deliver(bot, broadcast, user_id, limiter)
+            setattr(broadcast, outcome, getattr(broadcast, outcome) + 1)
+            broadcast.last_user_id = user_id
+            since_checkpoint += 1
+            if since_checkpoint >= settings.checkpoint_every:
+                since_checkpoint = 0
+                db.commit()
+                # Cancelling only changes the status column, so it is re-read at every checkpoint
+                status = db.query(Broadcast.status).filter(Broadcast.id == broadcast_id).scalar()
+                if status != BroadcastStatusEnum.sending:
+                    logger.info("Broadcast %s cancelled after user %s", broadcast_id, user_id)
+                    return None
+                if time.monotonic() - started >= slice_seconds:
+                    return datetime.utcnow()
+
+    db.commit()
+    finished = (
+        db.query(Broadcast)
+        .filter(Broadcast.id == broadcast_id, Broadcast.status == BroadcastStatusEnum.sending)
+        .update({Broadcast.status: BroadcastStatusEnum.done, Broadcast.finished_at: datetime.utcnow()},
+                synchronize_session=False)
+    )
+    db.commit()
+    if finished:
+        logger.info(
+            "Broadcast %s done: %s sent, %s failed, %s blocked",
+            broadcast_id, broadcast.sent, broadcast.failed, broadcast.blocked
+        )
+    return None
+
+
+def list_scheduled_messages(bot: TeleBot, db: Session, user: User, timezone):
+    """List the broadcasts that are scheduled or being sent, with their delivery statistics"""
+    broadcasts = read_active_broadcasts(db)
+    if not broadcasts:
         bot.send_message(user.id, strings[user.lang].no_scheduled_messages)
         return
 
-    response = strings[user.lang].list_public_messages + "\n"
-    for message_id, message_data in scheduled_messages.items():
-        scheduled_time = message_data["datetime"].strftime("%Y-%m-%d %H:%M")
-        response += f"- {message_id}: {scheduled_time} ({config.app.timezone})\n"
-    bot.send_message(user.id, response)
-
-
-def cancel_scheduled_message(bot: TeleBot, user: User, scheduled_messages: dict[str, dict]):
-    """Cancel a scheduled message"""
-    if not scheduled_messages:
+    lines = [strings[user.lang].list_public_messages]
+    for broadcast in broadcasts:
+        lines.append(strings[user.lang].broadcast_list_item.format(
+            message_id=broadcast.id,
+            send_datetime=_local_time(broadcast.send_at, timezone),
+            timezone=config.app.timezone,
+            status=broadcast.status.value,
+            sent=broadcast.sent,
+            total=broadcast.total if broadcast.total is not None else "?",
+            failed=broadcast.failed,
+            blocked=broadcast.blocked,
+        ))
+    bot.send_message(user.id, "\n".join(lines))
+
+
+def cancel_scheduled_message(bot: TeleBot, db: Session, user: User, timezone):
+    """Ask which scheduled message to cancel"""
+    broadcasts = read_active_broadcasts(db)
+    if not broadcasts:
         bot.send_message(user.id, strings[user.lang].no_scheduled_messages)
         return
 
     # Create keyboard for cancel options
     keyboard = InlineKeyboardMarkup()
-    for message_id, message in scheduled_messages.items():
-        job_label = f"{message_id}: {message['datetime'].strftime('%Y-%m-%d %H:%M')}"
-        keyboard.add(InlineKeyboardButton(job_label, callback_data=f"cancel_{message_id}"))
+    for broadcast in broadcasts:
+        job_label = f"{broadcast.id}: {_local_time(broadcast.send_at, timezone)}"
+        keyboard.add(InlineKeyboardButton(job_label, callback_data=f"cancel_broadcast:{broadcast.id}"))
 
     bot.send_message(user.id, strings[user.lang].cancel_message_prompt, reply_markup=keyboard)
 
+
+def _local_time(utc_time: datetime, timezone) -> str:
+    return pytz.utc.localize(utc_time).astimezone(timezone).strftime("%Y-%m-%d %H:%M")
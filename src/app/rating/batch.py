@@ -0,0 +1,275 @@
+"""
+Batch recompute of the rating tables.
+
+Instead of replaying matches one by one through the ORM, the history after a
+checkpoint is loaded once, the deltas of all matches are computed by the rating
+engine on NumPy arrays and every rating table is accumulated with ``np.add.at``.
+The result is written back in bulk, together with the periodic checkpoints and
+the ``match_rating_deltas`` and ``rating_history`` rows of the recomputed matches.
+"""
+import logging
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session
+
+from ..match.models import Clan, Hero, Match, MatchParticipant
+from . import checkpoints
+from .checkpoints import (
+    RATING_MODELS,
+    ROW_KEYS,
+    after_position,
+    decode_snapshot,
+    delete_checkpoints_after,
+    restore_tables,
+    snapshot_columns,
+    store_checkpoint,
+)
+from .engine import RatingEngine, get_engine
+from .history import rebuild_daily_history
+from .leaderboards import refresh_leaderboards
+from .profile import invalidate_profiles
+from .seasons import get_active_season
+from .models import (
+    GeneralClanRating,
+    GeneralHeroRating,
+    MatchRatingDelta,
+    PlayerOverallRating,
+    RatingCheckpoint,
+    RatingHistory,
+    WinTypeEnum,
+)
+
+logger = logging.getLogger(__name__)
+
+WIN_TYPES = [win_type.value for win_type in WinTypeEnum]
+COUNTERS = ["rating", "wins", "losses"] + [f"{win_type}_wins" for win_type in WIN_TYPES]
+# The general tables do not count the kinds of wins
+GENERAL_TABLES = {GeneralHeroRating.__tablename__, GeneralClanRating.__tablename__}
+
+
+class _Table:
+    """One rating table held as a dense counter matrix, one row per key"""
+
+    def __init__(self, model, snapshot: Optional[dict[str, Any]], key_columns: dict[str, np.ndarray],
+                 clan_names: np.ndarray):
+        self.name = model.__tablename__
+        self.columns = snapshot_columns(model)
+        self.key_names = ROW_KEYS[self.name]
+        self.counters = [column for column in COUNTERS if column in self.columns]
+        self.extras = [column for column in self.columns if column not in self.counters and column not in self.key_names]
+
+        stored = [dict(zip(snapshot["columns"], row)) for row in snapshot["rows"]] if snapshot else []
+        stored_keys = np.array([[row[key] for key in self.key_names] for row in stored], dtype=np.int64)
+        new_keys = np.stack([key_columns[key] for key in self.key_names], axis=1).astype(np.int64)
+        all_keys = np.concatenate([stored_keys.reshape(-1, len(self.key_names)), new_keys])
+
+        # Rows keep the order in which they first appeared, like with one-by-one inserts
+        keys, first, inverse = np.unique(all_keys, axis=0, return_index=True, return_inverse=True)
+        order = np.argsort(first, kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        self.keys = keys[order]
+        self.index = rank[inverse.reshape(-1)][len(stored):]
+
+        self.values = np.zeros((len(self.keys), len(self.counters)), dtype=np.int64)
+        self.extra_values: list[dict[str, Any]] = [{} for _ in range(len(self.keys))]
+        for position, row in enumerate(stored):
+            self.values[position] = [row.get(column) or 0 for column in self.counters]
+            self.extra_values[position] = {column: row.get(column) for column in self.extras}
+        for participant, row_index in enumerate(self.index):
+            extra = self.extra_values[row_index]
+            if not extra:
+                if "clan_name" in self.extras:
+                    extra["clan_name"] = str(clan_names[participant])
+                for column in ("titles", "custom_titles"):
+                    if column in self.extras:
+                        extra[column] = ""
+
+    def add(self, rows: slice, deltas: np.ndarray, winners: np.ndarray, win_types: np.ndarray):
+        index = self.index[rows]
+        columns = {column: position for position, column in enumerate(self.counters)}
+        np.add.at(self.values[:, columns["rating"]], index, deltas)
+        np.add.at(self.values[:, columns["wins"]], index, winners.astype(np.int64))
+        np.add.at(self.values[:, columns["losses"]], index, (~winners).astype(np.int64))
+        if self.name in GENERAL_TABLES:
+            return
+        for code, win_type in enumerate(WIN_TYPES):
+            column = f"{win_type}_wins"
+            if column in columns:
+                np.add.at(self.values[:, columns[column]], index, (winners & (win_types == code)).astype(np.int64))
+
+    def ratings(self) -> np.ndarray:
+        return self.values[:, self.counters.index("rating")]
+
+    def snapshot(self) -> dict[str, Any]:
+        # The columns as (source, position) once, instead of a dict per row
+        sources = [
+            (0, self.key_names.index(column)) if column in self.key_names
+            else (1, self.counters.index(column)) if column in self.counters
+            else (2, column)
+            for column in self.columns
+        ]
+        rows = []
+        for key, values, extra in zip(self.keys.tolist(), self.values.tolist(), self.extra_values):
+            numbers = (key, values)
+            rows.append([
+                numbers[source][position] if source < 2 else extra.get(position) for source, position in sources
+            ])
+        return {"columns": self.columns, "rows": rows}
+
+
+def recompute_ratings(db: Session, checkpoint: Optional[RatingCheckpoint] = None,
+                      engine: Optional[RatingEngine] = None, season_id: Optional[int] = None) -> dict[str, int]:
+    """
+    Recompute a season of the rating tables from a checkpoint (from the start of the
+    season when it is None). The season is the checkpoint's one, else ``season_id``,
+    else the active season.
+
+    Checkpoints newer than ``checkpoint`` are replaced and the rating deltas of every
+    recomputed match are written again.
+
+    Returns:
+        Dictionary with the number of recomputed matches, the total number of
+        processed matches and the id of the starting checkpoint
+    """
+    engine = engine or get_engine()
+    if checkpoint is not None:
+        season_id = checkpoint.season_id
+    season_id = season_id or get_active_season(db).id
+    interval = checkpoints.config.checkpoints.interval
+    snapshot = decode_snapshot(checkpoint.data) if checkpoint else {}
+
+    conditions = [Match.season_id == season_id]
+    if checkpoint is not None:
+        conditions.append(
+            after_position(Match.timestamp, Match.id, checkpoint.match_timestamp, checkpoint.match_id)
+        )
+    matches = select(Match.id, Match.timestamp).where(*conditions)
+    participants = (
+        select(
+            MatchParticipant.match_id, MatchParticipant.player_id, MatchParticipant.hero_id,
+            MatchParticipant.is_winner, MatchParticipant.win_type, Hero.clan_id, Clan.name,
+        )
+        .join(Match, Match.id == MatchParticipant.match_id)
+        .join(Hero, Hero.id == MatchParticipant.hero_id)
+        .join(Clan, Clan.id == Hero.clan_id)
+        .where(*conditions)
+    )
+    matches = db.execute(matches.order_by(Match.timestamp, Match.id)).all()
+    rows = db.execute(participants.order_by(Match.timestamp, Match.id, MatchParticipant.id)).all()
+
+    match_ids = np.array([match_id for match_id, _ in matches], dtype=np.int64)
+    columns = list(zip(*rows)) if rows else [()] * 7
+    participant_match = np.array(columns[0], dtype=np.int64)
+    player_ids = np.array(columns[1], dtype=np.int64)
+    hero_ids = np.array(columns[2], dtype=np.int64)
+    winners = np.array([bool(value) for value in columns[3]], dtype=bool)
+    win_types = np.array(
+        [WIN_TYPES.index(WinTypeEnum(value).value) if value else -1 for value in columns[4]], dtype=np.int64
+    )
+    clan_ids = np.array(columns[5], dtype=np.int64)
+    clan_names = np.array(columns[6], dtype=object)
+
+    key_columns = {"player_id": player_ids, "hero_id": hero_ids, "clan_id": clan_ids}
+    tables = {
+        model.__tablename__: _Table(model, snapshot.get(model.__tablename__), key_columns, clan_names)
+        for model in RATING_MODELS
+    }
+
+    # Matches padded to the same number of seats; participants are already grouped by match
+    positions = {match_id: index for index, match_id in enumerate(match_ids.tolist())}
+    match_index = np.array([positions[match_id] for match_id in participant_match.tolist()], dtype=np.int64)
+    starts = np.searchsorted(match_index, np.arange(len(matches) + 1))
+    seat_index = np.arange(len(rows)) - starts[match_index]
+    width = int(seat_index.max()) + 1 if len(rows) else 1
+
+    overall = tables[PlayerOverallRating.__tablename__]
+    player_rows = overall.index
+    padding = len(overall.keys)
+    players = np.full((len(matches), width), padding, dtype=np.int64)
+    seated_winners = np.zeros((len(matches), width), dtype=bool)
+    seats = np.zeros((len(matches), width), dtype=bool)
+    players[match_index, seat_index] = player_rows
+    seated_winners[match_index, seat_index] = winners
+    seats[match_index, seat_index] = True
+
+    initial_ratings = overall.ratings().copy()
+    match_deltas = engine.history_deltas(players, seated_winners, seats, initial_ratings)
+    deltas = match_deltas[match_index, seat_index]
+
+    # Overall rating after each participation: a running sum of the deltas per player
+    by_player = np.lexsort((np.arange(len(rows)), player_rows))
+    running = np.cumsum(deltas[by_player])
+    group_starts = np.flatnonzero(np.r_[True, np.diff(player_rows[by_player]) != 0]) if len(rows) else by_player
+    group_offsets = np.repeat(running[group_starts] - deltas[by_player][group_starts],
+                              np.diff(np.r_[group_starts, len(rows)]))
+    ratings_after = np.empty(len(rows), dtype=np.int64)
+    ratings_after[by_player] = initial_ratings[player_rows[by_player]] + running - group_offsets
+
+    delete_checkpoints_after(db, checkpoint, season_id)
+    processed = checkpoint.matches_processed if checkpoint else 0
+    # Every checkpoint is a snapshot of all rating rows: a long history gets a few of them, at a
+    # multiple of the interval, instead of one per interval
+    stride = 0
+    if interval:
+        per_checkpoint = interval * checkpoints.config.checkpoints.recompute_limit
+        stride = interval * max(1, -(-len(matches) // per_checkpoint))
+    done = 0
+    for end in range(stride - processed % stride, len(matches) + 1, stride) if stride else ():
+        for table in tables.values():
+            rows_slice = slice(starts[done], starts[end])
+            table.add(rows_slice, deltas[rows_slice], winners[rows_slice], win_types[rows_slice])
+        done = end
+        match_id, timestamp = matches[end - 1]
+        store_checkpoint(
+            db, season_id, match_id, timestamp, processed + end,
+            {name: table.snapshot() for name, table in tables.items()},
+        )
+    rows_slice = slice(starts[done], starts[len(matches)])
+    for table in tables.values():
+        table.add(rows_slice, deltas[rows_slice], winners[rows_slice], win_types[rows_slice])
+
+    restore_tables(db, {name: table.snapshot() for name, table in tables.items()}, season_id)
+
+    # Deltas and history of recomputed matches are written again; those of deleted matches are dropped
+    recomputed = select(Match.id).where(*conditions)
+    for model in (MatchRatingDelta, RatingHistory):
+        db.query(model).filter(or_(
+            model.match_id.in_(recomputed),
+            model.match_id.notin_(select(Match.id)),
+        )).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(MatchRatingDelta.__table__), [
+            {
+                "match_id": int(participant_match[i]), "player_id": int(player_ids[i]), "hero_id": int(hero_ids[i]),
+                "clan_id": int(clan_ids[i]), "rating": int(deltas[i]), "is_winner": bool(winners[i]),
+                "win_type": WinTypeEnum(WIN_TYPES[win_types[i]]) if winners[i] and win_types[i] >= 0 else None,
+            }
+            for i in range(len(rows))
+        ])
+        db.execute(insert(RatingHistory.__table__), [
+            {
+                "season_id": season_id, "player_id": int(player_ids[i]), "match_id": int(participant_match[i]),
+                "timestamp": matches[match_index[i]][1], "rating": int(ratings_after[i]), "delta": int(deltas[i]),
+            }
+            for i in range(len(rows))
+        ])
+    if checkpoint is not None:
+        rebuild_daily_history(db, season_id, checkpoint.match_timestamp.date())
+    elif matches:
+        rebuild_daily_history(db, season_id, matches[0][1].date())
+    refresh_leaderboards(db, season_id)
+    db.commit()
+    invalidate_profiles()
+
+    logger.info(
+        f"Recomputed {len(matches)} matches of season {season_id} ({len(rows)} participations) "
+        f"with the {engine.name} engine"
+    )
+    return {
+        "matches_replayed": len(matches),
+        "matches_total": processed + len(matches),
+        "checkpoint_id": checkpoint.id if checkpoint else 0,
+    }
@@ -0,0 +1,278 @@
+import json
+import logging
+import zlib
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import and_, delete, insert, or_
+from sqlalchemy.orm import Session
+
+from ..match.models import Clan, Hero, Match, MatchParticipant, Player
+from ..registry import lazy_config
+from .engine import get_engine
+from .models import (
+    GeneralClanRating,
+    GeneralHeroRating,
+    PlayerClanRating,
+    PlayerHeroRating,
+    PlayerOverallRating,
+    RatingCheckpoint,
+    WinTypeEnum,
+)
+from .seasons import get_active_season, season_at
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+
+RATING_MODELS = [PlayerOverallRating, PlayerHeroRating, PlayerClanRating, GeneralHeroRating, GeneralClanRating]
+
+# Columns identifying a row of each rating table
+ROW_KEYS = {
+    PlayerOverallRating.__tablename__: ("player_id",),
+    PlayerHeroRating.__tablename__: ("player_id", "hero_id"),
+    PlayerClanRating.__tablename__: ("player_id", "clan_id"),
+    GeneralHeroRating.__tablename__: ("hero_id",),
+    GeneralClanRating.__tablename__: ("clan_id",),
+}
+
+
+def snapshot_columns(model) -> list[str]:
+    # Snapshots belong to one season, the season is stored on the checkpoint
+    return [column.name for column in model.__table__.columns if column.name not in ("id", "season_id")]
+
+
+def after_position(timestamp_column, id_column, timestamp: datetime, match_id: int):
+    """SQL condition for rows strictly after the (timestamp, id) position"""
+    return or_(timestamp_column > timestamp, and_(timestamp_column == timestamp, id_column > match_id))
+
+
+def before_position(timestamp_column, id_column, timestamp: datetime, match_id: int):
+    """SQL condition for rows strictly before the (timestamp, id) position"""
+    return or_(timestamp_column < timestamp, and_(timestamp_column == timestamp, id_column < match_id))
+
+
+# Snapshots
+
+def snapshot_tables(db: Session, season_id: int) -> dict[str, Any]:
+    """Read a season of every rating table as ``{table: {"columns": [...], "rows": [[...], ...]}}``"""
+    snapshot = {}
+    for model in RATING_MODELS:
+        columns = snapshot_columns(model)
+        rows = db.query(*[getattr(model, column) for column in columns]).filter(model.season_id == season_id).all()
+        snapshot[model.__tablename__] = {"columns": columns, "rows": [list(row) for row in rows]}
+    return snapshot
+
+
+def restore_tables(db: Session, snapshot: Optional[dict[str, Any]], season_id: int):
+    """Replace a season of every rating table with a snapshot (or clear it when it is None)"""
+    for model in RATING_MODELS:
+        db.execute(delete(model).where(model.season_id == season_id))
+        table = (snapshot or {}).get(model.__tablename__)
+        if table and table["rows"]:
+            db.execute(insert(model.__table__), [
+                {**dict(zip(table["columns"], row)), "season_id": season_id} for row in table["rows"]
+            ])
+    db.flush()
+
+
+def encode_snapshot(snapshot: dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(snapshot, separators=(",", ":")).encode(), 6)
+
+
+def decode_snapshot(data: bytes) -> dict[str, Any]:
+    return json.loads(zlib.decompress(data))
+
+
+# Checkpoints
+
+def _checkpoints(db: Session, season_id: int):
+    return db.query(RatingCheckpoint).filter(RatingCheckpoint.season_id == season_id)
+
+
+def latest_checkpoint(db: Session, season_id: int) -> Optional[RatingCheckpoint]:
+    return _checkpoints(db, season_id).order_by(
+        RatingCheckpoint.match_timestamp.desc(), RatingCheckpoint.match_id.desc()
+    ).first()
+
+
+def checkpoint_before(db: Session, timestamp: datetime, match_id: int, season_id: int) -> Optional[RatingCheckpoint]:
+    """Nearest checkpoint of the season taken strictly before the given match position"""
+    return _checkpoints(db, season_id).filter(
+        before_position(RatingCheckpoint.match_timestamp, RatingCheckpoint.match_id, timestamp, match_id)
+    ).order_by(RatingCheckpoint.match_timestamp.desc(), RatingCheckpoint.match_id.desc()).first()
+
+
+def checkpoint_at_or_before(db: Session, when: datetime, season_id: int) -> Optional[RatingCheckpoint]:
+    return _checkpoints(db, season_id).filter(
+        RatingCheckpoint.match_timestamp <= when
+    ).order_by(RatingCheckpoint.match_timestamp.desc(), RatingCheckpoint.match_id.desc()).first()
+
+
+def delete_checkpoints_after(db: Session, checkpoint: Optional[RatingCheckpoint], season_id: int):
+    """
+    Drop the season's checkpoints newer than ``checkpoint`` (all of them when it is None);
+    they no longer match history
+    """
+    query = _checkpoints(db, season_id)
+    if checkpoint is not None:
+        query = query.filter(
+            after_position(
+                RatingCheckpoint.match_timestamp, RatingCheckpoint.match_id,
+                checkpoint.match_timestamp, checkpoint.match_id
+            )
+        )
+    query.delete(synchronize_session=False)
+
+
+def create_checkpoint(db: Session, match: Match, matches_processed: int) -> RatingCheckpoint:
+    """Store the current rating tables of the match's season as the state after ``match``"""
+    return store_checkpoint(
+        db, match.season_id, match.id, match.timestamp, matches_processed, snapshot_tables(db, match.season_id)
+    )
+
+
+def store_checkpoint(db: Session, season_id: int, match_id: int, match_timestamp: datetime, matches_processed: int,
+                     snapshot: dict[str, Any]) -> RatingCheckpoint:
+    """
+    Store a snapshot of the season's rating tables as the state after the given match, in the
+    caller's transaction: a checkpoint is committed together with the ratings it describes
+    """
+    checkpoint = RatingCheckpoint(
+        season_id=season_id,
+        match_id=match_id,
+        match_timestamp=match_timestamp,
+        matches_processed=matches_processed,
+        data=encode_snapshot(snapshot),
+    )
+    db.add(checkpoint)
+    db.flush()
+    logger.info(f"Rating checkpoint after match {match_id} ({matches_processed} matches, {len(checkpoint.data)} bytes)")
+    return checkpoint
+
+
+def maybe_create_checkpoint(db: Session, season_id: Optional[int] = None) -> Optional[RatingCheckpoint]:
+    """Create a checkpoint when enough matches of the season were processed since the last one"""
+    season_id = season_id or get_active_season(db).id
+    last = latest_checkpoint(db, season_id)
+    query = db.query(Match).filter(Match.season_id == season_id)
+    if last is not None:
+        query = query.filter(after_position(Match.timestamp, Match.id, last.match_timestamp, last.match_id))
+    pending = query.count()
+    if pending < config.checkpoints.interval:
+        return None
+    newest = query.order_by(Match.timestamp.desc(), Match.id.desc()).first()
+    checkpoint = create_checkpoint(db, newest, (last.matches_processed if last else 0) + pending)
+    db.commit()
+    return checkpoint
+
+
+def replay_ratings_from(db: Session, timestamp: datetime, match_id: int = 0,
+                        season_id: Optional[int] = None) -> dict[str, int]:
+    """
+    Recompute a season's ratings (the active one by default) after a correction at the
+    (timestamp, match_id) position. The nearest earlier checkpoint is restored and only
+    the matches after it are recomputed, instead of the whole history.
+    """
+    from .batch import recompute_ratings
+
+    season_id = season_id or get_active_season(db).id
+    checkpoint = checkpoint_before(db, timestamp, match_id, season_id)
+    stats = recompute_ratings(db, checkpoint, season_id=season_id)
+    logger.info(
+        f"Replayed {stats['matches_replayed']} matches from "
+        f"{'checkpoint after match ' + str(checkpoint.match_id) if checkpoint else 'the beginning'}"
+    )
+    return stats
+
+
+# Ratings as of a date
+
+def _new_row(columns: list[str], values: dict[str, Any]) -> dict[str, Any]:
+    row = {column: 0 for column in columns}
+    row.update(values)
+    return row
+
+
+def ratings_as_of(db: Session, when: datetime) -> dict[str, list[dict[str, Any]]]:
+    """
+    Rating tables of the season running at ``when`` as they were right after the last match
+    played at or before it. Starts from the nearest checkpoint and replays the remaining
+    matches in memory, without touching the stored ratings.
+    """
+    season_id = season_at(db, when).id
+    checkpoint = checkpoint_at_or_before(db, when, season_id)
+    snapshot = decode_snapshot(checkpoint.data) if checkpoint else {}
+
+    tables: dict[str, dict[tuple, dict[str, Any]]] = {}
+    columns: dict[str, list[str]] = {}
+    for model in RATING_MODELS:
+        name = model.__tablename__
+        columns[name] = snapshot_columns(model)
+        stored = snapshot.get(name, {"columns": columns[name], "rows": []})
+        rows = [dict(zip(stored["columns"], row)) for row in stored["rows"]]
+        tables[name] = {tuple(row[key] for key in ROW_KEYS[name]): row for row in rows}
+
+    query = (
+        db.query(MatchParticipant, Hero.clan_id, Clan.name)
+        .join(Match, Match.id == MatchParticipant.match_id)
+        .join(Hero, Hero.id == MatchParticipant.hero_id)
+        .join(Clan, Clan.id == Hero.clan_id)
+        .filter(Match.season_id == season_id, Match.timestamp <= when)
+    )
+    if checkpoint is not None:
+        query = query.filter(
+            after_position(Match.timestamp, Match.id, checkpoint.match_timestamp, checkpoint.match_id)
+        )
+    participants = query.order_by(Match.timestamp, Match.id, MatchParticipant.id).all()
+
+    engine = get_engine()
+    overall = tables[PlayerOverallRating.__tablename__]
+    for _, group in groupby(participants, key=lambda row: row[0].match_id):
+        group = list(group)
+        deltas = engine.match_deltas(
+            [(overall.get((participant.player_id,)) or {}).get("rating", 0) for participant, _, _ in group],
+            [bool(participant.is_winner) for participant, _, _ in group],
+        )
+        for (participant, clan_id, clan_name), points in zip(group, deltas):
+            winner = bool(participant.is_winner)
+            win_type = WinTypeEnum(participant.win_type).value if winner and participant.win_type else None
+            player_id, hero_id = participant.player_id, participant.hero_id
+
+            targets = [
+                (PlayerOverallRating.__tablename__, (player_id,), {"player_id": player_id}, True),
+                (PlayerHeroRating.__tablename__, (player_id, hero_id),
+                 {"player_id": player_id, "hero_id": hero_id}, True),
+                (PlayerClanRating.__tablename__, (player_id, clan_id),
+                 {"player_id": player_id, "clan_id": clan_id, "clan_name": clan_name}, True),
+                (GeneralHeroRating.__tablename__, (hero_id,), {"hero_id": hero_id}, False),
+                (GeneralClanRating.__tablename__, (clan_id,), {"clan_id": clan_id, "clan_name": clan_name}, False),
+            ]
+            for name, key, identity, counts_win_types in targets:
+                row = tables[name].get(key)
+                if row is None:
+                    row = tables[name][key] = _new_row(columns[name], identity)
+                    if "titles" in row:
+                        row["titles"] = row["custom_titles"] = ""
+                row["rating"] += points
+                row["wins" if winner else "losses"] += 1
+                if counts_win_types and win_type:
+                    row[f"{win_type}_wins"] += 1
+
+    logger.info(
+        f"Ratings as of {when:%Y-%m-%d %H:%M} computed from "
+        f"{'checkpoint ' + str(checkpoint.id) if checkpoint else 'scratch'} plus {len(participants)} participations"
+    )
+    return {name: [{**row, "season_id": season_id} for row in rows.values()] for name, rows in tables.items()}
+
+
+def top_players_as_of(db: Session, when: datetime, limit: int = 10) -> list[tuple[str, int]]:
+    """(username, rating) of the best players of the season running at ``when``, as of ``when``"""
+    rows = ratings_as_of(db, when)[PlayerOverallRating.__tablename__]
+    rows = [row for row in rows if row["wins"] or row["losses"]]
+    top = sorted(rows, key=lambda row: (-row["rating"], row["player_id"]))[:limit]
+    usernames = dict(db.query(Player.id, Player.username).filter(Player.id.in_([row["player_id"] for row in top])))
+    return [(usernames.get(row["player_id"], str(row["player_id"])), row["rating"]) for row in top]
@@ -0,0 +1,163 @@
+"""Rating engines.
+
+An engine turns the result of a match into one rating delta per participant.
+The same delta is applied to the participant's overall, hero and clan ratings
+and to the general hero and clan ratings, and stored in ``match_rating_deltas``.
+
+Every engine works on NumPy arrays of matches padded to the same number of
+seats, so a single live match and a full-history recompute use the same code.
+"""
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from ..registry import lazy_config
+
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+
+
+class RatingEngine(ABC):
+    """Computes rating deltas for matches"""
+
+    name: str = ""
+    # Whether a delta depends on the ratings before the match (then history order matters)
+    uses_ratings: bool = False
+
+    @abstractmethod
+    def batch_deltas(self, ratings: np.ndarray, winners: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        """
+        Deltas of independent matches.
+
+        Args:
+            ratings: (matches, seats) overall ratings of the participants before the match
+            winners: (matches, seats) bool, True for the winner
+            seats: (matches, seats) bool, False for padding
+
+        Returns:
+            (matches, seats) integer deltas, zero for padding
+        """
+
+    @abstractmethod
+    def score(self, is_winner: bool) -> int:
+        """Score stored on the match participant"""
+
+    def match_deltas(self, ratings: Sequence[float], winners: Sequence[bool]) -> list[int]:
+        """Deltas of a single match, in participant order"""
+        deltas = self.batch_deltas(
+            np.asarray([ratings], dtype=np.float64),
+            np.asarray([winners], dtype=bool),
+            np.ones((1, len(winners)), dtype=bool),
+        )
+        return [int(delta) for delta in deltas[0]]
+
+    def history_deltas(self, players: np.ndarray, winners: np.ndarray, seats: np.ndarray,
+                       initial_ratings: np.ndarray) -> np.ndarray:
+        """
+        Deltas of a chronologically ordered history.
+
+        Args:
+            players: (matches, seats) dense player indices, padding points at index ``len(initial_ratings)``
+            winners: (matches, seats) bool
+            seats: (matches, seats) bool, False for padding
+            initial_ratings: (players,) overall ratings before the first match
+
+        Returns:
+            (matches, seats) integer deltas
+        """
+        if not self.uses_ratings:
+            return self.batch_deltas(np.zeros(players.shape), winners, seats)
+
+        ratings = np.append(initial_ratings.astype(np.int64), 0)
+        deltas = np.zeros(players.shape, dtype=np.int64)
+        # Matches in the same wave share no player, so a wave is computed as one array operation
+        # and the result is the same as processing the matches one by one
+        waves = _waves(players, seats, len(initial_ratings))
+        order = np.argsort(waves, kind="stable")
+        bounds = np.flatnonzero(np.diff(waves[order])) + 1
+        for group in np.split(order, bounds):
+            group_players = players[group]
+            group_seats = seats[group]
+            group_deltas = self.batch_deltas(ratings[group_players].astype(np.float64), winners[group], group_seats)
+            deltas[group] = group_deltas
+            ratings[group_players[group_seats]] += group_deltas[group_seats]
+        return deltas
+
+
+def _waves(players: np.ndarray, seats: np.ndarray, player_count: int) -> np.ndarray:
+    """Index of the earliest wave each match can run in, given that a player's matches run in order"""
+    last_wave = [-1] * (player_count + 1)
+    waves = np.empty(len(players), dtype=np.int64)
+    for index, (row, row_seats) in enumerate(zip(players.tolist(), seats.tolist())):
+        members = [player for player, seated in zip(row, row_seats) if seated]
+        wave = max(last_wave[player] for player in members) + 1 if members else 0
+        for player in members:
+            last_wave[player] = wave
+        waves[index] = wave
+    return waves
+
+
+class PointsEngine(RatingEngine):
+    """Fixed points: the winner gets ``winner_points``, everybody else ``loser_points``"""
+
+    name = "points"
+
+    def __init__(self, winner_points: int = 4, loser_points: int = -1):
+        self.winner_points = winner_points
+        self.loser_points = loser_points
+
+    def batch_deltas(self, ratings: np.ndarray, winners: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        deltas = np.where(winners, self.winner_points, self.loser_points).astype(np.int64)
+        return np.where(seats, deltas, 0)
+
+    def score(self, is_winner: bool) -> int:
+        return self.winner_points if is_winner else self.loser_points
+
+
+class EloEngine(RatingEngine):
+    """
+    Free-for-all Elo.
+    A match is scored as every pair of participants playing each other: the winner beats
+    everybody, the others draw among themselves. The pairwise updates are averaged over
+    the opponents, so a 4-player match moves ratings about as much as one duel.
+    """
+
+    name = "elo"
+    uses_ratings = True
+
+    def __init__(self, k_factor: float = 32, scale: float = 400):
+        self.k_factor = k_factor
+        self.scale = scale
+
+    def batch_deltas(self, ratings: np.ndarray, winners: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        # [m, i, j] compares participant i with opponent j
+        expected = 1.0 / (1.0 + 10.0 ** ((ratings[:, None, :] - ratings[:, :, None]) / self.scale))
+        actual = 0.5 + 0.5 * (winners[:, :, None].astype(np.float64) - winners[:, None, :].astype(np.float64))
+        pairs = seats[:, :, None] & seats[:, None, :]
+        pairs &= ~np.eye(ratings.shape[1], dtype=bool)[None, :, :]
+        opponents = np.maximum(seats.sum(axis=1, keepdims=True) - 1, 1)
+        deltas = self.k_factor * ((actual - expected) * pairs).sum(axis=2) / opponents
+        return np.where(seats, np.rint(deltas), 0).astype(np.int64)
+
+    def score(self, is_winner: bool) -> int:
+        return 1 if is_winner else 0
+
+
+ENGINES = {
+    PointsEngine.name: PointsEngine,
+    EloEngine.name: EloEngine,
+}
+
+
+@lru_cache(maxsize=None)
+def get_engine(name: str = None) -> RatingEngine:
+    """Engine selected by ``engine.name`` in the rating config, built with its parameters"""
+    settings = config.engine
+    name = name or settings.name
+    if name not in ENGINES:
+        raise ValueError(f"Unknown rating engine '{name}', expected one of: {', '.join(ENGINES)}")
+    params = settings.get(name) or {}
+    return ENGINES[name](**params)
@@ -1,20 +1,21 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.states import State, StatesGroup
 
 from ..database.core import db_session
 from ..herorating import service as hero_service
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_equals, data_startswith
+from .history import read_rating_peak, read_rating_trend, sparkline
 from .markup import (
     create_clan_selection_markup,
     create_rating_menu_markup,
 )
+from .profile import get_profile
 from .service import (
-    get_player_clan_rating,
-    get_player_hero_rating,
-    get_player_overall_rating,
     read_clan,
     read_clans,
     read_general_hero_rating,
@@ -26,8 +27,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Load the database session
  
@@ -128,7 +129,7 @@ def register_handlers(bot: TeleBot):
             reply_markup=types.ForceReply(selective=True)
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "rating_overall", state=RatingState.select_rating_type)
+    @bot.callback_query_handler(func=data_equals("rating_overall"), state=RatingState.select_rating_type)
     def show_overall_rating(call: types.CallbackQuery, data: dict):
         user = data["user"]
 
@@ -136,20 +137,22 @@ def register_handlers(bot: TeleBot):
             player_id = state_data.get("selected_player")
             username = state_data.get("selected_player_username")
 
-        rating = get_player_overall_rating(db_session, player_id)
+        profile = get_profile(db_session, player_id)
+        rating = profile.overall if profile else None
 
         if rating:
-            player = read_player(db_session, player_id=player_id)
             titles = ""
-            if player.titles:
-                titles = "; ".join([title.title for title in player.titles]).strip("; ")
-            if player.custom_titles:
-                titles += "; " + "; ".join([title.title for title in player.custom_titles]).strip("; ")
+            if profile.titles:
+                titles = "; ".join(profile.titles).strip("; ")
+            if profile.custom_titles:
+                titles += "; " + "; ".join(profile.custom_titles).strip("; ")
             if not titles:
                 titles = strings[user.lang].no_titles
             message_text = strings[user.lang].player_overall_rating.format(
                 username=username,
                 rating=rating.rating,
+                rank=profile.rank,
+                total_players=profile.total_players,
                 wins=rating.wins,
                 losses=rating.losses,
                 win_rate=f"{rating.win_rate*100:.1f}%",
@@ -171,7 +174,68 @@ def register_handlers(bot: TeleBot):
         # user_messages[call.message.chat.id] = call.message.message_id
         # start_timeout(bot, call.message.chat.id, call.message.message_id)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "rating_hero", state=RatingState.select_rating_type)
+    @bot.callback_query_handler(func=data_equals("rating_trend"), state=RatingState.select_rating_type)
+    def show_rating_trend(call: types.CallbackQuery, data: dict):
+        user = data["user"]
+
+        with data["state"].data() as state_data:
+            player_id = state_data.get("selected_player")
+            username = state_data.get("selected_player_username")
+
+        days = config.history.trend_days
+        trend = read_rating_trend(db_session, player_id, days)
+
+        if trend:
+            message_text = strings[user.lang].player_rating_trend.format(
+                username=username,
+                days=days,
+                sparkline=sparkline([day.close_rating for day in trend]),
+                start=trend[0].open_rating,
+                end=trend[-1].close_rating,
+                change=trend[-1].close_rating - trend[0].open_rating,
+                low=min(day.min_rating for day in trend),
+                high=max(day.max_rating for day in trend),
+                matches=sum(day.matches for day in trend),
+            )
+        else:
+            message_text = strings[user.lang].no_rating_trend.format(username=username, days=days)
+
+        bot.edit_message_text(
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            text=message_text,
+            reply_markup=create_rating_menu_markup(user.lang)
+        )
+
+    @bot.callback_query_handler(func=data_equals("rating_peak"), state=RatingState.select_rating_type)
+    def show_rating_peak(call: types.CallbackQuery, data: dict):
+        user = data["user"]
+
+        with data["state"].data() as state_data:
+            player_id = state_data.get("selected_player")
+            username = state_data.get("selected_player_username")
+
+        peak = read_rating_peak(db_session, player_id)
+
+        if peak:
+            profile = get_profile(db_session, player_id)
+            message_text = strings[user.lang].player_rating_peak.format(
+                username=username,
+                rating=peak.rating,
+                date=f"{peak.timestamp:%d.%m.%Y}",
+                current=profile.overall.rating if profile and profile.overall else 0,
+            )
+        else:
+            message_text = strings[user.lang].no_rating_peak.format(username=username)
+
+        bot.edit_message_text(
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            text=message_text,
+            reply_markup=create_rating_menu_markup(user.lang)
+        )
+
+    @bot.callback_query_handler(func=data_equals("rating_hero"), state=RatingState.select_rating_type)
     def enter_hero_name_for_rating(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(RatingState.enter_hero_name)
@@ -203,7 +267,8 @@ def register_handlers(bot: TeleBot):
             )
             return
 
-        rating = get_player_hero_rating(db_session, player_id, hero.id)
+        profile = get_profile(db_session, player_id)
+        rating = profile.heroes.get(hero.id) if profile else None
 
         data["state"].set(RatingState.select_rating_type)
 
@@ -233,7 +298,7 @@ def register_handlers(bot: TeleBot):
         )
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "rating_clan", state=RatingState.select_rating_type)
+    @bot.callback_query_handler(func=data_equals("rating_clan"), state=RatingState.select_rating_type)
     def select_clan_for_rating(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(RatingState.select_clan)
@@ -251,26 +316,26 @@ def register_handlers(bot: TeleBot):
 
 
     @bot.callback_query_handler(
-        func=lambda call: call.data.startswith("player_clan_rating_"),
+        func=data_startswith("player_clan_rating_"),
         state=RatingState.select_clan
     )
     def show_clan_rating(call: types.CallbackQuery, data: dict):
         user = data["user"]
         clan_id = int(call.data.split("_")[3])
-        clan = read_clan(db_session, clan_id)
 
         with data["state"].data() as state_data:
             player_id = int(state_data.get("selected_player"))
             username = state_data.get("selected_player_username")
 
-        rating = get_player_clan_rating(db_session, player_id, clan_id)
+        profile = get_profile(db_session, player_id)
+        rating = profile.clans.get(clan_id) if profile else None
 
         data["state"].set(RatingState.select_rating_type)
 
         if rating:
             message_text = strings[user.lang].player_clan_rating.format(
                 username=username,
-                clan_name=rating.clan_name.split(" ")[1],
+                clan_name=rating.name.split(" ")[1],
                 rating=rating.rating,
                 wins=rating.wins,
                 prestige_wins=rating.prestige_wins,
@@ -281,6 +346,7 @@ def register_handlers(bot: TeleBot):
                 win_rate=f"{rating.win_rate*100:.1f}%"
             )
         else:
+            clan = read_clan(db_session, clan_id)
             message_text = strings[user.lang].no_clan_rating_data.format(
                 username=username,
                 clan_name=clan.clan_name
@@ -293,7 +359,7 @@ def register_handlers(bot: TeleBot):
             reply_markup=create_rating_menu_markup(user.lang)
         )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "rating_other_player", state=RatingState.select_rating_type)
+    @bot.callback_query_handler(func=data_equals("rating_other_player"), state=RatingState.select_rating_type)
     def select_another_player(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(RatingState.select_player)
@@ -315,7 +381,7 @@ def register_handlers(bot: TeleBot):
         # start_timeout(bot, call.message.chat.id, call.message.message_id)
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "rating_back",
+    @bot.callback_query_handler(func=data_equals("rating_back"),
                                state=[RatingState.enter_hero_name, RatingState.select_clan])
     def back_to_rating_selection(call: types.CallbackQuery, data: dict):
         user = data["user"]
@@ -331,7 +397,7 @@ def register_handlers(bot: TeleBot):
         # start_timeout(bot, call.message.chat.id, call.message.message_id)
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "cancel", state=RatingState.select_rating_type)
+    @bot.callback_query_handler(func=data_equals("cancel"), state=RatingState.select_rating_type)
     def cancel_rating_selection(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].delete()
@@ -0,0 +1,178 @@
+"""
+Per-player rating history.
+
+Every applied match appends one ``rating_history`` row per participant with the
+overall rating right after the match. ``rating_history_daily`` keeps one row per
+player and day, so trend and peak views read at most one row per day instead of
+every game the player has played. Both are kept per season, as the ratings are.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from ..database.replicas import read_only
+from ..match.models import Match
+from .checkpoints import after_position
+from .models import RatingHistory, RatingHistoryDaily, Season
+from .seasons import active_season_id
+
+logger = logging.getLogger(__name__)
+
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+
+
+# Writes
+
+def record_match_history(
+    db: Session, match_id: int, season_id: int, timestamp: datetime, entries: Iterable[tuple[int, int, int]]
+):
+    """
+    Append the history rows of an applied match and fold them into the daily rows.
+
+    Args:
+        entries: (player_id, rating after the match, delta) per participant
+    """
+    day = timestamp.date()
+    for player_id, rating, delta in entries:
+        db.add(RatingHistory(
+            season_id=season_id, player_id=player_id, match_id=match_id, timestamp=timestamp, rating=rating, delta=delta
+        ))
+        daily = db.query(RatingHistoryDaily).filter_by(season_id=season_id, player_id=player_id, day=day).first()
+        if daily is None:
+            db.add(RatingHistoryDaily(
+                season_id=season_id, player_id=player_id, day=day, open_rating=rating - delta, close_rating=rating,
+                min_rating=rating, max_rating=rating, matches=1,
+            ))
+        else:
+            daily.close_rating = rating
+            daily.min_rating = min(daily.min_rating, rating)
+            daily.max_rating = max(daily.max_rating, rating)
+            daily.matches += 1
+
+
+def rebuild_daily_history(
+    db: Session, season_id: int, since: Optional[date] = None, player_ids: Optional[Iterable[int]] = None
+):
+    """Recompute the season's daily rows from ``since`` on (all of them when it is None) from the raw history"""
+    daily = db.query(RatingHistoryDaily).filter(RatingHistoryDaily.season_id == season_id)
+    raw = db.query(
+        RatingHistory.player_id, RatingHistory.timestamp, RatingHistory.rating, RatingHistory.delta
+    ).filter(RatingHistory.season_id == season_id)
+    if since is not None:
+        daily = daily.filter(RatingHistoryDaily.day >= since)
+        raw = raw.filter(RatingHistory.timestamp >= datetime.combine(since, datetime.min.time()))
+    if player_ids is not None:
+        player_ids = list(player_ids)
+        daily = daily.filter(RatingHistoryDaily.player_id.in_(player_ids))
+        raw = raw.filter(RatingHistory.player_id.in_(player_ids))
+    daily.delete(synchronize_session=False)
+
+    rows = raw.order_by(RatingHistory.player_id, RatingHistory.timestamp, RatingHistory.match_id).all()
+    days = []
+    for (player_id, day), group in groupby(rows, key=lambda row: (row.player_id, row.timestamp.date())):
+        group = list(group)
+        ratings = [row.rating for row in group]
+        days.append({
+            "season_id": season_id, "player_id": player_id, "day": day,
+            "open_rating": group[0].rating - group[0].delta, "close_rating": ratings[-1],
+            "min_rating": min(ratings), "max_rating": max(ratings), "matches": len(group),
+        })
+    if days:
+        db.execute(insert(RatingHistoryDaily.__table__), days)
+    db.flush()
+
+
+def remove_match_history(db: Session, match_id: int, season_id: int, timestamp: datetime, deltas: dict[int, int]):
+    """
+    Drop the history rows of a reverted match. Later rows of its players in the match's
+    season are shifted by the removed delta and their daily rows recomputed from the match day.
+
+    Args:
+        deltas: player_id -> rating delta the match gave
+    """
+    db.query(RatingHistory).filter_by(match_id=match_id).delete(synchronize_session=False)
+    for player_id, delta in deltas.items():
+        db.execute(
+            update(RatingHistory)
+            .where(
+                RatingHistory.season_id == season_id,
+                RatingHistory.player_id == player_id,
+                after_position(RatingHistory.timestamp, RatingHistory.match_id, timestamp, match_id),
+            )
+            .values(rating=RatingHistory.rating - delta)
+        )
+    rebuild_daily_history(db, season_id, timestamp.date(), deltas.keys())
+
+
+def backfill_history_seasons(db: Session) -> int:
+    """Give the history recorded before it was kept per season its match's season; returns the number of rows"""
+    match_season = select(Match.season_id).where(Match.id == RatingHistory.match_id).scalar_subquery()
+    result = db.execute(
+        update(RatingHistory).where(RatingHistory.season_id != match_season).values(season_id=match_season)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        for (season_id,) in db.query(Season.id):
+            rebuild_daily_history(db, season_id)
+        logger.info(f"Rating history of {result.rowcount} participations moved to their match's season")
+    db.commit()
+    return result.rowcount
+
+
+# Reads
+
+@read_only
+def read_rating_trend(db: Session, player_id: int, days: int) -> list[RatingHistoryDaily]:
+    """Daily rows of the active season in the last ``days`` days, oldest first"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    return (
+        db.query(RatingHistoryDaily)
+        .filter(
+            RatingHistoryDaily.season_id == active_season_id(),
+            RatingHistoryDaily.player_id == player_id,
+            RatingHistoryDaily.day >= since,
+        )
+        .order_by(RatingHistoryDaily.day)
+        .all()
+    )
+
+
+@read_only
+def read_rating_peak(db: Session, player_id: int) -> Optional[RatingHistory]:
+    """The first match of the active season after which the player had their highest rating"""
+    best_day = (
+        db.query(RatingHistoryDaily)
+        .filter(RatingHistoryDaily.season_id == active_season_id(), RatingHistoryDaily.player_id == player_id)
+        .order_by(RatingHistoryDaily.max_rating.desc(), RatingHistoryDaily.day)
+        .first()
+    )
+    if best_day is None:
+        return None
+    start = datetime.combine(best_day.day, datetime.min.time())
+    return (
+        db.query(RatingHistory)
+        .filter(
+            RatingHistory.season_id == best_day.season_id,
+            RatingHistory.player_id == player_id,
+            RatingHistory.timestamp >= start,
+            RatingHistory.timestamp < start + timedelta(days=1),
+            RatingHistory.rating == best_day.max_rating,
+        )
+        .order_by(RatingHistory.timestamp, RatingHistory.match_id)
+        .first()
+    )
+
+
+def sparkline(values: list[int]) -> str:
+    """Values drawn as a line of block characters"""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    if low == high:
+        return SPARK_BARS[len(SPARK_BARS) // 2] * len(values)
+    scale = (len(SPARK_BARS) - 1) / (high - low)
+    return "".join(SPARK_BARS[round((value - low) * scale)] for value in values)
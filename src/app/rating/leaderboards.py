@@ -0,0 +1,169 @@
+"""
+Leaderboards.
+
+The top lists sorted every rating table of the season on each request. The
+leaderboard tables hold the same rows already ranked, with the position,
+the competition rank and the win rate, so a page of a top list is a range
+scan of the (season, position) index. They are updated in the transaction that
+changes the ratings, like the daily history: readers see the previous board until
+it commits, so an update never blocks them.
+
+A match only re-ranks the rows whose rating lies between the lowest and the highest
+old or new rating of its players, heroes and clans; the rows below that range keep
+their rating and only move when the match added rows. Recomputes and upgrades
+rebuild the whole boards with ``refresh_leaderboards``.
+"""
+import logging
+from typing import Iterable
+
+from sqlalchemy import Float, case, cast, delete, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session, aliased
+
+from .models import (
+    ClanLeaderboard,
+    GeneralClanRating,
+    GeneralHeroRating,
+    HeroLeaderboard,
+    PlayerHeroLeaderboard,
+    PlayerHeroRating,
+    PlayerLeaderboard,
+    PlayerOverallRating,
+    Season,
+)
+
+logger = logging.getLogger(__name__)
+
+WIN_TYPE_COLUMNS = ["prestige_wins", "murder_wins", "decay_wins", "stones_wins"]
+
+# board, rating table, key column, copied columns, partition columns
+BOARDS = [
+    (PlayerLeaderboard, PlayerOverallRating, "player_id",
+     ["player_id", "rating", "wins", "losses"] + WIN_TYPE_COLUMNS, []),
+    (PlayerHeroLeaderboard, PlayerHeroRating, "player_id",
+     ["hero_id", "player_id", "rating", "wins", "losses"] + WIN_TYPE_COLUMNS, ["hero_id"]),
+    (HeroLeaderboard, GeneralHeroRating, "hero_id", ["hero_id", "rating", "wins", "losses"], []),
+    (ClanLeaderboard, GeneralClanRating, "clan_id", ["clan_id", "rating", "wins", "losses"] + WIN_TYPE_COLUMNS, []),
+]
+
+
+def _ranked_rows(source, columns: list[str], partition: list[str], season_id: int, offset=0):
+    """SELECT of the season's rows of ``source`` with their position, rank and win rate"""
+    partition_by = [getattr(source, column) for column in partition]
+    total = source.wins + source.losses
+    return select(
+        source.season_id,
+        *[getattr(source, column) for column in columns],
+        func.row_number().over(partition_by=partition_by, order_by=(source.rating.desc(), source.id)) + offset,
+        func.rank().over(partition_by=partition_by, order_by=source.rating.desc()) + offset,
+        func.coalesce(cast(source.wins, Float) / func.nullif(total, 0), 0.0),
+    ).where(source.season_id == season_id)
+
+
+def _lock_season(db: Session, season_id: int):
+    # Concurrent updates of a season would both insert their rows; the lock on the season row
+    # orders them (PostgreSQL) and leaves the readers of the boards alone
+    db.query(Season.id).filter(Season.id == season_id).with_for_update().first()
+
+
+def refresh_leaderboards(db: Session, season_id: int):
+    """Rebuild the season's boards from its rating tables, in the caller's transaction"""
+    _lock_season(db, season_id)
+    for board, source, _, columns, partition in BOARDS:
+        db.execute(delete(board).where(board.season_id == season_id))
+        db.execute(insert(board).from_select(
+            ["season_id", *columns, "position", "rank", "win_rate"], _ranked_rows(source, columns, partition, season_id)
+        ))
+    db.flush()
+
+
+def _rerank(db: Session, board, source, key: str, columns: list[str], partition: list[str], season_id: int,
+            ids: dict[str, list[int]]):
+    """
+    Re-rank the rating range that the rows of the given keys moved through, in each of their
+    partitions of one board (each hero's board of ``player_hero_leaderboard``, the whole board otherwise).
+    """
+    column = partition[0] if partition else None
+
+    def part(table):
+        return getattr(table, column) if column else literal(0)
+
+    def scope(table):
+        if column is None:
+            return [table.season_id == season_id]
+        return [table.season_id == season_id, getattr(table, column).in_(ids[column])]
+
+    # The old ratings are still on the board, the new ones in the rating table
+    ratings = union_all(
+        select(part(source).label("part"), source.rating).where(*scope(source), getattr(source, key).in_(ids[key])),
+        select(part(board).label("part"), board.rating).where(*scope(board), getattr(board, key).in_(ids[key])),
+    ).subquery()
+    ranges = {
+        value: (low, high) for value, low, high in db.execute(
+            select(ratings.c.part, func.min(ratings.c.rating), func.max(ratings.c.rating)).group_by(ratings.c.part)
+        )
+    }
+    if not ranges:
+        return
+
+    def bound(table, index: int):
+        """The lowest (0) or highest (1) rating of the range of the row's partition"""
+        if column is None:
+            return ranges[0][index]
+        return case({value: limits[index] for value, limits in ranges.items()}, value=getattr(table, column))
+
+    def in_range(table):
+        return table.rating.between(bound(table, 0), bound(table, 1))
+
+    # Rows added to a range move the rows below it down
+    changes = union_all(
+        select(part(source).label("part"), literal(1).label("change")).where(*scope(source), in_range(source)),
+        select(part(board).label("part"), literal(-1).label("change")).where(*scope(board), in_range(board)),
+    ).subquery()
+    shifts = {
+        value: shift for value, shift in db.execute(
+            select(changes.c.part, func.sum(changes.c.change)).group_by(changes.c.part)
+        ) if shift
+    }
+
+    # Equal ratings are all in the range, so the rows above it give the offset of both position and rank
+    other = aliased(source)
+    above = select(func.count()).select_from(other).where(
+        other.season_id == season_id, other.rating > bound(source, 1),
+        *([getattr(other, column) == getattr(source, column)] if column else []),
+    ).scalar_subquery()
+    db.execute(delete(board).where(*scope(board), in_range(board)))
+    db.execute(insert(board).from_select(
+        ["season_id", *columns, "position", "rank", "win_rate"],
+        _ranked_rows(source, columns, partition, season_id, above).where(*scope(source), in_range(source)),
+    ))
+    if shifts:
+        shift = next(iter(shifts.values())) if column is None else case(shifts, value=getattr(board, column))
+        moved = [getattr(board, column).in_(list(shifts))] if column else []
+        db.execute(update(board).where(*scope(board), *moved, board.rating < bound(board, 0)).values(
+            position=board.position + shift, rank=board.rank + shift,
+        ))
+
+
+def update_leaderboards(db: Session, season_id: int, player_ids: Iterable[int], hero_ids: Iterable[int],
+                        clan_ids: Iterable[int]):
+    """
+    Re-rank the rows of the given players, heroes and clans (e.g. those of one match) in the
+    season's boards, in the caller's transaction.
+    """
+    _lock_season(db, season_id)
+    ids = {"player_id": list(player_ids), "hero_id": list(hero_ids), "clan_id": list(clan_ids)}
+    for board, source, key, columns, partition in BOARDS:
+        _rerank(db, board, source, key, columns, partition, season_id, ids)
+    db.flush()
+
+
+def ensure_leaderboards(db: Session, season_id: int) -> bool:
+    """Build the boards of a season that has ratings but no boards yet (e.g. after an upgrade)"""
+    if db.query(PlayerLeaderboard.id).filter_by(season_id=season_id).first() is not None:
+        return False
+    if db.query(PlayerOverallRating.id).filter_by(season_id=season_id).first() is None:
+        return False
+    refresh_leaderboards(db, season_id)
+    db.commit()
+    logger.info(f"Leaderboards of season {season_id} built")
+    return True
@@ -2,14 +2,16 @@ import logging
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +25,8 @@ def create_rating_menu_markup(lang, include_other_player=True):
         InlineKeyboardButton(strings[lang].overall_rating, callback_data="rating_overall"),
         InlineKeyboardButton(strings[lang].hero_rating, callback_data="rating_hero"),
         InlineKeyboardButton(strings[lang].clan_rating, callback_data="rating_clan"),
+        InlineKeyboardButton(strings[lang].rating_trend, callback_data="rating_trend"),
+        InlineKeyboardButton(strings[lang].rating_peak, callback_data="rating_peak"),
     )
     if include_other_player:
         markup.add(InlineKeyboardButton(strings[lang].other_player, callback_data="rating_other_player"))
@@ -1,6 +1,10 @@
+from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, UniqueConstraint,
+)
+from sqlalchemy import Enum as SQLEnum
 
 from ..models import Base
 
@@ -12,10 +16,26 @@ class WinTypeEnum(str, Enum):
     stones = "stones"
 
 
+class Season(Base):
+    """A rating season; exactly one is active and every rating row belongs to one season"""
+    __tablename__ = 'seasons'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    ended_at = Column(DateTime, nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False, index=True)
+
+
+def season_column():
+    """``season_id`` of a season-scoped table; rows created before seasons existed belong to season 1"""
+    return Column(Integer, ForeignKey('seasons.id'), nullable=False, server_default="1")
+
+
 class PlayerOverallRating(Base):
     __tablename__ = 'player_overall_ratings'
     id = Column(Integer, primary_key=True)
-    player_id = Column(Integer, ForeignKey('players.id'), unique=True)
+    season_id = season_column()
+    player_id = Column(Integer, ForeignKey('players.id'))
     rating = Column(Integer, default=0)
     wins = Column(Integer, default=0)
     losses = Column(Integer, default=0)
@@ -27,6 +47,11 @@ class PlayerOverallRating(Base):
     decay_wins = Column(Integer, default=0)
     stones_wins = Column(Integer, default=0)
 
+    __table_args__ = (
+        UniqueConstraint('season_id', 'player_id', name='uix_season_player'),
+        Index('ix_player_overall_ratings_season_rating', 'season_id', 'rating'),
+    )
+
     @property
     def win_rate(self):
         total = self.wins + self.losses
@@ -36,6 +61,7 @@ class PlayerOverallRating(Base):
 class PlayerHeroRating(Base):
     __tablename__ = 'player_hero_ratings'
     id = Column(Integer, primary_key=True)
+    season_id = season_column()
     player_id = Column(Integer, ForeignKey('players.id'))
     hero_id = Column(Integer, ForeignKey('heroes.id'))
     rating = Column(Integer, default=0)
@@ -47,7 +73,10 @@ class PlayerHeroRating(Base):
     decay_wins = Column(Integer, default=0)
     stones_wins = Column(Integer, default=0)
 
-    __table_args__ = (UniqueConstraint('player_id', 'hero_id', name='uix_player_hero'),)
+    __table_args__ = (
+        UniqueConstraint('season_id', 'player_id', 'hero_id', name='uix_season_player_hero'),
+        Index('ix_player_hero_ratings_season_hero_rating', 'season_id', 'hero_id', 'rating'),
+    )
 
     @property
     def win_rate(self):
@@ -58,6 +87,7 @@ class PlayerHeroRating(Base):
 class PlayerClanRating(Base):
     __tablename__ = 'player_clan_ratings'
     id = Column(Integer, primary_key=True)
+    season_id = season_column()
     player_id = Column(Integer, ForeignKey('players.id'))
     clan_id = Column(Integer, ForeignKey('clans.id'))
     clan_name = Column(String, nullable=False)
@@ -70,7 +100,10 @@ class PlayerClanRating(Base):
     decay_wins = Column(Integer, default=0)
     stones_wins = Column(Integer, default=0)
 
-    __table_args__ = (UniqueConstraint('player_id', 'clan_id', name='uix_player_clan'),)
+    __table_args__ = (
+        UniqueConstraint('season_id', 'player_id', 'clan_id', name='uix_season_player_clan'),
+        Index('ix_player_clan_ratings_season_clan_rating', 'season_id', 'clan_id', 'rating'),
+    )
 
     @property
     def win_rate(self):
@@ -80,11 +113,14 @@ class PlayerClanRating(Base):
 class GeneralHeroRating(Base):
     __tablename__ = 'general_hero_ratings'
     id = Column(Integer, primary_key=True)
-    hero_id = Column(Integer, ForeignKey('heroes.id'), unique=True)
+    season_id = season_column()
+    hero_id = Column(Integer, ForeignKey('heroes.id'))
     rating = Column(Integer, default=0)
     wins = Column(Integer, default=0)
     losses = Column(Integer, default=0)
 
+    __table_args__ = (UniqueConstraint('season_id', 'hero_id', name='uix_season_hero'),)
+
     @property
     def win_rate(self):
         total = self.wins + self.losses
@@ -93,7 +129,8 @@ class GeneralHeroRating(Base):
 class GeneralClanRating(Base):
     __tablename__ = 'general_clan_ratings'
     id = Column(Integer, primary_key=True)
-    clan_id = Column(Integer, ForeignKey('clans.id'), unique=True)
+    season_id = season_column()
+    clan_id = Column(Integer, ForeignKey('clans.id'))
     clan_name = Column(String, nullable=False)
     rating = Column(Integer, default=0)
     wins = Column(Integer, default=0)
@@ -104,7 +141,163 @@ class GeneralClanRating(Base):
     decay_wins = Column(Integer, default=0)
     stones_wins = Column(Integer, default=0)
 
+    __table_args__ = (UniqueConstraint('season_id', 'clan_id', name='uix_season_clan'),)
+
     @property
     def win_rate(self):
         total = self.wins + self.losses
         return self.wins / total if total > 0 else 0
+
+
+class MatchRatingDelta(Base):
+    """What one participant of a match added to the rating tables, so the match can be reverted"""
+    __tablename__ = 'match_rating_deltas'
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey('matches.id'), nullable=False, index=True)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    hero_id = Column(Integer, ForeignKey('heroes.id'), nullable=False)
+    clan_id = Column(Integer, ForeignKey('clans.id'), nullable=False)
+    rating = Column(Integer, nullable=False)
+    is_winner = Column(Boolean, nullable=False)
+    win_type = Column(SQLEnum(WinTypeEnum), nullable=True)
+
+
+class RatingCheckpoint(Base):
+    """Compressed snapshot of all rating tables after a given match"""
+    __tablename__ = 'rating_checkpoints'
+    id = Column(Integer, primary_key=True)
+    season_id = season_column()
+    # The last processed match; matches are replayed in (timestamp, id) order
+    match_id = Column(Integer, nullable=False)
+    match_timestamp = Column(DateTime, nullable=False)
+    matches_processed = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index('ix_rating_checkpoints_season_position', 'season_id', 'match_timestamp', 'match_id'),)
+
+
+class RatingHistory(Base):
+    """Overall rating of a player right after a match; append-only"""
+    __tablename__ = 'rating_history'
+    id = Column(Integer, primary_key=True)
+    season_id = season_column()
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    match_id = Column(Integer, ForeignKey('matches.id'), nullable=False, index=True)
+    timestamp = Column(DateTime, nullable=False)
+    rating = Column(Integer, nullable=False)
+    delta = Column(Integer, nullable=False)
+
+    __table_args__ = (Index('ix_rating_history_player_time', 'player_id', 'timestamp', 'match_id'),)
+
+
+class RatingHistoryDaily(Base):
+    """One day of a player's rating history, downsampled from ``rating_history``"""
+    __tablename__ = 'rating_history_daily'
+    id = Column(Integer, primary_key=True)
+    season_id = season_column()
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    day = Column(Date, nullable=False)
+    open_rating = Column(Integer, nullable=False)  # before the first match of the day
+    close_rating = Column(Integer, nullable=False)
+    min_rating = Column(Integer, nullable=False)
+    max_rating = Column(Integer, nullable=False)
+    matches = Column(Integer, nullable=False)
+
+    # A season closed during the day leaves the player one row of the day per season
+    __table_args__ = (UniqueConstraint('season_id', 'player_id', 'day', name='uix_rating_history_season_player_day'),)
+
+
+# Leaderboards: ranked copies of the rating tables, kept by leaderboards.update_leaderboards
+
+def position_column():
+    """1-based place in the board; unique per season (and hero), ties are ordered by the rating row's id"""
+    return Column(Integer, nullable=False)
+
+
+def rank_column():
+    """Competition rank: equal ratings share a rank and the next one skips ahead (1, 2, 2, 4)"""
+    return Column(Integer, nullable=False)
+
+
+class PlayerLeaderboard(Base):
+    """``player_overall_ratings`` of a season ordered by rating"""
+    __tablename__ = 'player_leaderboard'
+    id = Column(Integer, primary_key=True)
+    season_id = season_column()
+    position = position_column()
+    rank = rank_column()
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    rating = Column(Integer, nullable=False)
+    wins = Column(Integer, nullable=False)
+    losses = Column(Integer, nullable=False)
+    win_rate = Column(Float, nullable=False)  # 0..1
+
+    prestige_wins = Column(Integer, nullable=False)
+    murder_wins = Column(Integer, nullable=False)
+    decay_wins = Column(Integer, nullable=False)
+    stones_wins = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_player_leaderboard_season_position', 'season_id', 'position'),
+        Index('ix_player_leaderboard_season_player', 'season_id', 'player_id'),
+    )
+
+
+class PlayerHeroLeaderboard(Base):
+    """``player_hero_ratings`` of a season ordered by rating, one board per hero"""
+    __tablename__ = 'player_hero_leaderboard'
+    id = Column(Integer, primary_key=True)
+    season_id = season_column()
+    hero_id = Column(Integer, ForeignKey('heroes.id'), nullable=False)
+    position = position_column()
+    rank = rank_column()
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    rating = Column(Integer, nullable=False)
+    wins = Column(Integer, nullable=False)
+    losses = Column(Integer, nullable=False)
+    win_rate = Column(Float, nullable=False)
+
+    prestige_wins = Column(Integer, nullable=False)
+    murder_wins = Column(Integer, nullable=False)
+    decay_wins = Column(Integer, nullable=False)
+    stones_wins = Column(Integer, nullable=False)
+
+    __table_args__ = (Index('ix_player_hero_leaderboard_season_hero_position', 'season_id', 'hero_id', 'position'),)
+
+
+class HeroLeaderboard(Base):
+    """``general_hero_ratings`` of a season ordered by rating"""
+    __tablename__ = 'hero_leaderboard'
+    id = Column(Integer, primary_key=True)
+    season_id = season_column()
+    position = position_column()
+    rank = rank_column()
+    hero_id = Column(Integer, ForeignKey('heroes.id'), nullable=False)
+    rating = Column(Integer, nullable=False)
+    wins = Column(Integer, nullable=False)
+    losses = Column(Integer, nullable=False)
+    win_rate = Column(Float, nullable=False)
+
+    __table_args__ = (Index('ix_hero_leaderboard_season_position', 'season_id', 'position'),)
+
+
+class ClanLeaderboard(Base):
+    """``general_clan_ratings`` of a season ordered by rating"""
+    __tablename__ = 'clan_leaderboard'
+    id = Column(Integer, primary_key=True)
+    season_id = season_column()
+    position = position_column()
+    rank = rank_column()
+    clan_id = Column(Integer, ForeignKey('clans.id'), nullable=False)
+    rating = Column(Integer, nullable=False)
+    wins = Column(Integer, nullable=False)
+    losses = Column(Integer, nullable=False)
+    win_rate = Column(Float, nullable=False)
+
+    prestige_wins = Column(Integer, nullable=False)
+    murder_wins = Column(Integer, nullable=False)
+    decay_wins = Column(Integer, nullable=False)
+    stones_wins = Column(Integer, nullable=False)
+
+    __table_args__ = (Index('ix_clan_leaderboard_season_position', 'season_id', 'position'),)
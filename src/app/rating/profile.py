@@ -0,0 +1,184 @@
+"""
+Player cards.
+
+Everything the rating views show about a player, the overall rating with the
+rank, the hero and clan breakdowns and the titles, is read with one UNION ALL
+statement instead of a query per part and lazy loads of the title relations.
+Cards are cached per player; the rating service drops the cards of the players
+of a match when it is applied or reverted and the title services drop the
+cards of the players whose titles change. The rank also moves with the matches
+of other players, so cards expire after ``profile.cache_ttl_seconds``.
+
+    profile = get_profile(db_session, player_id)
+    hero_rating = profile.heroes.get(hero.id)
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy import Integer, String, cast, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from ..customtitle.models import CustomTitle
+from ..match.models import Hero, Player
+from ..registry import lazy_config
+from ..title.models import Title
+from .models import PlayerClanRating, PlayerHeroRating, PlayerLeaderboard
+from .seasons import active_season_id
+
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+
+STAT_COLUMNS = ["rating", "wins", "losses", "prestige_wins", "murder_wins", "decay_wins", "stones_wins"]
+
+
+@dataclass(frozen=True)
+class RatingLine:
+    """One rating row of a card"""
+
+    rating: int
+    wins: int
+    losses: int
+    prestige_wins: int
+    murder_wins: int
+    decay_wins: int
+    stones_wins: int
+    # Hero or clan name
+    name: Optional[str] = None
+
+    @property
+    def win_rate(self) -> float:
+        total = self.wins + self.losses
+        return self.wins / total if total > 0 else 0
+
+
+@dataclass
+class PlayerProfile:
+    """A player's card for the active season; shared between threads through the cache, so not modified"""
+
+    player_id: int
+    username: str
+    overall: Optional[RatingLine] = None
+    # Competition rank among the season's players, 0 without an overall rating
+    rank: int = 0
+    total_players: int = 0
+    heroes: dict[int, RatingLine] = field(default_factory=dict)
+    clans: dict[int, RatingLine] = field(default_factory=dict)
+    titles: list[str] = field(default_factory=list)
+    custom_titles: list[str] = field(default_factory=list)
+
+
+def _part(kind: str, key, name, stats=None, rank=None, total=None):
+    """One SELECT of the union, in the shared column layout"""
+    stats = stats or [None] * len(STAT_COLUMNS)
+    return select(
+        literal(kind, String).label("kind"),
+        cast(key, Integer).label("key"),
+        cast(name, String).label("name"),
+        *[cast(value if value is not None else null(), Integer).label(column) for column, value in zip(STAT_COLUMNS, stats)],
+        cast(rank if rank is not None else null(), Integer).label("rank"),
+        cast(total if total is not None else null(), Integer).label("total"),
+    )
+
+
+def read_profile(db: Session, player_id: int) -> Optional[PlayerProfile]:
+    """The card of a player in one statement; None when the player does not exist"""
+    season_id = active_season_id()
+    total_players = (
+        select(func.max(PlayerLeaderboard.position)).where(PlayerLeaderboard.season_id == season_id).scalar_subquery()
+    )
+    statement = union_all(
+        _part("player", Player.id, Player.username).where(Player.id == player_id),
+        _part(
+            "overall", null(), null(), [getattr(PlayerLeaderboard, column) for column in STAT_COLUMNS],
+            PlayerLeaderboard.rank, total_players,
+        ).where(PlayerLeaderboard.season_id == season_id, PlayerLeaderboard.player_id == player_id),
+        _part(
+            "hero", PlayerHeroRating.hero_id, Hero.name, [getattr(PlayerHeroRating, column) for column in STAT_COLUMNS]
+        ).join(Hero, Hero.id == PlayerHeroRating.hero_id).where(
+            PlayerHeroRating.season_id == season_id, PlayerHeroRating.player_id == player_id
+        ),
+        _part(
+            "clan", PlayerClanRating.clan_id, PlayerClanRating.clan_name,
+            [getattr(PlayerClanRating, column) for column in STAT_COLUMNS],
+        ).where(PlayerClanRating.season_id == season_id, PlayerClanRating.player_id == player_id),
+        _part("title", Title.id, Title.title).where(Title.season_id == season_id, Title.player_id == player_id),
+        _part("custom_title", CustomTitle.id, CustomTitle.title).where(CustomTitle.player_id == player_id),
+    )
+    rows = db.execute(statement).all()
+
+    player = next((row for row in rows if row.kind == "player"), None)
+    if player is None:
+        return None
+    profile = PlayerProfile(player_id=player.key, username=player.name)
+    titles, custom_titles = [], []
+    for row in rows:
+        line = RatingLine(*[getattr(row, column) for column in STAT_COLUMNS], name=row.name)
+        if row.kind == "overall":
+            profile.overall = line
+            profile.rank = row.rank
+            profile.total_players = row.total
+        elif row.kind == "hero":
+            profile.heroes[row.key] = line
+        elif row.kind == "clan":
+            profile.clans[row.key] = line
+        elif row.kind == "title":
+            titles.append((row.key, row.name))
+        elif row.kind == "custom_title":
+            custom_titles.append((row.key, row.name))
+    profile.titles = [title for _, title in sorted(titles)]
+    profile.custom_titles = [title for _, title in sorted(custom_titles)]
+    return profile
+
+
+class ProfileCache:
+    """Cards by player id; entries expire after ``ttl`` seconds or when they are invalidated"""
+
+    def __init__(self, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._items: dict[int, tuple[float, PlayerProfile]] = {}
+        # Bumped by every invalidation, so a card read before it is not stored after it
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, player_id: int, load: Callable[[], Optional[PlayerProfile]]) -> Optional[PlayerProfile]:
+        with self._lock:
+            item = self._items.get(player_id)
+            if item is not None and item[0] >= self._clock():
+                return item[1]
+            generation = self._generation
+
+        profile = load()
+        if profile is not None:
+            ttl = self.ttl if self.ttl is not None else config.profile.cache_ttl_seconds
+            with self._lock:
+                if generation == self._generation:
+                    self._items[player_id] = (self._clock() + ttl, profile)
+        return profile
+
+    def invalidate(self, *player_ids: Optional[int]):
+        """Drop the cards of ``player_ids``; all of them when none are given"""
+        with self._lock:
+            self._generation += 1
+            if not player_ids:
+                self._items.clear()
+            for player_id in player_ids:
+                self._items.pop(player_id, None)
+
+
+profile_cache = ProfileCache()
+
+
+def get_profile(db: Session, player_id: int) -> Optional[PlayerProfile]:
+    """
+    The cached card of a player. It is read from the session it is given and not from a
+    replica: a lagging replica could cache a card from before the match that invalidated it.
+    """
+    return profile_cache.get_or_load(player_id, lambda: read_profile(db, player_id))
+
+
+def invalidate_profiles(*player_ids: Optional[int]):
+    profile_cache.invalidate(*player_ids)
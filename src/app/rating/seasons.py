@@ -0,0 +1,103 @@
+"""
+Rating seasons.
+
+Every rating row, match, title and checkpoint carries a ``season_id``, and reads
+go through ``active_season_id()`` so they only touch the active season's rows via
+the season-leading indexes. Closing a season flips the active flag and starts
+a new one; the old rows stay in place as the season's archive.
+"""
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from ..title.models import Title
+from .models import Season
+
+logger = logging.getLogger(__name__)
+
+
+def active_season_id():
+    """Scalar subquery with the id of the active season, for use in filters"""
+    return select(Season.id).where(Season.is_active.is_(True)).scalar_subquery()
+
+
+def get_active_season(db: Session) -> Season:
+    """The active season, creating the first one when there is none yet"""
+    season = db.query(Season).filter(Season.is_active.is_(True)).first()
+    if season is None:
+        # Rows created before seasons existed default to season 1, which is also the id the
+        # database assigns to the first season (an explicit id would not advance a PostgreSQL sequence)
+        first = db.get(Season, 1)
+        season = first or Season(name="1", started_at=datetime.utcnow())
+        season.is_active = True
+        season.ended_at = None
+        db.add(season)
+        db.commit()
+        logger.info(f"Season '{season.name}' created")
+    return season
+
+
+def season_at(db: Session, when: datetime) -> Season:
+    """The season that was running at ``when`` (the first one for dates before every season)"""
+    season = (
+        db.query(Season)
+        .filter(Season.started_at <= when)
+        .order_by(Season.started_at.desc(), Season.id.desc())
+        .first()
+    )
+    if season is None:
+        season = db.query(Season).order_by(Season.id).first() or get_active_season(db)
+    return season
+
+
+def read_seasons(db: Session) -> list[Season]:
+    return db.query(Season).order_by(Season.id).all()
+
+
+def close_season(db: Session, name: Optional[str] = None) -> Season:
+    """
+    Archive the active season and start a new one.
+    The rating tables are not touched: the new season simply has no rows yet.
+    The season's titles stay with their holders; the new season gets unheld copies of them.
+
+    Returns:
+        The new active season
+
+    Raises:
+        RuntimeError: The rating tables still have unique constraints from before seasons, which
+            the new season's rows would break; the schema upgrade at startup replaces them
+    """
+    from ..database.migrations import superseded_unique_constraints
+    from .profile import invalidate_profiles
+
+    stale = superseded_unique_constraints(
+        db.connection(), [table for table in Season.metadata.sorted_tables if "season_id" in table.c]
+    )
+    if stale:
+        raise RuntimeError(f"The schema upgrade has not replaced the unique constraints {', '.join(stale)}")
+
+    current = get_active_season(db)
+    now = datetime.utcnow()
+    try:
+        db.execute(update(Season).where(Season.id == current.id).values(is_active=False, ended_at=now))
+        season = Season(name=name or str(current.id + 1), started_at=now, is_active=True)
+        db.add(season)
+        db.flush()
+        # Titles follow the new season's leaderboards, which are empty now
+        db.execute(insert(Title).from_select(
+            ["season_id", "category", "clan_id", "title", "default"],
+            select(season.id, Title.category, Title.clan_id, Title.title, Title.default)
+            .where(Title.season_id == current.id),
+        ))
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error closing season {current.id}: {e}")
+        db.rollback()
+        raise
+
+    invalidate_profiles()
+    logger.info(f"Season {current.id} closed, season '{season.name}' ({season.id}) started")
+    return season
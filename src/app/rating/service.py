@@ -1,17 +1,55 @@
 import logging
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session, joinedload
 
-from ..match.models import Clan, Match, Player
+from ..database.replicas import read_only
+from ..match.models import Clan, Hero, Match, MatchParticipant, Player
+from ..matchup.service import invalidate_matchups, record_match_matchups, revert_match_matchups
+from ..versus.service import record_match_pairs, revert_match_pairs
 from .models import (
     GeneralClanRating,
     GeneralHeroRating,
+    MatchRatingDelta,
     PlayerClanRating,
     PlayerHeroRating,
     PlayerOverallRating,
+    RatingCheckpoint,
     WinTypeEnum,
 )
+from .engine import get_engine
+from .history import record_match_history, remove_match_history
+from .leaderboards import refresh_leaderboards, update_leaderboards
+from .profile import invalidate_profiles
+from .seasons import active_season_id, get_active_season
+
+
+def _active(db: Session, model):
+    """Query of a rating table restricted to the active season"""
+    return db.query(model).filter(model.season_id == active_season_id())
+
+
+def _in_season(db: Session, model, season_id: int):
+    """Query of a rating table restricted to one season"""
+    return db.query(model).filter(model.season_id == season_id)
+
+
+def participant_deltas(db: Session, participants: list, season_id: int) -> list[int]:
+    """Rating deltas of a match's participants, computed by the configured engine"""
+    engine = get_engine()
+    ratings = [0] * len(participants)
+    if engine.uses_ratings:
+        current = dict(
+            db.query(PlayerOverallRating.player_id, PlayerOverallRating.rating)
+            .filter(
+                PlayerOverallRating.season_id == season_id,
+                PlayerOverallRating.player_id.in_([p.player_id for p in participants]),
+            )
+            .all()
+        )
+        ratings = [current.get(p.player_id) or 0 for p in participants]
+    return engine.match_deltas(ratings, [bool(p.is_winner) for p in participants])
 
 
 def update_player_ratings_for_match(db: Session, match, player_id: int):
@@ -28,15 +66,16 @@ def update_player_ratings_for_match(db: Session, match, player_id: int):
     logger = logging.getLogger(__name__)
     logger.info(f"Updating ratings for player_id={player_id} for match {match.id}")
 
-    winner_points = 4
-    loser_points = -1
-    
     # Find the player's participation in this match
-    participant = next((p for p in match.participants if p.player_id == player_id), None)
+    participants = list(match.participants)
+    index = next((i for i, p in enumerate(participants) if p.player_id == player_id), None)
     
-    if not participant:
+    if index is None:
         logger.warning(f"Player {player_id} not found in match {match.id}")
         return
+    participant = participants[index]
+    season_id = match.season_id
+    points = participant_deltas(db, participants, season_id)[index]
     
     hero_id = participant.hero_id
     clan_id = participant.hero.clan_id
@@ -45,17 +84,17 @@ def update_player_ratings_for_match(db: Session, match, player_id: int):
     logger.info(f"Processing participant: player_id={player_id}, hero_id={hero_id}, clan_id={clan.id}")
 
     # Update overall rating
-    overall = db.query(PlayerOverallRating).filter_by(player_id=player_id).first()
+    overall = db.query(PlayerOverallRating).filter_by(season_id=season_id, player_id=player_id).first()
     if not overall:
         logger.info(f"Creating new overall rating for player {player_id}")
         overall = PlayerOverallRating(
-            player_id=player_id, rating=0, wins=0,
+            season_id=season_id, player_id=player_id, rating=0, wins=0,
             losses=0, prestige_wins=0, murder_wins=0, stones_wins=0, decay_wins=0
         )
         db.add(overall)
     
+    overall.rating += points
     if participant.is_winner:
-        overall.rating += winner_points
         overall.wins += 1
 
         # kind of win
@@ -68,23 +107,22 @@ def update_player_ratings_for_match(db: Session, match, player_id: int):
         elif participant.win_type == WinTypeEnum.stones:
             overall.stones_wins += 1
     else:
-        overall.rating += loser_points
         overall.losses += 1
     
     logger.info(f"Updated overall rating for player {player_id}: rating={overall.rating}")
 
     # Update hero rating
-    ph = db.query(PlayerHeroRating).filter_by(player_id=player_id, hero_id=hero_id).first()
+    ph = db.query(PlayerHeroRating).filter_by(season_id=season_id, player_id=player_id, hero_id=hero_id).first()
     if not ph:
         logger.info(f"Creating new hero rating for player {player_id}, hero {hero_id}")
         ph = PlayerHeroRating(
-            player_id=player_id, hero_id=hero_id, rating=0, wins=0,
+            season_id=season_id, player_id=player_id, hero_id=hero_id, rating=0, wins=0,
             losses=0, prestige_wins=0, murder_wins=0, stones_wins=0, decay_wins=0
         )
         db.add(ph)
         db.flush()
+    ph.rating += points
     if participant.is_winner:
-        ph.rating += winner_points
         ph.wins += 1
 
         # kind of win
@@ -97,21 +135,20 @@ def update_player_ratings_for_match(db: Session, match, player_id: int):
         elif participant.win_type == WinTypeEnum.stones:
             ph.stones_wins += 1
     else:
-        ph.rating += loser_points
         ph.losses += 1
 
     # Update clan rating
-    pc = db.query(PlayerClanRating).filter_by(player_id=player_id, clan_id=clan_id).first()
+    pc = db.query(PlayerClanRating).filter_by(season_id=season_id, player_id=player_id, clan_id=clan_id).first()
     if not pc:
         logger.info(f"Creating new clan rating for player {player_id}, clan {clan.id}")
         pc = PlayerClanRating(
-            player_id=player_id, clan_id=clan_id, clan_name=clan.name, rating=0, wins=0,
+            season_id=season_id, player_id=player_id, clan_id=clan_id, clan_name=clan.name, rating=0, wins=0,
             losses=0, prestige_wins=0, murder_wins=0, stones_wins=0, decay_wins=0
         )
         db.add(pc)
 
+    pc.rating += points
     if participant.is_winner:
-        pc.rating += winner_points
         pc.wins += 1
         
         # kind of win
@@ -124,7 +161,6 @@ def update_player_ratings_for_match(db: Session, match, player_id: int):
         elif participant.win_type == WinTypeEnum.stones:
             pc.stones_wins += 1
     else:
-        pc.rating += loser_points
         pc.losses += 1
 
     try:
@@ -161,11 +197,14 @@ def rebuild_player_ratings(db: Session, player_id: int):
         logger.error(f"Player with ID {player_id} not found")
         return {"error": f"Player with ID {player_id} not found"}
     
+    # Only the active season is rebuilt, the closed ones are archived
+    season_id = get_active_season(db).id
+
     # Clear current ratings for this player
     logger.info(f"Clearing existing ratings for player_id={player_id}")
-    db.query(PlayerOverallRating).filter_by(player_id=player_id).delete()
-    db.query(PlayerHeroRating).filter_by(player_id=player_id).delete()
-    db.query(PlayerClanRating).filter_by(player_id=player_id).delete()
+    db.query(PlayerOverallRating).filter_by(season_id=season_id, player_id=player_id).delete()
+    db.query(PlayerHeroRating).filter_by(season_id=season_id, player_id=player_id).delete()
+    db.query(PlayerClanRating).filter_by(season_id=season_id, player_id=player_id).delete()
     db.commit()
     
     # Get all matches for this player ordered by date
@@ -173,7 +212,7 @@ def rebuild_player_ratings(db: Session, player_id: int):
     matches_query = (
         db.query(Match)
         .join(MatchParticipant, Match.id == MatchParticipant.match_id)
-        .filter(MatchParticipant.player_id == player_id)
+        .filter(MatchParticipant.player_id == player_id, Match.season_id == season_id)
         .order_by(Match.timestamp)
     )
     matches = matches_query.all()
@@ -184,7 +223,7 @@ def rebuild_player_ratings(db: Session, player_id: int):
     # Create initial rating objects for this player
     # Will be modified during match processing
     overall = PlayerOverallRating(
-        player_id=player_id, rating=0, wins=0,
+        season_id=season_id, player_id=player_id, rating=0, wins=0,
         losses=0, prestige_wins=0, murder_wins=0, stones_wins=0, decay_wins=0
     )
     db.add(overall)
@@ -204,9 +243,13 @@ def rebuild_player_ratings(db: Session, player_id: int):
         except Exception as e:
             logger.error(f"Error processing match {match.id} for player_id={player_id}: {e}")
     
+    refresh_leaderboards(db, season_id)
+    db.commit()
+    invalidate_profiles(player_id)
+
     # Gather statistics
-    hero_ratings_count = db.query(PlayerHeroRating).filter_by(player_id=player_id).count()
-    clan_ratings_count = db.query(PlayerClanRating).filter_by(player_id=player_id).count()
+    hero_ratings_count = db.query(PlayerHeroRating).filter_by(season_id=season_id, player_id=player_id).count()
+    clan_ratings_count = db.query(PlayerClanRating).filter_by(season_id=season_id, player_id=player_id).count()
     
     logger.info(f"Rating rebuild complete for player_id={player_id}. Processed {processed_count} matches.")
     logger.info(f"Statistics: {hero_ratings_count} hero ratings, {clan_ratings_count} clan ratings")
@@ -223,8 +266,9 @@ def rebuild_player_ratings(db: Session, player_id: int):
 
 def rebuild_all_ratings(db: Session):
     """
-    Rebuild all ratings based on complete match history.
-    Resets all rating tables and recalculates from scratch.
+    Rebuild the active season's ratings based on its complete match history.
+    Resets the season's rows and recalculates them from scratch in one batch,
+    storing a few checkpoints at multiples of ``checkpoints.interval`` matches.
     
     Args:
         db: Database session
@@ -232,45 +276,22 @@ def rebuild_all_ratings(db: Session):
     Returns:
         Dictionary with statistics about the rebuild process
     """
+    from .batch import recompute_ratings
+
     logger = logging.getLogger(__name__)
     logger.info("Starting complete rating rebuild")
-    
-    # Clear all rating tables
-    logger.info("Clearing existing ratings")
-    db.query(PlayerOverallRating).delete()
-    db.query(PlayerHeroRating).delete()
-    db.query(PlayerClanRating).delete()
-    db.query(GeneralHeroRating).delete()
-    db.query(GeneralClanRating).delete()
-    db.commit()
-    
-    # Get all matches ordered by date
-    matches = db.query(Match).order_by(Match.timestamp).all()
-    
-    logger.info(f"Processing {len(matches)} matches")
-    processed_count = 0
-    
-    # Process each match
-    for match in matches:
-        try:
-            update_ratings_after_match(db, match)
-            processed_count += 1
 
-            if processed_count % 10 == 0:
-                logger.info(f"Processed {processed_count}/{len(matches)} matches")
-
-        except Exception as e:
-            logger.error(f"Error processing match {match.id}: {e}")
+    result = recompute_ratings(db)
 
     # Gather statistics
     stats = {
-        "matches_processed": processed_count,
-        "matches_total": len(matches),
-        "player_ratings": db.query(PlayerOverallRating).count(),
-        "hero_ratings": db.query(PlayerHeroRating).count(),
-        "clan_ratings": db.query(PlayerClanRating).count(),
-        "general_hero_ratings": db.query(GeneralHeroRating).count(),
-        "general_clan_ratings": db.query(GeneralClanRating).count()
+        "matches_processed": result["matches_total"],
+        "matches_total": result["matches_total"],
+        "player_ratings": _active(db, PlayerOverallRating).count(),
+        "hero_ratings": _active(db, PlayerHeroRating).count(),
+        "clan_ratings": _active(db, PlayerClanRating).count(),
+        "general_hero_ratings": _active(db, GeneralHeroRating).count(),
+        "general_clan_ratings": _active(db, GeneralClanRating).count()
     }
 
     logger.info(f"Rating rebuild complete. Stats: {stats}")
@@ -280,36 +301,81 @@ def rebuild_all_ratings(db: Session):
 def update_ratings_after_match(db: Session, match):
     """
     Обновление рейтингов на основании результатов матча.
-    Для простоты предположим, что победителю начисляется +4 очков, а проигравшим – -1 очков.
+    Изменения рейтинга участников считает движок, выбранный в ``engine.name`` конфигурации рейтинга
+    (``RatingEngine``, см. engine.py): например, ``points`` начисляет фиксированные очки победителю и
+    проигравшим, ``elo`` — с учётом текущих рейтингов сезона.
     """
     logger = logging.getLogger(__name__)
-    logger.info(f"Updating ratings for match {match.id}")
+    logger.info("Updating ratings for match %s", match.id, extra={"match_id": match.id})
+
+    # Deltas are written together with the ratings, so their presence means the match is already counted
+    if db.query(MatchRatingDelta.id).filter_by(match_id=match.id).first():
+        logger.warning(f"Ratings for match {match.id} were already applied")
+        return
 
-    winner_points = 4
-    loser_points = -1
+    participants = list(match.participants)
+    season_id = match.season_id
+    deltas = participant_deltas(db, participants, season_id)
+    history = []
+    heroes = {
+        hero.id: hero
+        for hero in db.query(Hero).options(joinedload(Hero.clan)).filter(
+            Hero.id.in_([participant.hero_id for participant in participants])
+        )
+    }
 
-    for participant in match.participants:
+    # The rating rows of all seats, one query per table; rows created below are added to these
+    player_ids = [participant.player_id for participant in participants]
+    clan_ids = {hero.clan_id for hero in heroes.values()}
+    overall_rows = {
+        row.player_id: row for row in _in_season(db, PlayerOverallRating, season_id).filter(
+            PlayerOverallRating.player_id.in_(player_ids)
+        )
+    }
+    hero_rows = {
+        (row.player_id, row.hero_id): row for row in _in_season(db, PlayerHeroRating, season_id).filter(
+            PlayerHeroRating.player_id.in_(player_ids), PlayerHeroRating.hero_id.in_(list(heroes))
+        )
+    }
+    clan_rows = {
+        (row.player_id, row.clan_id): row for row in _in_season(db, PlayerClanRating, season_id).filter(
+            PlayerClanRating.player_id.in_(player_ids), PlayerClanRating.clan_id.in_(clan_ids)
+        )
+    }
+    general_hero_rows = {
+        row.hero_id: row for row in _in_season(db, GeneralHeroRating, season_id).filter(
+            GeneralHeroRating.hero_id.in_(list(heroes))
+        )
+    }
+    general_clan_rows = {
+        row.clan_id: row for row in _in_season(db, GeneralClanRating, season_id).filter(
+            GeneralClanRating.clan_id.in_(clan_ids)
+        )
+    }
+
+    for participant, points in zip(participants, deltas):
         player_id = participant.player_id
         hero_id = participant.hero_id
-        clan_id = participant.hero.clan_id
+        clan_id = heroes[hero_id].clan_id
 
-        clan = db.query(Clan).filter_by(id=clan_id).first()
+        clan = heroes[hero_id].clan
 
-        logger.info(f"Processing participant: player_id={player_id}, hero_id={hero_id}, clan_id={clan.id}")
+        logger.debug("Processing participant: player_id=%s, hero_id=%s, clan_id=%s", player_id, hero_id, clan_id)
 
         # Обновляем общий рейтинг игрока
-        overall = db.query(PlayerOverallRating).filter_by(player_id=player_id).first()
+        overall = overall_rows.get(player_id)
         if not overall:
-            logger.info(f"Creating new overall rating for player {player_id}")
+            logger.debug("Creating new overall rating for player %s", player_id)
             overall = PlayerOverallRating(
-                player_id=player_id, rating=0, wins=0,
+                season_id=season_id, player_id=player_id, rating=0, wins=0,
                 losses=0, prestige_wins=0, murder_wins=0, stones_wins=0, decay_wins=0
             )
             db.add(overall)
             db.flush()  # Use flush instead of commit to get the ID without committing transaction
+            overall_rows[player_id] = overall
 
+        overall.rating += points
         if participant.is_winner:
-            overall.rating += winner_points
             overall.wins += 1
 
             # kind of win
@@ -322,21 +388,22 @@ def update_ratings_after_match(db: Session, match):
             elif participant.win_type == WinTypeEnum.stones:
                 overall.stones_wins += 1
         else:
-            overall.rating += loser_points
             overall.losses += 1
-        logger.info(f"Updated overall rating for player {player_id}: rating={overall.rating}")
+        history.append((player_id, overall.rating, points))
+        logger.debug("Updated overall rating for player %s: rating=%s", player_id, overall.rating)
 
         # Рейтинг игрока на конкретном герое
-        ph = db.query(PlayerHeroRating).filter_by(player_id=player_id, hero_id=hero_id).first()
+        ph = hero_rows.get((player_id, hero_id))
         if not ph:
-            logger.info(f"Creating new hero rating for player {player_id}, hero {hero_id}")
-            ph = PlayerHeroRating(player_id=player_id, hero_id=hero_id, rating=0, wins=0,
+            logger.debug("Creating new hero rating for player %s, hero %s", player_id, hero_id)
+            ph = PlayerHeroRating(season_id=season_id, player_id=player_id, hero_id=hero_id, rating=0, wins=0,
                 losses=0, prestige_wins=0, murder_wins=0, stones_wins=0, decay_wins=0
             )
             db.add(ph)
             db.flush()
+            hero_rows[(player_id, hero_id)] = ph
+        ph.rating += points
         if participant.is_winner:
-            ph.rating += winner_points
             ph.wins += 1
 
             # kind of win
@@ -350,21 +417,21 @@ def update_ratings_after_match(db: Session, match):
                 ph.stones_wins += 1
 
         else:
-            ph.rating += loser_points
             ph.losses += 1
 
         # Рейтинг игрока в конкретном клане
-        pc = db.query(PlayerClanRating).filter_by(player_id=player_id, clan_id=clan_id).first()
+        pc = clan_rows.get((player_id, clan_id))
         if not pc:
-            logger.info(f"Creating new clan rating for player {player_id}, clan {clan.id}")
+            logger.debug("Creating new clan rating for player %s, clan %s", player_id, clan_id)
             pc = PlayerClanRating(
-                player_id=player_id, clan_id=clan_id, clan_name=clan.name,
+                season_id=season_id, player_id=player_id, clan_id=clan_id, clan_name=clan.name,
                 rating=0, wins=0, losses=0, prestige_wins=0, murder_wins=0, stones_wins=0, decay_wins=0
             )
             db.add(pc)
             db.flush()
+            clan_rows[(player_id, clan_id)] = pc
+        pc.rating += points
         if participant.is_winner:
-            pc.rating += winner_points
             pc.wins += 1
 
             # kind of win
@@ -378,41 +445,162 @@ def update_ratings_after_match(db: Session, match):
                 pc.stones_wins += 1
 
         else:
-            pc.rating += loser_points
             pc.losses += 1
 
         # Общий рейтинг героя
-        gh = db.query(GeneralHeroRating).filter_by(hero_id=hero_id).first()
+        gh = general_hero_rows.get(hero_id)
         if not gh:
-            logger.info(f"Creating new general hero rating for hero {hero_id}")
-            gh = GeneralHeroRating(hero_id=hero_id, rating=0, wins=0, losses=0)
+            logger.debug("Creating new general hero rating for hero %s", hero_id)
+            gh = GeneralHeroRating(season_id=season_id, hero_id=hero_id, rating=0, wins=0, losses=0)
             db.add(gh)
+            general_hero_rows[hero_id] = gh
+        gh.rating += points
         if participant.is_winner:
-            gh.rating += winner_points
             gh.wins += 1
         else:
-            gh.rating += loser_points
             gh.losses += 1
 
         # Общий рейтинг клана
-        gc = db.query(GeneralClanRating).filter_by(clan_id=clan_id).first()
+        gc = general_clan_rows.get(clan_id)
         if not gc:
-            logger.info(f"Creating new general clan rating for clan {clan.id}")
-            gc = GeneralClanRating(clan_id=clan_id, clan_name=clan.name, rating=0, wins=0, losses=0)
+            logger.debug("Creating new general clan rating for clan %s", clan_id)
+            gc = GeneralClanRating(season_id=season_id, clan_id=clan_id, clan_name=clan.name, rating=0, wins=0, losses=0)
             db.add(gc)
+            general_clan_rows[clan_id] = gc
+        gc.rating += points
         if participant.is_winner:
-            gc.rating += winner_points
             gc.wins += 1
         else:
-            gc.rating += loser_points
             gc.losses += 1
 
+        # Запоминаем вклад участника, чтобы матч можно было отменить
+        db.add(MatchRatingDelta(
+            match_id=match.id, player_id=player_id, hero_id=hero_id, clan_id=clan_id,
+            rating=points,
+            is_winner=bool(participant.is_winner),
+            win_type=WinTypeEnum(participant.win_type) if participant.is_winner and participant.win_type else None
+        ))
+
+    record_match_history(db, match.id, season_id, match.timestamp, history)
+    update_leaderboards(db, season_id, player_ids, heroes.keys(), clan_ids)
+    record_match_pairs(db, [(participant.player_id, participant.is_winner) for participant in participants])
+    record_match_matchups(db, [(participant.hero_id, participant.is_winner) for participant in participants])
+
     try:
         db.commit()
-        logger.info("Successfully committed rating updates")
+        logger.info("Successfully committed rating updates", extra={"match_id": match.id})
     except Exception as e:
         logger.error(f"Error committing rating updates: {e}")
         raise
+    invalidate_profiles(*player_ids)
+    invalidate_matchups()
+
+
+def _derive_match_deltas(db: Session, match_id: int, season_id: int) -> list[MatchRatingDelta]:
+    """Rebuild the deltas of a match recorded before deltas were stored"""
+    participants = (
+        db.query(MatchParticipant, Hero.clan_id)
+        .join(Hero, Hero.id == MatchParticipant.hero_id)
+        .filter(MatchParticipant.match_id == match_id)
+        .all()
+    )
+    # With a rating-dependent engine this is an approximation, the ratings before the match are gone
+    deltas = participant_deltas(db, [participant for participant, _ in participants], season_id)
+    return [
+        MatchRatingDelta(
+            match_id=match_id, player_id=participant.player_id, hero_id=participant.hero_id, clan_id=clan_id,
+            rating=points,
+            is_winner=bool(participant.is_winner),
+            win_type=WinTypeEnum(participant.win_type) if participant.is_winner and participant.win_type else None
+        )
+        for (participant, clan_id), points in zip(participants, deltas)
+    ]
+
+
+def _subtract(db: Session, model, filters: list, delta: MatchRatingDelta, with_win_types: bool = True):
+    """Subtract a participant's delta from one rating row with a single UPDATE"""
+    values = {
+        model.rating: model.rating - delta.rating,
+        model.wins: model.wins - (1 if delta.is_winner else 0),
+        model.losses: model.losses - (0 if delta.is_winner else 1),
+    }
+    if with_win_types and delta.win_type:
+        column = getattr(model, f"{WinTypeEnum(delta.win_type).value}_wins")
+        values[column] = column - 1
+    db.execute(update(model).where(*filters).values(values))
+
+
+def revert_match_ratings(db: Session, match_id: int, delete_match: bool = True) -> Optional[set[int]]:
+    """
+    Subtract a match's contributions from the five rating tables in one transaction.
+    Cost depends only on the number of participants, not on the match history.
+
+    Args:
+        db: Database session
+        match_id: ID of the match to revert
+        delete_match: Also delete the match and its participants
+
+    Returns:
+        IDs of the clans whose standings changed, or None if the match does not exist
+    """
+    logger = logging.getLogger(__name__)
+    match = db.query(Match).filter_by(id=match_id).first()
+    if not match:
+        return None
+
+    try:
+        deltas = db.query(MatchRatingDelta).filter_by(match_id=match_id).all()
+        if not deltas:
+            logger.info(f"No stored deltas for match {match_id}, deriving them from participants")
+            deltas = _derive_match_deltas(db, match_id, match.season_id)
+        affected_clans = {delta.clan_id for delta in deltas}
+        affected_players = {delta.player_id for delta in deltas}
+
+        season_id = match.season_id
+        for delta in deltas:
+            _subtract(db, PlayerOverallRating, [
+                PlayerOverallRating.season_id == season_id, PlayerOverallRating.player_id == delta.player_id
+            ], delta)
+            _subtract(db, PlayerHeroRating, [
+                PlayerHeroRating.season_id == season_id,
+                PlayerHeroRating.player_id == delta.player_id, PlayerHeroRating.hero_id == delta.hero_id
+            ], delta)
+            _subtract(db, PlayerClanRating, [
+                PlayerClanRating.season_id == season_id,
+                PlayerClanRating.player_id == delta.player_id, PlayerClanRating.clan_id == delta.clan_id
+            ], delta)
+            # The general tables never counted win types, see update_ratings_after_match
+            _subtract(db, GeneralHeroRating, [
+                GeneralHeroRating.season_id == season_id, GeneralHeroRating.hero_id == delta.hero_id
+            ], delta, False)
+            _subtract(db, GeneralClanRating, [
+                GeneralClanRating.season_id == season_id, GeneralClanRating.clan_id == delta.clan_id
+            ], delta, False)
+
+        remove_match_history(
+            db, match_id, season_id, match.timestamp, {delta.player_id: delta.rating for delta in deltas}
+        )
+        update_leaderboards(db, season_id, affected_players, {delta.hero_id for delta in deltas}, affected_clans)
+        revert_match_pairs(db, [(delta.player_id, delta.is_winner) for delta in deltas])
+        revert_match_matchups(db, [(delta.hero_id, delta.is_winner) for delta in deltas])
+        db.query(MatchRatingDelta).filter_by(match_id=match_id).delete(synchronize_session=False)
+        # Checkpoints taken after this match include it and can no longer be restored
+        db.query(RatingCheckpoint).filter(RatingCheckpoint.season_id == season_id, or_(
+            RatingCheckpoint.match_timestamp > match.timestamp,
+            and_(RatingCheckpoint.match_timestamp == match.timestamp, RatingCheckpoint.match_id >= match.id)
+        )).delete(synchronize_session=False)
+        if delete_match:
+            db.delete(match)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error reverting match {match_id}: {e}")
+        db.rollback()
+        raise
+
+    invalidate_profiles(*affected_players)
+    invalidate_matchups()
+    logger.info(f"Reverted ratings of match {match_id} ({len(affected_clans)} clans affected)")
+    return affected_clans
 
 
 def read_player(
@@ -431,28 +619,31 @@ def read_clans(db: Session):
     return db.query(Clan).all()
 
 def read_general_clan_rating(db: Session):
-    return db.query(GeneralClanRating).all()
+    return _active(db, GeneralClanRating).all()
 
 def read_clan(db: Session, clan_id: int):
-    return db.query(GeneralClanRating).filter_by(clan_id=clan_id).first()
+    return _active(db, GeneralClanRating).filter_by(clan_id=clan_id).first()
 
 def read_heroes(db: Session):
-    return db.query(GeneralHeroRating).all()
+    return _active(db, GeneralHeroRating).all()
 
 def read_general_hero_rating(db: Session, hero_id: int):
-    return db.query(GeneralHeroRating).filter_by(hero_id=hero_id).first()
+    return _active(db, GeneralHeroRating).filter_by(hero_id=hero_id).first()
 
+@read_only
 def get_player_overall_rating(db: Session, player_id: int):
-    return db.query(PlayerOverallRating).filter_by(player_id=player_id).first()
+    return _active(db, PlayerOverallRating).filter_by(player_id=player_id).first()
 
+@read_only
 def get_player_hero_rating(db: Session, player_id: int, hero_id: int):
-    return db.query(PlayerHeroRating).filter_by(player_id=player_id, hero_id=hero_id).first()
+    return _active(db, PlayerHeroRating).filter_by(player_id=player_id, hero_id=hero_id).first()
 
+@read_only
 def get_player_clan_rating(db: Session, player_id: int, clan_id: int):
-    return db.query(PlayerClanRating).filter_by(player_id=player_id, clan_id=clan_id).first()
+    return _active(db, PlayerClanRating).filter_by(player_id=player_id, clan_id=clan_id).first()
 
 def get_general_hero_rating(db: Session, hero_id: int):
-    return db.query(GeneralHeroRating).filter_by(hero_id=hero_id).first()
+    return _active(db, GeneralHeroRating).filter_by(hero_id=hero_id).first()
 
 def get_general_clan_rating(db: Session, clan_id: int):
-    return db.query(GeneralClanRating).filter_by(clan_id=clan_id).first()
+    return _active(db, GeneralClanRating).filter_by(clan_id=clan_id).first()
@@ -0,0 +1,153 @@
+"""Lazy component registry.
+
+Expensive objects (Google clients, schedulers, per-module configs) are
+registered here as factories and only built when something first touches
+them, so importing the bot does not open network connections or threads.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from omegaconf import DictConfig, OmegaConf
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentRegistry:
+    """Named components created on first use"""
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._instances: dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> "LazyComponent":
+        """Register a factory and return a proxy that builds the component on first access"""
+        with self._lock:
+            self._factories[name] = factory
+        return LazyComponent(self, name)
+
+    def get(self, name: str) -> Any:
+        """Return the component, building it if needed"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Component '{name}' is not registered")
+                started = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                logger.info(f"Component '{name}' initialized in {(time.perf_counter() - started) * 1000:.1f} ms")
+            return self._instances[name]
+
+    def is_loaded(self, name: str) -> bool:
+        """Check whether the component has already been built"""
+        return name in self._instances
+
+    def reset(self, name: Optional[str] = None):
+        """Forget built components so the next access builds them again"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+class LazyComponent:
+    """Proxy forwarding attribute access to a registry component"""
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: ComponentRegistry, name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def resolve(self) -> Any:
+        """Return the underlying component"""
+        return self._registry.get(self._name)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.resolve(), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._registry.is_loaded(self._name) else "deferred"
+        return f"<LazyComponent {self._name} ({state})>"
+
+
+@lru_cache(maxsize=None)
+def load_config(path: str) -> DictConfig:
+    """Load a YAML config once per process"""
+    return OmegaConf.load(path)
+
+
+class LazyConfig:
+    """Config node that is read from disk on first access"""
+
+    __slots__ = ("_path", "_keys")
+
+    def __init__(self, path: Union[str, Path], *keys: str):
+        object.__setattr__(self, "_path", str(path))
+        object.__setattr__(self, "_keys", keys)
+
+    def resolve(self) -> Any:
+        """Return the underlying OmegaConf node"""
+        node = load_config(self._path)
+        for key in self._keys:
+            node = node[key]
+        return node
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.resolve(), attribute)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.resolve()[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.resolve()
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+
+def lazy_config(path: Union[str, Path], *keys: str) -> LazyConfig:
+    """Create a deferred config node, e.g. ``lazy_config(CURRENT_DIR / "config.yaml", "strings")``"""
+    return LazyConfig(path, *keys)
+
+
+class StartupProfile:
+    """Collects durations of the startup phases"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def mark(self, name: str, since: float):
+        """Record a phase that started at ``since`` and ends now"""
+        self.phases.append((name, time.perf_counter() - since))
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> str:
+        """Format the phase timings as a single log line"""
+        parts = [f"{name}={duration * 1000:.0f}ms" for name, duration in self.phases]
+        return f"Startup phases: {', '.join(parts)} (total {self.total * 1000:.0f}ms)"
+
+
+registry = ComponentRegistry()
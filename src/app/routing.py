@@ -0,0 +1,361 @@
+"""
+Routing table for callback queries and messages.
+
+telebot tests the registered handlers one by one until one accepts the update,
+so every button press runs the ``call.data == ...`` predicates of all the
+handlers registered before the right one, and every state filter reads the
+state storage again. Here the handlers are indexed once, after registration:
+by exact callback data, by callback data prefix (a trie), by command and by
+conversation state. A single dispatcher handler reads the state once, looks up
+the candidate handlers and tests only those, keeping telebot's semantics (the
+first accepting handler in registration order runs, ``ContinueHandling`` passes
+the update on). Callback handlers are indexed when registered with the
+predicates of this module:
+
+    @bot.callback_query_handler(func=data_equals("top_exit"), state=TopState.select_top_type)
+    @bot.callback_query_handler(func=data_startswith("wintype:"), state=MatchState.enter_win_type)
+
+Handlers with other predicates still work, they are tested for every update.
+"""
+import heapq
+import inspect
+import logging
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Any, Callable, Iterable, Optional
+
+from telebot import util
+from telebot.handler_backends import ContinueHandling
+from telebot.states import State, resolve_context
+
+logger = logging.getLogger(__name__)
+
+ANY_STATE = "*"
+
+_order = attrgetter("order")
+
+
+def data_equals(value: str) -> Callable:
+    """Callback predicate ``call.data == value``, indexed by the routing table"""
+    def predicate(call) -> bool:
+        return call.data == value
+    predicate.route = ("data", value)
+    return predicate
+
+
+def data_startswith(prefix: str) -> Callable:
+    """Callback predicate ``call.data.startswith(prefix)``, indexed by the routing table"""
+    def predicate(call) -> bool:
+        return call.data.startswith(prefix)
+    predicate.route = ("prefix", prefix)
+    return predicate
+
+
+def _state_names(value) -> Optional[frozenset]:
+    """The state filter of a handler as a set of state names; None when it has none"""
+    if value is None:
+        return None
+    values = value if isinstance(value, list) else [value]
+    return frozenset(item.name if isinstance(item, State) else item for item in values)
+
+
+@dataclass(eq=False)
+class Route:
+    """A registered handler with its filters split into the indexed keys and the rest"""
+
+    order: int
+    handler: dict
+    data: Optional[str] = None
+    prefix: Optional[str] = None
+    commands: Optional[frozenset] = None
+    # Names of the accepted states; None accepts any state or none
+    states: Optional[frozenset] = None
+    # Filters that are still tested for every candidate update
+    filters: dict = field(default_factory=dict)
+    params: tuple = ()
+
+    @classmethod
+    def from_handler(cls, order: int, handler: dict) -> "Route":
+        route = cls(order, handler, params=tuple(inspect.signature(handler["function"]).parameters))
+        for name, value in handler["filters"].items():
+            if value is None:
+                continue
+            kind, key = getattr(value, "route", (None, None)) if name == "func" else (None, None)
+            if kind == "data":
+                route.data = key
+            elif kind == "prefix":
+                route.prefix = key
+            elif name == "commands":
+                route.commands = frozenset(value)
+            elif name == "state":
+                route.states = _state_names(value)
+            else:
+                route.filters[name] = value
+        return route
+
+    @property
+    def name(self) -> str:
+        function = inspect.unwrap(self.handler["function"])
+        return f"{function.__module__}.{function.__name__}"
+
+    @property
+    def key(self) -> str:
+        if self.data is not None:
+            return f"data={self.data!r}"
+        if self.prefix is not None:
+            return f"prefix={self.prefix!r}"
+        if self.commands:
+            return f"commands={sorted(self.commands)}"
+        return "any"
+
+    def accepts_state(self, state: Optional[str]) -> bool:
+        if self.states is None:
+            return True
+        if ANY_STATE in self.states:
+            return state is not None
+        return state in self.states
+
+    def covers_key(self, other: "Route") -> bool:
+        """Whether every update with the key of ``other`` also has the key of this route"""
+        if self.data is not None:
+            return other.data == self.data
+        if self.prefix is not None:
+            text = other.data if other.data is not None else other.prefix
+            return text is not None and text.startswith(self.prefix)
+        if self.commands:
+            return bool(other.commands) and other.commands <= self.commands
+        return True
+
+    def overlaps_key(self, other: "Route") -> bool:
+        """Whether some update has the keys of both routes"""
+        if self.covers_key(other) or other.covers_key(self):
+            return True
+        if self.prefix is not None and other.prefix is not None:
+            return self.prefix.startswith(other.prefix) or other.prefix.startswith(self.prefix)
+        if self.commands and other.commands:
+            return bool(self.commands & other.commands)
+        return False
+
+    def covers_states(self, other: "Route") -> bool:
+        if self.states is None:
+            return True
+        if other.states is None or ANY_STATE in other.states:
+            return False
+        return ANY_STATE in self.states or other.states <= self.states
+
+    def overlaps_states(self, other: "Route") -> bool:
+        if self.states is None or other.states is None:
+            return True
+        if ANY_STATE in self.states or ANY_STATE in other.states:
+            return True
+        return bool(self.states & other.states)
+
+    def covers_filters(self, other: "Route") -> bool:
+        """Whether ``other`` has at least the remaining filters of this route"""
+        return all(name in other.filters and other.filters[name] == value for name, value in self.filters.items())
+
+
+@dataclass
+class Conflict:
+    """Two routes accepting the same updates; a shadowed route never runs"""
+
+    kind: str
+    route: Route
+    earlier: Route
+
+    def __str__(self) -> str:
+        return (f"{self.route.name} ({self.route.key}) is {self.kind} by {self.earlier.name} "
+                f"({self.earlier.key}), registered before it")
+
+
+class _TrieNode:
+    __slots__ = ("children", "routes")
+
+    def __init__(self):
+        self.children: dict[str, "_TrieNode"] = {}
+        self.routes: list[Route] = []
+
+
+class PrefixTrie:
+    """Routes by callback data prefix; a lookup walks the characters of the data once"""
+
+    def __init__(self):
+        self._root = _TrieNode()
+
+    def add(self, prefix: str, route: Route):
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+        node.routes.append(route)
+
+    def matches(self, text: str) -> list[list[Route]]:
+        """The routes of every prefix of ``text``, shortest prefix first"""
+        found = []
+        node = self._root
+        if node.routes:
+            found.append(node.routes)
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.routes:
+                found.append(node.routes)
+        return found
+
+
+class RouteTable:
+    """The handlers of one update type indexed by callback data, prefix, command and state"""
+
+    def __init__(self, handlers: Iterable[dict]):
+        self.routes = [Route.from_handler(order, handler) for order, handler in enumerate(handlers)]
+        self._data: dict[str, list[Route]] = {}
+        self._prefixes = PrefixTrie()
+        self._commands: dict[str, list[Route]] = {}
+        self._states: dict[str, list[Route]] = {}
+        self._any_state: list[Route] = []
+        self._unindexed: list[Route] = []
+        for route in self.routes:
+            if route.data is not None:
+                self._data.setdefault(route.data, []).append(route)
+            elif route.prefix is not None:
+                self._prefixes.add(route.prefix, route)
+            elif route.commands:
+                for command in route.commands:
+                    self._commands.setdefault(command, []).append(route)
+            elif route.states is not None and ANY_STATE in route.states:
+                self._any_state.append(route)
+            elif route.states is not None:
+                for state in route.states:
+                    self._states.setdefault(state, []).append(route)
+            else:
+                self._unindexed.append(route)
+        self.uses_states = any(route.states is not None for route in self.routes)
+
+    def candidates(self, data: Optional[str] = None, command: Optional[str] = None,
+                   state: Optional[str] = None) -> Iterable[Route]:
+        """The routes that may accept the update, in registration order"""
+        lists = []
+        if data is not None:
+            if data in self._data:
+                lists.append(self._data[data])
+            lists.extend(self._prefixes.matches(data))
+        if command is not None and command in self._commands:
+            lists.append(self._commands[command])
+        if state is not None:
+            if state in self._states:
+                lists.append(self._states[state])
+            if self._any_state:
+                lists.append(self._any_state)
+        if self._unindexed:
+            lists.append(self._unindexed)
+        if len(lists) == 1:
+            return lists[0]
+        return heapq.merge(*lists, key=_order)
+
+    def conflicts(self) -> list[Conflict]:
+        """Routes hidden (``shadowed``) or partly hidden (``ambiguous``) by a route registered before them"""
+        found = []
+        for index, route in enumerate(self.routes):
+            for earlier in self.routes[:index]:
+                if not earlier.overlaps_key(route) or not earlier.overlaps_states(route):
+                    continue
+                if earlier.covers_key(route) and earlier.covers_states(route) and earlier.covers_filters(route):
+                    found.append(Conflict("shadowed", route, earlier))
+                    break
+                # Opaque predicates may tell the updates apart, and a specific route before a
+                # general one is the usual way to handle an exception
+                if earlier.filters == route.filters and not route.covers_key(earlier):
+                    found.append(Conflict("ambiguous", route, earlier))
+        return found
+
+
+def current_state(bot, update) -> Optional[str]:
+    """The conversation state of the sender of ``update``, as read by telebot's state filter"""
+    chat_id, user_id, business_connection_id, bot_id, message_thread_id = resolve_context(update, bot.bot_id)
+    if chat_id is None:
+        chat_id = user_id
+    return bot.current_states.get_state(
+        chat_id=chat_id,
+        user_id=user_id,
+        business_connection_id=business_connection_id,
+        bot_id=bot_id,
+        message_thread_id=message_thread_id,
+    )
+
+
+class Router:
+    """Dispatches the updates of one type to the handlers of its route table"""
+
+    def __init__(self, bot, table: RouteTable, callbacks: bool):
+        self.bot = bot
+        self.table = table
+        self.callbacks = callbacks
+
+    def dispatch(self, update, data: Optional[dict] = None) -> Any:
+        data = {} if data is None else data
+        state = current_state(self.bot, update) if self.table.uses_states else None
+        if self.callbacks:
+            candidates = self.table.candidates(data=update.data or "", state=state)
+        else:
+            command = util.extract_command(update.text) if update.content_type == "text" else None
+            candidates = self.table.candidates(command=command, state=state)
+
+        result = None
+        for route in candidates:
+            if not route.accepts_state(state):
+                continue
+            if not all(self.bot._test_filter(name, value, update) for name, value in route.filters.items()):
+                continue
+            result = self._call(route, update, data)
+            if not isinstance(result, ContinueHandling):
+                break
+        return result
+
+    def _call(self, route: Route, update, data: dict) -> Any:
+        """Pass ``data`` the way telebot passes it to a handler with these parameters"""
+        function, params = route.handler["function"], route.params
+        if len(params) == 1:
+            return function(update)
+        if "data" in params:
+            if len(params) == 2:
+                return function(update, data)
+            return function(update, data=data, bot=self.bot)
+        kwargs = {key: value for key, value in data.items() if key in params}
+        if route.handler.get("pass_bot"):
+            kwargs["bot"] = self.bot
+        return function(update, **kwargs)
+
+
+def install_routing(bot, strict: bool = False) -> dict[str, RouteTable]:
+    """
+    Replace the callback query and message handlers of ``bot`` by indexed dispatchers.
+    Conflicting routes are logged; with ``strict`` a shadowed route is an error.
+    """
+    tables = {}
+    for kind in ("callback_query_handlers", "message_handlers"):
+        table = RouteTable(getattr(bot, kind))
+        conflicts = table.conflicts()
+        for conflict in conflicts:
+            log = logger.warning if conflict.kind == "shadowed" else logger.debug
+            log("Route conflict: %s", conflict)
+        shadowed = [str(conflict) for conflict in conflicts if conflict.kind == "shadowed"]
+        if strict and shadowed:
+            raise ValueError("Shadowed routes:\n" + "\n".join(shadowed))
+
+        router = Router(bot, table, callbacks=kind == "callback_query_handlers")
+        setattr(bot, kind, [{"function": router.dispatch, "filters": {}, "router": router}])
+        tables[kind] = table
+        logger.info(f"Routed {len(table.routes)} {kind.replace('_', ' ')}")
+    return tables
+
+
+def registered_handlers(bot, kind: str) -> list[dict]:
+    """The handlers registered as ``kind``, also once ``install_routing`` replaced them by its dispatcher"""
+    handlers = []
+    for handler in getattr(bot, kind, []):
+        router = handler.get("router")
+        if router is None:
+            handlers.append(handler)
+        else:
+            handlers.extend(route.handler for route in router.table.routes)
+    return handlers
@@ -1,20 +1,22 @@
 import logging.config
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot.states import State, StatesGroup
 from telebot.types import Message
 
 from ..database.core import db_session
 from ..auth import service as auth_services
+from ..i18n.catalog import catalog
+from ..i18n.service import set_string
+from ..registry import lazy_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Constants
 ADMIN_CODE = "feral"
@@ -84,18 +86,8 @@ def register_handlers(bot):
         new_message = message.text
 
         try:
-            # Create a backup of the current config
-            backup_config = OmegaConf.create(OmegaConf.to_container(config))
-            
-            # Update the configuration
-            config.strings[user.lang].start_message = new_message
-
-            # Save the updated configuration
-            OmegaConf.save(config, CURRENT_DIR / "config.yaml")
-
-            # Update the global config variable
-            global strings
-            strings = config.strings
+            # Stored in the database and live at once; config.yaml keeps the default
+            set_string(db_session, "start", user.lang, "start_message", new_message)
 
             bot.send_message(message.chat.id, get_string_for_user(user, "hello_message_updated"))
             logger.info(f"Start message updated by admin {user.id}")
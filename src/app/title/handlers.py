@@ -1,20 +1,22 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.states import State, StatesGroup
 
 from ..database.core import db_session
 from ..match.models import Player
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_startswith
 from .service import CLAN_CATEGORIES, CATEGORY_TO_CLAN_ID, get_available_titles, update_title, update_title_for_all_players
 
 logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Define States
 class TitleState(StatesGroup):
@@ -62,7 +64,7 @@ def register_handlers(bot: TeleBot):
         # start_timeout(bot, message.chat.id, message.message_id)
 
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("title_select:"), state=TitleState.select_title)
+    @bot.callback_query_handler(func=data_startswith("title_select:"), state=TitleState.select_title)
     def title_selected(call: types.CallbackQuery, data: dict):
         """Handle title category selection"""
         # Extract the category from callback data
@@ -90,11 +92,10 @@ def register_handlers(bot: TeleBot):
     def save_title(message: types.Message, data: dict):
         """Save the new title"""
         user = data["user"]
-        print("BLAH")
         with data["state"].data() as state_data:
             category = state_data["title_category"]
                 
-            print("Category:", category)
+            logger.debug("Category: %s", category)
             new_title = message.text.strip()
 
             # Check title length
@@ -1,13 +1,19 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Table
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Table, func, select
 
 from sqlalchemy.orm import relationship
 from ..models import Base
+from ..rating.models import Season
 
 
 class Title(Base):
     """Title model for storing custom titles for top players and clans"""
     __tablename__ = 'titles'
     id = Column(Integer, primary_key=True)
+    # Every season has its own titles; new ones go to the active season (the first one before any exists)
+    season_id = Column(
+        Integer, ForeignKey('seasons.id'), nullable=False, server_default="1",
+        default=func.coalesce(select(Season.id).where(Season.is_active.is_(True)).scalar_subquery(), 1),
+    )
     category = Column(String, nullable=False)  # 'overall', 'clan', 'custom'
     clan_id = Column(Integer, ForeignKey('clans.id'), nullable=True)
     title = Column(String, nullable=False, default="Best Player")  # The custom title text
@@ -15,3 +21,5 @@ class Title(Base):
     player_id = Column(Integer, ForeignKey('players.id'))
 
     player = relationship("Player", back_populates="titles")
+
+    __table_args__ = (Index('ix_titles_season_category', 'season_id', 'category'),)
@@ -1,11 +1,13 @@
 import logging
 from typing import List, Optional, Dict
 
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session, joinedload
 
 from ..match.models import Clan, Player, Hero
 from ..rating.models import PlayerClanRating, PlayerOverallRating, PlayerHeroRating
+from ..rating.profile import invalidate_profiles
+from ..rating.seasons import active_season_id
 from .models import Title
 
 logger = logging.getLogger(__name__)
@@ -36,13 +38,17 @@ def read_clans(session: Session) -> List[Clan]:
     return clans
 
 def read_clan_title(session: Session, clan_id: str) -> Title:
-    """Read the title of the clan"""
-    title = session.query(Title).filter(Title.clan_id == clan_id).first()
+    """Read the title of the clan in the active season"""
+    title = session.query(Title).filter(
+        Title.season_id == active_season_id(), Title.clan_id == clan_id
+    ).order_by(Title.id).first()
     return title
 
 def is_top_player_overall(session: Session, player_id: int) -> bool:
     """Check if player is top-1 in overall rating"""
-    top_player = session.query(PlayerOverallRating).order_by(
+    top_player = session.query(PlayerOverallRating).filter(
+        PlayerOverallRating.season_id == active_season_id()
+    ).order_by(
         desc(PlayerOverallRating.rating)
     ).first()
     
@@ -50,8 +56,9 @@ def is_top_player_overall(session: Session, player_id: int) -> bool:
 
 def is_top_player_in_clan(session: Session, player_id: int, clan_id: int) -> bool:
     """Check if player is top-1 in clan rating"""
-    logger.info(f"Checking if player {player_id} is top-1 in clan {clan_id}")
+    logger.debug("Checking if player %s is top-1 in clan %s", player_id, clan_id)
     top_player = session.query(PlayerClanRating).filter(
+        PlayerClanRating.season_id == active_season_id(),
         PlayerClanRating.clan_id == clan_id
     ).order_by(
         desc(PlayerClanRating.rating)
@@ -80,11 +87,12 @@ def get_available_titles(session: Session, player_id: int, is_admin: bool) -> Di
 
 
 def get_title(session: Session, category: str, clan_id: Optional[int] = None) -> Optional[Title]:
-    """Get title for a specific category"""
-    return session.query(Title).filter(
+    """Get title for a specific category in the active season"""
+    return session.query(Title).options(joinedload(Title.player)).filter(
+            Title.season_id == active_season_id(),
             Title.category == category,
             Title.clan_id == clan_id
-        ).first()
+        ).order_by(Title.id).first()
 
 
 def update_title(session: Session, category: str, title_text: str, clan_id: Optional[int] = None) -> Title:
@@ -103,12 +111,14 @@ def update_title(session: Session, category: str, title_text: str, clan_id: Opti
         )
         session.add(title)
     session.commit()
+    if title.player_id is not None:
+        invalidate_profiles(title.player_id)
     return title
 
 
 def update_player_titles(session: Session, user_id: int):
     """Update player titles based on their rankings"""
-    print("Starting update_player_titles for user_id:", user_id)
+    logger.debug("Starting update_player_titles for user_id: %s", user_id)
     
     # Find the player associated with this user_id
     player = session.query(Player).filter(Player.user_id == user_id).first()
@@ -116,25 +126,27 @@ def update_player_titles(session: Session, user_id: int):
         logger.warning(f"No player found for user_id {user_id}")
         return
 
-    print(f"Found player with id: {player.id}")
+    logger.debug("Found player with id: %s", player.id)
 
     # Get current titles assigned to this player
-    current_titles = session.query(Title).filter(Title.player_id == player.id).all()
+    current_titles = session.query(Title).filter(
+        Title.season_id == active_season_id(), Title.player_id == player.id
+    ).all()
     current_title_categories = {title.category for title in current_titles}
     
-    print(f"Current titles for player {player.id}: {current_title_categories}")
+    logger.debug("Current titles for player %s: %s", player.id, current_title_categories)
     
     # Check if player deserves overall title (top player overall)
     deserves_overall_title = is_top_player_overall(session, player.id)
-    print(f"Deserves overall title: {deserves_overall_title}")
+    logger.debug("Deserves overall title: %s", deserves_overall_title)
     
     # If player deserves overall title but doesn't have it yet
     if deserves_overall_title and "overall" not in current_title_categories:
-        print("Processing overall title assignment")
+        logger.debug("Processing overall title assignment")
         # Get or create the overall title
         overall_title = get_title(session, "overall")
         if not overall_title:
-            print("Creating new overall title")
+            logger.debug("Creating new overall title")
             # Create default overall title if it doesn't exist
             overall_title = Title(
                 category="overall",
@@ -149,11 +161,11 @@ def update_player_titles(session: Session, user_id: int):
         overall_title.player_id = player.id
         if not overall_title.player:
             overall_title.player.append(player)
-            print("Overall title assigned to player")
+            logger.debug("Overall title assigned to player")
     
     # If player no longer deserves overall title but still has it
     elif not deserves_overall_title and "overall" in current_title_categories:
-        print("Removing overall title from player")
+        logger.debug("Removing overall title from player")
         # Find and remove the overall title from player
         overall_title = next((t for t in current_titles if t.category == "overall"), None)
         if overall_title:
@@ -163,19 +175,19 @@ def update_player_titles(session: Session, user_id: int):
     
     # Check clan titles
     for category, clan_id in CATEGORY_TO_CLAN_ID.items():
-        print(f"\nChecking clan title for category: {category}, clan_id: {clan_id}")
+        logger.debug("Checking clan title for category: %s, clan_id: %s", category, clan_id)
         deserves_clan_title = is_top_player_in_clan(session, player.id, clan_id)
-        print(f"Deserves {category} clan title: {deserves_clan_title}")
+        logger.debug("Deserves %s clan title: %s", category, deserves_clan_title)
         
         # If player deserves clan title but doesn't have it
         if deserves_clan_title and category not in current_title_categories:
-            print(f"Assigning {category} clan title")
+            logger.debug("Assigning %s clan title", category)
             clan_title = get_title(session, category=category, clan_id=clan_id)
             if not clan_title:
                 # Get clan name for the default title
                 clan = session.query(Clan).filter(Clan.id == clan_id).first()
                 clan_name = clan.name if clan else CLAN_CATEGORIES.get(category, category.capitalize())
-                print(f"Creating new clan title for {clan_name}")
+                logger.debug("Creating new clan title for %s", clan_name)
                 
                 # Create default clan title
                 clan_title = Title(
@@ -191,26 +203,90 @@ def update_player_titles(session: Session, user_id: int):
             clan_title.player_id = player.id
             if not clan_title.player:
                 clan_title.player.append(player)
-                print(f"Clan title {category} assigned to player")
+                logger.debug("Clan title %s assigned to player", category)
         
         # If player no longer deserves clan title but still has it
         elif not deserves_clan_title and category in current_title_categories:
-            print(f"Removing {category} clan title from player")
+            logger.debug("Removing %s clan title from player", category)
             clan_title = next((t for t in current_titles if t.category == category), None)
             if clan_title:
                 if not clan_title.player:
                     clan_title.player.remove(player)
                 clan_title.player_id = None
 
-    print("Committing changes to database")
+    logger.debug("Committing changes to database")
     # Commit all changes
     session.commit()
-    print("Title update completed")
+    logger.debug("Title update completed")
 
 def update_title_for_all_players(session: Session):
     """Update titles for all players"""
-    players = session.query(Player).all()
-    for player in players:
-        update_player_titles(session, player.user_id)
-    logger.info(f"Updated titles for all players")
-    session.commit()
\ No newline at end of file
+    # One top-player query per category instead of the per-player checks of update_player_titles
+    refresh_titles(session, set(CLAN_CATEGORIES), create_missing=True)
+    logger.info("Updated titles for all players")
+
+
+def categories_for_clans(clan_ids) -> set[str]:
+    """Title categories affected by a change in the given clans' standings"""
+    clan_categories = {clan_id: category for category, clan_id in CATEGORY_TO_CLAN_ID.items()}
+    return {"overall"} | {clan_categories[clan_id] for clan_id in clan_ids if clan_id in clan_categories}
+
+
+def _default_title(session: Session, category: str, clan_id: Optional[int]) -> Title:
+    if clan_id is None:
+        text = CLAN_CATEGORIES["overall"]
+    else:
+        clan = session.query(Clan).filter(Clan.id == clan_id).first()
+        text = f"Лучший {clan.name if clan else CLAN_CATEGORIES.get(category, category.capitalize())}"
+    title = Title(category=category, clan_id=clan_id, title=text, default=True)
+    session.add(title)
+    return title
+
+
+def refresh_titles(session: Session, categories: set[str], create_missing: bool = False):
+    """
+    Give the titles of the given categories to the current top players, without touching the others.
+    With ``create_missing`` a category that has a top player but no title gets the default one.
+    """
+    season_id = active_season_id()
+    # The current titles and top players of all categories, one query each
+    titles = {}
+    for title in session.query(Title).filter(
+        Title.season_id == season_id, Title.category.in_(categories)
+    ).order_by(Title.id):
+        # The first row of a category, the one get_title reads
+        titles.setdefault(title.category, title)
+    top_players = {}
+    if "overall" in categories:
+        top = session.query(PlayerOverallRating.player_id).filter(
+            PlayerOverallRating.season_id == season_id
+        ).order_by(desc(PlayerOverallRating.rating)).first()
+        top_players[None] = top[0] if top else None
+    clan_ids = [CATEGORY_TO_CLAN_ID[category] for category in categories if category != "overall"]
+    if clan_ids:
+        ranked = session.query(
+            PlayerClanRating.clan_id,
+            PlayerClanRating.player_id,
+            func.row_number().over(
+                partition_by=PlayerClanRating.clan_id, order_by=desc(PlayerClanRating.rating)
+            ).label("rank"),
+        ).filter(
+            PlayerClanRating.season_id == season_id,
+            PlayerClanRating.clan_id.in_(clan_ids)
+        ).subquery()
+        top_players.update(session.query(ranked.c.clan_id, ranked.c.player_id).filter(ranked.c.rank == 1).all())
+
+    moved = set()
+    for category in categories:
+        clan_id = None if category == "overall" else CATEGORY_TO_CLAN_ID[category]
+        title = titles.get(category)
+        top_player_id = top_players.get(clan_id)
+        if title is None and create_missing and top_player_id is not None:
+            title = _default_title(session, category, clan_id)
+        if title and title.player_id != top_player_id:
+            logger.info("Title '%s' moves from player %s to %s", category, title.player_id, top_player_id)
+            moved.update({title.player_id, top_player_id} - {None})
+            title.player_id = top_player_id
+    session.commit()
+    if moved:
+        invalidate_profiles(*moved)
@@ -1,7 +1,6 @@
 import logging
 from pathlib import Path
 
-from omegaconf import OmegaConf
 from telebot import TeleBot, types
 from telebot.states import State, StatesGroup
 
@@ -9,6 +8,9 @@ from ..common.service import cancel_timeout, user_messages
 from ..database.core import db_session
 from ..herorating import service as hero_service
 from ..rating.service import read_clans
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_equals, data_startswith
 from ..title import service as title_service
 from .markup import (
     create_clan_selection_markup,
@@ -20,8 +22,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # Define States
 class TopState(StatesGroup):
@@ -49,7 +51,7 @@ def register_handlers(bot: TeleBot):
         # start_timeout(bot, message.chat.id, sent_message.message_id)
         # user_messages[message.chat.id] = sent_message.message_id
 
-    @bot.callback_query_handler(func=lambda call: call.data == "top_players_overall", state=TopState.select_top_type)
+    @bot.callback_query_handler(func=data_equals("top_players_overall"), state=TopState.select_top_type)
     def show_top_players_overall(call: types.CallbackQuery, data: dict):
         user = data["user"]
         # Use the new service function
@@ -85,7 +87,7 @@ def register_handlers(bot: TeleBot):
         # user_messages[call.message.chat.id] = call.message.message_id
         # start_timeout(bot, call.message.chat.id, call.message.message_id)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "top_players_by_hero", state=TopState.select_top_type)
+    @bot.callback_query_handler(func=data_equals("top_players_by_hero"), state=TopState.select_top_type)
     def ask_for_hero_name(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(TopState.enter_hero_name)
@@ -140,7 +142,7 @@ def register_handlers(bot: TeleBot):
         data["state"].set(TopState.select_top_type)
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "top_players_by_clan", state=TopState.select_top_type)
+    @bot.callback_query_handler(func=data_equals("top_players_by_clan"), state=TopState.select_top_type)
     def select_clan_for_top(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(TopState.select_clan)
@@ -156,7 +158,7 @@ def register_handlers(bot: TeleBot):
         user_messages[call.message.chat.id] = call.message.message_id
 
     @bot.callback_query_handler(
-        func=lambda call: call.data.startswith("top_clan_"),
+        func=data_startswith("top_clan_"),
         state=TopState.select_clan
     )
     def show_top_players_by_clan(call: types.CallbackQuery, data: dict):
@@ -218,7 +220,7 @@ def register_handlers(bot: TeleBot):
         )
         user_messages[call.message.chat.id] = call.message.message_id
 
-    @bot.callback_query_handler(func=lambda call: call.data == "top_heroes", state=TopState.select_top_type)
+    @bot.callback_query_handler(func=data_equals("top_heroes"), state=TopState.select_top_type)
     def show_top_heroes(call: types.CallbackQuery, data: dict):
         user = data["user"]
         # Use the new service function
@@ -249,7 +251,7 @@ def register_handlers(bot: TeleBot):
         )
         user_messages[call.message.chat.id] = call.message.message_id
 
-    @bot.callback_query_handler(func=lambda call: call.data == "top_clans", state=TopState.select_top_type)
+    @bot.callback_query_handler(func=data_equals("top_clans"), state=TopState.select_top_type)
     def show_top_clans(call: types.CallbackQuery, data: dict):
         user = data["user"]
         # Use the new service function
@@ -298,7 +300,7 @@ def register_handlers(bot: TeleBot):
         )
         user_messages[call.message.chat.id] = call.message.message_id
 
-    @bot.callback_query_handler(func=lambda call: call.data == "top_back", state=TopState.select_clan)
+    @bot.callback_query_handler(func=data_equals("top_back"), state=TopState.select_clan)
     def back_to_top_selection(call: types.CallbackQuery, data: dict):
         user = data["user"]
         data["state"].set(TopState.select_top_type)
@@ -311,7 +313,7 @@ def register_handlers(bot: TeleBot):
         )
         user_messages[call.message.chat.id] = call.message.message_id
 
-    @bot.callback_query_handler(func=lambda call: call.data == "top_exit", state=TopState.select_top_type)
+    @bot.callback_query_handler(func=data_equals("top_exit"), state=TopState.select_top_type)
     def exit_top_command(call: types.CallbackQuery, data: dict):
         user = data["user"]
         cancel_timeout(call.message.chat.id)
@@ -1,20 +1,116 @@
 import logging
 from typing import List, Optional, Dict, Any, Tuple
-from sqlalchemy import desc, func
+from sqlalchemy import and_, desc, func
 from sqlalchemy.orm import Session
 
+from ..database.replicas import read_only
 from ..rating.models import (
     PlayerOverallRating,
     PlayerHeroRating,
     PlayerClanRating,
     GeneralHeroRating,
     GeneralClanRating,
-    WinTypeEnum
+    WinTypeEnum,
+    ClanLeaderboard,
+    HeroLeaderboard,
+    PlayerHeroLeaderboard,
+    PlayerLeaderboard,
 )
 from ..match.models import Player, Hero, Clan
+from ..rating.seasons import active_season_id
 from .schemas import PlayerRatingModel
 
 
+def _page(query, board, limit: Optional[int], offset: int = 0, ranged: bool = True):
+    """Rows ``offset`` .. ``offset + limit`` of a board; a range of positions unless filters make it sparse"""
+    query = query.order_by(board.position)
+    if ranged:
+        query = query.filter(board.position > offset)
+        if limit is not None:
+            query = query.filter(board.position <= offset + limit)
+        return query
+    return query.offset(offset).limit(limit)
+
+
+def _player_hero_ratings_from_leaderboard(db: Session, hero_id: int, player_id: Optional[int], min_games: int,
+                                          limit: Optional[int]) -> List[Dict[str, Any]]:
+    """``get_player_hero_ratings`` sorted by rating, read from the hero's ranked board"""
+    query = db.query(PlayerHeroLeaderboard, Player.username, Hero.name).join(
+        Player, Player.id == PlayerHeroLeaderboard.player_id
+    ).join(
+        Hero, Hero.id == PlayerHeroLeaderboard.hero_id
+    ).filter(
+        PlayerHeroLeaderboard.season_id == active_season_id(),
+        PlayerHeroLeaderboard.hero_id == hero_id
+    )
+    if player_id is not None:
+        query = query.filter(PlayerHeroLeaderboard.player_id == player_id)
+    if min_games > 0:
+        query = query.filter((PlayerHeroLeaderboard.wins + PlayerHeroLeaderboard.losses) >= min_games)
+
+    results = _page(query, PlayerHeroLeaderboard, limit, ranged=player_id is None and min_games == 0).all()
+    return [
+        {
+            "player_id": row.player_id,
+            "username": username,
+            "hero_id": row.hero_id,
+            "hero_name": hero_name,
+            "rating": row.rating,
+            "wins": row.wins,
+            "losses": row.losses,
+            "win_rate": round(row.win_rate * 100, 1),
+            "prestige_wins": row.prestige_wins,
+            "murder_wins": row.murder_wins,
+            "decay_wins": row.decay_wins,
+            "stones_wins": row.stones_wins
+        }
+        for row, username, hero_name in results
+    ]
+
+
+def _top_players_from_leaderboard(db: Session, limit: int, offset: int,
+                                  clan_id: Optional[int]) -> List[Dict[str, Any]]:
+    """``get_top_players`` sorted by rating, read from the ranked board"""
+    query = db.query(
+        PlayerLeaderboard, Player.username, PlayerOverallRating.titles, PlayerOverallRating.custom_titles
+    ).join(
+        Player, Player.id == PlayerLeaderboard.player_id
+    ).join(
+        # Titles change without a rating change, so they are read from the rating row
+        PlayerOverallRating, and_(
+            PlayerOverallRating.season_id == PlayerLeaderboard.season_id,
+            PlayerOverallRating.player_id == PlayerLeaderboard.player_id
+        )
+    ).filter(
+        PlayerLeaderboard.season_id == active_season_id()
+    )
+    if clan_id:
+        clan_players = db.query(PlayerClanRating.player_id).filter(
+            PlayerClanRating.season_id == active_season_id(), PlayerClanRating.clan_id == clan_id
+        )
+        query = query.filter(PlayerLeaderboard.player_id.in_(clan_players))
+
+    results = _page(query, PlayerLeaderboard, limit, offset, ranged=not clan_id).all()
+    return [
+        {
+            "player_id": row.player_id,
+            "username": username,
+            "rating": row.rating,
+            "wins": row.wins,
+            "losses": row.losses,
+            "win_rate": round(row.win_rate * 100, 1),
+            "prestige_wins": row.prestige_wins,
+            "murder_wins": row.murder_wins,
+            "decay_wins": row.decay_wins,
+            "stones_wins": row.stones_wins,
+            "titles": titles,
+            "custom_titles": custom_titles
+        }
+        for row, username, titles, custom_titles in results
+    ]
+
+
+@read_only
 def get_player_clan_ratings(db: Session, clan_id: Optional[int] = None, 
     min_games: int = 0,
     sort_by: str = "rating", 
@@ -40,7 +136,7 @@ def get_player_clan_ratings(db: Session, clan_id: Optional[int] = None,
     # Start with a join between PlayerClanRating and Player
     query = db.query(PlayerClanRating, Player).join(
         Player, PlayerClanRating.player_id == Player.id
-    )
+    ).filter(PlayerClanRating.season_id == active_season_id())
     
     # Apply filters
     if clan_id is not None:
@@ -107,6 +203,7 @@ def get_player_clan_ratings(db: Session, clan_id: Optional[int] = None,
     return formatted_results
 
 
+@read_only
 def get_player_hero_ratings(
     db: Session,
     player_id: Optional[int] = None,
@@ -133,12 +230,17 @@ def get_player_hero_ratings(
     """
     logger = logging.getLogger(__name__)
 
+    if hero_id is not None and sort_by == "rating" and descending:
+        formatted_results = _player_hero_ratings_from_leaderboard(db, hero_id, player_id, min_games, limit)
+        logger.info(f"Retrieved {len(formatted_results)} player hero ratings")
+        return formatted_results
+
     # Start with a join between PlayerHeroRating, Player and Hero
     query = db.query(PlayerHeroRating, Player, Hero).join(
         Player, PlayerHeroRating.player_id == Player.id
     ).join(
         Hero, PlayerHeroRating.hero_id == Hero.id
-    )
+    ).filter(PlayerHeroRating.season_id == active_season_id())
     
     # Apply filters
     if player_id is not None:
@@ -209,6 +311,7 @@ def get_player_hero_ratings(
     return formatted_results
 
 
+@read_only
 def get_top_players(
     db: Session,
     limit: int = 10,
@@ -231,18 +334,25 @@ def get_top_players(
     """
     logger = logging.getLogger(__name__)
     logger.info(f"Getting top {limit} players sorted by {sort_by}")
+
+    if sort_by not in ("win_rate", "wins"):
+        return _top_players_from_leaderboard(db, limit, offset, clan_id)
     
     query = db.query(
         PlayerOverallRating,
         Player
     ).join(
         Player, PlayerOverallRating.player_id == Player.id
+    ).filter(
+        PlayerOverallRating.season_id == active_season_id()
     )
     
     if clan_id:
-        print(f"Filtering by clan_id: {clan_id}")
+        logger.debug("Filtering by clan_id: %s", clan_id)
         # Filter by players who have played the specified clan
-        clan_players = db.query(PlayerClanRating.player_id).filter_by(clan_id=clan_id)
+        clan_players = db.query(PlayerClanRating.player_id).filter(
+            PlayerClanRating.season_id == active_season_id(), PlayerClanRating.clan_id == clan_id
+        )
         query = query.filter(PlayerOverallRating.player_id.in_(clan_players))
     
     # Apply sorting
@@ -280,6 +390,7 @@ def get_top_players(
     return top_players
 
 
+@read_only
 def get_top_heroes(
     db: Session,
     limit: int = 10,
@@ -302,6 +413,28 @@ def get_top_heroes(
     """
     logger = logging.getLogger(__name__)
     logger.info(f"Getting top {limit} heroes sorted by {sort_by}")
+
+    if sort_by not in ("win_rate", "wins"):
+        # Ranked in advance: the page is a range of positions
+        query = db.query(HeroLeaderboard, Hero).join(
+            Hero, HeroLeaderboard.hero_id == Hero.id
+        ).filter(
+            HeroLeaderboard.season_id == active_season_id(),
+            (HeroLeaderboard.wins + HeroLeaderboard.losses) >= min_games
+        )
+        return [
+            {
+                "hero_id": hero.id,
+                "name": hero.name,
+                "rating": rating.rating,
+                "wins": rating.wins,
+                "losses": rating.losses,
+                "total_games": rating.wins + rating.losses,
+                "win_rate": round(rating.win_rate * 100, 1),
+                "clan_id": hero.clan_id
+            }
+            for rating, hero in _page(query, HeroLeaderboard, limit, offset, ranged=min_games <= 0).all()
+        ]
     
     query = db.query(
         GeneralHeroRating,
@@ -309,6 +442,7 @@ def get_top_heroes(
     ).join(
         Hero, GeneralHeroRating.hero_id == Hero.id
     ).filter(
+        GeneralHeroRating.season_id == active_season_id(),
         (GeneralHeroRating.wins + GeneralHeroRating.losses) >= min_games
     )
     
@@ -343,6 +477,7 @@ def get_top_heroes(
     return top_heroes
 
 
+@read_only
 def get_top_players_by_clan(db: Session, clan_id: int, limit: int = 10) -> List[PlayerRatingModel]:
     """Get top players for a specific clan"""
     query = (
@@ -353,7 +488,7 @@ def get_top_players_by_clan(db: Session, clan_id: int, limit: int = 10) -> List[
             PlayerClanRating.losses
         )
         .join(PlayerClanRating, Player.id == PlayerClanRating.player_id)
-        .filter(PlayerClanRating.clan_id == clan_id)
+        .filter(PlayerClanRating.season_id == active_season_id(), PlayerClanRating.clan_id == clan_id)
         .order_by(desc(PlayerClanRating.rating))
         .limit(limit)
     )
@@ -372,6 +507,7 @@ def get_top_players_by_clan(db: Session, clan_id: int, limit: int = 10) -> List[
     ]
 
 
+@read_only
 def get_top_clans(
     db: Session,
     limit: int = 10,  # Default to 4 since there are 4 clans in Armello
@@ -390,12 +526,38 @@ def get_top_clans(
     """
     logger = logging.getLogger(__name__)
     logger.info(f"Getting top {limit} clans sorted by {sort_by}")
+
+    if sort_by not in ("win_rate", "wins"):
+        # Ranked in advance: the page is a range of positions
+        query = db.query(ClanLeaderboard, Clan).join(
+            Clan, ClanLeaderboard.clan_id == Clan.id
+        ).filter(
+            ClanLeaderboard.season_id == active_season_id()
+        )
+        return [
+            {
+                "clan_id": clan.id,
+                "name": clan.name,
+                "rating": rating.rating,
+                "wins": rating.wins,
+                "losses": rating.losses,
+                "total_games": rating.wins + rating.losses,
+                "win_rate": round(rating.win_rate * 100, 1),
+                "prestige_wins": rating.prestige_wins,
+                "murder_wins": rating.murder_wins,
+                "decay_wins": rating.decay_wins,
+                "stones_wins": rating.stones_wins
+            }
+            for rating, clan in _page(query, ClanLeaderboard, limit).all()
+        ]
     
     query = db.query(
         GeneralClanRating,
         Clan
     ).join(
         Clan, GeneralClanRating.clan_id == Clan.id
+    ).filter(
+        GeneralClanRating.season_id == active_season_id()
     )
     
     # Apply sorting
@@ -432,6 +594,7 @@ def get_top_clans(
     return top_clans
 
 
+@read_only
 def get_player_hero_rankings(
     db: Session,
     player_id: int,
@@ -457,6 +620,7 @@ def get_player_hero_rankings(
     ).join(
         Hero, PlayerHeroRating.hero_id == Hero.id
     ).filter(
+        PlayerHeroRating.season_id == active_season_id(),
         PlayerHeroRating.player_id == player_id,
         (PlayerHeroRating.wins + PlayerHeroRating.losses) >= min_games
     ).order_by(
@@ -489,6 +653,7 @@ def get_player_hero_rankings(
     return hero_rankings
 
 
+@read_only
 def get_player_clan_rankings(
     db: Session,
     player_id: int
@@ -509,6 +674,7 @@ def get_player_clan_rankings(
     query = db.query(
         PlayerClanRating
     ).filter(
+        PlayerClanRating.season_id == active_season_id(),
         PlayerClanRating.player_id == player_id
     ).order_by(
         desc(PlayerClanRating.rating)
@@ -539,6 +705,7 @@ def get_player_clan_rankings(
     return clan_rankings
 
 
+@read_only
 def get_win_type_distribution(
     db: Session,
     clan_id: Optional[int] = None,
@@ -560,7 +727,9 @@ def get_win_type_distribution(
     
     if hero_id:
         # Query win types for a specific hero
-        hero_ratings = db.query(GeneralHeroRating).filter_by(hero_id=hero_id).first()
+        hero_ratings = db.query(GeneralHeroRating).filter(
+            GeneralHeroRating.season_id == active_season_id(), GeneralHeroRating.hero_id == hero_id
+        ).first()
         if not hero_ratings:
             return {win_type.value: 0 for win_type in WinTypeEnum}
             
@@ -575,7 +744,9 @@ def get_win_type_distribution(
         
     elif clan_id:
         # Query win types for a specific clan
-        clan_ratings = db.query(GeneralClanRating).filter_by(clan_id=clan_id).first()
+        clan_ratings = db.query(GeneralClanRating).filter(
+            GeneralClanRating.season_id == active_season_id(), GeneralClanRating.clan_id == clan_id
+        ).first()
         if not clan_ratings:
             return {win_type.value: 0 for win_type in WinTypeEnum}
             
@@ -594,7 +765,7 @@ def get_win_type_distribution(
             func.sum(PlayerOverallRating.murder_wins).label("murder"),
             func.sum(PlayerOverallRating.decay_wins).label("decay"),
             func.sum(PlayerOverallRating.stones_wins).label("stones")
-        ).first()
+        ).filter(PlayerOverallRating.season_id == active_season_id()).first()
         
         return {
             "prestige": totals.prestige or 0,
@@ -604,6 +775,7 @@ def get_win_type_distribution(
         }
 
 
+@read_only
 def get_player_position(
     db: Session,
     player_id: int,
@@ -622,14 +794,23 @@ def get_player_position(
     """
     logger = logging.getLogger(__name__)
     logger.info(f"Getting ranking position for player {player_id}")
+
+    if sort_by not in ("win_rate", "wins"):
+        # The board holds the rank; its last position is the number of ranked players
+        board = db.query(PlayerLeaderboard).filter(PlayerLeaderboard.season_id == active_season_id())
+        entry = board.filter(PlayerLeaderboard.player_id == player_id).first()
+        if not entry:
+            return (0, 0)
+        return (entry.rank, board.with_entities(func.max(PlayerLeaderboard.position)).scalar())
     
     # Get the player's rating
-    player_rating = db.query(PlayerOverallRating).filter_by(player_id=player_id).first()
+    season_ratings = db.query(PlayerOverallRating).filter(PlayerOverallRating.season_id == active_season_id())
+    player_rating = season_ratings.filter(PlayerOverallRating.player_id == player_id).first()
     if not player_rating:
         return (0, 0)
     
     # Count total players
-    total_players = db.query(PlayerOverallRating).count()
+    total_players = season_ratings.count()
     
     # Query to find position
     if sort_by == "win_rate":
@@ -638,7 +819,7 @@ def get_player_position(
         player_win_rate = player_rating.win_rate
         
         # Count players with higher win rate
-        higher_ranked = db.query(PlayerOverallRating).filter(
+        higher_ranked = season_ratings.filter(
             PlayerOverallRating.player_id != player_id,
             min_games_filter,
             (PlayerOverallRating.wins / (PlayerOverallRating.wins + PlayerOverallRating.losses)) > player_win_rate
@@ -648,7 +829,7 @@ def get_player_position(
         
     elif sort_by == "wins":
         # Count players with more wins
-        higher_ranked = db.query(PlayerOverallRating).filter(
+        higher_ranked = season_ratings.filter(
             PlayerOverallRating.player_id != player_id,
             PlayerOverallRating.wins > player_rating.wins
         ).count()
@@ -657,7 +838,7 @@ def get_player_position(
         
     else:  # Default to rating
         # Count players with higher rating
-        higher_ranked = db.query(PlayerOverallRating).filter(
+        higher_ranked = season_ratings.filter(
             PlayerOverallRating.player_id != player_id,
             PlayerOverallRating.rating > player_rating.rating
         ).count()
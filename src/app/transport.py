@@ -0,0 +1,220 @@
+"""
+Pooled keep-alive transport for the Bot API.
+
+telebot sends every request with a ``requests`` session per thread, so each
+thread keeps its own connections and every new thread (or session renewal)
+repeats the TCP and TLS handshakes. ``ApiTransport`` is installed as
+``apihelper.CUSTOM_REQUEST_SENDER`` and as the session of file downloads: one
+connection pool shared by all threads and sized to them, TCP keep-alive on the
+sockets, per-method timeouts, a retry policy and a latency histogram per
+method. HTTP/2 is used when enabled and ``httpx`` with the ``h2`` extra is
+installed.
+
+    install_transport(ApiTransport(pool_size=4, timeouts={"sendPhoto": (5, 60)}))
+"""
+import logging
+import socket
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Mapping, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from telebot import apihelper
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import NewConnectionError
+
+from .metrics.collector import metrics
+from .metrics.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) seconds
+TimeoutPair = tuple[float, float]
+
+# Telegram methods that can be sent twice without a visible effect
+IDEMPOTENT_METHODS = frozenset({"getMe", "getFile", "getChat", "getChatMember", "getChatAdministrators"})
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Connections that could not be established and ``429 Too Many Requests`` are retried for every
+    method (the request was not processed). Connections lost after the request was sent, read
+    timeouts and 5xx answers are retried only for ``idempotent_methods``: Telegram may have
+    processed the request already, and sending a message again would post it twice.
+    """
+
+    attempts: int = 3
+    backoff_seconds: float = 0.5
+    # A longer wait is left to the caller, e.g. the rate limiter of the broadcasts
+    max_retry_after_seconds: float = 5
+    idempotent_methods: frozenset = field(default_factory=lambda: IDEMPOTENT_METHODS)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retrying after the failed ``attempt`` (1-based)"""
+        return self.backoff_seconds * 2 ** (attempt - 1)
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTP adapter whose sockets send TCP keep-alive probes, so dropped idle connections are noticed"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        keep_alive = (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [keep_alive]
+        super().init_poolmanager(*args, **kwargs)
+
+
+class Http2Response:
+    """The attributes of ``requests.Response`` read by telebot, for an ``httpx`` response"""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.reason = response.reason_phrase
+        self.content = response.content
+        self.text = response.text
+        self._response = response
+
+    def json(self) -> Any:
+        return self._response.json()
+
+
+def _http2_client(pool_size: int):
+    try:
+        import httpx
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        return httpx.Client(http2=True, limits=limits)
+    except ImportError:
+        logger.warning("HTTP/2 needs httpx with the h2 extra (pip install 'httpx[http2]'), using HTTP/1.1")
+        return None
+
+
+def _rewind(files: Optional[dict]) -> bool:
+    """Seek the uploaded files back to the start for another attempt; False if one can not be"""
+    for value in (files or {}).values():
+        stream = value[1] if isinstance(value, tuple) else value
+        if hasattr(stream, "read"):
+            if not (hasattr(stream, "seekable") and stream.seekable()):
+                return False
+            stream.seek(0)
+    return True
+
+
+def _not_sent(error: requests.ConnectionError) -> bool:
+    """Whether the request failed before a connection was established, so the server never saw it"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    # requests wraps the urllib3 error in a MaxRetryError
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return response.json().get("parameters", {}).get("retry_after")
+    except ValueError:
+        return None
+
+
+class ApiTransport:
+    """``apihelper.CUSTOM_REQUEST_SENDER`` sending the Bot API requests over one shared connection pool"""
+
+    def __init__(self, pool_size: int = 4, timeouts: Optional[Mapping[str, Union[float, TimeoutPair]]] = None,
+                 retry: Optional[RetryPolicy] = None, http2: bool = False,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.pool_size = pool_size
+        self.timeouts = {
+            method: (value, value) if isinstance(value, (int, float)) else tuple(value)
+            for method, value in (timeouts or {}).items()
+        }
+        self.retry = retry or RetryPolicy()
+        self.sleep = sleep
+
+        # Retries are done here, with the knowledge of the method
+        adapter = KeepAliveAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._http2 = _http2_client(pool_size) if http2 else None
+
+    def __call__(self, method: str, url: str, params=None, files=None, timeout: Optional[TimeoutPair] = None,
+                 proxies=None):
+        name = url.rsplit("/", 1)[-1]
+        timeout = self.timeouts.get(name, timeout)
+        with timed("bot_telegram_api", "Telegram Bot API request time", "method", name):
+            attempt = 1
+            while True:
+                response = error = None
+                try:
+                    response = self._send(method, url, params, files, timeout, proxies)
+                except requests.ConnectionError as e:
+                    if name not in self.retry.idempotent_methods and not _not_sent(e):
+                        raise
+                    error = e
+                except requests.Timeout as e:
+                    if name not in self.retry.idempotent_methods:
+                        raise
+                    error = e
+
+                delay = self.retry.delay(attempt) if error is not None else self._retry_delay(name, response, attempt)
+                if delay is None:
+                    return response
+                if attempt >= self.retry.attempts or not _rewind(files):
+                    if error is not None:
+                        raise error
+                    return response
+
+                metrics.counter(
+                    "bot_telegram_api_retries_total", "Retried Telegram Bot API requests", ("method",)
+                ).inc(name)
+                reason = type(error).__name__ if error is not None else response.status_code
+                logger.info("Retrying %s in %.1f s after %s (attempt %s)", name, delay, reason, attempt)
+                self.sleep(delay)
+                attempt += 1
+
+    def _retry_delay(self, name: str, response, attempt: int) -> Optional[float]:
+        """Seconds to wait before sending again, or None when the response is final"""
+        if response.status_code == 429:
+            retry_after = _retry_after(response)
+            if retry_after is not None and retry_after <= self.retry.max_retry_after_seconds:
+                return retry_after
+        elif response.status_code >= 500 and name in self.retry.idempotent_methods:
+            return self.retry.delay(attempt)
+        return None
+
+    def _send(self, method: str, url: str, params, files, timeout: Optional[TimeoutPair], proxies):
+        if self._http2 is not None and not proxies:
+            return self._send_http2(method, url, params, files, timeout)
+        return self.session.request(method, url, params=params, files=files, timeout=timeout, proxies=proxies)
+
+    def _send_http2(self, method: str, url: str, params, files, timeout: Optional[TimeoutPair]):
+        import httpx
+        connect, read = timeout or (apihelper.CONNECT_TIMEOUT, apihelper.READ_TIMEOUT)
+        try:
+            response = self._http2.request(
+                method.upper(), url, params=params, files=files, timeout=httpx.Timeout(read, connect=connect)
+            )
+        # telebot and the polling loop expect the exceptions of requests
+        except httpx.TimeoutException as e:
+            if isinstance(e, httpx.ConnectTimeout):
+                raise requests.ConnectTimeout(str(e)) from e
+            raise requests.ReadTimeout(str(e)) from e
+        except httpx.ConnectError as e:
+            raise requests.ConnectionError(NewConnectionError(None, str(e))) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        return Http2Response(response)
+
+    def close(self):
+        self.session.close()
+        if self._http2 is not None:
+            self._http2.close()
+
+
+def install_transport(transport: ApiTransport) -> ApiTransport:
+    """Send the Bot API requests and file downloads of telebot through ``transport``"""
+    apihelper.CUSTOM_REQUEST_SENDER = transport
+    # Downloads read ``apihelper.session`` instead of the request sender
+    apihelper.session = transport.session
+    apihelper.SESSION_TIME_TO_LIVE = None
+    return transport
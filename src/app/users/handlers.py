@@ -10,6 +10,9 @@ from telebot.types import CallbackQuery, Message
 
 from ..auth.service import read_user, upsert_user
 from ..database.core import db_session, export_all_tables
+from ..i18n.catalog import catalog
+from ..registry import lazy_config
+from ..routing import data_equals, data_startswith
 from .markup import create_cancel_button, create_users_menu_markup
 
 # Set up logging
@@ -18,8 +21,8 @@ logger = logging.getLogger(__name__)
 
 # Load configuration
 CURRENT_DIR = Path(__file__).parent
-config = OmegaConf.load(CURRENT_DIR / "config.yaml")
-app_strings = config.strings
+config = lazy_config(CURRENT_DIR / "config.yaml")
+app_strings = catalog.strings(CURRENT_DIR / "config.yaml")
 
 # States
 class AppStates(StatesGroup):
@@ -33,7 +36,7 @@ def register_handlers(bot):
     """Register about handlers"""
     logger.info("Registering `about` handlers")
 
-    @bot.callback_query_handler(func=lambda call: call.data == "users")
+    @bot.callback_query_handler(func=data_equals("users"))
     def add_admin_handler(call: CallbackQuery, data: dict):
         user = data["user"]
 
@@ -83,7 +86,7 @@ def register_handlers(bot):
         # Set the state
         data["state"].set(AppStates.user_menu)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("grant_admin"))
+    @bot.callback_query_handler(func=data_startswith("grant_admin"))
     def grant_admin_handler(call, data: dict):
         user = data["user"]
         grant_admin_user_id = call.data.split("_")[2]
@@ -97,7 +100,7 @@ def register_handlers(bot):
         )
 
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("block_user"))
+    @bot.callback_query_handler(func=data_startswith("block_user"))
     def block_user_handler(call, data: dict):
         user = data["user"]
         block_user_id = call.data.split("_")[2]
@@ -111,7 +114,7 @@ def register_handlers(bot):
             parse_mode="Markdown"
             )
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("unblock_user"))
+    @bot.callback_query_handler(func=data_startswith("unblock_user"))
     def block_user_handler(call, data: dict):
         user = data["user"]
         block_user_id = call.data.split("_")[2]
@@ -126,7 +129,7 @@ def register_handlers(bot):
             )
 
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("revoke_admin"))
+    @bot.callback_query_handler(func=data_startswith("revoke_admin"))
     def grant_admin_handler(call, data: dict):
         user = data["user"]
         revoke_admin_user_id = call.data.split("_")[2]
@@ -140,16 +143,16 @@ def register_handlers(bot):
         )
 
 
-    @bot.callback_query_handler(func=lambda call: call.data == "about")
+    @bot.callback_query_handler(func=data_equals("about"))
     def about_handler(call):
         user_id = call.from_user.id
 
-        config_str = OmegaConf.to_yaml(config)
+        config_str = OmegaConf.to_yaml(config.resolve())
 
         # Send config
         bot.send_message(user_id, f"```yaml\n{config_str}\n```", parse_mode="Markdown")
 
-    @bot.callback_query_handler(func=lambda call: call.data == "export_data")
+    @bot.callback_query_handler(func=data_equals("export_data"))
     def export_data_handler(call, data):
         user = data["user"]
 
@@ -0,0 +1,62 @@
+import logging
+from pathlib import Path
+
+from sqlalchemy import func
+from telebot import TeleBot, types
+
+from ..database.core import db_session
+from ..i18n.catalog import catalog
+from ..match.models import Player
+from ..registry import lazy_config
+from .service import read_head_to_head
+
+logger = logging.getLogger(__name__)
+
+# Load configuration
+CURRENT_DIR = Path(__file__).parent
+config = lazy_config(CURRENT_DIR / "config.yaml")
+strings = catalog.strings(CURRENT_DIR / "config.yaml")
+
+
+def register_handlers(bot: TeleBot):
+    """Register head-to-head handlers"""
+    logger.info("Registering head-to-head handlers")
+
+    @bot.message_handler(commands=["vs"])
+    def vs_command(message: types.Message, data: dict):
+        """/vs @first @second – the common matches of two players"""
+        user = data["user"]
+        usernames = [word[1:] for word in message.text.split()[1:] if word.startswith("@") and len(word) > 1]
+        if len(usernames) != 2:
+            bot.reply_to(message, strings[user.lang].usage)
+            return
+        if usernames[0].lower() == usernames[1].lower():
+            bot.reply_to(message, strings[user.lang].same_player)
+            return
+
+        # Both players in one query
+        players = {
+            player.username.lower(): player
+            for player in db_session.query(Player).filter(func.lower(Player.username).in_(
+                [username.lower() for username in usernames]
+            ))
+        }
+        for username in usernames:
+            if username.lower() not in players:
+                bot.reply_to(message, strings[user.lang].player_not_found.format(username=username))
+                return
+        player, opponent = (players[username.lower()] for username in usernames)
+
+        head_to_head = read_head_to_head(db_session, player.id, opponent.id)
+        if head_to_head is None:
+            text = strings[user.lang].no_games.format(player=player.username, opponent=opponent.username)
+        else:
+            text = strings[user.lang].head_to_head.format(
+                player=player.username,
+                opponent=opponent.username,
+                games=head_to_head.games,
+                wins=head_to_head.wins,
+                opponent_wins=head_to_head.opponent_wins,
+                other_wins=head_to_head.other_wins,
+            )
+        bot.reply_to(message, text)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
+
+from ..models import Base
+
+
+class PlayerPair(Base):
+    """Head-to-head counts of two players over all their common matches, stored once with player_a_id < player_b_id"""
+    __tablename__ = 'player_pairs'
+    id = Column(Integer, primary_key=True)
+    player_a_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    player_b_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    games = Column(Integer, nullable=False, default=0)
+    # Common matches won by player A and by player B; the rest were won by someone else
+    a_wins = Column(Integer, nullable=False, default=0)
+    b_wins = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint('player_a_id', 'player_b_id', name='uix_player_pair'),)
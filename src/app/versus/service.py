@@ -0,0 +1,172 @@
+"""
+Head-to-head statistics.
+
+``player_pairs`` holds, for every two players who have met, the number of their
+common matches and how many of them each one won. A confirmed match updates the
+k·(k-1)/2 pairs of its k seats in the transaction that applies its ratings, and
+a reverted match subtracts them again, so ``/vs`` is one lookup by the pair's
+unique index instead of a self-join of ``match_participants`` over the history.
+``rebuild_player_pairs`` recomputes the table from the full history with NumPy.
+"""
+import logging
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..database.replicas import read_only
+from ..match.models import MatchParticipant
+from .models import PlayerPair
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HeadToHead:
+    """Common matches of two players, in the order they were asked for"""
+
+    player_id: int
+    opponent_id: int
+    games: int = 0
+    wins: int = 0
+    opponent_wins: int = 0
+
+    @property
+    def other_wins(self) -> int:
+        """Common matches won by a third player"""
+        return self.games - self.wins - self.opponent_wins
+
+
+def _pair_counts(seats: Iterable[tuple[int, bool]]) -> dict[tuple[int, int], tuple[int, int]]:
+    """(player_a_id, player_b_id) -> (a won, b won) for every two seats of a match"""
+    pairs = {}
+    for (first, first_won), (second, second_won) in combinations(sorted(seats), 2):
+        if first != second:
+            pairs[(first, second)] = (int(bool(first_won)), int(bool(second_won)))
+    return pairs
+
+
+def _apply_pairs(db: Session, seats: Iterable[tuple[int, bool]], sign: int):
+    pairs = _pair_counts(seats)
+    if not pairs:
+        return
+    player_ids = {player_id for pair in pairs for player_id in pair}
+    # The pairs of the match, in one query; rows created below are added to it. The row locks order
+    # concurrent matches and reverts (PostgreSQL), the read-modify-write would lose one of them; taking
+    # them in key order keeps two matches of the same players from deadlocking
+    rows = {
+        (row.player_a_id, row.player_b_id): row for row in db.query(PlayerPair).filter(
+            PlayerPair.player_a_id.in_(player_ids), PlayerPair.player_b_id.in_(player_ids)
+        ).order_by(PlayerPair.player_a_id, PlayerPair.player_b_id).with_for_update()
+    }
+    for (player_a_id, player_b_id), (a_won, b_won) in pairs.items():
+        row = rows.get((player_a_id, player_b_id))
+        if row is None:
+            if sign < 0:
+                continue
+            row = PlayerPair(player_a_id=player_a_id, player_b_id=player_b_id, games=0, a_wins=0, b_wins=0)
+            db.add(row)
+        row.games += sign
+        row.a_wins += sign * a_won
+        row.b_wins += sign * b_won
+        if row.games <= 0:
+            db.delete(row)
+
+
+def record_match_pairs(db: Session, seats: Iterable[tuple[int, bool]]):
+    """
+    Count a match in the pairs of its players, in the caller's transaction.
+
+    Args:
+        seats: (player_id, is_winner) per participant
+    """
+    _apply_pairs(db, seats, 1)
+
+
+def revert_match_pairs(db: Session, seats: Iterable[tuple[int, bool]]):
+    """Subtract a match from the pairs of its players, in the caller's transaction"""
+    _apply_pairs(db, seats, -1)
+
+
+def rebuild_player_pairs(db: Session, chunk_size: int = 50_000) -> int:
+    """
+    Recompute the pair table from every recorded match; returns the number of pairs.
+
+    The seats are loaded as arrays and grouped by match size. For the matches with k
+    seats, each of the k·(k-1)/2 seat combinations is one vectorized step over all of
+    them, and the counts of equal pairs are summed with ``np.add.at``.
+    """
+    seats_query = db.query(MatchParticipant.match_id, MatchParticipant.player_id, MatchParticipant.is_winner).filter(
+        MatchParticipant.player_id.isnot(None)
+    ).order_by(MatchParticipant.match_id, MatchParticipant.player_id)
+    rows = np.array(
+        [(match_id, player_id, bool(is_winner)) for match_id, player_id, is_winner in seats_query], dtype=np.int64
+    ).reshape(-1, 3)
+    match_ids, player_ids, winners = rows[:, 0], rows[:, 1], rows[:, 2]
+
+    first_players, second_players, first_wins, second_wins = [], [], [], []
+    _, starts, sizes = np.unique(match_ids, return_index=True, return_counts=True)
+    for size in np.unique(sizes):
+        if size < 2:
+            continue
+        # Seats of the matches with ``size`` participants, one row per match, sorted by player
+        seats = starts[sizes == size][:, None] + np.arange(size)
+        for first, second in combinations(range(size), 2):
+            first_players.append(player_ids[seats[:, first]])
+            second_players.append(player_ids[seats[:, second]])
+            first_wins.append(winners[seats[:, first]])
+            second_wins.append(winners[seats[:, second]])
+
+    db.query(PlayerPair).delete(synchronize_session=False)
+    if not first_players:
+        db.commit()
+        return 0
+    player_a, player_b = np.concatenate(first_players), np.concatenate(second_players)
+    a_won, b_won = np.concatenate(first_wins), np.concatenate(second_wins)
+    # A player seated twice in one match is not a pair
+    distinct = player_a != player_b
+    player_a, player_b, a_won, b_won = player_a[distinct], player_b[distinct], a_won[distinct], b_won[distinct]
+
+    pairs, index = np.unique(np.stack([player_a, player_b], axis=1), axis=0, return_inverse=True)
+    index = index.ravel()
+    games = np.zeros(len(pairs), dtype=np.int64)
+    a_wins = np.zeros(len(pairs), dtype=np.int64)
+    b_wins = np.zeros(len(pairs), dtype=np.int64)
+    np.add.at(games, index, 1)
+    np.add.at(a_wins, index, a_won)
+    np.add.at(b_wins, index, b_won)
+
+    columns = {
+        "player_a_id": pairs[:, 0], "player_b_id": pairs[:, 1], "games": games, "a_wins": a_wins, "b_wins": b_wins,
+    }
+    for start in range(0, len(pairs), chunk_size):
+        chunk = zip(*(values[start:start + chunk_size].tolist() for values in columns.values()))
+        db.execute(insert(PlayerPair.__table__), [dict(zip(columns, row)) for row in chunk])
+    db.commit()
+    logger.info(f"Head-to-head pairs rebuilt: {len(pairs)} pairs from {len(np.unique(match_ids))} matches")
+    return len(pairs)
+
+
+def ensure_player_pairs(db: Session) -> bool:
+    """Build the pair table when there are matches but no pairs yet (e.g. after an upgrade)"""
+    if db.query(PlayerPair.id).first() is not None:
+        return False
+    if db.query(MatchParticipant.id).first() is None:
+        return False
+    rebuild_player_pairs(db)
+    return True
+
+
+@read_only
+def read_head_to_head(db: Session, player_id: int, opponent_id: int) -> Optional[HeadToHead]:
+    """The common matches of two players in one lookup by the pair index; None when they never met"""
+    player_a_id, player_b_id = sorted((player_id, opponent_id))
+    row = db.query(PlayerPair).filter_by(player_a_id=player_a_id, player_b_id=player_b_id).first()
+    if row is None:
+        return None
+    if player_id == player_a_id:
+        return HeadToHead(player_id, opponent_id, row.games, row.a_wins, row.b_wins)
+    return HeadToHead(player_id, opponent_id, row.games, row.b_wins, row.a_wins)
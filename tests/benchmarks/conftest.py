@@ -0,0 +1,150 @@
+"""
+Benchmark fixtures.
+
+``bench_db`` is one synthetic dataset per session (see ``generate_bulk_data``) and
+``bench`` times a callable over a few rounds. Results are written to
+``<--benchmark-dir>/<timestamp>.json`` and compared with the previous run there.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.core import import_models
+from app.models import Base
+
+# A regression is reported when the median grows by more than this factor
+REGRESSION_FACTOR = 1.2
+
+RESULTS: dict[str, dict] = {}
+
+
+@pytest.fixture(scope="session")
+def bench_scale(pytestconfig):
+    return {
+        "players": pytestconfig.getoption("--benchmark-players"),
+        "matches": pytestconfig.getoption("--benchmark-matches"),
+    }
+
+
+@pytest.fixture(scope="session")
+def bench_db(pytestconfig, tmp_path_factory, bench_scale):
+    """Session with the generated dataset and its ratings and titles"""
+    from app.match.data import generate_bulk_data, init_clans_and_heroes
+    from app.rating.service import rebuild_all_ratings
+    from app.title.data import init_titles
+
+    import_models()
+    url = pytestconfig.getoption("--benchmark-db") or f"sqlite:///{tmp_path_factory.mktemp('bench') / 'bench.db'}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    started = time.perf_counter()
+    init_clans_and_heroes(session)
+    init_titles(session)
+    generate_bulk_data(session, players=bench_scale["players"], matches=bench_scale["matches"])
+    RESULTS["generate_bulk_data"] = _summary([time.perf_counter() - started])
+    rebuild_all_ratings(session)
+
+    yield session
+
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def bench(request):
+    """
+    Time ``func(*args)`` over ``rounds`` runs and record the result under the test name.
+    ``setup`` runs before every round, outside the timing, and returns the arguments.
+    """
+    def run(func, *args, rounds=5, setup=None):
+        timings = []
+        result = None
+        for _ in range(rounds):
+            call_args = setup() if setup else args
+            started = time.perf_counter()
+            result = func(*call_args)
+            timings.append(time.perf_counter() - started)
+        RESULTS[request.node.name] = _summary(timings)
+        return result
+
+    return run
+
+
+def _summary(timings):
+    return {
+        "rounds": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(  # noqa: S603, S607
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _previous_results(directory: Path):
+    runs = sorted(directory.glob("*.json"))
+    if not runs:
+        return None, {}
+    return runs[-1].name, json.loads(runs[-1].read_text())["results"]
+
+
+def pytest_sessionfinish(session):
+    if not RESULTS:
+        return
+    config = session.config
+    directory = Path(config.getoption("--benchmark-dir"))
+    directory.mkdir(parents=True, exist_ok=True)
+    config._benchmark_previous = _previous_results(directory)
+
+    path = directory / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps({
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "database": config.getoption("--benchmark-db") or "sqlite",
+        "scale": {
+            "players": config.getoption("--benchmark-players"),
+            "matches": config.getoption("--benchmark-matches"),
+        },
+        "results": RESULTS,
+    }, indent=2))
+    config._benchmark_path = path
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not RESULTS:
+        return
+    previous_name, previous = getattr(config, "_benchmark_previous", (None, {}))
+    terminalreporter.section("benchmarks")
+    header = f"{'name':<45} {'median, s':>12} {'min, s':>12}"
+    if previous_name:
+        header += f" {'vs ' + previous_name:>26}"
+    terminalreporter.write_line(header)
+    for name, result in sorted(RESULTS.items()):
+        line = f"{name:<45} {result['median']:>12.4f} {result['min']:>12.4f}"
+        if name in previous:
+            ratio = result["median"] / previous[name]["median"] if previous[name]["median"] else 1.0
+            marker = "  REGRESSION" if ratio > REGRESSION_FACTOR else ""
+            line += f" {ratio:>25.2f}x{marker}"
+        terminalreporter.write_line(line)
+    terminalreporter.write_line(f"Saved to {getattr(config, '_benchmark_path', '')}")
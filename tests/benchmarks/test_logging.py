@@ -0,0 +1,43 @@
+import logging
+
+import pytest
+
+from app.logs import TEXT_FORMAT, setup_logging, stop_logging
+
+pytestmark = pytest.mark.benchmark
+
+UPDATES = 2_000
+
+
+@pytest.fixture
+def root_logger(tmp_path):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield tmp_path / "bot.log"
+    stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def log_updates(logger):
+    """The records of an update through the user middleware and a rating update"""
+    for index in range(UPDATES):
+        logger.info("%s from user %s in chat %s", "message", index, -100, extra={"content_type": "text"})
+        for player_id in range(4):
+            logger.debug("Updated overall rating for player %s: rating=%s", player_id, index)
+
+
+def test_synchronous_logging(bench, root_logger):
+    handler = logging.FileHandler(root_logger)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    logging.getLogger().handlers[:] = [handler]
+    logging.getLogger().setLevel(logging.DEBUG)
+    bench(log_updates, logging.getLogger("app.rating.service"))
+    handler.close()
+
+
+def test_queued_logging(bench, root_logger):
+    with open(root_logger, "w") as stream:
+        setup_logging(level="INFO", sampling={"app.rating.service": 0.1}, stream=stream)
+        bench(log_updates, logging.getLogger("app.rating.service"))
+        stop_logging()
@@ -0,0 +1,37 @@
+import itertools
+
+import pytest
+
+from app.match.models import Hero, Player
+from app.match.schemas import MatchCreate, ParticipantCreate
+from app.match.service import create_match
+from app.rating.service import rebuild_all_ratings, update_ratings_after_match
+from app.title.service import update_title_for_all_players
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_rebuild_all_ratings(bench, bench_db):
+    stats = bench(rebuild_all_ratings, bench_db, rounds=3)
+
+    assert stats["matches_processed"] == stats["matches_total"]
+
+
+def test_update_ratings_after_match(bench, bench_db):
+    usernames = [username for username, in bench_db.query(Player.username).order_by(Player.id).limit(40)]
+    heroes = [hero_id for hero_id, in bench_db.query(Hero.id).order_by(Hero.id).limit(4)]
+    lineups = itertools.cycle(usernames[index:index + 4] for index in range(0, len(usernames), 4))
+
+    def new_match():
+        lineup = next(lineups)
+        match = create_match(bench_db, MatchCreate(
+            screenshot="bench", win_type="prestige", winner_username=lineup[0],
+            participants=[ParticipantCreate(username=username, hero_id=hero) for username, hero in zip(lineup, heroes)],
+        ))
+        return bench_db, match
+
+    bench(update_ratings_after_match, rounds=20, setup=new_match)
+
+
+def test_update_title_for_all_players(bench, bench_db):
+    bench(update_title_for_all_players, bench_db, rounds=1)
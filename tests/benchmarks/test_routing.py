@@ -0,0 +1,65 @@
+import pytest
+import telebot
+from telebot import types
+from telebot.custom_filters import StateFilter
+from telebot.states import State, StatesGroup
+
+from app.routing import data_equals, data_startswith, install_routing
+
+pytestmark = pytest.mark.benchmark
+
+HANDLERS = 100
+UPDATES = 2_000
+USER_ID = 7
+
+
+class MenuState(StatesGroup):
+    select = State()
+
+
+def build_bot(routed: bool) -> telebot.TeleBot:
+    """About as many callback handlers as the bot has, half of them with a state filter"""
+    bot = telebot.TeleBot("123456:TEST", threaded=False, use_class_middlewares=True)
+    bot.add_custom_filter(StateFilter(bot))
+    for index in range(HANDLERS):
+        state = MenuState.select if index % 2 else None
+        if routed:
+            predicate = data_startswith(f"item{index}:") if index % 4 == 3 else data_equals(f"button{index}")
+        elif index % 4 == 3:
+            predicate = (lambda prefix: lambda call: call.data.startswith(prefix))(f"item{index}:")
+        else:
+            predicate = (lambda value: lambda call: call.data == value)(f"button{index}")
+        bot.callback_query_handler(func=predicate, state=state)(lambda call, data: None)
+    if routed:
+        install_routing(bot)
+    bot.set_state(USER_ID, MenuState.select, USER_ID)
+    return bot
+
+
+def updates() -> list:
+    """Presses of the buttons registered last, the worst case of the linear scan"""
+    return [
+        types.Update.de_json({
+            "update_id": index,
+            "callback_query": {
+                "id": str(index),
+                "from": {"id": USER_ID, "is_bot": False, "first_name": "Player"},
+                "chat_instance": "chat",
+                "data": f"item{HANDLERS - 1}:{index}" if index % 2 else f"button{HANDLERS - 2}",
+                "message": {
+                    "message_id": 1, "date": 1700000000, "chat": {"id": USER_ID, "type": "private"}, "text": "menu"
+                },
+            },
+        })
+        for index in range(UPDATES)
+    ]
+
+
+def test_linear_dispatch(bench):
+    bot = build_bot(routed=False)
+    bench(bot.process_new_updates, updates())
+
+
+def test_routed_dispatch(bench):
+    bot = build_bot(routed=True)
+    bench(bot.process_new_updates, updates())
@@ -0,0 +1,25 @@
+import pytest
+
+from app.clanrating.service import get_clan_stats
+from app.herorating.service import calculate_hero_stats
+from app.match.models import Clan, Hero
+from app.match.service import read_hero
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_get_clan_stats(bench, bench_db):
+    clan = bench_db.query(Clan).order_by(Clan.id).first()
+
+    assert bench(get_clan_stats, bench_db, clan.name) is not None
+
+
+def test_calculate_hero_stats(bench, bench_db):
+    hero = bench_db.query(Hero).order_by(Hero.id).first()
+
+    bench(calculate_hero_stats, bench_db, hero.id)
+
+
+def test_read_hero(bench, bench_db):
+    # A misspelled name goes through every lookup, down to the fuzzy match
+    assert bench(read_hero, bench_db, "Thain") is not None
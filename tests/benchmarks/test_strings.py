@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pytest
+
+from app import match
+from app.i18n.catalog import StringCatalog
+from app.registry import lazy_config
+
+pytestmark = pytest.mark.benchmark
+
+MATCH_CONFIG = Path(match.__file__).parent / "config.yaml"
+# Renders per round: a handler renders a few strings per message
+MESSAGES = 10_000
+
+
+def render(strings):
+    for index in range(MESSAGES):
+        strings["ru"].duplicate_screenshot_warning.format(match_ids=index)
+        strings["ru"].select_winner_prompt
+
+
+def test_render_with_omegaconf(bench):
+    bench(render, lazy_config(MATCH_CONFIG, "strings"))
+
+
+def test_render_with_catalog(bench):
+    strings = StringCatalog().strings(MATCH_CONFIG)
+    strings["ru"]
+    bench(render, strings)
@@ -0,0 +1,51 @@
+import pytest
+
+from app.match.models import Player
+from app.top import service
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture(scope="module")
+def player_id(bench_db):
+    return bench_db.query(Player.id).order_by(Player.id.desc()).first()[0]
+
+
+def test_get_player_clan_ratings(bench, bench_db):
+    bench(service.get_player_clan_ratings, bench_db, 1, 0, "rating", True, 10)
+
+
+def test_get_player_hero_ratings(bench, bench_db):
+    bench(service.get_player_hero_ratings, bench_db, None, 1, 0, "rating", True, 10)
+
+
+def test_get_top_players(bench, bench_db):
+    bench(service.get_top_players, bench_db, 10)
+
+
+def test_get_top_heroes(bench, bench_db):
+    bench(service.get_top_heroes, bench_db, 10)
+
+
+def test_get_top_players_by_clan(bench, bench_db):
+    bench(service.get_top_players_by_clan, bench_db, 1, 10)
+
+
+def test_get_top_clans(bench, bench_db):
+    bench(service.get_top_clans, bench_db, 10)
+
+
+def test_get_player_hero_rankings(bench, bench_db, player_id):
+    bench(service.get_player_hero_rankings, bench_db, player_id)
+
+
+def test_get_player_clan_rankings(bench, bench_db, player_id):
+    bench(service.get_player_clan_rankings, bench_db, player_id)
+
+
+def test_get_win_type_distribution(bench, bench_db):
+    bench(service.get_win_type_distribution, bench_db)
+
+
+def test_get_player_position(bench, bench_db, player_id):
+    bench(service.get_player_position, bench_db, player_id)
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+from telebot import apihelper
+
+from app.transport import ApiTransport, install_transport
+from load.fake_api import FakeBotAPI
+from load.harness import TOKEN, fake_telegram
+
+pytestmark = pytest.mark.benchmark
+
+THREADS = 4
+BURSTS = 20
+# About a TLS handshake with the Bot API from Europe
+CONNECT_LATENCY = 0.02
+
+
+@pytest.fixture
+def api():
+    saved = apihelper.CUSTOM_REQUEST_SENDER, apihelper.session, apihelper.SESSION_TIME_TO_LIVE
+    with FakeBotAPI(connect_latency=CONNECT_LATENCY) as fake, fake_telegram(fake):
+        yield fake
+    apihelper.CUSTOM_REQUEST_SENDER, apihelper.session, apihelper.SESSION_TIME_TO_LIVE = saved
+
+
+def send_messages():
+    """
+    Bursts of a send, an edit and a delete from short-lived threads, like the timeout timers
+    of the conversations, with a few of them at once
+    """
+    def burst():
+        message = apihelper.send_message(TOKEN, 1, "Match report timed out")
+        apihelper.edit_message_text(TOKEN, "Timed out", 1, message["message_id"])
+        apihelper.delete_message(TOKEN, 1, message["message_id"])
+
+    for _ in range(BURSTS):
+        workers = [threading.Thread(target=burst) for _ in range(THREADS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+
+def test_per_thread_sessions(bench, api):
+    apihelper.CUSTOM_REQUEST_SENDER = None
+    bench(send_messages)
+
+
+def test_pooled_transport(bench, api):
+    install_transport(ApiTransport(pool_size=THREADS))
+    bench(send_messages)
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.core import import_models
+from app.database.profiler import QueryProfiler
+from app.models import Base
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--run-benchmarks", action="store_true", help="Run the benchmarks in tests/benchmarks")
+    group.addoption("--benchmark-players", type=int, default=10_000, help="Players in the benchmark dataset")
+    group.addoption("--benchmark-matches", type=int, default=10_000, help="Matches in the benchmark dataset")
+    group.addoption("--benchmark-db", default=None,
+                    help="Database URL for the benchmark dataset (a temporary SQLite file by default)")
+    group.addoption("--benchmark-dir", default=".benchmarks", help="Directory for the JSON benchmark results")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: performance benchmark, only run with --run-benchmarks")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks run only with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Sessions bound to a fresh SQLite database with the full schema"""
+    import_models()
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def seeded_db(db):
+    """Database with the clans, heroes and four players"""
+    from app.match.data import init_clans_and_heroes
+    from app.match.models import Player
+
+    init_clans_and_heroes(db)
+    db.add_all([Player(user_id=index, username=f"player{index}") for index in range(1, 5)])
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def query_budget():
+    """
+    ``with query_budget(5): ...`` fails when the block runs more than 5 SQL statements
+    or repeats one statement from the same line ``n_plus_one`` times or more
+    """
+    @contextmanager
+    def budget(max_queries: int, n_plus_one: int = 5):
+        with QueryProfiler(n_plus_one_threshold=n_plus_one) as profiler:
+            yield profiler
+        assert profiler.query_count <= max_queries, f"Query budget of {max_queries} exceeded: {profiler.report()}"
+        assert not profiler.n_plus_one(), f"N+1 queries: {profiler.report()}"
+
+    return budget
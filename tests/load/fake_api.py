@@ -0,0 +1,177 @@
+"""
+Local stand-in for the Telegram Bot API.
+
+Answers every method with a plausible result (sent messages get increasing ids,
+files download as a small PNG) and counts the calls per method and the
+connections opened, so the bot can run its full handler stack without the
+network. Errors can be scripted per method with ``fail_next``.
+"""
+import io
+import itertools
+import json
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlparse
+
+from PIL import Image
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bot", "username": "load_test_bot"}
+
+# Methods that send a new message and return it
+MESSAGE_METHODS = {
+    "sendMessage", "sendPhoto", "sendDocument", "sendAnimation", "forwardMessage", "copyMessage",
+    "editMessageText", "editMessageCaption", "editMessageReplyMarkup",
+}
+
+
+def _screenshot() -> bytes:
+    image = Image.linear_gradient("L").resize((64, 64))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeBotAPI:
+    """Threaded HTTP server speaking enough of the Bot API for the handlers"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, connect_latency: float = 0.0):
+        self.latency = latency
+        # Paid once per connection, like the TCP and TLS handshakes with the real API
+        self.connect_latency = connect_latency
+        self.calls: Counter = Counter()
+        self.connections = 0
+        self._failures: dict[str, deque] = defaultdict(deque)
+        self._message_ids = itertools.count(1_000_000)
+        self._lock = threading.Lock()
+        self._screenshot = _screenshot()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot{{0}}/{{1}}"
+
+    @property
+    def file_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/file/bot{{0}}/{{1}}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-bot-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def fail_next(self, method: str, status: int, retry_after: Optional[int] = None):
+        """Answer the next call of ``method`` with an error ``status``"""
+        error = {"ok": False, "error_code": status, "description": f"Error {status}"}
+        if retry_after is not None:
+            error["parameters"] = {"retry_after": retry_after}
+        with self._lock:
+            self._failures[method].append((status, error))
+
+    def drop_next(self, method: str):
+        """Close the connection after reading the next call of ``method``, without an answer"""
+        with self._lock:
+            self._failures[method].append((None, None))
+
+    def result(self, method: str, params: dict):
+        """The ``result`` field returned for ``method``"""
+        if method == "getMe":
+            return BOT_USER
+        if method == "getFile":
+            file_id = params.get("file_id", "file")
+            return {"file_id": file_id, "file_unique_id": file_id, "file_size": len(self._screenshot),
+                    "file_path": f"photos/{file_id}.png"}
+        if method in MESSAGE_METHODS:
+            chat_id = int(params.get("chat_id", 0) or 0)
+            with self._lock:
+                message_id = int(params.get("message_id") or next(self._message_ids))
+            message = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private", "title": "load"},
+                "from": BOT_USER,
+            }
+            if "caption" in params or method == "sendPhoto":
+                message["caption"] = params.get("caption", "")
+                message["photo"] = [{"file_id": params.get("photo", "photo"), "file_unique_id": "photo",
+                                     "width": 64, "height": 64}]
+            else:
+                message["text"] = params.get("text", "")
+            return message
+        return True
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without this every call waits for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with api._lock:
+                    api.connections += 1
+                if api.connect_latency:
+                    time.sleep(api.connect_latency)
+
+            def _reply(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if api.latency:
+                    time.sleep(api.latency)
+
+                if url.path.startswith("/file/"):
+                    with api._lock:
+                        api.calls["downloadFile"] += 1
+                    self._reply(200, api._screenshot, "image/png")
+                    return
+
+                method = url.path.rsplit("/", 1)[-1]
+                params = dict(parse_qsl(url.query))
+                if body and self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                    params.update(parse_qsl(body.decode()))
+                with api._lock:
+                    api.calls[method] += 1
+                    failure = api._failures[method].popleft() if api._failures[method] else None
+                if failure:
+                    status, error = failure
+                    if status is None:
+                        self.close_connection = True
+                        return
+                    self._reply(status, json.dumps(error).encode(), "application/json")
+                    return
+                payload = json.dumps({"ok": True, "result": api.result(method, params)}).encode()
+                self._reply(200, payload, "application/json")
+
+            do_GET = _handle
+            do_POST = _handle
+
+        return Handler
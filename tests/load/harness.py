@@ -0,0 +1,272 @@
+"""
+Offline load harness for the middleware and handler stack.
+
+Feeds an update stream into ``bot.process_new_updates`` of the real bot
+(``main.build_bot``), with every API call answered by ``FakeBotAPI``, and
+reports updates/sec, p50/p99 latency per handler and middleware, and the
+database queries behind them.
+
+    PYTHONPATH=src:tests python -m load.harness --chats 50 --reports 2
+    PYTHONPATH=src:tests python -m load.harness --updates recorded.jsonl --output report.json
+"""
+import argparse
+import functools
+import io
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from telebot import apihelper, types
+
+from app.routing import registered_handlers
+
+from .fake_api import FakeBotAPI
+from .updates import match_report_flows, read_updates
+
+TOKEN = "123456:LOAD"
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoadStats:
+    """Latency and query samples per handler, middleware and job"""
+
+    def __init__(self):
+        self.samples: dict[str, list[tuple[float, int]]] = defaultdict(list)
+        self.queries = 0
+        self._local = threading.local()
+
+    def count_query(self, *args):
+        self.queries += 1
+        self._local.queries = getattr(self._local, "queries", 0) + 1
+
+    @contextmanager
+    def measure(self, name: str):
+        queries = getattr(self._local, "queries", 0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.samples[name].append((elapsed, getattr(self._local, "queries", 0) - queries))
+
+    def wrap(self, name: str, func):
+        @functools.wraps(func)
+        def measured(*args, **kwargs):
+            with self.measure(name):
+                return func(*args, **kwargs)
+        return measured
+
+    def summary(self) -> dict[str, dict]:
+        result = {}
+        for name, samples in sorted(self.samples.items()):
+            timings = [elapsed for elapsed, _ in samples]
+            result[name] = {
+                "calls": len(samples),
+                "p50_ms": _percentile(timings, 0.5) * 1000,
+                "p99_ms": _percentile(timings, 0.99) * 1000,
+                "total_ms": sum(timings) * 1000,
+                "queries_per_call": sum(queries for _, queries in samples) / len(samples),
+            }
+        return result
+
+
+def _chat_id(update: types.Update):
+    message = update.message or (update.callback_query.message if update.callback_query else None)
+    return message.chat.id if message else None
+
+
+def batches(updates: list[types.Update], batch_size: int):
+    """
+    Split the stream the way ``getUpdates`` would deliver it: up to ``batch_size`` updates,
+    at most one per chat. ``process_new_updates`` handles a batch's messages before its
+    callback queries, which must not reorder the steps of one conversation.
+    """
+    batch, chats = [], set()
+    for update in updates:
+        chat_id = _chat_id(update)
+        if len(batch) >= batch_size or (chat_id is not None and chat_id in chats):
+            yield batch
+            batch, chats = [], set()
+        batch.append(update)
+        chats.add(chat_id)
+    if batch:
+        yield batch
+
+
+def instrument(bot, stats: LoadStats):
+    """Time every registered handler and middleware of ``bot``"""
+    for kind in ("message_handlers", "callback_query_handlers"):
+        for handler in registered_handlers(bot, kind):
+            function = handler["function"]
+            handler["function"] = stats.wrap(f"handler:{function.__module__.rsplit('.', 2)[-2]}.{function.__name__}",
+                                             function)
+    for middleware in bot.middlewares:
+        middleware.pre_process = stats.wrap(f"middleware:{type(middleware).__name__}", middleware.pre_process)
+
+
+@contextmanager
+def fake_telegram(api: FakeBotAPI):
+    """Point the Bot API client at ``api`` for the duration of the block"""
+    saved = apihelper.API_URL, apihelper.FILE_URL
+    apihelper.API_URL, apihelper.FILE_URL = api.api_url, api.file_url
+    try:
+        yield api
+    finally:
+        apihelper.API_URL, apihelper.FILE_URL = saved
+
+
+@contextmanager
+def bound_database(engine: Engine):
+    """Run the handlers' shared session and the job worker against ``engine``"""
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import core
+    from app.jobs.worker import job_worker
+
+    saved = core.db_session.bind, job_worker.session_factory
+    core.db_session.close()
+    core.db_session.bind = engine
+    job_worker.session_factory = sessionmaker(bind=engine)
+    try:
+        yield
+    finally:
+        core.db_session.close()
+        core.db_session.bind, job_worker.session_factory = saved
+
+
+def prepare_database(engine: Engine):
+    """Recreate the schema with the reference data the handlers expect"""
+    from sqlalchemy.orm import sessionmaker
+
+    from app.auth.data import init_roles_table
+    from app.database.core import import_models
+    from app.match.data import init_clans_and_heroes
+    from app.models import Base
+    from app.title.data import init_titles
+
+    import_models()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        init_roles_table(session)
+        init_clans_and_heroes(session)
+        init_titles(session)
+    finally:
+        session.close()
+
+
+def run_load(updates: list[dict], engine: Engine, batch_size: int = 100, run_jobs: bool = True,
+             api_latency: float = 0.0) -> dict:
+    """
+    Process ``updates`` with the real bot against ``engine`` and a fake Bot API.
+
+    Updates are passed in batches of up to ``batch_size``, as ``getUpdates`` returns them.
+    Queued jobs (e.g. confirmed matches) run afterwards when ``run_jobs`` is set.
+
+    Returns:
+        Report with the throughput, per-handler statistics and fake API calls
+    """
+    from app import main
+    from app.common.cleanup import message_cleaner
+    from app.jobs.worker import job_worker
+
+    stats = LoadStats()
+    event.listen(engine, "before_cursor_execute", stats.count_query)
+    try:
+        with FakeBotAPI(latency=api_latency) as api, fake_telegram(api), bound_database(engine):
+            bot = main.build_bot(TOKEN)
+            # Handlers run in the calling thread, so a chat's updates are handled in order
+            bot.threaded = False
+            instrument(bot, stats)
+
+            parsed = [types.Update.de_json(update) for update in updates]
+            started = time.perf_counter()
+            for batch in batches(parsed, batch_size):
+                bot.process_new_updates(batch)
+            elapsed = time.perf_counter() - started
+            update_queries = stats.queries
+
+            jobs = 0
+            if run_jobs:
+                session = job_worker.session_factory()
+                try:
+                    with stats.measure("jobs"):
+                        jobs = job_worker.run_pending(session)
+                finally:
+                    session.close()
+            # Deletions are sent in the background; send the rest before counting the calls
+            message_cleaner.flush()
+            api_calls = dict(api.calls)
+    finally:
+        event.remove(engine, "before_cursor_execute", stats.count_query)
+
+    return {
+        "updates": len(updates),
+        "seconds": elapsed,
+        "updates_per_second": len(updates) / elapsed if elapsed else 0.0,
+        "queries": update_queries,
+        "queries_per_update": update_queries / len(updates) if updates else 0.0,
+        "jobs": jobs,
+        "job_queries": stats.queries - update_queries,
+        "handlers": stats.summary(),
+        "api_calls": api_calls,
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['updates']} updates in {report['seconds']:.2f} s: {report['updates_per_second']:.1f} updates/s, "
+        f"{report['queries_per_update']:.1f} queries/update",
+        f"{report['jobs']} jobs, {report['job_queries']} queries",
+        "",
+        f"{'name':<55} {'calls':>6} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}",
+    ]
+    for name, row in report["handlers"].items():
+        lines.append(
+            f"{name:<55} {row['calls']:>6} {row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['queries_per_call']:>8.1f}"
+        )
+    lines.append("")
+    lines.append("API calls: " + ", ".join(f"{method}={count}" for method, count in sorted(report["api_calls"].items())))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--updates", type=Path, help="Recorded updates, one JSON object per line")
+    parser.add_argument("--chats", type=int, default=20, help="Group chats reporting matches at once")
+    parser.add_argument("--reports", type=int, default=1, help="Match reports per chat")
+    parser.add_argument("--batch-size", type=int, default=100, help="Updates per process_new_updates call")
+    parser.add_argument("--database", default="sqlite:///load_test.db", help="Database URL (recreated)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Seconds the fake API waits per call")
+    parser.add_argument("--no-jobs", action="store_true", help="Leave the queued jobs unprocessed")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    engine = create_engine(args.database)
+    prepare_database(engine)
+    updates = read_updates(args.updates) if args.updates else match_report_flows(args.chats, args.reports)
+    # Handlers print debugging output; keep it out of the report
+    with redirect_stdout(io.StringIO()):
+        report = run_load(updates, engine, args.batch_size, not args.no_jobs, args.api_latency)
+    engine.dispose()
+
+    print(format_report(report))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.match.models import Match
+from app.rating.models import PlayerOverallRating
+
+from .harness import prepare_database, run_load
+from .updates import match_report_flows
+
+
+def test_match_report_flows_run_end_to_end(tmp_path):
+    # Arrange
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    prepare_database(engine)
+    updates = match_report_flows(chats=3, reports_per_chat=2)
+
+    # Act
+    report = run_load(updates, engine, batch_size=100)
+
+    # Assert
+    session = sessionmaker(bind=engine)()
+    assert session.query(Match).count() == 6
+    assert session.query(PlayerOverallRating).count() == 12
+    session.close()
+    engine.dispose()
+    assert report["updates"] == len(updates) == 60
+    assert report["jobs"] == 6
+    assert report["handlers"]["handler:match.process_hero_selection"]["calls"] == 24
+    assert report["handlers"]["handler:match.confirm_match"]["calls"] == 6
+    assert report["api_calls"]["getFile"] == 6
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+import requests
+from telebot import apihelper
+from telebot.apihelper import ApiTelegramException
+
+from app.transport import ApiTransport, RetryPolicy, install_transport
+
+from .fake_api import FakeBotAPI
+from .harness import TOKEN, fake_telegram
+
+
+@pytest.fixture
+def api():
+    saved = apihelper.CUSTOM_REQUEST_SENDER, apihelper.session, apihelper.SESSION_TIME_TO_LIVE
+    with FakeBotAPI() as fake, fake_telegram(fake):
+        yield fake
+    apihelper.CUSTOM_REQUEST_SENDER, apihelper.session, apihelper.SESSION_TIME_TO_LIVE = saved
+
+
+def send_from_threads(threads: int, messages: int):
+    def send():
+        for index in range(messages):
+            apihelper.send_message(TOKEN, 1, f"message {index}")
+
+    workers = [threading.Thread(target=send) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_threads_share_the_pooled_connections(api):
+    # Arrange
+    install_transport(ApiTransport(pool_size=2))
+
+    # Act
+    for _ in range(3):
+        send_from_threads(threads=2, messages=10)
+
+    # Assert
+    assert api.calls["sendMessage"] == 60
+    assert api.connections <= 2
+
+
+def test_short_rate_limits_are_waited_for_and_long_ones_are_raised(api):
+    # Arrange
+    waits = []
+    install_transport(ApiTransport(retry=RetryPolicy(max_retry_after_seconds=5), sleep=waits.append))
+    api.fail_next("sendMessage", 429, retry_after=2)
+    api.fail_next("deleteMessage", 429, retry_after=30)
+
+    # Act
+    message = apihelper.send_message(TOKEN, 1, "hello")
+    with pytest.raises(ApiTelegramException) as error:
+        apihelper.delete_message(TOKEN, 1, message["message_id"])
+
+    # Assert
+    assert waits == [2]
+    assert api.calls["sendMessage"] == 2
+    assert error.value.error_code == 429
+
+
+def test_server_errors_are_retried_only_for_idempotent_methods(api):
+    # Arrange
+    waits = []
+    install_transport(ApiTransport(retry=RetryPolicy(attempts=3, backoff_seconds=0.5), sleep=waits.append))
+    api.fail_next("getMe", 502)
+    api.fail_next("getMe", 503)
+    api.fail_next("sendMessage", 502)
+
+    # Act
+    bot_user = apihelper.get_me(TOKEN)
+    with pytest.raises(apihelper.ApiException):
+        apihelper.send_message(TOKEN, 1, "hello")
+
+    # Assert
+    assert bot_user["username"] == "load_test_bot"
+    assert waits == [0.5, 1.0]
+    assert api.calls["sendMessage"] == 1
+
+
+def test_dropped_connections_are_retried_only_for_idempotent_methods(api):
+    # Arrange
+    waits = []
+    install_transport(ApiTransport(retry=RetryPolicy(attempts=3, backoff_seconds=0.5), sleep=waits.append))
+    api.drop_next("getMe")
+    api.drop_next("sendMessage")
+
+    # Act
+    bot_user = apihelper.get_me(TOKEN)
+    with pytest.raises(requests.ConnectionError):
+        apihelper.send_message(TOKEN, 1, "hello")
+
+    # Assert
+    assert bot_user["username"] == "load_test_bot"
+    assert waits == [0.5]
+    assert api.calls["sendMessage"] == 1
+
+
+def test_failed_connections_are_retried_then_raised():
+    # Arrange
+    waits = []
+    transport = ApiTransport(timeouts={"sendMessage": 0.2}, retry=RetryPolicy(attempts=2), sleep=waits.append)
+
+    # Act / Assert
+    with pytest.raises(requests.ConnectionError):
+        transport("post", "http://127.0.0.1:9/bot123456:TEST/sendMessage", params={"chat_id": 1, "text": "x"})
+    assert waits == [0.5]
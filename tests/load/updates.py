@@ -0,0 +1,84 @@
+"""
+Update streams for the load harness.
+
+``match_report_flows`` builds the full ``/match`` report conversation (command,
+screenshot, players, winner, win type, four heroes, confirmation) for many group
+chats at once, interleaved the way a busy bot receives them. ``read_updates``
+loads a recorded stream: one ``getUpdates`` result object per line.
+"""
+import itertools
+import json
+from pathlib import Path
+from typing import Iterator
+
+HEROES = ["Thane", "Amber", "Mercurio", "Sana", "Twiss", "Volodar", "River", "Zosha"]
+
+
+class _Chat:
+    """One group chat reporting matches; produces its updates in order"""
+
+    def __init__(self, index: int, counter: Iterator[int], start: int, step: int):
+        self.chat = {"id": -(10 ** 12) - index, "type": "supergroup", "title": f"Load chat {index}"}
+        self.reporter = {
+            "id": 10 ** 9 + index, "is_bot": False, "first_name": f"Reporter {index}",
+            "username": f"reporter{index}", "language_code": "ru",
+        }
+        self.players = [f"load{index}_{seat}" for seat in range(4)]
+        self.counter = counter
+        self.date = start
+        self.step = step
+        self.message_id = 0
+
+    def _message(self, **content) -> dict:
+        # Steps are further apart than the antiflood window, like a person typing
+        self.date += self.step
+        self.message_id += 1
+        message = {"message_id": self.message_id, "date": self.date, "chat": self.chat, "from": self.reporter}
+        message.update(content)
+        return {"update_id": next(self.counter), "message": message}
+
+    def _callback(self, data: str) -> dict:
+        self.date += self.step
+        update_id = next(self.counter)
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id), "from": self.reporter, "chat_instance": str(self.chat["id"]), "data": data,
+                "message": {"message_id": self.message_id, "date": self.date, "chat": self.chat, "text": "..."},
+            },
+        }
+
+    def match_report(self, number: int) -> list[dict]:
+        winner = self.players[number % 4]
+        photo = f"screenshot-{self.chat['id']}-{number}"
+        return [
+            self._message(text="/match", entities=[{"type": "bot_command", "offset": 0, "length": 6}]),
+            self._message(photo=[{"file_id": photo, "file_unique_id": photo, "width": 1280, "height": 720}]),
+            self._message(text=" ".join(f"@{player}" for player in self.players)),
+            self._message(text=f"@{winner}"),
+            self._callback(f"wintype:{('prestige', 'murder', 'decay', 'stones')[number % 4]}"),
+            *(self._message(text=HEROES[(number + seat) % len(HEROES)]) for seat in range(4)),
+            self._callback("match:confirm"),
+        ]
+
+
+def match_report_flows(chats: int = 20, reports_per_chat: int = 1, start: int = 1_700_000_000,
+                       step: int = 5) -> list[dict]:
+    """Complete match reports from ``chats`` chats, with the chats' updates interleaved"""
+    counter = itertools.count(1)
+    flows = []
+    for index in range(chats):
+        chat = _Chat(index, counter, start, step)
+        flows.append([update for number in range(reports_per_chat) for update in chat.match_report(number)])
+
+    # Round-robin over the chats; update ids follow the arrival order
+    updates = [update for step_updates in itertools.zip_longest(*flows) for update in step_updates if update]
+    for update_id, update in enumerate(updates, 1):
+        update["update_id"] = update_id
+    return updates
+
+
+def read_updates(path: Path) -> list[dict]:
+    """Updates recorded one JSON object per line"""
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,67 @@
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+from app.common.cleanup import MessageCleaner
+
+
+class FakeBot:
+    def __init__(self, failing_chats=()):
+        self.failing_chats = set(failing_chats)
+        self.calls = []
+
+    def delete_messages(self, chat_id, message_ids):
+        if chat_id in self.failing_chats:
+            raise ApiTelegramException(
+                "deleteMessages", None, {"error_code": 400, "description": "Bad Request: message can't be deleted"}
+            )
+        self.calls.append((chat_id, list(message_ids)))
+        return True
+
+
+def test_deletions_are_coalesced_per_chat_in_batches_of_100():
+    # Arrange
+    bot = FakeBot()
+    # Long enough that the background thread leaves the work to flush()
+    cleaner = MessageCleaner(coalesce_seconds=60)
+    cleaner.delete(bot, 1, range(150, 0, -1))
+    cleaner.delete(bot, 1, [5, None])
+    cleaner.delete(bot, 2, [7])
+
+    # Act
+    calls = cleaner.flush()
+
+    # Assert
+    assert calls == 3
+    assert bot.calls == [(1, list(range(1, 101))), (1, list(range(101, 151))), (2, [7])]
+    assert cleaner.pending() == 0
+
+
+def test_failed_deletions_do_not_stop_the_other_chats():
+    # Arrange
+    bot = FakeBot(failing_chats={1})
+    cleaner = MessageCleaner(coalesce_seconds=60)
+    cleaner.delete(bot, 1, [10, 11])
+    cleaner.delete(bot, 2, [20])
+
+    # Act
+    cleaner.flush()
+
+    # Assert
+    assert bot.calls == [(2, [20])]
+
+
+def test_deletions_are_sent_by_the_background_thread():
+    # Arrange
+    bot = FakeBot()
+    cleaner = MessageCleaner(coalesce_seconds=0.05)
+
+    # Act
+    cleaner.delete(bot, 1, [3, 1])
+    cleaner.delete(bot, 1, [2])
+    deadline = time.monotonic() + 5
+    while not bot.calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Assert
+    assert bot.calls == [(1, [1, 2, 3])]
@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from app.logs import JsonFormatter, NonBlockingQueueHandler, SamplingFilter, setup_logging, stop_logging
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def make_record(name="app.test", level=logging.INFO, message="Rating of %s: %s", args=(1, 25), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_records_carry_the_extra_fields():
+    # Act
+    entry = json.loads(JsonFormatter().format(make_record(match_id=7)))
+
+    # Assert
+    assert entry["message"] == "Rating of 1: 25"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["match_id"] == 7
+
+
+def test_sampling_applies_to_the_category_and_its_children_but_not_to_warnings():
+    # Arrange
+    sampling = SamplingFilter({"app.noisy": 0.0})
+
+    # Act / Assert
+    assert not sampling.filter(make_record("app.noisy"))
+    assert not sampling.filter(make_record("app.noisy.child", logging.DEBUG))
+    assert sampling.filter(make_record("app.noisy", logging.WARNING))
+    assert sampling.filter(make_record("app.quiet"))
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    # Arrange
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+
+    # Act
+    for _ in range(3):
+        handler.handle(make_record())
+
+    # Assert
+    assert handler.dropped == 2
+    assert handler.queue.get_nowait().msg == "Rating of %s: %s"
+
+
+def test_pipeline_writes_json_lines_in_the_background(restore_root_logger):
+    # Arrange
+    stream = io.StringIO()
+    setup_logging(json_format=True, sampling={"app.sampled": 0.0}, stream=stream)
+    logger = logging.getLogger("app.pipeline")
+
+    # Act
+    logger.info("Match %s saved", 12, extra={"match_id": 12})
+    logger.debug("Not enabled")
+    logging.getLogger("app.sampled").info("Dropped by sampling")
+    stop_logging()
+
+    # Assert
+    [line] = stream.getvalue().splitlines()
+    assert json.loads(line)["message"] == "Match 12 saved"
+    assert json.loads(line)["match_id"] == 12
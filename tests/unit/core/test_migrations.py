@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database.core import _column_backfills, import_models
+from app.database.migrations import upgrade_schema
+from app.models import Base
+from app.rating.models import PlayerOverallRating
+from app.rating.seasons import close_season, get_active_season
+
+
+def test_upgrade_adds_missing_columns_and_indexes(tmp_path):
+    # Arrange
+    import_models()
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE player_overall_ratings (id INTEGER PRIMARY KEY, player_id INTEGER, rating INTEGER, "
+            "wins INTEGER, losses INTEGER, titles VARCHAR, custom_titles VARCHAR, prestige_wins INTEGER, "
+            "murder_wins INTEGER, decay_wins INTEGER, stones_wins INTEGER)"
+        ))
+        connection.execute(text("INSERT INTO player_overall_ratings (player_id, rating) VALUES (1, 12)"))
+
+    # Act
+    upgrade_schema(engine, Base.metadata)
+
+    # Assert
+    inspector = inspect(engine)
+    assert "season_id" in {column["name"] for column in inspector.get_columns("player_overall_ratings")}
+    assert {"ix_player_overall_ratings_season_rating", "uix_season_player"} <= {
+        index["name"] for index in inspector.get_indexes("player_overall_ratings")
+    }
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT season_id, rating FROM player_overall_ratings")).one() == (1, 12)
+    engine.dispose()
+
+
+def test_upgrade_backfills_the_columns_it_adds(tmp_path):
+    # Arrange
+    import_models()
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE match_participants"))
+        connection.execute(text(
+            "CREATE TABLE match_participants (id INTEGER PRIMARY KEY, match_id INTEGER, player_id INTEGER, "
+            "hero_id INTEGER, is_winner BOOLEAN, win_type VARCHAR, score INTEGER)"
+        ))
+        connection.execute(text(
+            "INSERT INTO matches (id, season_id, timestamp, win_type) VALUES (1, 1, '2024-05-01 12:00:00', 'PRESTIGE')"
+        ))
+        connection.execute(text("INSERT INTO match_participants (match_id, player_id) VALUES (1, 1), (1, 2)"))
+
+    # Act
+    added = upgrade_schema(engine, Base.metadata, backfills=_column_backfills())
+
+    # Assert
+    assert ("match_participants", "timestamp") in added
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT timestamp FROM match_participants")).scalars().all() == [
+            "2024-05-01 12:00:00"
+        ] * 2
+    engine.dispose()
+
+
+def test_upgrade_replaces_the_constraints_from_before_seasons(tmp_path):
+    # Arrange
+    import_models()
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE player_overall_ratings"))
+        connection.execute(text(
+            "CREATE TABLE player_overall_ratings (id INTEGER PRIMARY KEY, player_id INTEGER, rating INTEGER, "
+            "wins INTEGER, losses INTEGER, titles VARCHAR, custom_titles VARCHAR, prestige_wins INTEGER, "
+            "murder_wins INTEGER, decay_wins INTEGER, stones_wins INTEGER, UNIQUE (player_id))"
+        ))
+        connection.execute(text("INSERT INTO player_overall_ratings (player_id, rating) VALUES (1, 12)"))
+    db = sessionmaker(bind=engine)()
+    get_active_season(db)
+    with pytest.raises(RuntimeError):
+        close_season(db)
+    db.rollback()
+
+    # Act
+    upgrade_schema(engine, Base.metadata)
+    season = close_season(db)
+    db.add(PlayerOverallRating(season_id=season.id, player_id=1, rating=4))
+    db.commit()
+
+    # Assert
+    assert [constraint["column_names"] for constraint in inspect(engine).get_unique_constraints(
+        "player_overall_ratings"
+    )] == [["season_id", "player_id"]]
+    assert sorted(db.query(PlayerOverallRating.season_id, PlayerOverallRating.rating)) == [(1, 12), (2, 4)]
+    assert "ix_player_overall_ratings_season_rating" in {
+        index["name"] for index in inspect(engine).get_indexes("player_overall_ratings")
+    }
+    db.close()
+    engine.dispose()
@@ -0,0 +1,92 @@
+import pytest
+
+from app.database.profiler import QueryProfiler, normalize_statement
+from app.herorating.service import calculate_hero_stats
+from app.match.models import Hero, Player
+from app.match.schemas import MatchCreate, ParticipantCreate
+from app.match.service import create_match
+from app.rating.service import update_ratings_after_match
+from app.title.models import Title
+from app.title.service import update_title_for_all_players
+
+
+def record_match(db, winner):
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(4).all()]
+    participants = [
+        ParticipantCreate(username=f"player{index}", hero_id=hero_id) for index, hero_id in enumerate(heroes, 1)
+    ]
+    match = create_match(
+        db, MatchCreate(screenshot="file-id", win_type="prestige", participants=participants, winner_username=winner)
+    )
+    update_ratings_after_match(db, match)
+    return match
+
+
+def test_statements_are_normalized():
+    # Act
+    normalized = normalize_statement("SELECT *\n  FROM players WHERE id IN (?, ?, ?) AND name = 'o''k' LIMIT 10")
+
+    # Assert
+    assert normalized == "SELECT * FROM players WHERE id IN (?) AND name = ? LIMIT ?"
+
+
+def test_a_query_per_row_is_reported_as_n_plus_one(seeded_db):
+    # Arrange
+    db = seeded_db
+
+    # Act
+    with QueryProfiler(n_plus_one_threshold=3) as profiler:
+        for player_id in range(1, 5):
+            db.query(Player).filter(Player.id == player_id).first()
+
+    # Assert
+    assert profiler.query_count == 4
+    [repeated] = profiler.n_plus_one()
+    assert repeated.count == 4
+    assert repeated.call_site.startswith("test_profiler.py:")
+    assert "N+1: 4x" in profiler.report()
+
+
+def test_query_budget_fails_when_exceeded(seeded_db, query_budget):
+    # Act / Assert
+    with pytest.raises(AssertionError, match="Query budget of 1 exceeded"):
+        with query_budget(1):
+            seeded_db.query(Player).all()
+            seeded_db.query(Hero).all()
+
+
+def test_match_recording_and_stats_do_not_query_per_row(seeded_db, query_budget):
+    # Arrange
+    db = seeded_db
+    record_match(db, "player1")
+    hero_id = db.query(Hero).order_by(Hero.id).first().id
+
+    # Act / Assert
+    # The rating rows are still read and written per participant, which is bounded by the four seats
+    with query_budget(75):
+        record_match(db, "player2")
+    for _ in range(5):
+        record_match(db, "player1")
+    with query_budget(6):
+        stats = calculate_hero_stats(db, hero_id)
+
+    assert stats.total_matches == 7
+    assert stats.total_wins == 6
+    assert stats.prestige_wins == 6
+
+
+def test_title_update_is_independent_of_the_player_count(seeded_db, query_budget):
+    # Arrange
+    db = seeded_db
+    db.add_all([Player(username=f"extra{index}") for index in range(50)])
+    db.commit()
+    record_match(db, "player1")
+
+    # Act
+    with query_budget(8):
+        update_title_for_all_players(db)
+
+    # Assert
+    overall = db.query(Title).filter_by(category="overall").one()
+    assert overall.player_id == 1
+    assert overall.default
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.database.replicas import configure_replicas, on_primary, read_only, record_write, set_current_user
+from app.match.models import Player
+from app.models import Base
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@read_only
+def count_players(db) -> int:
+    return db.query(Player).count()
+
+
+class Clock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def replica_engine(tmp_path, session_factory):
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def router(replica_engine, clock):
+    router = configure_replicas([replica_engine], max_lag_seconds=5, lag_check_seconds=0, clock=clock)
+    yield router
+    configure_replicas([])
+    set_current_user(None)
+
+
+@pytest.fixture
+def replicate(db, replica_engine):
+    """Copy the primary to the replica, as streaming replication would have by now"""
+    def copy():
+        primary = db.get_bind().raw_connection()
+        replica = replica_engine.raw_connection()
+        try:
+            primary.driver_connection.backup(replica.driver_connection)
+        finally:
+            replica.close()
+            primary.close()
+
+    return copy
+
+
+def add_player(db, index: int):
+    db.add(Player(user_id=index, username=f"player{index}"))
+    db.commit()
+
+
+def test_reads_go_to_a_replica_within_the_lag_limit(db, router, clock, replicate):
+    # Arrange
+    add_player(db, 1)
+    router.write_heartbeat(db)
+    replicate()
+    add_player(db, 2)
+
+    # Act
+    clock.now = NOW + timedelta(seconds=3)
+    on_replica = count_players(db)
+
+    # Assert
+    assert on_replica == 1
+    assert router.lag(router.replicas[0]) == timedelta(seconds=3)
+
+
+def test_a_lagging_replica_falls_back_to_the_primary(db, router, clock, replicate):
+    # Arrange
+    add_player(db, 1)
+    router.write_heartbeat(db)
+    replicate()
+    add_player(db, 2)
+
+    # Act
+    clock.now = NOW + timedelta(seconds=6)
+    result = count_players(db)
+
+    # Assert
+    assert result == 2
+
+
+def test_users_read_their_own_writes_until_the_replica_has_replayed_them(db, router, clock, replicate):
+    # Arrange
+    router.write_heartbeat(db)
+    replicate()
+    clock.now = NOW + timedelta(seconds=1)
+    add_player(db, 1)
+    set_current_user(1)
+    record_write(1)
+
+    # Act
+    own_before = count_players(db)
+    set_current_user(2)
+    other_before = count_players(db)
+    clock.now = NOW + timedelta(seconds=2)
+    router.write_heartbeat(db)
+    replicate()
+    set_current_user(1)
+    own_after = count_players(db)
+
+    # Assert
+    assert own_before == 1
+    assert other_before == 0
+    assert own_after == 1
+    assert router.choose(1) is router.replicas[0]
+
+
+def test_an_unavailable_replica_is_skipped(db, router, replica_engine):
+    # Arrange
+    add_player(db, 1)
+    Base.metadata.drop_all(replica_engine)
+
+    # Act
+    result = count_players(db)
+
+    # Assert
+    assert result == 1
+
+
+def test_reads_inside_writes_stay_on_the_primary(db, router, replicate):
+    # Arrange
+    router.write_heartbeat(db)
+    replicate()
+    add_player(db, 1)
+
+    # Act
+    with on_primary():
+        in_block = count_players(db)
+    db.add(Player(user_id=2, username="player2"))
+    with_pending_changes = count_players(db)
+
+    # Assert
+    assert in_block == 1
+    assert with_pending_changes == 2
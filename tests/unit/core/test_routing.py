@@ -0,0 +1,168 @@
+import pytest
+import telebot
+from telebot import types
+from telebot.custom_filters import StateFilter
+from telebot.handler_backends import ContinueHandling
+from telebot.states import State, StatesGroup
+
+from app.routing import data_equals, data_startswith, install_routing
+
+USER_ID = 7
+
+
+class FlowState(StatesGroup):
+    select = State()
+    confirm = State()
+
+
+def callback_update(data: str) -> types.Update:
+    return types.Update.de_json({
+        "update_id": 1,
+        "callback_query": {
+            "id": "1",
+            "from": {"id": USER_ID, "is_bot": False, "first_name": "Player"},
+            "chat_instance": "chat",
+            "data": data,
+            "message": {"message_id": 1, "date": 1700000000, "chat": {"id": USER_ID, "type": "private"}, "text": "menu"},
+        },
+    })
+
+
+def message_update(text: str) -> types.Update:
+    return types.Update.de_json({
+        "update_id": 1,
+        "message": {
+            "message_id": 2,
+            "date": 1700000000,
+            "chat": {"id": USER_ID, "type": "private"},
+            "from": {"id": USER_ID, "is_bot": False, "first_name": "Player"},
+            "text": text,
+        },
+    })
+
+
+def build_bot(calls: list) -> telebot.TeleBot:
+    bot = telebot.TeleBot("123456:TEST", threaded=False, use_class_middlewares=True)
+    bot.add_custom_filter(StateFilter(bot))
+
+    @bot.callback_query_handler(func=data_equals("confirm"), state=FlowState.confirm)
+    def confirm(call, data):
+        calls.append("confirm")
+
+    @bot.callback_query_handler(func=data_startswith("pick:special"))
+    def pick_special(call):
+        calls.append("pick_special")
+        return ContinueHandling()
+
+    @bot.callback_query_handler(func=data_startswith("pick:"), state=[FlowState.select, FlowState.confirm])
+    def pick(call, data):
+        calls.append(f"pick {call.data.split(':')[1]}")
+
+    @bot.callback_query_handler(func=lambda call: call.data.endswith("!"))
+    def shout(call):
+        calls.append("shout")
+
+    @bot.callback_query_handler(state=FlowState.select)
+    def any_in_select(call, data):
+        calls.append("any_in_select")
+
+    @bot.message_handler(commands=["start"])
+    def start(message, data):
+        calls.append("start")
+
+    @bot.message_handler(state=FlowState.select)
+    def select_text(message, data):
+        calls.append("select_text")
+
+    @bot.message_handler(state="*")
+    def any_state_text(message):
+        calls.append("any_state_text")
+
+    return bot
+
+
+CASES = [
+    (None, callback_update("confirm")),
+    (FlowState.confirm, callback_update("confirm")),
+    (None, callback_update("pick:red")),
+    (FlowState.select, callback_update("pick:red")),
+    (FlowState.select, callback_update("pick:special")),
+    (FlowState.select, callback_update("other!")),
+    (FlowState.select, callback_update("other")),
+    (None, message_update("/start")),
+    (FlowState.select, message_update("/start")),
+    (FlowState.select, message_update("hello")),
+    (FlowState.confirm, message_update("hello")),
+    (None, message_update("hello")),
+]
+
+
+@pytest.mark.parametrize("state, update", CASES)
+def test_routed_dispatch_runs_the_same_handlers_as_telebot(state, update):
+    # Arrange
+    linear_calls, routed_calls = [], []
+    linear, routed = build_bot(linear_calls), build_bot(routed_calls)
+    install_routing(routed)
+    for bot in (linear, routed):
+        if state is not None:
+            bot.set_state(USER_ID, state, USER_ID)
+
+    # Act
+    linear.process_new_updates([update])
+    routed.process_new_updates([update])
+
+    # Assert
+    assert routed_calls == linear_calls
+    assert len(routed.callback_query_handlers) == len(routed.message_handlers) == 1
+
+
+def test_shadowed_and_ambiguous_routes_are_reported():
+    # Arrange
+    bot = build_bot([])
+
+    @bot.callback_query_handler(func=data_equals("confirm"), state=FlowState.confirm)
+    def confirm_again(call):
+        pass
+
+    @bot.callback_query_handler(func=data_equals("pick:blue"), state=FlowState.select)
+    def pick_blue(call):
+        pass
+
+    @bot.callback_query_handler(func=data_equals("pick:green"))
+    def pick_green(call):
+        pass
+
+    @bot.message_handler(commands=["start"], state=FlowState.select)
+    def start_in_select(message):
+        pass
+
+    # Act
+    tables = install_routing(bot)
+
+    # Assert
+    found = [conflict for table in tables.values() for conflict in table.conflicts()]
+    conflicts = {
+        (conflict.kind, conflict.route.name.rsplit(".", 1)[1], conflict.earlier.name.rsplit(".", 1)[1])
+        for conflict in found
+    }
+    assert conflicts == {
+        ("shadowed", "confirm_again", "confirm"),
+        ("shadowed", "pick_blue", "pick"),
+        ("ambiguous", "pick_green", "pick"),
+        ("ambiguous", "pick_green", "any_in_select"),
+        ("shadowed", "start_in_select", "start"),
+    }
+    assert "confirm_again (data='confirm') is shadowed by" in str(found[0])
+
+
+def test_strict_routing_refuses_shadowed_routes():
+    # Arrange
+    bot = build_bot([])
+
+    @bot.callback_query_handler(func=data_startswith("pick:r"), state=FlowState.select)
+    def pick_red(call):
+        pass
+
+    # Act / Assert
+    with pytest.raises(ValueError, match="pick_red"):
+        install_routing(bot, strict=True)
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[3] / "src"
+
+# Runs in a fresh interpreter so module-level side effects are measured too
+STARTUP_SCRIPT = """
+import json, socket, time
+
+network_calls = []
+
+def blocked(*args, **kwargs):
+    network_calls.append(repr(args[:1]))
+    raise OSError("network disabled in startup test")
+
+socket.socket.connect = blocked
+socket.create_connection = blocked
+
+started = time.perf_counter()
+from app import main
+bot = main.build_bot("123456:TEST")
+elapsed = time.perf_counter() - started
+
+from app import logs
+from app.registry import registry
+print(json.dumps({
+    "elapsed": elapsed,
+    "network_calls": network_calls,
+    "handlers": len(bot.message_handlers) + len(bot.callback_query_handlers),
+    "scheduler_loaded": registry.is_loaded("public_message.scheduler"),
+    "google_sheets_loaded": registry.is_loaded("google_sheets.client"),
+    "logging_started": logs._listener is not None,
+    "report": main.startup.report(),
+}))
+"""
+
+
+def test_build_bot_is_fast_and_offline(tmp_path):
+    # Arrange
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(SRC_DIR)
+    env["BOT_TOKEN"] = "123456:TEST"
+    env["DATABASE_URL"] = f"sqlite:///{tmp_path / 'startup.db'}"
+
+    # Act
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, env=env, cwd=tmp_path, timeout=60
+    )
+
+    # Assert
+    assert result.returncode == 0, result.stderr
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    assert stats["network_calls"] == []
+    assert stats["handlers"] > 0
+    assert not stats["scheduler_loaded"]
+    assert not stats["google_sheets_loaded"]
+    assert not stats["logging_started"]
+    assert stats["elapsed"] < 1.0, stats["report"]
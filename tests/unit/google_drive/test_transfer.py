@@ -0,0 +1,189 @@
+import json
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.google_drive.transfer import CHUNK_ALIGNMENT, TransferManager
+
+
+class FakeDrive:
+    """In-memory stand-in for the parts of the Drive v3 API used by TransferManager"""
+
+    def __init__(self):
+        self.files: dict[str, dict] = {}
+        self.sessions: dict[str, dict] = {}
+        self.permissions: list[str] = []
+        self.list_calls = 0
+        self.fail_next_chunk = False
+        self.lock = threading.Lock()
+
+    def add_file(self, name: str, content: bytes, mime_type: str = "text/plain") -> str:
+        file_id = uuid.uuid4().hex
+        self.files[file_id] = {"id": file_id, "name": name, "mimeType": mime_type, "content": content}
+        return file_id
+
+
+def make_handler(drive: FakeDrive):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", headers: dict = None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, payload: dict):
+            self._send(status, json.dumps(payload).encode(), {"Content-Type": "application/json"})
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == "/drive/v3/files":
+                with drive.lock:
+                    drive.list_calls += 1
+                quoted = re.search(r"name = '((?:[^'\\]|\\.)*)'", params["q"][0]).group(1)
+                name = re.sub(r"\\(.)", r"\1", quoted)
+                files = [
+                    {key: file[key] for key in ("id", "name", "mimeType")}
+                    for file in drive.files.values()
+                    if file["name"] == name
+                ]
+                return self._json(200, {"files": files})
+            file_id = url.path.rsplit("/", 1)[1]
+            if file_id not in drive.files:
+                return self._json(404, {"error": "not found"})
+            self._send(200, drive.files[file_id]["content"])
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self._body()
+            if url.path == "/upload/drive/v3/files":
+                session_id = uuid.uuid4().hex
+                drive.sessions[session_id] = {
+                    "metadata": json.loads(body),
+                    "total": int(self.headers["X-Upload-Content-Length"]),
+                    "data": b"",
+                }
+                location = f"http://{self.headers['Host']}/upload/session/{session_id}"
+                return self._send(200, headers={"Location": location})
+            if url.path.endswith("/permissions"):
+                drive.permissions.append(url.path.split("/")[-2])
+                return self._json(200, {"id": "anyone"})
+            self._json(404, {})
+
+        def do_PUT(self):
+            session = drive.sessions[self.path.rsplit("/", 1)[1]]
+            chunk = self._body()
+            content_range = self.headers["Content-Range"]
+            if not content_range.startswith("bytes */"):
+                with drive.lock:
+                    fail, drive.fail_next_chunk = drive.fail_next_chunk, False
+                if fail:
+                    return self._json(503, {"error": "backend error"})
+                start = int(content_range.split(" ")[1].split("-")[0])
+                session["data"] = session["data"][:start] + chunk
+            received = len(session["data"])
+            if received < session["total"]:
+                headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+                return self._send(308, headers=headers)
+            file_id = drive.add_file(session["metadata"]["name"], session["data"])
+            self._json(200, {"id": file_id, "name": session["metadata"]["name"]})
+
+    return Handler
+
+
+@pytest.fixture
+def drive():
+    fake = FakeDrive()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(fake))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    fake.url = f"http://127.0.0.1:{server.server_port}"
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manager(drive):
+    return TransferManager(lambda: "token", base_url=drive.url, chunk_size=CHUNK_ALIGNMENT, max_workers=4)
+
+
+def test_download_many_fetches_files_concurrently(drive, manager, tmp_path):
+    # Arrange
+    files = [(drive.add_file(f"file{i}.txt", f"content {i}".encode()), f"file{i}.txt") for i in range(8)]
+
+    # Act
+    results = manager.download_many(files, str(tmp_path))
+
+    # Assert
+    assert all(result.ok for result in results)
+    assert [result.name for result in results] == [name for _, name in files]
+    assert (tmp_path / "file3.txt").read_bytes() == b"content 3"
+
+
+def test_upload_is_chunked_and_resumes_after_failure(drive, manager, tmp_path):
+    # Arrange
+    payload = bytes(range(256)) * 4096  # 1 MiB, four chunks
+    source = tmp_path / "export.bin"
+    source.write_bytes(payload)
+    drive.fail_next_chunk = True
+
+    # Act
+    result = manager.upload(str(source), folder_id="folder", public=True)
+
+    # Assert
+    assert result.ok, result.error
+    assert drive.files[result.file_id]["content"] == payload
+    assert drive.permissions == [result.file_id]
+
+
+def test_upload_many_uploads_every_file(drive, manager, tmp_path):
+    # Arrange
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"report{i}.csv"
+        path.write_text(f"row {i}")
+        paths.append(str(path))
+
+    # Act
+    results = manager.upload_many(paths)
+
+    # Assert
+    assert all(result.ok for result in results)
+    assert sorted(file["name"] for file in drive.files.values()) == [f"report{i}.csv" for i in range(5)]
+
+
+def test_id_lookups_are_cached(drive, manager):
+    # Arrange
+    folder_id = drive.add_file("exports", b"", mime_type="application/vnd.google-apps.folder")
+
+    # Act
+    first = manager.get_folder_id("exports")
+    second = manager.get_folder_id("exports")
+
+    # Assert
+    assert first == second == folder_id
+    assert drive.list_calls == 1
+
+
+def test_lookups_escape_quotes_and_backslashes(drive, manager):
+    # Arrange
+    file_id = drive.add_file("O'Brien\\notes.csv", b"data")
+
+    # Act
+    found = manager.get_file_id("O'Brien\\notes.csv")
+
+    # Assert
+    assert found == file_id
@@ -0,0 +1,88 @@
+import pytest
+
+from app.i18n.catalog import StringCatalog, catalog
+from app.i18n.models import StringOverride
+from app.i18n.service import load_string_overrides, set_string
+
+CONFIG = """
+strings:
+  en:
+    hello: Hello, {name}!
+    menu:
+      title: Menu
+      options:
+        - label: Back
+          value: back
+  ru:
+    hello: Привет, {name}!
+    menu:
+      title: Меню
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "greeting" / "config.yaml"
+    path.parent.mkdir()
+    path.write_text(CONFIG)
+    return path
+
+
+def test_strings_compile_to_frozen_tables(config_path):
+    # Arrange
+    strings = StringCatalog().strings(config_path)
+
+    # Act
+    english = strings["en"]
+
+    # Assert
+    assert english.hello.format(name="Ann") == "Hello, Ann!"
+    assert english["menu"].title == strings.en.menu["title"] == "Menu"
+    assert type(english.hello) is str
+    assert [option.label for option in english.menu.options] == ["Back"]
+    assert english.to_dict()["menu"]["options"] == [{"label": "Back", "value": "back"}]
+    with pytest.raises(KeyError):
+        english["missing"]
+    with pytest.raises(AttributeError):
+        english.missing
+    with pytest.raises(TypeError):
+        english.hello = "Hi"
+
+
+def test_override_is_live_without_rewriting_the_file(config_path):
+    # Arrange
+    strings_catalog = StringCatalog()
+    strings = strings_catalog.strings(config_path)
+    before = strings["ru"]
+
+    # Act
+    strings_catalog.override("greeting", "ru", "menu.title", "Главное меню")
+    edited = strings["ru"].menu.title
+    strings_catalog.override("greeting", "ru", "menu.title", None)
+
+    # Assert
+    assert edited == "Главное меню"
+    assert strings["ru"].menu.title == before.menu.title == "Меню"
+    assert config_path.read_text() == CONFIG
+
+
+def test_edited_strings_are_stored_and_reloaded(db, config_path):
+    # Arrange
+    strings = catalog.strings(config_path)
+
+    # Act
+    set_string(db, "greeting", "en", "hello", "Welcome, {name}")
+    edited = strings.en.hello
+    catalog.load_overrides([])
+    reset = strings.en.hello
+    loaded = load_string_overrides(db)
+
+    # Assert
+    assert edited == "Welcome, {name}"
+    assert reset == "Hello, {name}!"
+    assert loaded == 1
+    assert strings.en.hello == "Welcome, {name}"
+    assert db.query(StringOverride).one().key == "hello"
+    set_string(db, "greeting", "en", "hello", None)
+    assert strings.en.hello == "Hello, {name}!"
+    assert db.query(StringOverride).count() == 0
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from app.jobs.models import Job, JobStatusEnum
+from app.jobs.service import enqueue_job
+from app.jobs.worker import JobWorker
+
+
+def test_enqueue_is_idempotent(session_factory):
+    # Arrange
+    db = session_factory()
+
+    # Act
+    first, first_created = enqueue_job(db, "match.confirm", {"chat_id": 1}, "match.confirm:1:10")
+    second, second_created = enqueue_job(db, "match.confirm", {"chat_id": 1}, "match.confirm:1:10")
+
+    # Assert
+    assert first_created and not second_created
+    assert first.id == second.id
+    assert db.query(Job).count() == 1
+
+
+def test_worker_runs_job_and_records_latency(session_factory):
+    # Arrange
+    db = session_factory()
+    worker = JobWorker(session_factory)
+    seen = []
+    worker.register("test.echo", lambda session, job, payload: seen.append(payload["value"]))
+    enqueue_job(db, "test.echo", {"value": 42}, "echo-1")
+
+    # Act
+    processed = worker.run_pending(db)
+
+    # Assert
+    assert processed == 1
+    assert seen == [42]
+    assert db.query(Job).one().status == JobStatusEnum.done
+    assert worker.latency.summary()["test.echo"]["count"] == 1
+
+
+def test_failed_job_is_retried_then_reported(session_factory):
+    # Arrange
+    db = session_factory()
+    worker = JobWorker(session_factory)
+    failures = []
+
+    def broken(session, job, payload):
+        raise RuntimeError("database is down")
+
+    worker.register("test.broken", broken, on_failure=lambda session, job, payload, error: failures.append(job.id))
+    job, _ = enqueue_job(db, "test.broken", {}, "broken-1")
+
+    # Act
+    attempts = 0
+    while job.status != JobStatusEnum.failed and attempts < 10:
+        worker.run_pending(db)
+        job.run_after = datetime.utcnow()  # skip the retry delay
+        db.commit()
+        attempts += 1
+
+    # Assert
+    assert job.attempts == 3
+    assert job.last_error == "database is down"
+    assert failures == [job.id]
+
+
+def test_workers_run_only_the_kinds_registered_with_them(session_factory):
+    # Arrange
+    db = session_factory()
+    matches = JobWorker(session_factory)
+    broadcasts = JobWorker(session_factory, name="broadcast-worker")
+    seen = []
+    matches.register("test.match", lambda session, job, payload: seen.append("match"))
+    broadcasts.register("test.broadcast", lambda session, job, payload: seen.append("broadcast"))
+    enqueue_job(db, "test.broadcast", {}, "broadcast-1")
+    enqueue_job(db, "test.match", {}, "match-1")
+
+    # Act
+    processed = matches.run_pending(db)
+
+    # Assert
+    assert processed == 1
+    assert seen == ["match"]
+    assert db.query(Job).filter_by(kind="test.broadcast").one().status == JobStatusEnum.pending
@@ -0,0 +1,103 @@
+import io
+import random
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageOps
+
+from app.match.fingerprint import (
+    HashIndex,
+    ScreenshotIndex,
+    dhash,
+    hamming_distance,
+    load_screenshot_index,
+    save_screenshot_hash,
+)
+from app.match.models import Match, WinTypeEnum
+
+SCREENSHOT = Path(__file__).resolve().parents[2] / "functional" / "assets" / "match.webp"
+
+
+def encode(image: Image.Image, image_format: str = "JPEG", **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **kwargs)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def screenshot() -> Image.Image:
+    with Image.open(SCREENSHOT) as image:
+        return image.convert("RGB")
+
+
+def test_recompressed_screenshot_is_near_duplicate(screenshot):
+    # Arrange
+    original = dhash(SCREENSHOT.read_bytes())
+    thumbnail = screenshot.resize((480, 270))
+
+    # Act
+    recompressed = dhash(encode(thumbnail, quality=40))
+    different = dhash(encode(ImageOps.mirror(screenshot)))
+
+    # Assert
+    assert hamming_distance(original, recompressed) <= 6
+    assert hamming_distance(original, different) > 6
+
+
+def test_hash_index_search_matches_brute_force():
+    # Arrange
+    rng = random.Random(42)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    for item in range(50):
+        hashes.append(hashes[item] ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)))
+    index = HashIndex(max_distance=8)
+    for item, value in enumerate(hashes):
+        index.add(item, value)
+    query = hashes[100] ^ 0b1011  # three bits away from an indexed hash
+
+    # Act
+    found = index.search(query)
+
+    # Assert
+    expected = sorted(
+        (hamming_distance(query, value), item) for item, value in enumerate(hashes)
+        if hamming_distance(query, value) <= 8
+    )
+    assert found == expected
+    assert found[0] == (3, 100)
+
+
+def test_index_lookup_is_sub_millisecond():
+    # Arrange
+    rng = random.Random(7)
+    index = ScreenshotIndex(max_distance=6)
+    for match_id in range(20000):
+        index.add(match_id, rng.getrandbits(64))
+    queries = [rng.getrandbits(64) for _ in range(200)]
+
+    # Act
+    started = time.perf_counter()
+    for query in queries:
+        index.find_duplicates(query)
+    per_lookup = (time.perf_counter() - started) / len(queries)
+
+    # Assert
+    assert per_lookup < 0.001
+
+
+def test_index_is_persisted_and_reloaded(db):
+    # Arrange
+    match = Match(win_type=WinTypeEnum.prestige, screenshot="file-id")
+    db.add(match)
+    db.commit()
+    value = dhash(SCREENSHOT.read_bytes())
+
+    # Act
+    save_screenshot_hash(db, match.id, value, "unique-id")
+    index = load_screenshot_index(db)
+
+    # Assert
+    assert index.find_duplicates(value ^ 1) == [match.id]
+    index.remove(match.id)
+    assert index.find_duplicates(value) == []
@@ -0,0 +1,35 @@
+from app.jobs.service import enqueue_job, get_payload, save_payload
+from app.match.models import Hero, Match, MatchParticipant
+from app.match.schemas import MatchCreate, ParticipantCreate
+from app.match.service import add_match
+from app.rating.seasons import get_active_season
+
+
+def match_data(db):
+    hero_ids = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(3).all()]
+    participants = [
+        ParticipantCreate(username=f"player{index}", hero_id=hero_id) for index, hero_id in enumerate(hero_ids, 1)
+    ]
+    return MatchCreate(screenshot="file-id", win_type="prestige", participants=participants, winner_username="player1")
+
+
+def test_an_added_match_is_committed_with_the_job_payload(seeded_db):
+    # Arrange
+    db = seeded_db
+    get_active_season(db)
+    job, _ = enqueue_job(db, "confirm_match", {}, "match-1")
+
+    # Act
+    add_match(db, match_data(db))
+    # A job that fails before its payload is saved leaves no match behind
+    db.rollback()
+    lost = db.query(Match).count()
+    match = add_match(db, match_data(db))
+    save_payload(db, job, {"match_id": match.id})
+    db.expire_all()
+
+    # Assert
+    assert lost == 0
+    assert db.query(Match).count() == 1
+    assert db.query(MatchParticipant).filter_by(match_id=match.id).count() == 3
+    assert get_payload(job) == {"match_id": match.id}
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+
+from app.match.models import Hero, Match, MatchParticipant
+from app.matchhistory.service import (
+    HERO,
+    NEWER,
+    OLDER,
+    PLAYER,
+    SEASON,
+    Cursor,
+    _scope_query,
+    backfill_participant_timestamps,
+    read_history_page,
+)
+from app.rating.checkpoints import before_position
+from app.rating.seasons import get_active_season
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def add_matches(db, count, players=(1, 2, 3, 4), with_timestamps=True):
+    """Add ``count`` matches a minute apart, all won by the first player, with the same heroes"""
+    season_id = get_active_season(db).id
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(len(players)).all()]
+    matches = []
+    for index in range(count):
+        match = Match(season_id=season_id, timestamp=START + timedelta(minutes=index), screenshot="file-id",
+                      win_type="prestige")
+        db.add(match)
+        db.flush()
+        for seat, (player_id, hero_id) in enumerate(zip(players, heroes)):
+            db.add(MatchParticipant(
+                match_id=match.id, player_id=player_id, hero_id=hero_id, is_winner=seat == 0,
+                win_type="prestige" if seat == 0 else None,
+                timestamp=match.timestamp if with_timestamps else None,
+            ))
+        matches.append(match.id)
+    db.commit()
+    return matches
+
+
+def test_pages_walk_the_history_in_both_directions(seeded_db):
+    # Arrange
+    db = seeded_db
+    matches = add_matches(db, 25)
+
+    # Act
+    first = read_history_page(db, PLAYER, 2, limit=10)
+    second = read_history_page(db, PLAYER, 2, first.older, OLDER, limit=10)
+    last = read_history_page(db, PLAYER, 2, second.older, OLDER, limit=10)
+    back = read_history_page(db, PLAYER, 2, last.newer, NEWER, limit=10)
+    front = read_history_page(db, PLAYER, 2, back.newer, NEWER, limit=10)
+
+    # Assert
+    newest_first = matches[::-1]
+    assert [entry.match_id for entry in first.entries] == newest_first[:10]
+    assert [entry.match_id for entry in second.entries] == newest_first[10:20]
+    assert [entry.match_id for entry in last.entries] == newest_first[20:]
+    assert (first.newer, last.older) == (None, None)
+    assert back.entries == second.entries and back.older is not None
+    assert front.entries == first.entries and front.newer is None
+    assert (first.entries[0].hero, first.entries[0].is_winner) == ("River", False)
+
+
+def test_hero_and_season_pages(seeded_db):
+    # Arrange
+    db = seeded_db
+    add_matches(db, 3)
+    hero = db.query(Hero).order_by(Hero.id).first()
+    season_id = get_active_season(db).id
+
+    # Act
+    hero_page = read_history_page(db, HERO, hero.id, limit=2)
+    season_page = read_history_page(db, SEASON, season_id, limit=5)
+
+    # Assert
+    assert [(entry.username, entry.is_winner) for entry in hero_page.entries] == [("player1", True)] * 2
+    assert hero_page.older is not None
+    assert [(entry.username, entry.hero, entry.win_type) for entry in season_page.entries] == [
+        ("player1", hero.name, "prestige")
+    ] * 3
+    assert season_page.older is None
+
+
+def test_a_deep_page_is_one_index_range_scan(seeded_db, query_budget):
+    # Arrange
+    db = seeded_db
+    add_matches(db, 30)
+    cursor = read_history_page(db, PLAYER, 1, limit=25).older
+    statement, timestamp_column, id_column = _scope_query(PLAYER, 1)
+    statement = statement.where(before_position(timestamp_column, id_column, cursor.timestamp, cursor.match_id))
+    statement = statement.order_by(timestamp_column.desc(), id_column.desc()).limit(11)
+    compiled = statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+
+    # Act
+    with query_budget(1):
+        page = read_history_page(db, PLAYER, 1, cursor, OLDER, limit=10)
+    plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+
+    # Assert
+    assert len(page.entries) == 5
+    assert "ix_match_participants_player_time" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_cursors_survive_callback_data(seeded_db):
+    # Arrange
+    cursor = Cursor(datetime(2024, 5, 1, 12, 30, 15, 123456), 987654)
+
+    # Act
+    encoded = cursor.encode()
+
+    # Assert
+    assert Cursor.decode(encoded) == cursor
+    assert len(f"history:p:1234567:o:{encoded}") <= 64
+
+
+def test_participants_of_old_matches_get_their_timestamp(seeded_db):
+    # Arrange
+    db = seeded_db
+    matches = add_matches(db, 2, with_timestamps=False)
+
+    # Act
+    before = read_history_page(db, PLAYER, 1).entries
+    updated = backfill_participant_timestamps(db)
+    after = read_history_page(db, PLAYER, 1).entries
+
+    # Assert
+    assert before == []
+    assert updated == 8
+    assert [entry.match_id for entry in after] == matches[::-1]
+
+
+def test_a_season_match_with_two_winners_is_listed_once(seeded_db):
+    # Arrange
+    db = seeded_db
+    matches = add_matches(db, 2)
+    db.query(MatchParticipant).filter_by(match_id=matches[0], player_id=2).update({"is_winner": True})
+    db.commit()
+
+    # Act
+    page = read_history_page(db, SEASON, get_active_season(db).id, limit=5)
+
+    # Assert
+    assert [(entry.match_id, entry.username) for entry in page.entries] == [
+        (matches[1], "player1"), (matches[0], "player1")
+    ]
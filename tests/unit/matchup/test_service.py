@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.match.models import Hero, Match, MatchParticipant
+from app.matchup.service import (
+    Matchups,
+    get_matchups,
+    invalidate_matchups,
+    read_matchups,
+    rebuild_matchups,
+)
+from app.rating.seasons import get_active_season
+from app.rating.service import revert_match_ratings, update_ratings_after_match
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    invalidate_matchups()
+    yield
+    invalidate_matchups()
+
+
+def play(db, minutes, winner, hero_offsets=(0, 1, 2, 3)):
+    """Add a match of players 1-4 on the heroes at ``hero_offsets``, won by the seat ``winner``, and apply it"""
+    get_active_season(db)
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id)]
+    match = Match(timestamp=START + timedelta(minutes=minutes), screenshot="file-id", win_type="prestige")
+    db.add(match)
+    db.flush()
+    for seat, offset in enumerate(hero_offsets):
+        db.add(MatchParticipant(
+            match_id=match.id, player_id=seat + 1, hero_id=heroes[offset],
+            is_winner=seat == winner, win_type="prestige" if seat == winner else None,
+        ))
+    db.commit()
+    update_ratings_after_match(db, match)
+    return match
+
+
+def test_matches_update_the_arrays(seeded_db):
+    # Arrange
+    db = seeded_db
+    first, second, third, fourth, fifth = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(5)]
+
+    # Act
+    play(db, 0, winner=0)
+    play(db, 1, winner=1, hero_offsets=(0, 4, 1, 2))
+    matchups = get_matchups(db)
+
+    # Assert
+    assert (matchups.games(first), matchups.hero_wins(first)) == (2, 1)
+    assert (matchups.appearances[first, second], matchups.wins[first, second]) == (2, 1)
+    assert (matchups.appearances[fifth, first], matchups.wins[fifth, first]) == (1, 1)
+    assert matchups.wins[second, first] == 0
+    assert [(matchup.hero_id, matchup.games, matchup.wins) for matchup in matchups.opponents(first)] == [
+        (fourth, 1, 1), (second, 2, 1), (third, 2, 1), (fifth, 1, 0)
+    ]
+
+
+def test_the_rebuild_gives_the_incremental_arrays(seeded_db):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=0)
+    reverted = play(db, 1, winner=2, hero_offsets=(5, 6, 7, 0))
+    play(db, 2, winner=3, hero_offsets=(3, 2, 1, 8))
+    revert_match_ratings(db, reverted.id)
+    incremental = read_matchups(db)
+
+    # Act
+    rebuilt = rebuild_matchups(db)
+
+    # Assert
+    size = max(incremental.size, rebuilt.size)
+    assert np.array_equal(incremental.grown(size).appearances, rebuilt.grown(size).appearances)
+    assert np.array_equal(incremental.grown(size).wins, rebuilt.grown(size).wins)
+    assert incremental.appearances.sum() == 2 * 16
+
+
+def test_the_arrays_are_served_from_memory_until_a_match(seeded_db, query_budget):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=0)
+    hero_id = db.query(Hero).order_by(Hero.id).first().id
+    get_matchups(db)
+
+    # Act
+    with query_budget(0):
+        cached = get_matchups(db)
+    play(db, 1, winner=0)
+    refreshed = get_matchups(db)
+
+    # Assert
+    assert cached.games(hero_id) == 1
+    assert refreshed.games(hero_id) == 2
+
+
+def test_arrays_are_stored_compactly():
+    # Arrange
+    rng = np.random.default_rng(0)
+    matchups = Matchups(rng.integers(0, 1000, size=(25, 25), dtype=np.int32),
+                        rng.integers(0, 500, size=(25, 25), dtype=np.int32))
+
+    # Act
+    data = matchups.encode()
+    decoded = Matchups.decode(25, data)
+
+    # Assert
+    assert len(data) <= 2 * 25 * 25 * 4
+    assert np.array_equal(decoded.appearances, matchups.appearances)
+    assert np.array_equal(decoded.wins, matchups.wins)
@@ -0,0 +1,86 @@
+import urllib.request
+
+import pytest
+import telebot
+from sqlalchemy import create_engine, text
+from telebot import types
+
+from app.metrics.collector import metrics
+from app.metrics.instrumentation import handler_name, instrument_bot, instrument_database
+from app.metrics.server import start_metrics_server
+from app.middleware.metrics import MetricsMiddleware
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def message_update(text_value):
+    return types.Update.de_json({
+        "update_id": 1,
+        "message": {
+            "message_id": 1, "date": 0, "text": text_value,
+            "chat": {"id": 5, "type": "private"}, "from": {"id": 5, "is_bot": False, "first_name": "A"},
+        },
+    })
+
+
+def test_histogram_renders_cumulative_buckets():
+    # Arrange
+    histogram = metrics.histogram("demo_seconds", "Demo", ("kind",), buckets=[0.1, 1])
+
+    # Act
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, "a")
+    rendered = metrics.render()
+
+    # Assert
+    assert '# TYPE demo_seconds histogram' in rendered
+    assert 'demo_seconds_bucket{kind="a",le="0.1"} 1' in rendered
+    assert 'demo_seconds_bucket{kind="a",le="1"} 3' in rendered
+    assert 'demo_seconds_bucket{kind="a",le="+Inf"} 4' in rendered
+    assert 'demo_seconds_count{kind="a"} 4' in rendered
+    assert histogram.quantile(0.5, "a") == 1
+
+
+def test_handlers_are_timed_with_their_queries(tmp_path):
+    # Arrange
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    bot = telebot.TeleBot("123456:TEST", threaded=False, use_class_middlewares=True)
+    bot.setup_middleware(MetricsMiddleware(bot))
+
+    @bot.message_handler(commands=["count"])
+    def count_handler(message):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+
+    instrument_bot(bot)
+    instrument_database()
+
+    # Act
+    bot.process_new_updates([message_update("/count")])
+
+    # Assert
+    assert metrics.get("bot_handler_seconds").count(handler_name(count_handler)) == 1
+    assert metrics.get("bot_update_seconds").count("Message") == 1
+    assert metrics.get("bot_update_queries").sum("Message") == 2
+    engine.dispose()
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    # Arrange
+    metrics.counter("demo_total", "Demo").inc(amount=3)
+    server = start_metrics_server(host="127.0.0.1", port=0)
+
+    # Act
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+        body = response.read().decode()
+
+    # Assert
+    server.shutdown()
+    server.server_close()
+    assert "demo_total 3" in body
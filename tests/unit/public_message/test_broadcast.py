@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+from telebot.apihelper import ApiTelegramException
+
+from app.auth.models import User
+from app.jobs.models import Job, JobStatusEnum
+from app.jobs.worker import JobWorker
+from app.public_message.models import Broadcast, BroadcastStatusEnum
+from app.public_message.service import (
+    BROADCAST_JOB,
+    RateLimiter,
+    cancel_broadcast,
+    create_broadcast,
+    run_broadcast,
+)
+
+
+class FakeBot:
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        if chat_id in self.blocked:
+            raise ApiTelegramException(
+                "sendMessage", None, {"error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+            )
+        self.sent.append(chat_id)
+
+
+def add_users(db, count):
+    db.add_all([User(id=index, username=f"user{index}") for index in range(1, count + 1)])
+    db.commit()
+
+
+def test_broadcast_streams_every_user_once_with_statistics(db):
+    # Arrange
+    add_users(db, 120)
+    bot = FakeBot(blocked={7, 8})
+    broadcast = create_broadcast(db, 1, "text", "News", None, datetime.utcnow())
+
+    # Act
+    continue_at = run_broadcast(bot, db, broadcast.id, RateLimiter(0))
+
+    # Assert
+    db.refresh(broadcast)
+    assert continue_at is None
+    assert bot.sent == [user_id for user_id in range(1, 121) if user_id not in (7, 8)]
+    assert (broadcast.status, broadcast.total, broadcast.sent, broadcast.blocked) == (
+        BroadcastStatusEnum.done, 120, 118, 2
+    )
+    assert db.query(Job).filter_by(kind=BROADCAST_JOB).count() == 1
+
+
+def test_broadcast_resumes_from_its_checkpoint(session_factory):
+    # Arrange
+    db = session_factory()
+    add_users(db, 120)
+    bot = FakeBot()
+    broadcast = create_broadcast(db, 1, "text", "News", None, datetime.utcnow())
+    worker = JobWorker(session_factory)
+    worker.register(BROADCAST_JOB, lambda session, job, payload: run_broadcast(
+        bot, session, payload["broadcast_id"], RateLimiter(0), slice_seconds=0
+    ))
+
+    # Act: every slice ends at the first checkpoint and puts the job back in the queue
+    slices = 0
+    while db.query(Job.status).scalar() != JobStatusEnum.done and slices < 10:
+        slices += worker.run_pending(db)
+        db.expire_all()
+
+    # Assert
+    assert slices == 3
+    assert bot.sent == list(range(1, 121))
+    assert db.get(Broadcast, broadcast.id).status == BroadcastStatusEnum.done
+
+
+def test_cancel_stops_a_running_broadcast_at_the_next_checkpoint(session_factory):
+    # Arrange
+    db = session_factory()
+    add_users(db, 120)
+    broadcast = create_broadcast(db, 1, "text", "News", None, datetime.utcnow() + timedelta(hours=1))
+    other_session = session_factory()
+
+    class CancellingBot(FakeBot):
+        def send_message(self, chat_id, text):
+            super().send_message(chat_id, text)
+            if chat_id == 10:
+                cancel_broadcast(other_session, broadcast.id)
+
+    bot = CancellingBot()
+
+    # Act
+    cancelled = run_broadcast(bot, db, broadcast.id, RateLimiter(0))
+    cancelled_again = cancel_broadcast(other_session, broadcast.id)
+
+    # Assert
+    assert cancelled is None
+    assert len(bot.sent) == 50
+    assert db.get(Broadcast, broadcast.id).status == BroadcastStatusEnum.cancelled
+    assert not cancelled_again
+
+
+def test_rate_limiter_spaces_calls():
+    # Arrange
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(20, clock=lambda: now[0], sleep=sleep)
+
+    # Act
+    for _ in range(3):
+        limiter.wait()
+
+    # Assert
+    assert sleeps == [0.05, 0.05]
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.match.models import Hero, Match, MatchParticipant
+from app.rating import checkpoints
+from app.rating.checkpoints import RATING_MODELS, ROW_KEYS, ratings_as_of, replay_ratings_from, top_players_as_of
+from app.rating.models import RatingCheckpoint
+from app.rating.service import rebuild_all_ratings
+
+START = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def history(seeded_db, monkeypatch):
+    """Twelve matches, one per day, with checkpoints every five matches"""
+    monkeypatch.setattr(checkpoints.config.checkpoints, "interval", 5)
+    db = seeded_db
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).all()]
+    for index in range(12):
+        match = Match(timestamp=START + timedelta(days=index), screenshot="file-id", win_type="prestige")
+        db.add(match)
+        db.flush()
+        winner = index % 4
+        for seat in range(4):
+            db.add(MatchParticipant(
+                match_id=match.id, player_id=seat + 1, hero_id=heroes[(index + seat * 5) % len(heroes)],
+                is_winner=seat == winner, win_type="prestige" if seat == winner else None,
+            ))
+    db.commit()
+    rebuild_all_ratings(db)
+    return db
+
+
+def table_state(tables):
+    """Comparable form of ``{table: [row, ...]}``, ignoring untouched rows"""
+    return {
+        name: sorted(
+            tuple(sorted(row.items())) for row in rows if row.get("wins") or row.get("losses")
+        )
+        for name, rows in tables.items()
+    }
+
+
+def stored_state(db):
+    tables = {}
+    for model in RATING_MODELS:
+        columns = [column.name for column in model.__table__.columns if column.name != "id"]
+        tables[model.__tablename__] = [
+            {column: getattr(row, column) for column in columns} for row in db.query(model).all()
+        ]
+    return table_state(tables)
+
+
+def test_rebuild_stores_periodic_checkpoints(history):
+    assert [cp.matches_processed for cp in history.query(RatingCheckpoint).order_by(RatingCheckpoint.id)] == [5, 10]
+
+
+def test_replay_from_checkpoint_matches_full_rebuild(history):
+    # Arrange
+    db = history
+    match = db.query(Match).order_by(Match.timestamp).offset(7).first()
+    for participant in match.participants:
+        participant.is_winner = not participant.is_winner
+        participant.win_type = "murder" if participant.is_winner else None
+    db.commit()
+
+    # Act
+    stats = replay_ratings_from(db, match.timestamp, match.id)
+    replayed = stored_state(db)
+    rebuild_all_ratings(db)
+
+    # Assert
+    assert stats["matches_replayed"] == 7
+    assert replayed == stored_state(db)
+
+
+def test_ratings_as_of_date_matches_truncated_history(history):
+    # Arrange
+    db = history
+    when = START + timedelta(days=7, hours=1)
+
+    # Act
+    as_of = table_state(ratings_as_of(db, when))
+    for match in db.query(Match).filter(Match.timestamp > when).all():
+        db.delete(match)
+    db.commit()
+    rebuild_all_ratings(db)
+
+    # Assert
+    assert set(as_of) == set(ROW_KEYS)
+    assert as_of == stored_state(db)
+
+
+def test_a_failed_recompute_keeps_no_new_checkpoints(history, monkeypatch):
+    # Arrange
+    db = history
+    db.query(RatingCheckpoint).delete()
+    db.commit()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr("app.rating.batch.restore_tables", fail)
+
+    # Act
+    with pytest.raises(RuntimeError):
+        rebuild_all_ratings(db)
+    db.rollback()
+
+    # Assert
+    assert db.query(RatingCheckpoint).count() == 0
+
+
+def test_top_players_as_of_a_date(history):
+    # Arrange
+    db = history
+
+    # Act
+    top = top_players_as_of(db, START + timedelta(days=1, hours=1), limit=3)
+
+    # Assert
+    assert top == [("player1", 3), ("player2", 3), ("player3", -2)]
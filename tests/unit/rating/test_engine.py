@@ -0,0 +1,122 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.match.models import Hero, Match, MatchParticipant
+from app.rating import batch
+from app.rating.checkpoints import RATING_MODELS
+from app.rating.engine import EloEngine, PointsEngine
+from app.rating.models import MatchRatingDelta, RatingCheckpoint
+from app.rating.service import update_ratings_after_match
+
+START = datetime(2025, 1, 1, 12, 0)
+
+
+def random_history(db, matches=40, seed=7):
+    rng = random.Random(seed)
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).all()]
+    for index in range(matches):
+        match = Match(timestamp=START + timedelta(hours=index), screenshot="file-id", win_type="prestige")
+        db.add(match)
+        db.flush()
+        seats = rng.sample([1, 2, 3, 4], rng.choice([2, 3, 4]))
+        winner = rng.choice(seats)
+        win_type = rng.choice(["prestige", "murder", "decay", "stones"])
+        for player_id in seats:
+            db.add(MatchParticipant(
+                match_id=match.id, player_id=player_id, hero_id=rng.choice(heroes),
+                is_winner=player_id == winner, win_type=win_type if player_id == winner else None,
+            ))
+    db.commit()
+
+
+def stored_state(db):
+    state = {}
+    for model in RATING_MODELS + [MatchRatingDelta]:
+        columns = [column.name for column in model.__table__.columns if column.name != "id"]
+        state[model.__tablename__] = sorted(
+            tuple(str(getattr(row, column)) for column in columns) for row in db.query(model).all()
+        )
+    return state
+
+
+@pytest.mark.parametrize("engine", [PointsEngine(), EloEngine()], ids=["points", "elo"])
+def test_batch_recompute_matches_sequential_updates(seeded_db, monkeypatch, engine):
+    # Arrange
+    db = seeded_db
+    monkeypatch.setattr("app.rating.service.get_engine", lambda: engine)
+    random_history(db)
+    for match in db.query(Match).order_by(Match.timestamp, Match.id).all():
+        update_ratings_after_match(db, match)
+    sequential = stored_state(db)
+
+    # Act
+    stats = batch.recompute_ratings(db, engine=engine)
+
+    # Assert
+    assert stats["matches_replayed"] == 40
+    assert stored_state(db) == sequential
+
+
+def test_batch_recompute_stores_checkpoints(seeded_db, monkeypatch):
+    # Arrange
+    db = seeded_db
+    monkeypatch.setattr(batch.checkpoints.config.checkpoints, "interval", 15)
+    random_history(db)
+
+    # Act
+    batch.recompute_ratings(db, engine=PointsEngine())
+
+    # Assert
+    assert [cp.matches_processed for cp in db.query(RatingCheckpoint).order_by(RatingCheckpoint.id)] == [15, 30]
+
+
+def test_a_long_recompute_stores_a_few_spaced_checkpoints(seeded_db, monkeypatch):
+    # Arrange
+    db = seeded_db
+    monkeypatch.setattr(batch.checkpoints.config.checkpoints, "interval", 5)
+    monkeypatch.setattr(batch.checkpoints.config.checkpoints, "recompute_limit", 2)
+    random_history(db)
+
+    # Act
+    batch.recompute_ratings(db, engine=PointsEngine())
+
+    # Assert
+    assert [cp.matches_processed for cp in db.query(RatingCheckpoint).order_by(RatingCheckpoint.id)] == [20, 40]
+
+
+def test_elo_favours_the_underdog():
+    engine = EloEngine(k_factor=32)
+
+    # Equal ratings: the winner takes what the others lose
+    even = engine.match_deltas([0, 0, 0, 0], [True, False, False, False])
+    # An upset is worth more than beating weaker players
+    upset = engine.match_deltas([0, 200, 200, 200], [True, False, False, False])
+    expected = engine.match_deltas([200, 0, 0, 0], [True, False, False, False])
+
+    assert even[0] == 16 and even[1:] == [-5, -5, -5]
+    assert upset[0] > even[0] > expected[0] > 0
+
+
+def test_elo_history_of_100k_matches_is_fast():
+    # Arrange
+    rng = np.random.default_rng(1)
+    matches, players = 100_000, 500
+    seats = np.ones((matches, 4), dtype=bool)
+    # Four distinct players per match
+    steps = rng.integers(1, players // 4, (matches, 1))
+    lineups = (rng.integers(0, players, (matches, 1)) + np.arange(4) * steps) % players
+    winners = np.zeros((matches, 4), dtype=bool)
+    winners[np.arange(matches), rng.integers(0, 4, matches)] = True
+
+    # Act
+    started = time.perf_counter()
+    deltas = EloEngine().history_deltas(lineups, winners, seats, np.zeros(players))
+    elapsed = time.perf_counter() - started
+
+    # Assert
+    assert deltas.shape == (matches, 4)
+    assert elapsed < 10
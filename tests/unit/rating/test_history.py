@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+
+from app.match.models import Hero, Match, MatchParticipant
+from app.rating.history import backfill_history_seasons, read_rating_peak, read_rating_trend, sparkline
+from app.rating.models import PlayerOverallRating, RatingHistory, RatingHistoryDaily
+from app.rating.seasons import close_season, get_active_season
+from app.rating.service import rebuild_all_ratings, revert_match_ratings, update_ratings_after_match
+
+
+def play(db, timestamp, winner, players=(1, 2, 3, 4)):
+    """Add a match of the active season won by ``winner`` and apply its ratings"""
+    season_id = get_active_season(db).id
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(len(players)).all()]
+    match = Match(season_id=season_id, timestamp=timestamp, screenshot="file-id", win_type="prestige")
+    db.add(match)
+    db.flush()
+    for player_id, hero_id in zip(players, heroes):
+        db.add(MatchParticipant(
+            match_id=match.id, player_id=player_id, hero_id=hero_id,
+            is_winner=player_id == winner, win_type="prestige" if player_id == winner else None,
+        ))
+    db.commit()
+    update_ratings_after_match(db, match)
+    return match
+
+
+def history_of(db, player_id):
+    return [
+        (row.match_id, row.rating, row.delta)
+        for row in db.query(RatingHistory).filter_by(player_id=player_id).order_by(RatingHistory.timestamp)
+    ]
+
+
+def daily_of(db, player_id):
+    return [
+        (row.day, row.open_rating, row.close_rating, row.min_rating, row.max_rating, row.matches)
+        for row in db.query(RatingHistoryDaily).filter_by(player_id=player_id).order_by(RatingHistoryDaily.day)
+    ]
+
+
+def test_history_and_daily_rows_follow_the_overall_rating(seeded_db):
+    # Arrange
+    db = seeded_db
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    # Act
+    play(db, today - timedelta(days=1, hours=2), winner=1)
+    play(db, today - timedelta(days=1), winner=2)
+    play(db, today, winner=1)
+
+    # Assert
+    assert history_of(db, 1)[-1][1] == db.query(PlayerOverallRating).filter_by(player_id=1).one().rating
+    assert [rating for _, rating, _ in history_of(db, 1)] == [4, 3, 7]
+    assert daily_of(db, 1) == [
+        ((today - timedelta(days=1)).date(), 0, 3, 3, 4, 2),
+        (today.date(), 3, 7, 7, 7, 1),
+    ]
+
+
+def test_rebuild_writes_the_same_history_as_live_updates(seeded_db):
+    # Arrange
+    db = seeded_db
+    start = datetime(2025, 3, 1, 10, 0)
+    for index in range(9):
+        play(db, start + timedelta(hours=7 * index), winner=index % 3 + 1)
+    live = {player_id: (history_of(db, player_id), daily_of(db, player_id)) for player_id in range(1, 5)}
+
+    # Act
+    rebuild_all_ratings(db)
+
+    # Assert
+    assert {player_id: (history_of(db, player_id), daily_of(db, player_id)) for player_id in range(1, 5)} == live
+
+
+def test_revert_shifts_later_history(seeded_db):
+    # Arrange
+    db = seeded_db
+    start = datetime(2025, 3, 1, 10, 0)
+    play(db, start, winner=1)
+    reverted = play(db, start + timedelta(hours=1), winner=1)
+    play(db, start + timedelta(days=1), winner=2)
+
+    # Act
+    revert_match_ratings(db, reverted.id)
+
+    # Assert
+    assert [rating for _, rating, _ in history_of(db, 1)] == [4, 3]
+    assert daily_of(db, 1) == [(start.date(), 0, 4, 4, 4, 1), ((start + timedelta(days=1)).date(), 4, 3, 3, 3, 1)]
+
+
+def test_revert_in_a_closed_season_leaves_later_seasons_alone(seeded_db):
+    # Arrange
+    db = seeded_db
+    start = datetime(2025, 3, 1, 10, 0)
+    reverted = play(db, start, winner=1)
+    play(db, start + timedelta(hours=1), winner=1)
+    close_season(db)
+    play(db, start + timedelta(hours=2), winner=2)
+
+    # Act
+    revert_match_ratings(db, reverted.id)
+
+    # Assert
+    assert [rating for _, rating, _ in history_of(db, 1)] == [4, -1]
+    daily = db.query(RatingHistoryDaily).filter_by(player_id=1).order_by(RatingHistoryDaily.season_id)
+    assert [(row.season_id, row.close_rating) for row in daily] == [(reverted.season_id, 4), (reverted.season_id + 1, -1)]
+
+
+def test_backfill_moves_the_history_to_the_seasons_of_its_matches(seeded_db):
+    # Arrange
+    db = seeded_db
+    start = datetime(2025, 3, 1, 10, 0)
+    play(db, start, winner=1)
+    close_season(db)
+    later = play(db, start + timedelta(days=1), winner=2)
+    # History recorded before it was kept per season belongs to the first season
+    db.query(RatingHistory).update({"season_id": 1})
+    db.query(RatingHistoryDaily).update({"season_id": 1})
+    db.commit()
+
+    # Act
+    moved = backfill_history_seasons(db)
+
+    # Assert
+    assert moved == 4
+    assert {row.season_id for row in db.query(RatingHistory).filter_by(match_id=later.id)} == {later.season_id}
+    assert db.query(RatingHistoryDaily).filter_by(season_id=later.season_id).count() == 4
+
+
+def test_trend_and_peak_reads(seeded_db):
+    # Arrange
+    db = seeded_db
+    now = datetime.utcnow()
+    play(db, now - timedelta(days=60), winner=1)
+    play(db, now - timedelta(days=2), winner=1)
+    play(db, now - timedelta(days=1), winner=3)
+
+    # Act
+    trend = read_rating_trend(db, 1, days=30)
+    peak = read_rating_peak(db, 1)
+
+    # Assert
+    assert [(day.open_rating, day.close_rating) for day in trend] == [(4, 8), (8, 7)]
+    assert peak.rating == 8
+    assert peak.timestamp.date() == (now - timedelta(days=2)).date()
+    assert read_rating_peak(db, 99) is None
+
+
+def test_trend_and_peak_read_the_active_season(seeded_db):
+    # Arrange
+    db = seeded_db
+    now = datetime.utcnow()
+    play(db, now - timedelta(days=3), winner=1)
+    play(db, now - timedelta(days=3), winner=1)
+    close_season(db)
+    play(db, now - timedelta(days=1), winner=2)
+
+    # Act
+    trend = read_rating_trend(db, 1, days=30)
+    peak = read_rating_peak(db, 1)
+
+    # Assert
+    assert [(day.season_id, day.close_rating) for day in trend] == [(get_active_season(db).id, -1)]
+    assert peak.rating == -1
+
+
+def test_sparkline():
+    assert sparkline([0, 3, 7]) == "▁▄█"
+    assert sparkline([5, 5]) == "▅▅"
+    assert sparkline([]) == ""
@@ -0,0 +1,138 @@
+import random
+from datetime import datetime, timedelta
+
+from app.match.models import Hero, Match, MatchParticipant, Player
+from app.rating.leaderboards import BOARDS, refresh_leaderboards
+from app.rating.models import PlayerHeroLeaderboard, PlayerLeaderboard
+from app.rating.seasons import get_active_season
+from app.rating.service import rebuild_all_ratings, revert_match_ratings, update_ratings_after_match
+from app.top.service import get_player_hero_ratings, get_player_position, get_top_clans, get_top_heroes, get_top_players
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def play(db, minutes, winner, players=(1, 2, 3, 4), hero_offset=0):
+    """Add a match of the active season won by ``winner`` and apply its ratings"""
+    get_active_season(db)
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).offset(hero_offset).limit(len(players)).all()]
+    match = Match(timestamp=START + timedelta(minutes=minutes), screenshot="file-id", win_type="prestige")
+    db.add(match)
+    db.flush()
+    for player_id, hero_id in zip(players, heroes):
+        db.add(MatchParticipant(
+            match_id=match.id, player_id=player_id, hero_id=hero_id,
+            is_winner=player_id == winner, win_type="prestige" if player_id == winner else None,
+        ))
+    db.commit()
+    update_ratings_after_match(db, match)
+    return match
+
+
+def board_of(db):
+    return [
+        (row.position, row.rank, row.player_id, row.rating)
+        for row in db.query(PlayerLeaderboard).order_by(PlayerLeaderboard.position)
+    ]
+
+
+def test_boards_follow_the_ratings_with_shared_ranks(seeded_db):
+    # Arrange
+    db = seeded_db
+
+    # Act
+    play(db, 0, winner=1)
+    play(db, 1, winner=2, players=(2, 3, 1, 4))
+
+    # Assert
+    assert board_of(db) == [(1, 1, 1, 3), (2, 1, 2, 3), (3, 3, 3, -2), (4, 3, 4, -2)]
+    assert [player["username"] for player in get_top_players(db, limit=2, offset=1)] == ["player2", "player3"]
+    assert get_top_players(db, limit=1)[0]["win_rate"] == 50.0
+    assert get_player_position(db, 4) == (3, 4)
+    assert [hero["rating"] for hero in get_top_heroes(db, limit=10)] == [8, -2, -2, -2]
+    assert sum(clan["wins"] for clan in get_top_clans(db)) == 2
+
+
+def test_a_match_only_rebuilds_the_boards_of_its_heroes(seeded_db):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1)
+    untouched = {row.id for row in db.query(PlayerHeroLeaderboard)}
+
+    # Act
+    play(db, 1, winner=3, players=(3, 4), hero_offset=4)
+
+    # Assert
+    assert untouched <= {row.id for row in db.query(PlayerHeroLeaderboard)}
+    fifth_hero = db.query(Hero).order_by(Hero.id).offset(4).first()
+    ratings = get_player_hero_ratings(db, hero_id=fifth_hero.id, limit=10)
+    assert [(rating["username"], rating["rating"], rating["win_rate"]) for rating in ratings] == [
+        ("player3", 4, 100.0)
+    ]
+
+
+def test_revert_and_rebuild_give_the_same_board_as_live_updates(seeded_db):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1)
+    reverted = play(db, 1, winner=4)
+    play(db, 2, winner=2, players=(2, 1, 4, 3))
+
+    # Act
+    revert_match_ratings(db, reverted.id)
+    after_revert = board_of(db)
+    rebuild_all_ratings(db)
+
+    # Assert
+    assert after_revert == board_of(db)
+    assert [player_id for _, _, player_id, _ in after_revert] == [1, 2, 3, 4]
+
+
+def test_a_player_joining_the_board_moves_the_rows_below_down(seeded_db):
+    # Arrange
+    db = seeded_db
+    db.add(Player(user_id=5, username="player5"))
+    db.commit()
+    play(db, 0, winner=1)
+    play(db, 1, winner=1)
+
+    # Act
+    play(db, 2, winner=5, players=(5, 1))
+    updated = boards_of(db)
+    refresh_leaderboards(db, get_active_season(db).id)
+
+    # Assert
+    assert board_of(db) == [(1, 1, 1, 7), (2, 2, 5, 4), (3, 3, 2, -2), (4, 3, 3, -2), (5, 3, 4, -2)]
+    assert updated == boards_of(db)
+
+
+def boards_of(db):
+    boards = {}
+    for board, _, _, columns, _ in BOARDS:
+        rows = db.query(board).order_by(*[getattr(board, column) for column in columns])
+        boards[board.__tablename__] = [
+            tuple(getattr(row, column) for column in ["position", "rank", *columns]) for row in rows
+        ]
+    return boards
+
+
+def test_updates_after_each_match_give_the_same_boards_as_a_full_rebuild(seeded_db):
+    # Arrange
+    db = seeded_db
+    db.add_all([Player(user_id=index, username=f"player{index}") for index in range(5, 13)])
+    db.commit()
+    rng = random.Random(7)
+    matches = []
+    for minute in range(40):
+        # New players keep joining, so rows are added below the re-ranked ranges
+        players = rng.sample(range(1, min(12, 4 + minute // 3) + 1), 4)
+        matches.append(play(db, minute, winner=rng.choice(players), players=players, hero_offset=rng.randrange(6)))
+
+    # Act
+    for match in rng.sample(matches, 5):
+        revert_match_ratings(db, match.id)
+    updated = boards_of(db)
+    refresh_leaderboards(db, get_active_season(db).id)
+    db.commit()
+
+    # Assert
+    assert updated == boards_of(db)
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.customtitle.service import create_custom_title
+from app.match.models import Hero, Match, MatchParticipant
+from app.rating.profile import get_profile, invalidate_profiles, read_profile
+from app.rating.seasons import get_active_season
+from app.rating.service import update_ratings_after_match
+from app.title.models import Title
+from app.title.service import update_title
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    invalidate_profiles()
+    yield
+    invalidate_profiles()
+
+
+def play(db, minutes, winner, players=(1, 2, 3)):
+    """Add a match of the active season won by ``winner`` and apply its ratings"""
+    get_active_season(db)
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(len(players)).all()]
+    match = Match(timestamp=START + timedelta(minutes=minutes), screenshot="file-id", win_type="prestige")
+    db.add(match)
+    db.flush()
+    for player_id, hero_id in zip(players, heroes):
+        db.add(MatchParticipant(
+            match_id=match.id, player_id=player_id, hero_id=hero_id,
+            is_winner=player_id == winner, win_type="prestige" if player_id == winner else None,
+        ))
+    db.commit()
+    update_ratings_after_match(db, match)
+    return match
+
+
+def test_the_card_is_read_in_one_statement(seeded_db, query_budget):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1)
+    play(db, 1, winner=2, players=(2, 1, 3))
+    db.add(Title(category="overall", title="Best", player_id=1))
+    db.commit()
+    create_custom_title(db, 1, "Founder")
+    first_hero, second_hero = db.query(Hero).order_by(Hero.id).limit(2).all()
+
+    # Act
+    with query_budget(1):
+        profile = read_profile(db, 1)
+
+    # Assert
+    assert profile.username == "player1"
+    assert (profile.overall.rating, profile.overall.wins, profile.overall.losses) == (3, 1, 1)
+    assert profile.overall.prestige_wins == 1
+    assert (profile.rank, profile.total_players) == (1, 3)
+    assert profile.heroes[first_hero.id].rating == 4
+    assert profile.heroes[second_hero.id].name == second_hero.name
+    assert sum(line.wins for line in profile.clans.values()) == 1
+    assert (profile.titles, profile.custom_titles) == (["Best"], ["Founder"])
+    assert read_profile(db, 999) is None
+
+
+def test_cards_are_cached_until_their_player_plays(seeded_db, query_budget):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1)
+    get_profile(db, 1)
+    get_profile(db, 4)
+
+    # Act
+    with query_budget(0):
+        cached = get_profile(db, 1)
+    play(db, 1, winner=2, players=(1, 2, 3))
+    with query_budget(0):
+        bystander = get_profile(db, 4)
+    refreshed = get_profile(db, 1)
+
+    # Assert
+    assert cached.overall.rating == 4
+    assert bystander.overall is None
+    assert refreshed.overall.rating == 3
+
+
+def test_a_title_change_drops_the_card_of_its_holder(seeded_db):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1)
+    db.add(Title(category="overall", title="Best", player_id=1))
+    db.commit()
+    before = get_profile(db, 1)
+
+    # Act
+    update_title(db, "overall", "Champion")
+    after = get_profile(db, 1)
+
+    # Assert
+    assert before.titles == ["Best"]
+    assert after.titles == ["Champion"]
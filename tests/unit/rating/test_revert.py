@@ -0,0 +1,86 @@
+from app.match.models import Hero
+from app.match.schemas import MatchCreate, ParticipantCreate
+from app.match.service import create_match
+from app.rating.models import (
+    GeneralClanRating,
+    GeneralHeroRating,
+    MatchRatingDelta,
+    PlayerClanRating,
+    PlayerHeroRating,
+    PlayerOverallRating,
+)
+from app.rating.service import revert_match_ratings, update_ratings_after_match
+
+RATING_TABLES = [PlayerOverallRating, PlayerHeroRating, PlayerClanRating, GeneralHeroRating, GeneralClanRating]
+
+
+def record_match(db, hero_ids, winner, win_type="prestige"):
+    participants = [
+        ParticipantCreate(username=f"player{index}", hero_id=hero_id) for index, hero_id in enumerate(hero_ids, 1)
+    ]
+    match = create_match(
+        db, MatchCreate(screenshot="file-id", win_type=win_type, participants=participants, winner_username=winner)
+    )
+    update_ratings_after_match(db, match)
+    return match
+
+
+def snapshot(db):
+    rows = {}
+    for model in RATING_TABLES:
+        for row in db.query(model).all():
+            values = {column.name: getattr(row, column.name) for column in model.__table__.columns if column.name != "id"}
+            rows[(model.__tablename__, tuple(sorted(values.items())))] = values
+    # Rows that were created by the reverted match remain with zero counters
+    return {key for key, values in rows.items() if values.get("wins") or values.get("losses")}
+
+
+def test_revert_restores_ratings_before_the_match(seeded_db):
+    # Arrange
+    db = seeded_db
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).all()]
+    record_match(db, heroes[0:4], "player1")
+    before = snapshot(db)
+    match = record_match(db, [heroes[0], heroes[5], heroes[9], heroes[13]], "player3", "murder")
+
+    # Act
+    affected_clans = revert_match_ratings(db, match.id)
+
+    # Assert
+    assert snapshot(db) == before
+    assert affected_clans == {1, 2, 3, 4}
+    assert db.query(MatchRatingDelta).filter_by(match_id=match.id).count() == 0
+
+
+def test_revert_derives_deltas_for_legacy_matches(seeded_db):
+    # Arrange
+    db = seeded_db
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).all()]
+    record_match(db, heroes[4:8], "player2", "stones")
+    before = snapshot(db)
+    match = record_match(db, heroes[8:12], "player4", "decay")
+    db.query(MatchRatingDelta).filter_by(match_id=match.id).delete()
+    db.commit()
+
+    # Act
+    revert_match_ratings(db, match.id)
+
+    # Assert
+    assert snapshot(db) == before
+
+
+def test_revert_of_unknown_match_returns_none(seeded_db):
+    assert revert_match_ratings(seeded_db, 999) is None
+
+
+def test_ratings_are_not_applied_twice(seeded_db):
+    # Arrange
+    db = seeded_db
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).all()]
+    match = record_match(db, heroes[0:4], "player1")
+
+    # Act
+    update_ratings_after_match(db, match)
+
+    # Assert
+    assert db.query(PlayerOverallRating).filter_by(player_id=1).one().rating == 4
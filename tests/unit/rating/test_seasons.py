@@ -0,0 +1,105 @@
+from sqlalchemy import event
+
+from app.match.models import Hero, Match
+from app.match.schemas import MatchCreate, ParticipantCreate
+from app.match.service import create_match, delete_all_matches
+from app.rating.models import PlayerOverallRating, Season
+from app.rating.seasons import close_season, get_active_season
+from app.rating.service import get_player_overall_rating, rebuild_all_ratings, update_ratings_after_match
+from app.title.models import Title
+from app.top.service import get_top_players
+
+
+def record_match(db, winner):
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(4).all()]
+    participants = [
+        ParticipantCreate(username=f"player{index}", hero_id=hero_id) for index, hero_id in enumerate(heroes, 1)
+    ]
+    match = create_match(
+        db, MatchCreate(screenshot="file-id", win_type="prestige", participants=participants, winner_username=winner)
+    )
+    update_ratings_after_match(db, match)
+    return match
+
+
+def test_closing_a_season_starts_from_zero_and_keeps_the_archive(seeded_db):
+    # Arrange
+    db = seeded_db
+    record_match(db, "player1")
+    record_match(db, "player1")
+    db.add(Title(category="overall", title="Best", player_id=1))
+    db.commit()
+    first = get_active_season(db)
+
+    # Act
+    second = close_season(db, "Spring")
+    match = record_match(db, "player2")
+
+    # Assert
+    assert match.season_id == second.id != first.id
+    assert db.query(Season).filter_by(is_active=True).one().name == "Spring"
+    assert get_player_overall_rating(db, 1).rating == -1
+    assert [player["username"] for player in get_top_players(db, limit=1)] == ["player2"]
+    archived = db.query(PlayerOverallRating).filter_by(season_id=first.id, player_id=1).one()
+    assert archived.rating == 8
+    titles = {title.season_id: (title.title, title.player_id) for title in db.query(Title)}
+    assert titles == {first.id: ("Best", 1), second.id: ("Best", None)}
+
+
+def test_rebuild_touches_only_the_active_season(seeded_db):
+    # Arrange
+    db = seeded_db
+    record_match(db, "player1")
+    first = get_active_season(db).id
+    close_season(db)
+    record_match(db, "player3")
+
+    # Act
+    stats = rebuild_all_ratings(db)
+
+    # Assert
+    assert stats["matches_total"] == 1
+    assert db.query(PlayerOverallRating).filter_by(season_id=first, player_id=1).one().rating == 4
+    assert get_player_overall_rating(db, 3).rating == 4
+    assert get_player_overall_rating(db, 1).rating == -1
+
+
+def test_deleting_all_matches_keeps_the_archived_seasons(seeded_db):
+    # Arrange
+    db = seeded_db
+    archived = record_match(db, "player1")
+    close_season(db)
+    record_match(db, "player2")
+
+    # Act
+    delete_all_matches(db)
+    stats = rebuild_all_ratings(db)
+
+    # Assert
+    assert [match.id for match in db.query(Match)] == [archived.id]
+    assert stats["matches_total"] == 0
+    assert db.query(PlayerOverallRating).filter_by(season_id=archived.season_id, player_id=1).one().rating == 4
+
+
+def test_two_rollovers_from_a_database_without_seasons(db):
+    # Arrange
+    inserts = []
+
+    def record_insert(connection, cursor, statement, *args):
+        if statement.startswith("INSERT INTO seasons"):
+            inserts.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", record_insert)
+
+    # Act
+    first = get_active_season(db)
+    second = close_season(db)
+    third = close_season(db)
+
+    # Assert
+    assert [(season.id, season.is_active) for season in db.query(Season).order_by(Season.id)] == [
+        (first.id, False), (second.id, False), (third.id, True)
+    ]
+    assert (first.id, second.id, third.id) == (1, 2, 3)
+    # The database assigns every id, so a PostgreSQL sequence stays ahead of the rows
+    assert len(inserts) == 3 and not any("(id," in statement for statement in inserts)
@@ -0,0 +1,24 @@
+from app.rating.models import PlayerOverallRating
+from app.rating.seasons import get_active_season
+from app.title.models import Title
+from app.title.service import get_title, refresh_titles
+
+
+def test_refresh_moves_the_title_that_get_title_reads(seeded_db):
+    # Arrange
+    db = seeded_db
+    season_id = get_active_season(db).id
+    db.add_all([
+        Title(season_id=season_id, category="overall", title="First", player_id=1),
+        Title(season_id=season_id, category="overall", title="Duplicate", player_id=1),
+        PlayerOverallRating(season_id=season_id, player_id=2, rating=8),
+    ])
+    db.commit()
+
+    # Act
+    refresh_titles(db, {"overall"})
+
+    # Assert
+    title = get_title(db, "overall")
+    assert (title.title, title.player_id) == ("First", 2)
+    assert db.query(Title).filter_by(title="Duplicate").one().player_id == 1
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from app.match.models import Hero, Match, MatchParticipant
+from app.rating.seasons import get_active_season
+from app.rating.service import revert_match_ratings, update_ratings_after_match
+from app.versus.models import PlayerPair
+from app.versus.service import read_head_to_head, rebuild_player_pairs
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def play(db, minutes, winner, players=(1, 2, 3, 4)):
+    """Add a match won by ``winner`` and apply it"""
+    get_active_season(db)
+    heroes = [hero.id for hero in db.query(Hero).order_by(Hero.id).limit(len(players)).all()]
+    match = Match(timestamp=START + timedelta(minutes=minutes), screenshot="file-id", win_type="prestige")
+    db.add(match)
+    db.flush()
+    for player_id, hero_id in zip(players, heroes):
+        db.add(MatchParticipant(
+            match_id=match.id, player_id=player_id, hero_id=hero_id,
+            is_winner=player_id == winner, win_type="prestige" if player_id == winner else None,
+        ))
+    db.commit()
+    update_ratings_after_match(db, match)
+    return match
+
+
+def pairs_of(db):
+    return sorted(
+        (row.player_a_id, row.player_b_id, row.games, row.a_wins, row.b_wins) for row in db.query(PlayerPair)
+    )
+
+
+def test_matches_update_the_pairs_of_their_players(seeded_db, query_budget):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1)
+    play(db, 1, winner=3, players=(3, 1, 2))
+
+    # Act
+    with query_budget(1):
+        first = read_head_to_head(db, 1, 3)
+    second = read_head_to_head(db, 3, 1)
+
+    # Assert
+    assert (first.games, first.wins, first.opponent_wins, first.other_wins) == (2, 1, 1, 0)
+    assert (second.wins, second.opponent_wins) == (1, 1)
+    assert (read_head_to_head(db, 2, 4).games, read_head_to_head(db, 2, 4).other_wins) == (1, 1)
+    assert read_head_to_head(db, 3, 4).games == 1
+    assert len(pairs_of(db)) == 6
+
+
+def test_a_reverted_match_leaves_its_pairs(seeded_db):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1, players=(1, 2))
+    reverted = play(db, 1, winner=4)
+
+    # Act
+    revert_match_ratings(db, reverted.id)
+
+    # Assert
+    assert pairs_of(db) == [(1, 2, 1, 1, 0)]
+    assert read_head_to_head(db, 3, 4) is None
+
+
+def test_the_rebuild_gives_the_incremental_pairs(seeded_db):
+    # Arrange
+    db = seeded_db
+    play(db, 0, winner=1)
+    play(db, 1, winner=2, players=(4, 2, 1))
+    reverted = play(db, 2, winner=3, players=(3, 2))
+    play(db, 3, winner=4, players=(2, 3, 4, 1))
+    revert_match_ratings(db, reverted.id)
+    incremental = pairs_of(db)
+
+    # Act
+    count = rebuild_player_pairs(db)
+
+    # Assert
+    assert count == 6
+    assert pairs_of(db) == incremental